@@ -1,47 +1,36 @@
+import os
+import sys
+
 import graphviz
 
+# O esquema vem do módulo de ingestão, a mesma fonte do validador (validacao.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mineirao_2024_2025_datasets'))
+import ingestao  # noqa: E402
+
 # ==============================================================================
 # 1. Definição do Modelo Star Schema
 # ==============================================================================
 
-# Definição das tabelas e suas chaves
-schema = {
-    "FATOS": {
-        "FATO_JOGOS": ["jogo_id (PK)", "data_id (FK)", "adversario_id (FK)", "publico_pago", "receita_ingresso_mil_rs", "taxa_ocupacao"],
-        "FATO_CONSUMO": ["jogo_id (FK)", "produto_id (FK)", "qtd_vendida", "receita_produto_rs"],
-        "FATO_MOBILIDADE_INCIDENTES": ["jogo_id (FK)", "setor_id (FK)", "publico_setor", "tempo_entrada_medio_min", "incidente_contagem"],
-        "FATO_MERCADO_INGRESSOS": ["data_id (FK)", "canal_id (FK)", "socios_ativos", "vendas_canal"],
-        "FATO_PROJECAO": ["jogo_id (FK)", "publico_projetado", "receita_projetada_mil_rs"],
-        "FATO_RECEITA_AGREGADA": ["categoria_receita", "receita_total_mil_rs"] # Tabela agregada - sem chaves FK
-    },
-    "DIMENSOES": {
-        "DIM_DATA": ["data_id (PK)", "ano", "mes", "dia_semana"],
-        "DIM_ADVERSARIO": ["adversario_id (PK)", "nome_adversario", "competicao", "nivel_confronto"],
-        "DIM_SETOR": ["setor_id (PK)", "nome_setor", "capacidade_mil"],
-        "DIM_PRODUTO": ["produto_id (PK)", "item_vendido", "categoria", "preco_medio_rs"],
-        "DIM_CANAL": ["canal_id (PK)", "nome_canal", "tipo_operacao"],
-        "DIM_PERFIL_TORCEDOR": ["perfil_id (PK)", "faixa_etaria", "genero"] # Não possui FK nos fatos, mas é parte da dimensão conceitual
-    }
-}
+# Chaves estrangeiras por tabela, a partir dos relacionamentos
+foreign_keys = {(source, column) for source, _, column in ingestao.RELACIONAMENTOS}
 
-# Definição dos Relacionamentos (Fatos -> Dimensões/Outros Fatos)
-relationships = [
-    # FATO_JOGOS (Fato Central)
-    ("FATO_JOGOS", "DIM_DATA", "data_id"),
-    ("FATO_JOGOS", "DIM_ADVERSARIO", "adversario_id"),
-    
-    # Fatos Granulares que se ligam ao JOGO
-    ("FATO_CONSUMO", "FATO_JOGOS", "jogo_id (Fato-a-Fato)"),
-    ("FATO_MOBILIDADE_INCIDENTES", "FATO_JOGOS", "jogo_id (Fato-a-Fato)"),
-    ("FATO_PROJECAO", "FATO_JOGOS", "jogo_id (Fato-a-Fato)"),
+# Tabelas e colunas (PK/FK) de ingestao.ESQUEMA, agrupadas em fatos e dimensões
+schema = {"FATOS": {}, "DIMENSOES": {}}
+for table, spec in ingestao.ESQUEMA.items():
+    group = "FATOS" if table.startswith('fato_') else "DIMENSOES"
+    columns = []
+    for column in spec['colunas']:
+        if (table, column) in foreign_keys:
+            column += " (FK)"
+        elif column in spec['chaves']:
+            column += " (PK)"
+        columns.append(column)
+    schema[group][table.upper()] = columns
 
-    # Dimensões específicas dos Fatos Granulares
-    ("FATO_CONSUMO", "DIM_PRODUTO", "produto_id"),
-    ("FATO_MOBILIDADE_INCIDENTES", "DIM_SETOR", "setor_id"),
-    
-    # FATO_MERCADO_INGRESSOS
-    ("FATO_MERCADO_INGRESSOS", "DIM_DATA", "data_id"),
-    ("FATO_MERCADO_INGRESSOS", "DIM_CANAL", "canal_id"),
+# Relacionamentos (Fatos -> Dimensões/Outros Fatos); fato-a-fato quando o destino é um fato
+relationships = [
+    (source.upper(), target.upper(), f"{column} (Fato-a-Fato)" if target.startswith('fato_') else column)
+    for source, target, column in ingestao.RELACIONAMENTOS
 ]
 
 # ==============================================================================
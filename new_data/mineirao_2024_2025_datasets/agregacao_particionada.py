@@ -0,0 +1,368 @@
+import os
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import ingestao
+import juncao_estrela
+import consulta_sql
+import tabela_mestre
+import figuras
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+
+# --- 1. CONFIGURAÇÃO ---
+# Motor de agregação particionado: os fatos ficam no Parquet por ano/mes de
+# consulta_sql.particionar (um por estádio, cada um com o seu diretório de CSVs). As
+# partições (estádio, temporada, mês) de cada estádio são divididas em um lote contíguo
+# por processo; o processo lê só as colunas usadas do seu lote e devolve agregados parciais
+# combináveis (soma, contagem, mínimo, máximo; média = soma / contagem), calculados direto
+# sobre os buffers do Arrow, sem passar pelo pandas. O processo principal só combina poucos
+# parciais pequenos.
+# Os parciais combinados têm uma linha por grupo e as colunas do fato; os agregados das
+# figuras passam pelas mesmas funções do caminho pandas (figuras.agregar_*) e os da tabela
+# mestre saem com os nomes de tabela_mestre.agregar_fatos: mesmas colunas, tipos e ordem.
+#
+# Medido (relatorio(), máquina de 1 núcleo) contra o pandas com as tabelas já em memória:
+#   100.000 jogos (1,5 mi de linhas de fatos):    1 processo 0,43 s = 0,67x (pandas 0,29 s; 0,51 s com a carga dos CSVs)
+#   1.000.000 jogos (14,6 mi de linhas de fatos): 1 processo 2,80 s = 0,69x (pandas 1,95 s; 3,32 s com a carga dos CSVs)
+# (antes dos lotes por processo e das contas sobre o Arrow: 0,42x e 0,61x)
+# Sem uma máquina com vários núcleos não há medição de ganho com processos, então o motor
+# fica fora do pipeline do app (pipeline.criar_pipeline usa sempre o pandas ou o SQL); ele
+# serve para agregar vários estádios e para medir com relatorio() onde houver núcleos.
+ESTADIO_PADRAO = 'Mineirão'
+
+# Agregação -> (fato, colunas de grupo, {coluna do fato: operação})
+AGREGACOES = {
+    'consumo_jogo': ('fato_consumo', ['jogo_id'], {'receita_produto_rs': 'sum'}),
+    'ingressos_data': ('fato_mercado_ingressos', ['data_id'],
+                       {'socios_ativos': 'max', 'novas_adesoes': 'max', 'vendas_canal': 'sum'}),
+    'mobilidade_jogo': ('fato_mobilidade_incidentes', ['jogo_id'],
+                        {'tempo_entrada_medio_min': 'mean', 'tempo_saida_medio_min': 'mean',
+                         'incidente_contagem': 'sum'}),
+    'consumo_item': ('fato_consumo', ['categoria', 'item_vendido'], {'receita_produto_rs': 'sum'}),
+    'ingressos_tipo': ('fato_mercado_ingressos', ['tipo_operacao'], {'vendas_canal': 'sum'}),
+    'mobilidade_setor': ('fato_mobilidade_incidentes', ['nome_setor'],
+                         {'tempo_entrada_medio_min': 'mean', 'tempo_saida_medio_min': 'mean',
+                          'incidente_contagem': 'sum', 'tempo_resposta_min': 'mean', 'publico_setor': 'sum'}),
+}
+
+# Colunas de grupo que vêm de uma dimensão -> (dimensão, chave no fato)
+DIMENSOES = {
+    'categoria': ('dim_produto', 'produto_id'),
+    'item_vendido': ('dim_produto', 'produto_id'),
+    'tipo_operacao': ('dim_canal', 'canal_id'),
+    'nome_setor': ('dim_setor', 'setor_id'),
+}
+
+# Agregados da tabela mestre (os de tabela_mestre.agregar_fatos) -> (agregação, colunas renomeadas)
+MASTER = {
+    'consumo': ('consumo_jogo', {'receita_produto_rs': 'receita_total_consumo_rs'}),
+    'ingressos': ('ingressos_data', {'socios_ativos': 'socios_ativos_dia', 'novas_adesoes': 'novas_adesoes_dia',
+                                     'vendas_canal': 'vendas_total_ingressos'}),
+    'mobilidade': ('mobilidade_jogo', {'incidente_contagem': 'incidentes_total'}),
+}
+
+# Agregado das figuras (pipeline.NOS_AGREGADOS) -> (agregação, função de figuras.py)
+FIGURAS = {
+    'receita_categoria': ('consumo_item', figuras.agregar_receita_categoria),
+    'top_itens': ('consumo_item', figuras.agregar_top_itens),
+    'vendas_tipo': ('ingressos_tipo', figuras.agregar_vendas_tipo),
+    'mobilidade_setor': ('mobilidade_setor', figuras.agregar_mobilidade_setor),
+    'incidentes_setor': ('mobilidade_setor', figuras.agregar_incidentes_setor),
+}
+
+FATOS = sorted({fato for fato, _, _ in AGREGACOES.values()})
+
+# Operação -> estatísticas parciais guardadas (coluna_<sufixo>) e como combiná-las
+PARCIAIS = {'sum': ['soma'], 'count': ['contagem'], 'min': ['min'], 'max': ['max'], 'mean': ['soma', 'contagem']}
+CALCULO = {'soma': 'sum', 'contagem': 'count', 'min': 'min', 'max': 'max'}
+COMBINACAO = {'soma': 'sum', 'contagem': 'sum', 'min': 'min', 'max': 'max'}
+
+
+# --- 2. AGREGADOS PARCIAIS POR PARTIÇÃO (roda nos processos) ---
+# Nas partições o grupo é sempre uma chave inteira do fato (jogo_id, produto_id...): os
+# atributos das dimensões (categoria, nome_setor...) só entram na combinação, sobre os
+# parciais, e cada estádio usa as suas próprias dimensões.
+def chave_particao(grupo):
+    return list(dict.fromkeys(DIMENSOES[coluna][1] if coluna in DIMENSOES else coluna for coluna in grupo))
+
+
+def _codificar(valores_chave):
+    # (códigos, valores distintos, códigos presentes). Chaves inteiras densas (jogo_id, data_id,
+    # ids das dimensões) viram código por subtração, sem o sort do np.unique; os códigos sem
+    # linha são descartados depois das contas (presentes=None: todos têm linha)
+    if valores_chave.dtype.kind in 'iu' and len(valores_chave):
+        menor = valores_chave.min()
+        amplitude = int(valores_chave.max() - menor) + 1
+        if amplitude <= 2 * len(valores_chave):
+            codigos = (valores_chave - menor).astype(np.intp)
+            presentes = np.bincount(codigos, minlength=amplitude) > 0
+            return codigos, (np.flatnonzero(presentes) + menor).astype(valores_chave.dtype), presentes
+    unicos, codigos = np.unique(valores_chave, return_inverse=True)
+    return codigos, unicos, None
+
+
+def resumir(colunas, chave, operacoes):
+    # colunas: {nome: array do numpy}. Estatísticas por código de grupo com bincount/ufunc.at,
+    # sem o overhead fixo do groupby do pandas
+    codigos, unicos, presentes = _codificar(colunas[chave])
+    tamanho = len(unicos) if presentes is None else len(presentes)
+
+    def manter(estatistica):
+        return estatistica if presentes is None else estatistica[presentes]
+
+    parcial = {chave: unicos}
+    for coluna, operacao in operacoes.items():
+        valores = colunas[coluna]
+        validos = ~np.isnan(valores) if valores.dtype.kind == 'f' else None
+        limpos = valores if validos is None else np.where(validos, valores, 0)
+        contagem = manter(np.bincount(codigos if validos is None else codigos[validos], minlength=tamanho))
+        for sufixo in PARCIAIS[operacao]:
+            if sufixo == 'soma':
+                # bincount soma em float64; inteiros voltam exatos (|soma| < 2**53)
+                soma = manter(np.bincount(codigos, weights=limpos, minlength=tamanho))
+                parcial[f'{coluna}_soma'] = soma.astype(valores.dtype) if validos is None else soma
+            elif sufixo == 'contagem':
+                parcial[f'{coluna}_contagem'] = contagem
+            else:
+                ufunc, neutro = (np.maximum, -np.inf) if sufixo == 'max' else (np.minimum, np.inf)
+                extremo = np.full(tamanho, neutro)
+                ufunc.at(extremo, codigos, np.where(validos, valores, neutro) if validos is not None else valores)
+                extremo = manter(extremo)
+                extremo[contagem == 0] = np.nan
+                parcial[f'{coluna}_{sufixo}'] = extremo.astype(valores.dtype) if validos is None else extremo
+    return pd.DataFrame(parcial)
+
+
+def agregar_lote(lote):
+    # lote: {fato: [pastas ano=/mes= das partições do lote]}; devolve ({agregação: parcial}, segundos)
+    inicio = time.perf_counter()
+    parciais = {}
+    for fato, pastas in lote.items():
+        especificacoes = {nome: (chave_particao(grupo)[0], operacoes)
+                          for nome, (nome_fato, grupo, operacoes) in AGREGACOES.items() if nome_fato == fato}
+        nomes = sorted({c for chave, operacoes in especificacoes.values() for c in [chave, *operacoes]})
+        tabela = pa.concat_tables([pq.read_table(pasta, columns=nomes) for pasta in pastas])
+        colunas = {nome: tabela.column(nome).to_numpy() for nome in nomes}
+        for nome, (chave, operacoes) in especificacoes.items():
+            parciais[nome] = resumir(colunas, chave, operacoes)
+    return parciais, time.perf_counter() - inicio
+
+
+# --- 3. COMBINAÇÃO DOS PARCIAIS ---
+def combinar(parciais, grupo, operacoes):
+    # Parciais (de partições ou estádios) -> uma linha por grupo, em ordem de chave
+    if not parciais:
+        parciais = [pd.DataFrame(columns=grupo + [f'{c}_{s}' for c, op in operacoes.items() for s in PARCIAIS[op]])]
+    df = pd.concat(parciais, ignore_index=True)
+    if len(grupo) == 1 and df[grupo[0]].is_unique:
+        # Chaves que não se repetem entre partições (jogo_id, data_id): só ordenar
+        return df.sort_values(grupo[0], ignore_index=True)
+    regras = {c: COMBINACAO[c.rsplit('_', 1)[1]] for c in df.columns if c not in grupo}
+    return df.groupby(grupo, sort=True).agg(regras).reset_index()
+
+
+def finalizar(df, grupo, operacoes):
+    # Estatísticas -> colunas do fato (média = soma / contagem, como tabela_mestre._montar_linhas)
+    resultado = df[grupo].copy()
+    for coluna, operacao in operacoes.items():
+        if operacao == 'mean':
+            resultado[coluna] = df[f'{coluna}_soma'] / df[f'{coluna}_contagem'].replace(0, np.nan)
+        else:
+            resultado[coluna] = df[f'{coluna}_{PARCIAIS[operacao][0]}']
+    return resultado
+
+
+def traduzir(estatisticas, raiz, grupo):
+    # Chave da dimensão -> atributos do grupo, pela dimensão do próprio estádio; chaves sem
+    # par ficam nulas e saem do groupby, como no detalhe do caminho pandas
+    dimensao, chave = DIMENSOES[grupo[0]]
+    dim = pq.read_table(os.path.join(raiz, f'{dimensao}.parquet'), columns=[chave, *grupo]).to_pandas()
+    return juncao_estrela.juntar(estatisticas, [(dim, chave, grupo)]).drop(columns=chave)
+
+
+# --- 4. MOTOR ---
+class MotorParticionado:
+    def __init__(self, fontes=None, trabalhadores=None):
+        # fontes: {estádio: diretório dos CSVs} (padrão: o diretório do app, como ESTADIO_PADRAO)
+        self.fontes = fontes or {ESTADIO_PADRAO: ingestao.DIRETORIO_PADRAO}
+        self.trabalhadores = trabalhadores or os.cpu_count() or 1
+        self.raizes = {estadio: consulta_sql.particionar(diretorio) for estadio, diretorio in self.fontes.items()}
+
+    def particoes(self, anos=(), estadios=()):
+        # [(estádio, ano, mês, {fato: pasta})]; filtros de temporada e estádio podam partições
+        # (a partição nula, de linhas sem período, só entra sem filtro de temporada)
+        anos = {str(a) for a in anos}
+        particoes = {}
+        for estadio, raiz in self.raizes.items():
+            if estadios and estadio not in estadios:
+                continue
+            for fato in FATOS:
+                base = os.path.join(raiz, fato)
+                for pasta_ano in sorted(os.listdir(base)):
+                    ano = pasta_ano.split('=', 1)[1]
+                    if anos and ano not in anos:
+                        continue
+                    for pasta_mes in sorted(os.listdir(os.path.join(base, pasta_ano))):
+                        chave = (estadio, ano, pasta_mes.split('=', 1)[1])
+                        particoes.setdefault(chave, {})[fato] = os.path.join(base, pasta_ano, pasta_mes)
+        return [(*chave, pastas) for chave, pastas in particoes.items()]
+
+    def lotes(self, anos=(), estadios=()):
+        # [(estádio, {fato: [pastas]})]: as partições de cada estádio, em ordem de período,
+        # divididas em até `trabalhadores` lotes contíguos de tamanho parecido
+        por_estadio = {}
+        for estadio, _, _, pastas in self.particoes(anos, estadios):
+            por_estadio.setdefault(estadio, []).append(pastas)
+        lotes = []
+        for estadio, particoes in por_estadio.items():
+            for parte in np.array_split(np.arange(len(particoes)), min(self.trabalhadores, len(particoes))):
+                lote = {}
+                for i in parte:
+                    for fato, pasta in particoes[i].items():
+                        lote.setdefault(fato, []).append(pasta)
+                lotes.append((estadio, lote))
+        return lotes
+
+    def parciais(self, anos=(), estadios=()):
+        # {agregação: {estádio: [parcial de cada lote]}}
+        tarefas = self.lotes(anos, estadios)
+        lotes = [lote for _, lote in tarefas]
+        if self.trabalhadores < 2 or len(lotes) < 2:
+            resultados = [agregar_lote(lote) for lote in lotes]
+        else:
+            with ProcessPoolExecutor(min(self.trabalhadores, len(lotes))) as executor:
+                resultados = list(executor.map(agregar_lote, lotes))
+        self.tempos_lotes = [segundos for _, segundos in resultados]
+        parciais = {nome: {} for nome in AGREGACOES}
+        for (estadio, _), (resultado, _) in zip(tarefas, resultados):
+            for nome, parcial in resultado.items():
+                parciais[nome].setdefault(estadio, []).append(parcial)
+        return parciais
+
+    def agregar_todos(self, anos=(), estadios=()):
+        # {'master': os agregados de tabela_mestre.agregar_fatos, <agregado das figuras>: quadro}.
+        # jogo_id e data_id são chaves de cada estádio: o 'master' só sai para um estádio.
+        parciais = self.parciais(anos, estadios)
+        combinados = {}
+        for nome, (_, grupo, operacoes) in AGREGACOES.items():
+            chave = chave_particao(grupo)
+            por_estadio = []
+            for estadio, lista in parciais[nome].items():
+                estatisticas = combinar(lista, chave, operacoes)
+                por_estadio.append(estatisticas if chave == grupo else traduzir(estatisticas, self.raizes[estadio], grupo))
+            if len(por_estadio) != 1 or chave != grupo:
+                por_estadio = [combinar(por_estadio, grupo, operacoes)]
+            combinados[nome] = finalizar(por_estadio[0], grupo, operacoes)
+
+        # Uma linha por grupo com as colunas do fato: as funções do caminho pandas dão os
+        # mesmos quadros (o groupby delas só reagrupa linhas únicas)
+        resultado = {nome: funcao(combinados[base]) for nome, (base, funcao) in FIGURAS.items()}
+        if len(estadios or self.fontes) == 1:
+            resultado['master'] = {nome: combinados[base].rename(columns=renomear)
+                                   for nome, (base, renomear) in MASTER.items()}
+        return resultado
+
+
+# --- 5. COMPARAÇÃO COM O CAMINHO PANDAS ---
+def caminho_pandas(tabelas):
+    # Caminho atual: detalhes por junção em estrela e groupby sobre a tabela inteira
+    detalhes = {
+        'consumo': juncao_estrela.juntar(tabelas['fato_consumo'], [(tabelas['dim_produto'], 'produto_id', None)]),
+        'ingressos': juncao_estrela.juntar(tabelas['fato_mercado_ingressos'], [(tabelas['dim_canal'], 'canal_id', None)]),
+        'mobilidade': juncao_estrela.juntar(tabelas['fato_mobilidade_incidentes'],
+                                            [(tabelas['dim_setor'], 'setor_id', None)]),
+    }
+    origem = {'receita_categoria': 'consumo', 'top_itens': 'consumo', 'vendas_tipo': 'ingressos',
+              'mobilidade_setor': 'mobilidade', 'incidentes_setor': 'mobilidade'}
+    resultado = {nome: funcao(detalhes[origem[nome]]) for nome, (_, funcao) in FIGURAS.items()}
+    resultado['master'] = tabela_mestre.agregar_fatos(tabelas)
+    return resultado
+
+
+def diferencas(esperado, obtido):
+    # Nomes dos quadros que diferem (decimais com tolerância relativa de 1e-9: a ordem
+    # das somas muda entre partições)
+    erros = []
+    for nome, df in esperado.items():
+        pares = df.items() if isinstance(df, dict) else [(None, df)]
+        for sub, quadro in pares:
+            outro = obtido[nome][sub] if sub else obtido[nome]
+            try:
+                pd.testing.assert_frame_equal(quadro.reset_index(drop=True), outro.reset_index(drop=True),
+                                              rtol=1e-9)
+            except AssertionError:
+                erros.append(f'{nome}.{sub}' if sub else nome)
+    return erros
+
+
+def relatorio(diretorio=None, processos=(1, 2, 4), repeticoes=3, anos=()):
+    def melhor(funcao):
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            resultado = funcao()
+            tempos.append(time.perf_counter() - inicio)
+        return min(tempos), resultado
+
+    def milhar(valor):
+        return f'{valor:,}'.replace(',', '.')
+
+    diretorio = diretorio or ingestao.DIRETORIO_PADRAO
+    inicio = time.perf_counter()
+    motor = MotorParticionado({ESTADIO_PADRAO: diretorio})
+    preparo = time.perf_counter() - inicio
+    particoes = motor.particoes(anos)
+    temporadas = sorted({ano for _, ano, _, _ in particoes})
+
+    inicio = time.perf_counter()
+    tabelas = ingestao.carregar_tabelas(diretorio, compacto=False)
+    carga = time.perf_counter() - inicio
+    linhas = sum(len(tabelas[fato]) for fato in FATOS)
+    print(f"📦 {milhar(linhas)} linhas de fatos; {len(particoes)} partições (estádio, temporada, mês) em "
+          f"{len(temporadas)} temporada(s); Parquet particionado pronto em {preparo:.2f} s; "
+          f"{os.cpu_count()} núcleo(s)")
+    if anos:
+        print("⚠️ Com filtro de temporada só o motor é medido (o caminho pandas filtra depois de agregar tudo)")
+
+    print(f"{'Caminho':<36}{'Tempo (s)':>11}{'Aceleração':>12}")
+    base = None
+    if not anos:
+        base, esperado = melhor(lambda: caminho_pandas(tabelas))
+        print(f"{'pandas (tabelas já em memória)':<36}{base:>11.3f}{'1.00x':>12}")
+        print(f"{'pandas (carga dos CSVs + groupby)':<36}{carga + base:>11.3f}{base / (carga + base):>11.2f}x")
+    erros = []
+    for n in processos:
+        motor.trabalhadores = n
+        tempo, obtido = melhor(lambda: motor.agregar_todos(anos))
+        aceleracao = f'{base / tempo:.2f}x' if base else '-'
+        print(f"{f'motor particionado, {n} processo(s)':<36}{tempo:>11.3f}{aceleracao:>12}")
+        if base:
+            erros += [e for e in diferencas(esperado, obtido) if e not in erros]
+
+    # Só tempos medidos: com mais processos que núcleos eles disputam a mesma CPU
+    nucleos = os.cpu_count() or 1
+    if nucleos < max(processos):
+        print(f"⚠️ Só {nucleos} núcleo(s) disponível(is): os tempos acima de {nucleos} processo(s) não medem ganho")
+    if base:
+        print(f"❌ Quadros diferentes do caminho pandas: {', '.join(erros)}" if erros else
+              "✅ Conferido: o motor devolve os mesmos quadros do caminho pandas")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Agregação particionada (estádio, temporada) em processos.')
+    parser.add_argument('diretorio', nargs='?', default=None, help='diretório dos CSVs (padrão: MINEIRAO_DADOS)')
+    parser.add_argument('--processos', type=int, nargs='+', default=[1, 2, 4], help='números de processos a medir')
+    parser.add_argument('--repeticoes', type=int, default=3, help='repetições por medida (vale a melhor)')
+    parser.add_argument('--anos', type=int, nargs='*', default=[], help='só estas temporadas (poda partições)')
+    args = parser.parse_args()
+    relatorio(args.diretorio, args.processos, args.repeticoes, args.anos)
@@ -0,0 +1,71 @@
+import numpy as np
+
+
+# Redução de séries temporais no servidor, para que gráficos com centenas de milhares
+# de pontos enviem ao navegador só o necessário para a resolução da tela.
+# x deve estar ordenado (numérico, ex.: datetime64 convertido para int64).
+
+def reduzir_minmax(x, y, n_saida):
+    # Divide a série em (n_saida - 2) / 2 faixas e mantém o mínimo e o máximo de cada uma,
+    # preservando picos e vales (bom para barras de público), mais o primeiro e o último
+    # ponto, para a série ir de borda a borda. Totalmente vetorizado.
+    n = len(x)
+    if n <= n_saida:
+        return np.arange(n)
+    faixas = max(1, (n_saida - 2) // 2)
+    inicios = np.arange(faixas) * n // faixas
+    tamanhos = np.diff(np.r_[inicios, n])
+    posicoes = np.arange(n)
+
+    # Valor mínimo/máximo por faixa e, em seguida, a primeira posição que o atinge
+    minimos = np.repeat(np.minimum.reduceat(y, inicios), tamanhos)
+    maximos = np.repeat(np.maximum.reduceat(y, inicios), tamanhos)
+    idx_min = np.minimum.reduceat(np.where(y == minimos, posicoes, n), inicios)
+    idx_max = np.minimum.reduceat(np.where(y == maximos, posicoes, n), inicios)
+    return np.unique(np.concatenate([[0, n - 1], idx_min, idx_max]))
+
+
+def reduzir_lttb(x, y, n_saida):
+    # Largest-Triangle-Three-Buckets: mantém, em cada faixa, o ponto que forma o maior
+    # triângulo com o ponto escolhido antes e a média da faixa seguinte (bom para linhas).
+    n = len(x)
+    if n <= n_saida or n_saida < 3:
+        return np.arange(n)
+    x = x.astype(np.float64)
+    y = y.astype(np.float64)
+
+    # Faixas internas (o primeiro e o último ponto são sempre mantidos)
+    limites = np.linspace(1, n - 1, n_saida - 1).astype(np.int64)
+    medias_x = np.add.reduceat(x[1:n - 1], limites[:-1] - 1) / np.diff(limites)
+    medias_y = np.add.reduceat(y[1:n - 1], limites[:-1] - 1) / np.diff(limites)
+
+    indices = np.empty(n_saida, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    anterior = 0
+    for i in range(n_saida - 2):
+        ini, fim = limites[i], limites[i + 1]
+        if i + 1 < n_saida - 2:
+            px, py = medias_x[i + 1], medias_y[i + 1]
+        else:
+            px, py = x[n - 1], y[n - 1]
+        ax, ay = x[anterior], y[anterior]
+        areas = np.abs((ax - px) * (y[ini:fim] - ay) - (ax - x[ini:fim]) * (py - ay))
+        anterior = ini + int(np.argmax(areas))
+        indices[i + 1] = anterior
+    return indices
+
+
+METODOS = {'minmax': reduzir_minmax, 'lttb': reduzir_lttb}
+
+
+def reduzir_serie(x, y, n_saida, metodo='lttb', intervalo=None):
+    # Retorna (x, y, total_no_intervalo), descartando NaN e cortando ao intervalo [ini, fim]
+    validos = ~np.isnan(y)
+    x, y = x[validos], y[validos]
+    if intervalo is not None:
+        ini, fim = np.searchsorted(x, intervalo[0], 'left'), np.searchsorted(x, intervalo[1], 'right')
+        # Um ponto de cada lado para a linha continuar até a borda do gráfico
+        ini, fim = max(0, ini - 1), min(len(x), fim + 1)
+        x, y = x[ini:fim], y[ini:fim]
+    indices = METODOS[metodo](x, y, n_saida)
+    return x[indices], y[indices], len(x)
@@ -0,0 +1,305 @@
+import os
+import sys
+import time
+import queue
+import argparse
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+import ingestao
+
+
+# --- 1. FORMATO DOS EVENTOS ---
+# Uma linha por evento, anexada ao fim de um arquivo (ou posta em uma fila):
+#   timestamp;tipo;setor_id;valor
+# timestamp em segundos (horário do jogo, não do servidor); tipo E = entrada pelo portão
+# (valor = tempo de entrada em minutos), S = saída (tempo de saída) e I = incidente
+# (valor = tempo de resposta em minutos).
+TIPOS = ('E', 'S', 'I')
+ARQUIVO_EVENTOS_PADRAO = 'eventos_ao_vivo.txt'
+JANELAS_MIN = [5, 15, 60]
+
+
+# --- 2. AGREGADOS EM JANELA DESLIZANTE ---
+# Para cada setor, um anel de faixas de `largura_s` segundos cobrindo a maior janela.
+# Registrar um evento soma em uma faixa (O(1)); uma faixa que já pertence a uma volta
+# anterior do anel é zerada ao ser reaproveitada. A janela é medida a partir do evento
+# mais recente, então a reprodução acelerada de um jogo gera as mesmas janelas.
+class AgregadosAoVivo:
+    def __init__(self, setores, janela_max_s=3600, largura_s=10):
+        # setores: {setor_id: nome_setor}
+        self.setores = dict(setores)
+        self._indice = {setor_id: k for k, setor_id in enumerate(self.setores)}
+        self.largura_s = largura_s
+        self._faixas = int(janela_max_s // largura_s)
+        tamanho = len(self.setores) * self._faixas
+        self._epoca = [-1] * tamanho
+        self._soma = {tipo: [0.0] * tamanho for tipo in TIPOS}
+        self._contagem = {tipo: [0] * tamanho for tipo in TIPOS}
+        self._trava = threading.Lock()
+        self.ultimo_ts = None
+        self.eventos = 0
+        self.descartados = 0  # linhas inválidas, setor desconhecido ou fora da janela
+
+    def _registrar(self, ts, tipo, setor_id, valor):
+        indice = self._indice.get(setor_id)
+        if indice is None or tipo not in self._soma:
+            self.descartados += 1
+            return
+        faixa = int(ts // self.largura_s)
+        pos = indice * self._faixas + faixa % self._faixas
+        epoca = self._epoca[pos]
+        if epoca != faixa:
+            if epoca > faixa:
+                # A posição já guarda uma faixa mais nova: o evento saiu da janela
+                self.descartados += 1
+                return
+            self._epoca[pos] = faixa
+            for t in TIPOS:
+                self._soma[t][pos] = 0.0
+                self._contagem[t][pos] = 0
+        self._soma[tipo][pos] += valor
+        self._contagem[tipo][pos] += 1
+        if self.ultimo_ts is None or ts > self.ultimo_ts:
+            self.ultimo_ts = ts
+        self.eventos += 1
+
+    def registrar(self, ts, tipo, setor_id, valor):
+        with self._trava:
+            self._registrar(ts, tipo, setor_id, valor)
+
+    def processar_linhas(self, linhas):
+        # Lote de linhas 'timestamp;tipo;setor_id;valor' (str ou bytes), sob uma só trava
+        with self._trava:
+            for linha in linhas:
+                if isinstance(linha, bytes):
+                    linha = linha.decode('ascii', 'replace')
+                try:
+                    ts, tipo, setor_id, valor = linha.split(';')
+                    self._registrar(float(ts), tipo, int(setor_id), float(valor))
+                except ValueError:
+                    if linha.strip():
+                        self.descartados += 1
+
+    def resumo(self, janela_s=900):
+        # Um registro por setor, com as mesmas colunas dos agregados históricos do
+        # Painel 3 (figuras.agregar_mobilidade_setor / agregar_incidentes_setor)
+        with self._trava:
+            epoca = np.array(self._epoca).reshape(len(self.setores), self._faixas)
+            somas = {t: np.array(self._soma[t]).reshape(epoca.shape) for t in TIPOS}
+            contagens = {t: np.array(self._contagem[t]).reshape(epoca.shape) for t in TIPOS}
+            ultimo_ts = self.ultimo_ts
+
+        if ultimo_ts is None:
+            na_janela = np.zeros(epoca.shape, dtype=bool)
+        else:
+            atual = int(ultimo_ts // self.largura_s)
+            k = min(self._faixas, max(1, int(janela_s // self.largura_s)))
+            na_janela = (epoca > atual - k) & (epoca <= atual)
+        soma = {t: np.where(na_janela, somas[t], 0).sum(axis=1) for t in TIPOS}
+        contagem = {t: np.where(na_janela, contagens[t], 0).sum(axis=1) for t in TIPOS}
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return pd.DataFrame({
+                'setor_id': list(self.setores),
+                'nome_setor': list(self.setores.values()),
+                'tempo_entrada_medio': soma['E'] / contagem['E'],
+                'tempo_saida_medio': soma['S'] / contagem['S'],
+                'incidentes_total': contagem['I'],
+                'tempo_resposta_medio': soma['I'] / contagem['I'],
+                'publico_total': contagem['E'],
+            })
+
+
+# --- 3. FONTES DE EVENTOS ---
+# As duas fontes têm a mesma interface: ler_novos() devolve as linhas completas
+# que chegaram desde a última chamada.
+class LeitorArquivo:
+    # Acompanha um arquivo só de anexação (como `tail -f`). Uma linha incompleta no
+    # fim fica guardada até o resto chegar; se o arquivo encolher, recomeça do início.
+    def __init__(self, caminho, do_inicio=False):
+        self.caminho = caminho
+        self._posicao = 0
+        self._resto = b''
+        if not do_inicio and os.path.exists(caminho):
+            self._posicao = os.path.getsize(caminho)
+
+    def ler_novos(self):
+        try:
+            tamanho = os.path.getsize(self.caminho)
+        except OSError:
+            return []
+        if tamanho < self._posicao:
+            self._posicao, self._resto = 0, b''
+        if tamanho == self._posicao:
+            return []
+        with open(self.caminho, 'rb') as f:
+            f.seek(self._posicao)
+            dados = f.read(tamanho - self._posicao)
+        self._posicao += len(dados)
+        linhas = (self._resto + dados).split(b'\n')
+        self._resto = linhas.pop()
+        return linhas
+
+
+class LeitorFila:
+    # Eventos entregues por outro thread do mesmo processo (ex.: um cliente de socket)
+    def __init__(self, fila=None):
+        self.fila = fila or queue.Queue()
+
+    def ler_novos(self):
+        linhas = []
+        try:
+            while True:
+                linhas.append(self.fila.get_nowait())
+        except queue.Empty:
+            return linhas
+
+
+class ModoAoVivo:
+    # Thread que lê a fonte periodicamente e alimenta os agregados
+    def __init__(self, fonte, agregados, intervalo_s=0.2):
+        self.fonte = fonte
+        self.agregados = agregados
+        self.intervalo_s = intervalo_s
+        self._parar = threading.Event()
+        self._thread = None
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._executar, name='modo-ao-vivo', daemon=True)
+        self._thread.start()
+        return self
+
+    def _executar(self):
+        while not self._parar.is_set():
+            linhas = self.fonte.ler_novos()
+            if linhas:
+                self.agregados.processar_linhas(linhas)
+            else:
+                self._parar.wait(self.intervalo_s)
+
+    def parar(self):
+        self._parar.set()
+        if self._thread:
+            self._thread.join()
+
+
+def setores_padrao(diretorio=None):
+    dim_setor = ingestao.carregar_tabelas(diretorio, tabelas=['dim_setor'])['dim_setor']
+    return dict(zip(dim_setor['setor_id'], dim_setor['nome_setor']))
+
+
+# --- 4. REPRODUÇÃO A PARTIR DO CSV ---
+def gerar_eventos(fato_mobilidade, jogo_id=None, torcedores_por_evento=10, duracao_s=3 * 3600, seed=42):
+    # Eventos individuais coerentes com as médias de fato_mobilidade_incidentes: um evento
+    # de entrada e um de saída a cada `torcedores_por_evento` torcedores do setor e um
+    # evento por incidente. Entradas nas 2 h antes do jogo, saídas na última meia hora,
+    # incidentes ao longo de todo o período. Retorna (ts, tipo, setor_id, valor) ordenados.
+    rng = np.random.default_rng(seed)
+    if jogo_id is None:
+        jogo_id = fato_mobilidade['jogo_id'].min()
+    # Tempos em float64 (no modo compacto vêm em décimos de minuto)
+    linhas = ingestao.decimais(fato_mobilidade[fato_mobilidade['jogo_id'] == jogo_id])
+    setor = linhas['setor_id'].to_numpy()
+    por_setor = np.maximum(1, linhas['publico_setor'].to_numpy() // torcedores_por_evento)
+    incidentes = linhas['incidente_contagem'].to_numpy()
+
+    def amostrar(quantidades, medias, inicio, fim, tipo):
+        n = int(quantidades.sum())
+        media = np.repeat(medias, quantidades)
+        # Gama com forma 4: tempos positivos e assimétricos, com a média do CSV
+        valor = rng.gamma(4.0, media / 4.0)
+        ts = rng.uniform(inicio, fim, n)
+        return ts, np.full(n, tipo), np.repeat(setor, quantidades), valor
+
+    partes = [
+        amostrar(por_setor, linhas['tempo_entrada_medio_min'].to_numpy(), 0, duracao_s * 2 / 3, 'E'),
+        amostrar(por_setor, linhas['tempo_saida_medio_min'].to_numpy(), duracao_s * 5 / 6, duracao_s, 'S'),
+        amostrar(incidentes, linhas['tempo_resposta_min'].to_numpy(), 0, duracao_s, 'I'),
+    ]
+    ts, tipo, setor_id, valor = (np.concatenate(coluna) for coluna in zip(*partes))
+    ordem = np.argsort(ts, kind='stable')
+    return ts[ordem], tipo[ordem], setor_id[ordem], valor[ordem]
+
+
+def formatar_linhas(ts, tipo, setor_id, valor, inicio=0.0):
+    return [f"{inicio + t:.3f};{k};{s};{v:.2f}" for t, k, s, v in zip(ts, tipo, setor_id, valor)]
+
+
+def reproduzir(caminho, linhas, taxa=10000, lote_s=0.1):
+    # Anexa as linhas ao arquivo a `taxa` eventos/s, em lotes de `lote_s` segundos
+    por_lote = max(1, int(taxa * lote_s))
+    inicio = time.perf_counter()
+    with open(caminho, 'a', encoding='ascii') as f:
+        for k in range(0, len(linhas), por_lote):
+            f.write('\n'.join(linhas[k:k + por_lote]) + '\n')
+            f.flush()
+            espera = inicio + (k + por_lote) / taxa - time.perf_counter()
+            if espera > 0:
+                time.sleep(espera)
+    return time.perf_counter() - inicio
+
+
+# --- 5. TAXA DE PROCESSAMENTO ---
+def medir_taxa(num_eventos=1_000_000, diretorio=None):
+    # Eventos/s do modo ao vivo em um núcleo: só agregação (linhas em memória) e
+    # ponta a ponta (arquivo escrito de uma vez e lido pelo LeitorArquivo)
+    fato = ingestao.carregar_tabelas(diretorio, tabelas=['fato_mobilidade_incidentes'])['fato_mobilidade_incidentes']
+    eventos = gerar_eventos(fato, torcedores_por_evento=1)
+    repeticoes = -(-num_eventos // len(eventos[0]))
+    linhas = (formatar_linhas(*eventos) * repeticoes)[:num_eventos]
+    setores = setores_padrao(diretorio)
+
+    agregados = AgregadosAoVivo(setores)
+    inicio = time.perf_counter()
+    agregados.processar_linhas(linhas)
+    so_agregacao = time.perf_counter() - inicio
+
+    # Arquivo temporário fora da pasta de dados, removido mesmo se a medição falhar
+    descritor, caminho = tempfile.mkstemp(prefix='eventos_medicao_', suffix='.txt')
+    try:
+        with os.fdopen(descritor, 'w', encoding='ascii') as f:
+            f.write('\n'.join(linhas) + '\n')
+        agregados = AgregadosAoVivo(setores)
+        leitor = LeitorArquivo(caminho, do_inicio=True)
+        inicio = time.perf_counter()
+        agregados.processar_linhas(leitor.ler_novos())
+        ponta_a_ponta = time.perf_counter() - inicio
+    finally:
+        os.remove(caminho)
+
+    inicio = time.perf_counter()
+    agregados.resumo(900)
+    tempo_resumo = time.perf_counter() - inicio
+
+    print(f"Eventos: {len(linhas)}")
+    print(f"Só agregação:   {len(linhas) / so_agregacao:>12,.0f} eventos/s")
+    print(f"Arquivo + agregação: {len(linhas) / ponta_a_ponta:>7,.0f} eventos/s")
+    print(f"Resumo da janela de 15 min: {tempo_resumo * 1000:.2f} ms")
+    return len(linhas) / ponta_a_ponta
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Modo ao vivo do Painel 3: reprodução e medição.')
+    sub = parser.add_subparsers(dest='comando', required=True)
+    rep = sub.add_parser('reproduzir', help='Anexa ao arquivo de eventos um jogo do CSV, no ritmo pedido')
+    rep.add_argument('--arquivo', default=ARQUIVO_EVENTOS_PADRAO)
+    rep.add_argument('--jogo', type=int, default=None, help='jogo_id (padrão: o primeiro)')
+    rep.add_argument('--taxa', type=int, default=10000, help='Eventos por segundo')
+    rep.add_argument('--torcedores-por-evento', type=int, default=10)
+    med = sub.add_parser('medir', help='Mede eventos/s processados em um núcleo')
+    med.add_argument('--eventos', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    if args.comando == 'reproduzir':
+        fato = ingestao.carregar_tabelas(tabelas=['fato_mobilidade_incidentes'])['fato_mobilidade_incidentes']
+        linhas = formatar_linhas(*gerar_eventos(fato, args.jogo, args.torcedores_por_evento), inicio=time.time())
+        print(f"Reproduzindo {len(linhas)} eventos em {args.arquivo} a {args.taxa} eventos/s...")
+        segundos = reproduzir(args.arquivo, linhas, args.taxa)
+        print(f"Concluído em {segundos:.1f} s")
+    else:
+        taxa = medir_taxa(args.eventos)
+        sys.exit(0 if taxa >= 10000 else 1)
@@ -1,250 +1,119 @@
-import pandas as pd
+import os
+import time
+INICIO_IMPORTACAO = time.perf_counter()
+
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
 import dash
 from dash import dcc
 from dash import html
-from plotly.subplots import make_subplots
-import io
+from dash import Input, Output
+
+import cache_lru
+import pipeline
+import figuras
+import snapshot
+import ao_vivo
+import metricas
+import projecao
+import ingestao
+import servidor_http
 
 # --- 1. CONFIGURAÇÃO E CARREGAMENTO DE DADOS ---
-# IDs dos arquivos carregados pelo usuário
-# NOTA: Estes IDs são placeholders e dependem do ambiente de execução.
-# Em um ambiente real (fora deste chat), você usaria os nomes dos arquivos CSV.
-files = {
-    "dim_canal.csv": "uploaded:dim_canal.csv",
-    "dim_data.csv": "uploaded:dim_data.csv",
-    "dim_perfil_torcedor.csv": "uploaded:dim_perfil_torcedor.csv",
-    "dim_produto.csv": "uploaded:dim_produto.csv",
-    "dim_setor.csv": "uploaded:dim_setor.csv",
-    "fato_consumo.csv": "uploaded:fato_consumo.csv",
-    "fato_jogos.csv": "uploaded:fato_jogos.csv",
-    "fato_mercado_ingressos.csv": "uploaded:fato_mercado_ingressos.csv",
-    "fato_mobilidade_incidentes.csv": "uploaded:fato_mobilidade_incidentes.csv",
-    "fato_projecao.csv": "uploaded:fato_projecao.csv",
-    "dim_adversario.csv": "uploaded:dim_adversario.csv",
-    "fato_receita_agregada.csv": "uploaded:fato_receita_agregada.csv"
-}
-
-# Função auxiliar para carregar e limpar dados
-def load_and_clean(file_id):
-    try:
-        # Tenta carregar usando o ID de arquivo do ambiente
-        df = pd.read_csv(file_id, sep=';', decimal=',')
-    except:
-        # Tenta carregar localmente caso o ID de arquivo falhe (você pode substituir isso
-        # pela leitura direta do nome do arquivo se os CSVs estiverem na mesma pasta)
-        df = pd.read_csv(file_id.split(':')[-1], delimiter=';', decimal=',')
-
-    # Limpeza e conversão de colunas numéricas
-    for col in df.columns:
-        if any(keyword in col.lower() for keyword in ['receita', 'publico', 'ticket', 'tempo', 'consumo', 'capacidade', 'taxa', 'preco', 'socios', 'adesoes', 'vendas', 'min']):
-            try:
-                # Substitui vírgula por ponto para conversão em float
-                df[col] = df[col].astype(str).str.replace(',', '.', regex=False).astype(float)
-            except:
-                pass
-    return df
-
-# Carregamento de todos os arquivos
-# NOTE: Certifique-se de que os arquivos CSV estejam na mesma pasta que o app.py
-dataframes = {name.replace('.csv', ''): load_and_clean(id) for name, id in files.items()}
+# Tabelas, agregados e figuras são nós do pipeline compartilhado (pipeline.py), avaliados
+# sob demanda e guardados em cache. Os 12 CSVs são lidos pelo módulo de ingestão, com
+# esquema explícito por tabela e cache Parquet na pasta .cache_ingestao.
+# Para apontar para outra pasta de CSVs, defina a variável de ambiente MINEIRAO_DADOS.
+# Antes de qualquer carga, os CSVs passam pela validação do star schema (validacao.py):
+# com erros de integridade o app não sobe; MINEIRAO_VALIDAR=0 desliga a verificação.
+# Na inicialização, quadros e figuras vêm do snapshot (snapshot.py) quando os dados e o
+# código não mudaram; senão são calculados, com as 9 figuras montadas em paralelo.
+# Cada nó calculado é medido (tempo, CPU, RSS, linhas) e exposto em /metrics (seção 6).
+# Com MINEIRAO_PERFIL=<arquivo .prof ou .html>, a inicialização refaz tudo sem
+# snapshot sob cProfile/pyinstrument e grava o perfil nesse arquivo.
+tempos_inicializacao = {'importacao': time.perf_counter() - INICIO_IMPORTACAO}
+metricas_app = metricas.Metricas()
+ARQUIVO_PERFIL = os.environ.get('MINEIRAO_PERFIL')
+
+
+def preparar_pipeline():
+    return snapshot.preparar_pipeline(tempos=tempos_inicializacao, usar_snapshot=False if ARQUIVO_PERFIL else None,
+                                      instrumentacao=metricas_app.instrumentar_pipeline(pipeline.categoria))
+
+
+if ARQUIVO_PERFIL:
+    pipeline_dados, ARQUIVO_PERFIL = metricas.capturar_perfil(preparar_pipeline, ARQUIVO_PERFIL)
+    print(f"Perfil da inicialização gravado em {ARQUIVO_PERFIL}")
+else:
+    pipeline_dados = preparar_pipeline()
 
 
 # --- 2. CONSOLIDAÇÃO E CRIAÇÃO DA TABELA MESTRE (df_dashboard) ---
-
-# Renomear colunas para padronizar
-dataframes['fato_jogos'] = dataframes['fato_jogos'].rename(columns={
-    'receita_ingresso_mil_rs': 'receita_ingresso_mil_rs_real',
-    'publico_pago': 'publico_pago_real'
-})
-dataframes['fato_projecao'] = dataframes['fato_projecao'].rename(columns={
-    'publico_projetado': 'publico_pago_projetado',
-    'receita_projetada_mil_rs': 'receita_ingresso_mil_rs_projetada'
-})
-
-# Agregação de Fato_Consumo
-df_consumo_agg = dataframes['fato_consumo'].groupby('jogo_id').agg(
-    receita_total_consumo_rs=('receita_produto_rs', 'sum')
-).reset_index()
-
-# Merge Inicial: Fato_Jogos com Dimensões
-df_master = dataframes['fato_jogos'].merge(
-    dataframes['dim_data'][['data_id', 'data']],
-    on='data_id', how='left'
-)
-df_master = df_master.merge(
-    dataframes['dim_adversario'][['adversario_id', 'nome_adversario', 'competicao', 'nivel_confronto', 'classico_local']],
-    on='adversario_id', how='left'
-)
-df_master = df_master.merge(
-    dataframes['fato_projecao'][['jogo_id', 'publico_pago_projetado', 'receita_ingresso_mil_rs_projetada']],
-    on='jogo_id', how='left'
-)
-df_master = df_master.merge(df_consumo_agg, on='jogo_id', how='left')
-
-# Ingressos e Mobilidade (Agregados)
-df_ingressos_agg = dataframes['fato_mercado_ingressos'].groupby('data_id').agg(
-    socios_ativos_dia=('socios_ativos', 'max'),
-    novas_adesoes_dia=('novas_adesoes', 'max'),
-    vendas_total_ingressos=('vendas_canal', 'sum')
-).reset_index()
-df_mobilidade_agg = dataframes['fato_mobilidade_incidentes'].groupby('jogo_id').agg(
-    tempo_entrada_medio_min=('tempo_entrada_medio_min', 'mean'),
-    tempo_saida_medio_min=('tempo_saida_medio_min', 'mean'),
-    incidentes_total=('incidente_contagem', 'sum')
-).reset_index()
-df_master = df_master.merge(df_ingressos_agg, on='data_id', how='left')
-df_master = df_master.merge(df_mobilidade_agg, on='jogo_id', how='left')
-
-# Cálculo de Métricas Derivadas (KPIs)
-df_master['receita_total_consumo_mil_rs'] = df_master['receita_total_consumo_rs'] / 1000
-df_master['receita_total_mil_rs_real'] = df_master['receita_ingresso_mil_rs_real'] + df_master['receita_total_consumo_mil_rs'].fillna(0)
-df_master['gap_publico_pago_perc'] = ((df_master['publico_pago_real'] - df_master['publico_pago_projetado']) / df_master['publico_pago_projetado']) * 100
-df_master['gap_publico_pago_perc'] = df_master['gap_publico_pago_perc'].replace([np.inf, -np.inf], np.nan).round(2)
-df_master['ticket_medio_consumo_rs_real'] = df_master['receita_total_consumo_rs'] / df_master['publico_pago_real']
-df_master['ticket_medio_total_rs'] = df_master['ticket_medio_ingresso_rs'] + df_master['ticket_medio_consumo_rs_real'].fillna(0)
-
-df_master['data_jogo'] = pd.to_datetime(df_master['data']).dt.date
-df_dashboard = df_master.copy()
-
-# Dataframes Detalhe para Painéis 2 e 3
-df_consumo_detalhe = dataframes['fato_consumo'].merge(dataframes['dim_produto'], on='produto_id', how='left')
-df_ingressos_canal = dataframes['fato_mercado_ingressos'].merge(dataframes['dim_canal'], on='canal_id', how='left')
-df_mobilidade_detalhe = dataframes['fato_mobilidade_incidentes'].merge(dataframes['dim_setor'], on='setor_id', how='left')
-df_perfil = dataframes['dim_perfil_torcedor']
+df_dashboard = pipeline_dados.obter('df_dashboard')
+# Os quadros de detalhe dos Painéis 2 e 3 são nós do pipeline, calculados só quando um
+# filtro os pede (filtrar_detalhe); no backend SQL os filtros viram consultas (consulta_sql.py)
 
 
 # --- 3. GERAÇÃO DAS 9 FIGURAS PLOTLY ---
-
-# --- PAINEL 1 ---
-fig1 = px.bar(
-    df_dashboard.sort_values('data_jogo'),
-    x='data_jogo',
-    y=['publico_pago_real', 'publico_pago_projetado'],
-    barmode='group',
-    labels={'value': 'Público Pago (Pessoas)', 'variable': 'Métrica'},
-    title='1. Comparativo de Público Pago: Realizado vs. Projetado'
-)
-fig1.update_layout(hovermode="x unified")
-
-fig2 = px.line(
-    df_dashboard.sort_values('data_jogo'),
-    x='data_jogo',
-    y='ticket_medio_total_rs',
-    title='2. Evolução do Ticket Médio Total (Ingresso + Consumo)',
-    labels={'data_jogo': 'Data do Jogo', 'ticket_medio_total_rs': 'Ticket Médio Total (R$)'},
-    markers=True,
-    color_discrete_sequence=['#F6511D']
-)
-fig2.update_layout(hovermode="x unified")
-
-order = ['Grande', 'Medio', 'Pequeno', 'Classico']
-df_box = df_dashboard.copy()
-df_box['nivel_confronto'] = pd.Categorical(df_box['nivel_confronto'], categories=order, ordered=True)
-df_box = df_box.sort_values('nivel_confronto')
-
-fig3 = px.box(
-    df_box.dropna(subset=['receita_total_mil_rs_real']),
-    x='nivel_confronto',
-    y='receita_total_mil_rs_real',
-    color='nivel_confronto',
-    title='3. Distribuição da Receita Total (Milhões de R$) por Nível de Confronto',
-    labels={'nivel_confronto': 'Nível do Confronto', 'receita_total_mil_rs_real': 'Receita Total (Milhões de R$)'},
-)
-
-# --- PAINEL 2 ---
-df_receita_categoria = df_consumo_detalhe.groupby('categoria')['receita_produto_rs'].sum().reset_index()
-df_receita_categoria['receita_produto_mil_rs'] = df_receita_categoria['receita_produto_rs'] / 1000
-
-fig4 = px.pie(
-    df_receita_categoria,
-    values='receita_produto_mil_rs',
-    names='categoria',
-    title='4. Distribuição da Receita de Consumo por Categoria',
-    hole=.3, 
-    color_discrete_sequence=px.colors.qualitative.Pastel
-)
-fig4.update_traces(textposition='inside', textinfo='percent+label')
-
-df_top_itens = df_consumo_detalhe.groupby('item_vendido')['receita_produto_rs'].sum().reset_index()
-df_top_itens = df_top_itens.sort_values(by='receita_produto_rs', ascending=False).head(5)
-df_top_itens['receita_produto_mil_rs'] = df_top_itens['receita_produto_rs'] / 1000
-
-fig5 = px.bar(
-    df_top_itens,
-    x='item_vendido',
-    y='receita_produto_mil_rs',
-    title='5. Top 5 Itens Vendidos por Receita Total',
-    labels={'item_vendido': 'Item', 'receita_produto_mil_rs': 'Receita Total (Milhares de R$)'},
-    color='item_vendido',
-    color_discrete_sequence=px.colors.qualitative.Dark2
-)
-
-df_vendas_tipo = df_ingressos_canal.groupby('tipo_operacao')['vendas_canal'].sum().reset_index()
-
-fig6 = px.bar(
-    df_vendas_tipo,
-    x='tipo_operacao',
-    y='vendas_canal',
-    title='6. Volume Total de Vendas de Ingressos por Tipo de Canal',
-    labels={'tipo_operacao': 'Tipo de Operação', 'vendas_canal': 'Total de Ingressos Vendidos'},
-    color='tipo_operacao',
-    color_discrete_sequence=['#4B0082', '#00BFFF']
-)
-
-# --- PAINEL 3 ---
-df_mobilidade_agg_setor = df_mobilidade_detalhe.groupby('nome_setor').agg(
-    tempo_entrada_medio=('tempo_entrada_medio_min', 'mean'),
-    tempo_saida_medio=('tempo_saida_medio_min', 'mean'),
-).reset_index()
-
-fig7 = px.bar(
-    df_mobilidade_agg_setor,
-    x='nome_setor',
-    y=['tempo_entrada_medio', 'tempo_saida_medio'],
-    barmode='group',
-    title='7. Tempo Médio de Entrada e Saída por Setor (Minutos)',
-    labels={'value': 'Tempo Médio (Minutos)', 'variable': 'Métrica de Tempo', 'nome_setor': 'Setor'},
-    color_discrete_map={'tempo_entrada_medio': '#3CB371', 'tempo_saida_medio': '#FFA07A'}
-)
-
-df_incidentes_agg_setor = df_mobilidade_detalhe.groupby('nome_setor').agg(
-    incidentes_total=('incidente_contagem', 'sum'),
-    tempo_resposta_medio=('tempo_resposta_min', 'mean'),
-    publico_total=('publico_setor', 'sum') 
-).reset_index()
-
-fig8 = px.scatter(
-    df_incidentes_agg_setor,
-    x='tempo_resposta_medio',
-    y='incidentes_total',
-    size='publico_total', 
-    color='nome_setor',
-    hover_name='nome_setor',
-    title='8. Análise de Incidentes: Total vs. Tempo Médio de Resposta por Setor',
-    labels={'tempo_resposta_medio': 'Tempo Médio de Resposta (Minutos)', 'incidentes_total': 'Total de Incidentes', 'publico_total': 'Público Total Acumulado'},
-    size_max=50
-)
-
-df_faixa_etaria = df_perfil.groupby('faixa_etaria').size().reset_index(name='contagem')
-age_order = ['18-24 anos', '25-34 anos', '35-44 anos', '45-59 anos', '60+ anos']
-df_faixa_etaria['faixa_etaria'] = pd.Categorical(df_faixa_etaria['faixa_etaria'], categories=age_order, ordered=True)
-df_faixa_etaria = df_faixa_etaria.sort_values('faixa_etaria')
-
-fig9 = px.pie(
-    df_faixa_etaria,
-    values='contagem',
-    names='faixa_etaria',
-    title='9. Distribuição do Público por Faixa Etária',
-    hole=.4,
-    color_discrete_sequence=px.colors.qualitative.Vivid
-)
-fig9.update_traces(textposition='inside', textinfo='percent+label')
-
-
-# --- 4. ESTRUTURA DASH E LAYOUT HTML ---
+# As funções de agregação e de cada figura ficam em figuras.py. No modo HTTP otimizado
+# (servidor_http.py, padrão) as figuras não vão no layout: cada painel busca as suas em
+# GET /_figuras/<id> ao entrar na tela; com MINEIRAO_HTTP=0 ficam embutidas como antes.
+# id do gráfico -> nó do pipeline
+FIGURAS_LAYOUT = dict(zip(['grafico-publico', 'grafico-ticket-medio', 'grafico-receita-confronto',
+                           'grafico-receita-categoria', 'grafico-top-itens', 'grafico-vendas-canal',
+                           'grafico-mobilidade', 'grafico-incidentes', 'grafico-faixa-etaria'], pipeline.NOS_FIGURAS))
+
+
+def grafico(id_grafico):
+    if servidor_http.HTTP_OTIMIZADO:
+        return dcc.Graph(id=id_grafico)
+    return dcc.Graph(id=id_grafico, figure=pipeline_dados.obter(FIGURAS_LAYOUT[id_grafico]))
+
+
+# --- 4. FILTROS E AGREGADOS MEMOIZADOS ---
+# Temporada (dim_data.ano), competição e nível de confronto filtram os jogos; o setor
+# filtra apenas o Painel 3. Cada groupby é guardado por combinação de filtros em um
+# cache LRU limitado, e as figuras de cada painel também, para que combinações
+# repetidas respondam imediatamente.
+cache_agregados = cache_lru.CacheLRU(capacidade=256)
+cache_figuras = cache_lru.CacheLRU(capacidade=256)
+
+
+def normalizar_filtro(valores):
+    # Valores de um Dropdown -> tupla ordenada (vazia = sem filtro), usada como chave
+    return tuple(sorted(valores)) if valores else ()
+
+
+def filtrar_jogos(anos=(), competicoes=(), niveis=()):
+    return cache_agregados.obter(('jogos', anos, competicoes, niveis),
+                                 lambda: pipeline.filtrar_jogos(pipeline_dados.obter('df_dashboard'), anos, competicoes, niveis))
+
+
+def agregado(nome, anos=(), competicoes=(), niveis=(), setores=()):
+    # Backend pandas: filtra o quadro de detalhe e agrega; backend SQL: uma consulta
+    # com os filtros como predicados (MINEIRAO_BACKEND=sql)
+    def calcular():
+        if nome == 'faixa_etaria':
+            # Bitmaps do fato por ingresso (fato_torcedor.py), em qualquer backend
+            with metricas_app.medir('agregacao', f'filtro:{nome}') as info:
+                resultado = pipeline.agregar_torcedores(pipeline_dados, anos, competicoes, niveis, setores)
+                info['linhas'] = len(resultado)
+            return resultado
+        if pipeline_dados.backend == 'sql':
+            banco = pipeline_dados.obter('banco_sql')
+            with metricas_app.medir('agregacao', f'filtro:{nome}') as info:
+                resultado = banco.agregar(nome, anos, competicoes, niveis, setores)
+                info['linhas'] = len(resultado)
+            return resultado
+        jogos = filtrar_jogos(anos, competicoes, niveis) if anos or competicoes or niveis else None
+        detalhe = pipeline.filtrar_detalhe(pipeline_dados, nome, jogos, setores)
+        with metricas_app.medir('agregacao', f'filtro:{nome}') as info:
+            resultado = pipeline.AGREGADOS[nome][2](detalhe)
+            info['linhas'] = len(resultado)
+        return resultado
+    return cache_agregados.obter((nome, anos, competicoes, niveis, setores), calcular)
+
+
+# --- 5. ESTRUTURA DASH E LAYOUT HTML ---
 
 # Inicializar o aplicativo Dash
 app = dash.Dash(__name__)
@@ -272,27 +141,51 @@ app.layout = html.Div(style={'backgroundColor': '#f0f2f5', 'fontFamily': 'Arial,
             'marginBottom': '0'
         }
     ),
+
+    # --- FILTROS (cross-filtering dos painéis) ---
+    html.Div(style={'display': 'flex', 'flexDirection': 'row', 'flexWrap': 'wrap', 'padding': '10px 20px'}, children=[
+        html.Div(style={'width': '22%', **card_style}, children=[
+            html.Label('Temporada'),
+            dcc.Dropdown(id='filtro-ano', options=sorted(pipeline_dados.obter('dim_data')['ano'].unique().tolist()),
+                         multi=True, placeholder='Todas')
+        ]),
+        html.Div(style={'width': '22%', **card_style}, children=[
+            html.Label('Competição'),
+            dcc.Dropdown(id='filtro-competicao', options=sorted(pipeline_dados.obter('dim_adversario')['competicao'].unique().tolist()),
+                         multi=True, placeholder='Todas')
+        ]),
+        html.Div(style={'width': '22%', **card_style}, children=[
+            html.Label('Nível do Confronto'),
+            dcc.Dropdown(id='filtro-nivel', options=figuras.order, multi=True, placeholder='Todos')
+        ]),
+        html.Div(style={'width': '22%', **card_style}, children=[
+            html.Label('Setor (Painel 3)'),
+            dcc.Dropdown(id='filtro-setor', options=pipeline_dados.obter('dim_setor')['nome_setor'].tolist(),
+                         multi=True, placeholder='Todos')
+        ])
+    ]),
     
     # --- PAINEL 1: Desempenho Financeiro e de Público ---
-    html.Div(style={'padding': '10px 20px'}, children=[
+    html.Div(id='painel-1', style={'padding': '10px 20px'}, children=[
+        dcc.Store(id='visivel-painel-1'),
         html.H2('📊 PAINEL 1: Desempenho Financeiro e de Público', style={'color': '#1f2f4f', 'textAlign': 'left', 'paddingTop': '10px'}),
         
         # Linha 1: Gráficos 1 e 2
         html.Div(style={'display': 'flex', 'flexDirection': 'row', 'flexWrap': 'wrap'}, children=[
             # Gráfico 1: Público Real vs. Projetado
             html.Div(style={'width': '50%', **card_style}, children=[
-                dcc.Graph(id='grafico-publico', figure=fig1)
+                grafico('grafico-publico')
             ]),
             # Gráfico 2: Evolução do Ticket Médio Total
             html.Div(style={'width': '50%', **card_style}, children=[
-                dcc.Graph(id='grafico-ticket-medio', figure=fig2)
+                grafico('grafico-ticket-medio')
             ])
         ]),
         
         # Linha 2: Gráfico 3
         html.Div(style={'padding': '0 15px'}, children=[
             html.Div(style={**card_style, 'width': '100%', 'margin': '0'}, children=[
-                dcc.Graph(id='grafico-receita-confronto', figure=fig3)
+                grafico('grafico-receita-confronto')
             ])
         ])
     ]),
@@ -300,22 +193,23 @@ app.layout = html.Div(style={'backgroundColor': '#f0f2f5', 'fontFamily': 'Arial,
     html.Hr(style={'borderColor': '#ccc', 'margin': '20px'}),
     
     # --- PAINEL 2: Detalhe do Consumo e Mercados ---
-    html.Div(style={'padding': '10px 20px'}, children=[
+    html.Div(id='painel-2', style={'padding': '10px 20px'}, children=[
+        dcc.Store(id='visivel-painel-2'),
         html.H2('🛒 PAINEL 2: Detalhe do Consumo e Mercados', style={'color': '#1f2f4f', 'textAlign': 'left', 'paddingTop': '10px'}),
         
         # Linha 3: Gráficos 4, 5 e 6
         html.Div(style={'display': 'flex', 'flexDirection': 'row', 'flexWrap': 'wrap'}, children=[
             # Gráfico 4: Receita por Categoria (Rosca)
             html.Div(style={'width': '33.33%', **card_style}, children=[
-                dcc.Graph(id='grafico-receita-categoria', figure=fig4)
+                grafico('grafico-receita-categoria')
             ]),
             # Gráfico 5: Top 5 Itens
             html.Div(style={'width': '33.33%', **card_style}, children=[
-                dcc.Graph(id='grafico-top-itens', figure=fig5)
+                grafico('grafico-top-itens')
             ]),
             # Gráfico 6: Vendas por Canal
             html.Div(style={'width': '33.33%', **card_style}, children=[
-                dcc.Graph(id='grafico-vendas-canal', figure=fig6)
+                grafico('grafico-vendas-canal')
             ])
         ])
     ]),
@@ -323,36 +217,251 @@ app.layout = html.Div(style={'backgroundColor': '#f0f2f5', 'fontFamily': 'Arial,
     html.Hr(style={'borderColor': '#ccc', 'margin': '20px'}),
 
     # --- PAINEL 3: Setor, Perfil e Mobilidade ---
-    html.Div(style={'padding': '10px 20px'}, children=[
+    html.Div(id='painel-3', style={'padding': '10px 20px'}, children=[
+        dcc.Store(id='visivel-painel-3'),
         html.H2('🚧 PAINEL 3: Setor, Perfil e Mobilidade', style={'color': '#1f2f4f', 'textAlign': 'left', 'paddingTop': '10px'}),
         
         # Linha 4: Gráficos 7 e 8
         html.Div(style={'display': 'flex', 'flexDirection': 'row', 'flexWrap': 'wrap'}, children=[
             # Gráfico 7: Tempo Médio de Entrada/Saída
             html.Div(style={'width': '50%', **card_style}, children=[
-                dcc.Graph(id='grafico-mobilidade', figure=fig7)
+                grafico('grafico-mobilidade')
             ]),
             # Gráfico 8: Incidentes vs. Tempo de Resposta
             html.Div(style={'width': '50%', **card_style}, children=[
-                dcc.Graph(id='grafico-incidentes', figure=fig8)
+                grafico('grafico-incidentes')
             ])
         ]),
         
         # Linha 5: Gráfico 9
         html.Div(style={'padding': '0 15px'}, children=[
             html.Div(style={**card_style, 'width': '100%', 'margin': '0'}, children=[
-                dcc.Graph(id='grafico-faixa-etaria', figure=fig9)
+                grafico('grafico-faixa-etaria')
             ])
         ])
     ]),
     
+    html.Hr(style={'borderColor': '#ccc', 'margin': '20px'}),
+
+    # --- PAINEL 4: Simulador de Cenários (What-if) ---
+    html.Div(style={'padding': '10px 20px'}, children=[
+        html.H2('🔮 PAINEL 4: Simulador de Cenários de Público e Receita', style={'color': '#1f2f4f', 'textAlign': 'left', 'paddingTop': '10px'}),
+
+        # Controles do cenário: adversários, dias, feriado e faixa de ticket
+        html.Div(style={'display': 'flex', 'flexDirection': 'row', 'flexWrap': 'wrap'}, children=[
+            html.Div(style={'width': '30%', **card_style}, children=[
+                html.Label('Adversários'),
+                dcc.Dropdown(id='cenario-adversario', options=pipeline_dados.obter('dim_adversario')['nome_adversario'].tolist(),
+                             multi=True, placeholder='Todos'),
+                html.Label('Dia da Semana'),
+                dcc.Dropdown(id='cenario-dia', options=projecao.DIAS_SEMANA, value=['Quarta-feira', 'Domingo'],
+                             multi=True, placeholder='Todos'),
+                dcc.Checklist(id='cenario-feriado', options=[{'label': ' Feriado', 'value': True}], value=[]),
+            ]),
+            html.Div(style={'width': '30%', **card_style}, children=[
+                html.Label('Ticket Médio (R$)'),
+                dcc.RangeSlider(id='cenario-ticket', min=20, max=400, step=10, value=[50, 250],
+                                marks={v: f'R$ {v}' for v in range(50, 401, 100)}),
+            ]),
+            html.Div(style={'width': '30%', **card_style}, children=[
+                html.Div(id='cenario-resumo', style={'color': '#1f2f4f', 'whiteSpace': 'pre-line'})
+            ])
+        ]),
+        html.Div(style={'display': 'flex', 'flexDirection': 'row', 'flexWrap': 'wrap'}, children=[
+            html.Div(style={'width': '50%', **card_style}, children=[dcc.Graph(id='grafico-cenario-receita')]),
+            html.Div(style={'width': '50%', **card_style}, children=[dcc.Graph(id='grafico-cenario-publico')])
+        ])
+    ]),
+
     # Rodapé simples
     html.Div(style={'textAlign': 'center', 'padding': '20px', 'fontSize': '0.8em', 'color': '#777'}, children=[
         html.P('Análise de Dados do Estádio - Implementação Plotly Dash. Desenvolvido em Python.')
     ])
 ])
 
-# 5. Rodar o servidor
+# --- 6. CALLBACKS DE FILTRO ---
+# Um callback por gráfico: cada requisição monta só a sua figura, e o navegador
+# atualiza os gráficos à medida que chegam. O setor só entra nos gráficos do Painel 3.
+# id do gráfico -> (construção a partir dos filtros e do intervalo de zoom, usa setor, usa zoom)
+FIGURAS_FILTRADAS = {
+    'grafico-publico': (lambda f, z=None: figuras.figura_publico(filtrar_jogos(*f), pipeline_dados.obter('df_simulacao'), z),
+                        False, True),
+    'grafico-ticket-medio': (lambda f, z=None: figuras.figura_ticket_medio(filtrar_jogos(*f), pipeline_dados.obter('df_simulacao'), z),
+                             False, True),
+    'grafico-receita-confronto': (lambda f, z=None: figuras.figura_receita_confronto(filtrar_jogos(*f)), False, False),
+    'grafico-receita-categoria': (lambda f, z=None: figuras.figura_receita_categoria(agregado('receita_categoria', *f)), False, False),
+    'grafico-top-itens': (lambda f, z=None: figuras.figura_top_itens(agregado('top_itens', *f)), False, False),
+    'grafico-vendas-canal': (lambda f, z=None: figuras.figura_vendas_canal(agregado('vendas_tipo', *f)), False, False),
+    'grafico-mobilidade': (lambda f, z=None: figuras.figura_mobilidade(agregado('mobilidade_setor', *f),
+                                                                       pipeline_dados.obter('df_filas_setor')), True, False),
+    'grafico-incidentes': (lambda f, z=None: figuras.figura_incidentes(agregado('incidentes_setor', *f)), True, False),
+    'grafico-faixa-etaria': (lambda f, z=None: figuras.figura_faixa_etaria(
+        agregado('faixa_etaria', *f), pipeline_dados.obter('fato_torcedor') is not None), True, False),
+}
+
+
+def intervalo_do_relayout(relayout):
+    # relayoutData do Plotly -> (inicio, fim) do eixo x, 'auto' ao desfazer o zoom,
+    # ou None para eventos que não mudam o eixo x (ex.: autosize)
+    if not relayout:
+        return None
+    if relayout.get('xaxis.autorange'):
+        return 'auto'
+    if 'xaxis.range[0]' in relayout:
+        return (relayout['xaxis.range[0]'], relayout['xaxis.range[1]'])
+    if 'xaxis.range' in relayout:
+        return tuple(relayout['xaxis.range'])
+    return None
+
+
+def registrar_callback_filtro(id_grafico, construir, usa_setor, usa_zoom):
+    entradas = [Input('filtro-ano', 'value'), Input('filtro-competicao', 'value'), Input('filtro-nivel', 'value')]
+    if usa_setor:
+        entradas.append(Input('filtro-setor', 'value'))
+    if usa_zoom:
+        # No modo de séries grandes, o zoom/pan reamostra a série no intervalo visível
+        entradas.append(Input(id_grafico, 'relayoutData'))
+
+    def construir_medindo(filtros, intervalo=None):
+        with metricas_app.medir('figura', id_grafico):
+            return construir(filtros, intervalo)
+
+    @app.callback(Output(id_grafico, 'figure'), *entradas, prevent_initial_call=True)
+    def atualizar(*valores):
+        relayout = valores[-1] if usa_zoom else None
+        filtros = tuple(normalizar_filtro(v) for v in (valores[:-1] if usa_zoom else valores))
+
+        if usa_zoom and dash.callback_context.triggered_id == id_grafico:
+            intervalo = intervalo_do_relayout(relayout)
+            if intervalo is None or not figuras.modo_series_grandes(filtrar_jogos(*filtros)):
+                return dash.no_update
+            if intervalo != 'auto':
+                figura = construir_medindo(filtros, intervalo)  # intervalos de zoom não vão para o cache
+                metricas.marcar_fim_callback()
+                return figura
+        figura = cache_figuras.obter((id_grafico,) + filtros, lambda: construir_medindo(filtros))
+        metricas.marcar_fim_callback()
+        return figura
+    return atualizar
+
+
+callbacks_filtro = {id_grafico: registrar_callback_filtro(id_grafico, construir, usa_setor, usa_zoom)
+                    for id_grafico, (construir, usa_setor, usa_zoom) in FIGURAS_FILTRADAS.items()}
+
+# Métricas no formato do Prometheus em /metrics: etapas do pipeline e dos callbacks,
+# histogramas de latência por callback e os caches LRU
+metricas.instalar_no_servidor(app.server, metricas_app,
+                              caches={'agregados': cache_agregados, 'figuras': cache_figuras})
+
+# Modo HTTP otimizado (servidor_http.py): gzip/brotli, ETags pela chave do snapshot e
+# figuras por painel sob demanda. Cada gráfico lista os filtros (índices de FILTROS) que
+# o deixam a cargo do seu callback de filtro em vez da figura sem filtro.
+FILTROS = ['filtro-ano', 'filtro-competicao', 'filtro-nivel', 'filtro-setor']
+PAINEIS = {
+    painel: {g: ([0, 1, 2, 3] if FIGURAS_FILTRADAS[g][1] else [0, 1, 2]) if g in FIGURAS_FILTRADAS else []
+             for g in graficos}
+    for painel, graficos in [('painel-1', ['grafico-publico', 'grafico-ticket-medio', 'grafico-receita-confronto']),
+                             ('painel-2', ['grafico-receita-categoria', 'grafico-top-itens', 'grafico-vendas-canal']),
+                             ('painel-3', ['grafico-mobilidade', 'grafico-incidentes', 'grafico-faixa-etaria'])]
+}
+if servidor_http.HTTP_OTIMIZADO:
+    servidor_http.instalar_no_servidor(
+        app.server, {g: (lambda nome=nome: pipeline_dados.obter(nome)) for g, nome in FIGURAS_LAYOUT.items()},
+        snapshot.chave_snapshot(), ingestao.DIRETORIO_PADRAO)
+    servidor_http.registrar_paineis(app, PAINEIS, FILTROS)
+
+
+# --- 7. SIMULADOR DE CENÁRIOS (WHAT-IF) ---
+# O modelo (projecao.py) é lido do cache em disco ou ajustado na primeira chamada, e não
+# na inicialização: com o snapshot o app sobe sem ler o fato_jogos. Cada atualização
+# projeta a grade inteira de cenários em uma única chamada vetorizada.
+PONTOS_TICKET = 25
+
+
+@app.callback(Output('grafico-cenario-receita', 'figure'), Output('grafico-cenario-publico', 'figure'),
+              Output('cenario-resumo', 'children'),
+              Input('cenario-adversario', 'value'), Input('cenario-dia', 'value'), Input('cenario-feriado', 'value'),
+              Input('cenario-ticket', 'value'))
+def atualizar_cenarios(adversarios, dias, feriado, tickets):
+    dim_adversario = pipeline_dados.obter('dim_adversario')
+    if adversarios:
+        dim_adversario = dim_adversario[dim_adversario['nome_adversario'].isin(adversarios)]
+    with metricas_app.medir('figura', 'simulador-cenarios') as info:
+        modelo = projecao.obter_modelo()
+        inicio = time.perf_counter()
+        grade = projecao.grade_cenarios(dim_adversario, dia_semana=dias or projecao.DIAS_SEMANA,
+                                        feriado=[bool(feriado)],
+                                        ticket_medio_ingresso_rs=np.linspace(tickets[0], tickets[1], PONTOS_TICKET))
+        cenarios = modelo.prever(grade)
+        tempo_ms = (time.perf_counter() - inicio) * 1000
+        info['linhas'] = len(cenarios)
+        agregados = figuras.agregar_cenarios(cenarios)
+        melhor = cenarios.loc[cenarios['receita_projetada_mil_rs'].idxmax()]
+        def milhar(valor):
+            return f'{valor:,.0f}'.replace(',', '.')
+        resumo = (f"{milhar(len(cenarios))} cenários projetados em {tempo_ms:.0f} ms\n"
+                  f"Maior receita: {melhor['nome_adversario']}, {melhor['dia_semana']}, "
+                  f"ticket R$ {melhor['ticket_medio_ingresso_rs']:.0f} → {milhar(melhor['publico_projetado'])} pagantes, "
+                  f"R$ {milhar(melhor['receita_projetada_mil_rs'])} mil\n"
+                  f"Erro médio do modelo (validação cruzada): público "
+                  f"{modelo.qualidade['publico_pago']['mape_fora_dobra'] * 100:.1f}%, receita "
+                  f"{modelo.qualidade['receita_ingresso_mil_rs']['mape_fora_dobra'] * 100:.1f}%")
+        figura_receita = figuras.figura_cenarios_receita(agregados)
+        figura_publico = figuras.figura_cenarios_publico(agregados, projecao.CAPACIDADE)
+    metricas.marcar_fim_callback()
+    return figura_receita, figura_publico, resumo
+
+
+# --- 8. MODO AO VIVO (DIA DE JOGO) ---
+# Com MINEIRAO_AO_VIVO=<arquivo de eventos>, um thread acompanha o arquivo (formato em
+# ao_vivo.py) e mantém agregados por setor em janelas deslizantes. Um painel extra
+# atualiza os gráficos 7 e 8 a cada 2 s só a partir desses agregados, sem tocar nos
+# quadros históricos. Para testar: python ao_vivo.py reproduzir --arquivo <arquivo>
+ARQUIVO_AO_VIVO = os.environ.get('MINEIRAO_AO_VIVO')
+modo_ao_vivo = None
+
+if ARQUIVO_AO_VIVO:
+    setores = pipeline_dados.obter('dim_setor')
+    agregados_ao_vivo = ao_vivo.AgregadosAoVivo(dict(zip(setores['setor_id'], setores['nome_setor'])),
+                                                janela_max_s=max(ao_vivo.JANELAS_MIN) * 60)
+    modo_ao_vivo = ao_vivo.ModoAoVivo(ao_vivo.LeitorArquivo(ARQUIVO_AO_VIVO), agregados_ao_vivo).iniciar()
+
+    # Painel inserido antes do rodapé
+    app.layout.children.insert(-1, html.Div(style={'padding': '10px 20px'}, children=[
+        html.H2('🔴 AO VIVO: Mobilidade e Incidentes', style={'color': '#1f2f4f', 'textAlign': 'left', 'paddingTop': '10px'}),
+        html.Div(style=card_style, children=[
+            dcc.RadioItems(id='janela-ao-vivo', options=[{'label': f'Últimos {m} min', 'value': m} for m in ao_vivo.JANELAS_MIN],
+                           value=15, inline=True),
+            html.Span(id='status-ao-vivo', style={'color': '#777', 'fontSize': '0.9em'}),
+        ]),
+        html.Div(style={'display': 'flex', 'flexDirection': 'row', 'flexWrap': 'wrap'}, children=[
+            html.Div(style={'width': '50%', **card_style}, children=[dcc.Graph(id='grafico-mobilidade-ao-vivo')]),
+            html.Div(style={'width': '50%', **card_style}, children=[dcc.Graph(id='grafico-incidentes-ao-vivo')]),
+        ]),
+        dcc.Interval(id='intervalo-ao-vivo', interval=2000),
+    ]))
+
+    @app.callback(Output('grafico-mobilidade-ao-vivo', 'figure'), Output('grafico-incidentes-ao-vivo', 'figure'),
+                  Output('status-ao-vivo', 'children'),
+                  Input('intervalo-ao-vivo', 'n_intervals'), Input('janela-ao-vivo', 'value'))
+    def atualizar_ao_vivo(_, janela_min):
+        resumo = agregados_ao_vivo.resumo(janela_min * 60)
+        sufixo = f' (ao vivo, últimos {janela_min} min)'
+        fig_mobilidade = figuras.figura_mobilidade(resumo)
+        fig_mobilidade.update_layout(title=fig_mobilidade.layout.title.text + sufixo)
+        fig_incidentes = figuras.figura_incidentes(resumo.fillna({'tempo_resposta_medio': 0}))
+        fig_incidentes.update_layout(title=fig_incidentes.layout.title.text + sufixo)
+        status = (f' {agregados_ao_vivo.eventos:,} eventos processados'
+                  f' | {agregados_ao_vivo.descartados:,} descartados')
+        metricas.marcar_fim_callback()
+        return fig_mobilidade, fig_incidentes, status
+
+
+tempos_inicializacao['total'] = time.perf_counter() - INICIO_IMPORTACAO
+print(snapshot.formatar_tempos(tempos_inicializacao), flush=True)
+
+
+# 9. Rodar o servidor
 if __name__ == '__main__':
     # O dashboard estará acessível em http://127.0.0.1:8050/
     app.run(debug=True)
\ No newline at end of file
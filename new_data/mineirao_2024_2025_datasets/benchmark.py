@@ -0,0 +1,209 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from contextlib import redirect_stdout
+
+import numpy as np
+import pandas as pd
+import plotly
+
+import gerador
+import ingestao
+import pipeline
+import fato_torcedor
+import export_offline
+
+# --- 1. CONFIGURAÇÃO ---
+# Mede cada etapa do pipeline de análise em star schemas sintéticos (gerador.py) de
+# tamanhos crescentes: carga dos CSVs, tabela mestre, cada agregação, cada figura e a
+# exportação HTML. Tempo e pico de memória (tracemalloc) são medidos em passadas
+# separadas, para que o rastreamento de memória não distorça os tempos.
+TAMANHOS_PADRAO = [25, 1_000, 100_000, 1_000_000]
+DIRETORIO_DADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.benchmark')
+ARQUIVO_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+
+# Regressão: etapa mais lenta que a baseline além do limite relativo E do piso absoluto
+# (etapas de poucos milissegundos variam muito de uma execução para outra)
+LIMITE_REGRESSAO = 0.25
+PISO_REGRESSAO_S = 0.050
+
+
+# --- 2. DADOS SINTÉTICOS ---
+def preparar_dados(num_jogos, seed=42):
+    # Gera os CSVs uma vez por tamanho e os reaproveita nas execuções seguintes
+    diretorio = os.path.join(DIRETORIO_DADOS, f'jogos_{num_jogos}_seed_{seed}')
+    if not os.path.exists(os.path.join(diretorio, 'fato_receita_agregada.csv')):
+        shutil.rmtree(diretorio, ignore_errors=True)
+        with redirect_stdout(None):
+            gerador.exportar_em_lotes(diretorio, num_jogos, jogos_por_lote=100_000, seed=seed)
+    return diretorio
+
+
+# --- 3. ETAPAS ---
+def executar_etapas(diretorio):
+    # Gera (nome_da_etapa, função) na ordem de execução. Cada etapa de pipeline calcula
+    # um nó cujas dependências já estão prontas, então o tempo medido é só o do nó.
+    # usar_estado=False: a etapa da tabela mestre mede sempre a reconstrução completa
+    p = pipeline.criar_pipeline(diretorio, usar_estado=False)
+    tabelas = {}
+
+    def carga_csv():
+        tabelas.update(ingestao.carregar_tabelas(diretorio, usar_cache=False))
+        for nome, df in tabelas.items():
+            p.definir(nome, df)
+    yield 'carga_csv', carga_csv
+
+    def fato_torcedor_frio():
+        # Sorteio e indexação sem o cache em disco, como a carga dos CSVs (None acima do teto)
+        cabe = fato_torcedor.cabe(tabelas['fato_jogos'])
+        p.definir('fato_torcedor', fato_torcedor.abrir(diretorio, forcar=True) if cabe else None)
+
+    for no in p.a_montante(pipeline.NOS_FIGURAS):
+        if no == 'fato_torcedor':
+            yield f'{pipeline.categoria(no)}:{no}', fato_torcedor_frio
+        elif no not in ingestao.ESQUEMA:
+            yield f'{pipeline.categoria(no)}:{no}', lambda no=no: p.obter(no)
+
+    figs = {nome: p.obter(nome) for nome in pipeline.NOS_FIGURAS}
+    saida = tempfile.mkdtemp(prefix='benchmark_export_')
+    yield 'export_html_completo', lambda: export_offline.exportar_html_completo(figs, os.path.join(saida, 'completo.html'))
+    yield 'export_html_compacto', lambda: export_offline.exportar_html_compacto(figs, os.path.join(saida, 'compacto.html'))
+    shutil.rmtree(saida)
+
+
+def medir_tempos(diretorio, repeticoes):
+    melhores = {}
+    for _ in range(repeticoes):
+        for nome, etapa in executar_etapas(diretorio):
+            inicio = time.perf_counter()
+            etapa()
+            segundos = time.perf_counter() - inicio
+            melhores[nome] = min(segundos, melhores.get(nome, float('inf')))
+    return melhores
+
+
+def medir_memoria(diretorio):
+    picos = {}
+    tracemalloc.start()
+    try:
+        for nome, etapa in executar_etapas(diretorio):
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+            etapa()
+            picos[nome] = (tracemalloc.get_traced_memory()[1] - base) / 2 ** 20
+    finally:
+        tracemalloc.stop()
+    return picos
+
+
+def medir_tamanho(num_jogos, repeticoes=None, memoria=True):
+    inicio = time.perf_counter()
+    diretorio = preparar_dados(num_jogos)
+    preparo = time.perf_counter() - inicio
+    # Tamanhos pequenos: melhor de 5, para reduzir o ruído
+    repeticoes = repeticoes or (5 if num_jogos <= 10_000 else 1)
+    tempos = medir_tempos(diretorio, repeticoes)
+    picos = medir_memoria(diretorio) if memoria else {}
+
+    linhas = {}
+    for tabela in ingestao.ESQUEMA:
+        with open(os.path.join(diretorio, f'{tabela}.csv'), 'rb') as f:
+            linhas[tabela] = sum(1 for _ in f) - 1
+    etapas = {nome: {'segundos': round(segundos, 6), 'pico_mb': round(picos[nome], 2) if nome in picos else None}
+              for nome, segundos in tempos.items()}
+    return {'linhas': linhas, 'preparo_dados_s': round(preparo, 3), 'repeticoes': repeticoes, 'etapas': etapas}
+
+
+def executar(tamanhos=TAMANHOS_PADRAO, memoria=True):
+    resultados = {
+        'ambiente': {
+            'python': platform.python_version(), 'pandas': pd.__version__, 'numpy': np.__version__,
+            'plotly': plotly.__version__, 'cpus': os.cpu_count(), 'plataforma': platform.platform(),
+        },
+        'data': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'tamanhos': {},
+    }
+    for num_jogos in tamanhos:
+        print(f"⏱️ {num_jogos} jogos...", flush=True)
+        try:
+            resultados['tamanhos'][str(num_jogos)] = medir_tamanho(num_jogos, memoria=memoria)
+        except MemoryError:
+            # Registra o limite em vez de abortar a suíte inteira
+            resultados['tamanhos'][str(num_jogos)] = {'erro': 'MemoryError'}
+        imprimir_tamanho(num_jogos, resultados['tamanhos'][str(num_jogos)])
+    return resultados
+
+
+# --- 4. RELATÓRIO E COMPARAÇÃO COM A BASELINE ---
+def imprimir_tamanho(num_jogos, resultado):
+    if 'erro' in resultado:
+        print(f"  ❌ {resultado['erro']}")
+        return
+    print(f"  {'Etapa':<44}{'Tempo (ms)':>12}{'Pico (MB)':>12}")
+    for nome, etapa in resultado['etapas'].items():
+        pico = f"{etapa['pico_mb']:.1f}" if etapa['pico_mb'] is not None else '-'
+        print(f"  {nome:<44}{etapa['segundos'] * 1000:>12.1f}{pico:>12}")
+    total = sum(etapa['segundos'] for etapa in resultado['etapas'].values())
+    print(f"  {'TOTAL':<44}{total * 1000:>12.1f}")
+
+
+def comparar(resultados, baseline, limite=LIMITE_REGRESSAO, piso_s=PISO_REGRESSAO_S):
+    # Retorna (regressões, falhas): regressões são (tamanho, etapa, baseline_s, atual_s);
+    # falhas são o que impede a comparação e também reprova a execução: tamanho que deu
+    # erro, tamanho ou etapa sem baseline (regrave com --salvar-baseline ao criar etapas)
+    regressoes, falhas = [], []
+    for tamanho, atual in resultados['tamanhos'].items():
+        base = baseline['tamanhos'].get(tamanho)
+        if 'erro' in atual:
+            falhas.append(f"{tamanho} jogos: {atual['erro']}")
+            continue
+        if not base or 'erro' in base:
+            falhas.append(f"{tamanho} jogos: sem baseline" + (f" (erro na baseline: {base['erro']})" if base else ''))
+            continue
+        for nome, etapa in atual['etapas'].items():
+            if nome not in base['etapas']:
+                falhas.append(f"{tamanho} jogos, {nome}: etapa ausente da baseline")
+                continue
+            antes, agora = base['etapas'][nome]['segundos'], etapa['segundos']
+            if agora > antes * (1 + limite) and agora - antes > piso_s:
+                regressoes.append((tamanho, nome, antes, agora))
+    return regressoes, falhas
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark de escala do pipeline de análise.')
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=TAMANHOS_PADRAO, help='números de jogos')
+    parser.add_argument('--saida', default=None, help='grava os resultados neste JSON')
+    parser.add_argument('--baseline', default=ARQUIVO_BASELINE, help='JSON de referência para comparação')
+    parser.add_argument('--limite', type=float, default=LIMITE_REGRESSAO,
+                        help='regressão relativa tolerada (padrão: 0.25 = 25%%)')
+    parser.add_argument('--salvar-baseline', action='store_true', help='grava os resultados como nova baseline')
+    parser.add_argument('--sem-memoria', action='store_true', help='pula a passada de memória (mais rápido)')
+    args = parser.parse_args()
+
+    resultados = executar(args.tamanhos, memoria=not args.sem_memoria)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2)
+
+    if args.salvar_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2)
+        print(f"✅ Baseline gravada em {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            regressoes, falhas = comparar(resultados, json.load(f), args.limite)
+        for falha in falhas:
+            print(f"❌ {falha}")
+        for tamanho, nome, antes, agora in regressoes:
+            print(f"❌ Regressão em {tamanho} jogos, {nome}: {antes * 1000:.1f} ms -> {agora * 1000:.1f} ms "
+                  f"(+{(agora / antes - 1) * 100:.0f}%)")
+        if regressoes or falhas:
+            sys.exit(1)
+        print(f"✅ Sem regressões acima de {args.limite:.0%} em relação a {args.baseline}")
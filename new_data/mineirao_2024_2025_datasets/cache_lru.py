@@ -0,0 +1,51 @@
+import threading
+from collections import OrderedDict
+
+
+# Cache LRU limitado para resultados de agregações (ex.: um groupby por combinação de
+# filtros). Ao passar da capacidade, descarta o item usado há mais tempo.
+# Guarda contadores de acertos, faltas e descartes para acompanhar a eficácia.
+class CacheLRU:
+    def __init__(self, capacidade=128):
+        self.capacidade = capacidade
+        self._itens = OrderedDict()
+        self._trava = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+        self.descartes = 0
+
+    def obter(self, chave, calcular):
+        # Retorna o valor em cache para a chave ou calcula, guarda e retorna
+        with self._trava:
+            if chave in self._itens:
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                return self._itens[chave]
+            self.faltas += 1
+
+        # Cálculo fora da trava, para não serializar callbacks concorrentes
+        valor = calcular()
+
+        with self._trava:
+            self._itens[chave] = valor
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.capacidade:
+                self._itens.popitem(last=False)
+                self.descartes += 1
+        return valor
+
+    def limpar(self):
+        with self._trava:
+            self._itens.clear()
+
+    def estatisticas(self):
+        with self._trava:
+            total = self.acertos + self.faltas
+            return {
+                'tamanho': len(self._itens),
+                'capacidade': self.capacidade,
+                'acertos': self.acertos,
+                'faltas': self.faltas,
+                'descartes': self.descartes,
+                'taxa_acerto': self.acertos / total if total else 0.0,
+            }
@@ -0,0 +1,375 @@
+import os
+import sys
+import glob
+import time
+import shutil
+import sqlite3
+import argparse
+import threading
+import subprocess
+
+import pandas as pd
+
+import ingestao
+import juncao_estrela
+
+# pyarrow e DuckDB só são necessários com o backend SQL; o backend pandas não os exige
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = ds = pq = None
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+
+# --- 1. CONFIGURAÇÃO ---
+# Backend SQL opcional: o star schema vira um banco embutido, no próprio processo, sobre
+# Parquet particionado por ano/mes (hive: tabela/ano=2024/mes=5/*.parquet). Cada agregação
+# das figuras é uma consulta SQL; os filtros do app viram predicados. No DuckDB, o filtro
+# de temporada poda partições e só as colunas usadas são lidas do Parquet; os fatos
+# grandes nunca passam pelo pandas. Sem DuckDB instalado, o SQLite (biblioteca padrão)
+# executa o mesmo SQL sobre tabelas em memória com só as colunas usadas.
+# Variáveis de ambiente: MINEIRAO_BACKEND = 'pandas' (padrão) ou 'sql';
+# MINEIRAO_MOTOR_SQL = 'duckdb' ou 'sqlite' (padrão: duckdb, se instalado).
+NOME_PARTICOES = '.particoes_sql'
+VERSAO_PARTICOES = 1
+BACKEND_PADRAO = os.environ.get('MINEIRAO_BACKEND', 'pandas')
+MOTOR_PADRAO = os.environ.get('MINEIRAO_MOTOR_SQL', 'duckdb' if duckdb is not None else 'sqlite')
+
+# Fatos particionados por ano/mes -> coluna que leva ao período (via dim_data)
+FATOS_PARTICIONADOS = {
+    'fato_jogos': 'data_id',
+    'fato_consumo': 'jogo_id',
+    'fato_mercado_ingressos': 'data_id',
+    'fato_mobilidade_incidentes': 'jogo_id',
+}
+
+# Colunas que as consultas usam (projeção do Parquet para o SQLite)
+COLUNAS_SQL = {
+    'fato_jogos': ['jogo_id', 'data_id', 'adversario_id', 'ano'],
+    'dim_adversario': ['adversario_id', 'competicao', 'nivel_confronto'],
+    'fato_consumo': ['jogo_id', 'produto_id', 'receita_produto_rs', 'ano'],
+    'dim_produto': ['produto_id', 'item_vendido', 'categoria'],
+    'fato_mercado_ingressos': ['data_id', 'canal_id', 'socios_ativos', 'novas_adesoes', 'vendas_canal', 'ano'],
+    'dim_canal': ['canal_id', 'tipo_operacao'],
+    'fato_mobilidade_incidentes': ['jogo_id', 'setor_id', 'publico_setor', 'tempo_entrada_medio_min',
+                                   'tempo_saida_medio_min', 'incidente_contagem', 'tempo_resposta_min', 'ano'],
+    'dim_setor': ['setor_id', 'nome_setor'],
+}
+
+
+# --- 2. PARQUET PARTICIONADO POR ANO/MES ---
+def _caminho_raiz(diretorio=None):
+    return os.path.join(diretorio or ingestao.DIRETORIO_PADRAO, NOME_PARTICOES)
+
+
+def particionar(diretorio=None, forcar=False):
+    # Grava (ou reaproveita, se os CSVs não mudaram) o Parquet particionado; retorna a raiz
+    if pa is None:
+        raise ImportError("pyarrow não instalado (pip install pyarrow); o backend SQL lê o star schema em Parquet")
+    raiz = _caminho_raiz(diretorio)
+    assinatura = f'v{VERSAO_PARTICOES};{ingestao.assinatura_dados(diretorio)}'
+    marcador = os.path.join(raiz, 'assinatura.txt')
+    if not forcar and os.path.exists(marcador):
+        with open(marcador, encoding='utf-8') as f:
+            if f.read() == assinatura:
+                return raiz
+
+    shutil.rmtree(raiz, ignore_errors=True)
+    os.makedirs(raiz)
+    tabelas = ingestao.carregar_tabelas(diretorio, compacto=False)
+    periodos = {'data_id': tabelas['dim_data'][['data_id', 'ano', 'mes']]}
+    periodos['jogo_id'] = juncao_estrela.juntar(tabelas['fato_jogos'][['jogo_id', 'data_id']],
+                                                [(periodos['data_id'], 'data_id', ['ano', 'mes'])])
+
+    for nome, df in tabelas.items():
+        if nome not in FATOS_PARTICIONADOS:
+            pq.write_table(pa.Table.from_pandas(df, preserve_index=False), os.path.join(raiz, f'{nome}.parquet'))
+            continue
+        chave = FATOS_PARTICIONADOS[nome]
+        df = juncao_estrela.juntar(df, [(periodos[chave], chave, ['ano', 'mes'])])
+        # Linhas sem período ficam na partição nula (__HIVE_DEFAULT_PARTITION__)
+        df['ano'] = df['ano'].astype('Int64')
+        df['mes'] = df['mes'].astype('Int64')
+        pq.write_to_dataset(pa.Table.from_pandas(df, preserve_index=False), os.path.join(raiz, nome),
+                            partition_cols=['ano', 'mes'])
+
+    with open(marcador, 'w', encoding='utf-8') as f:
+        f.write(assinatura)
+    return raiz
+
+
+# --- 3. MOTORES SQL EMBUTIDOS ---
+class MotorDuckDB:
+    nome = 'duckdb'
+
+    def __init__(self, raiz):
+        if duckdb is None:
+            raise ImportError("DuckDB não instalado (pip install duckdb); use o motor 'sqlite'")
+        self.con = duckdb.connect(':memory:')
+        for tabela in ingestao.ESQUEMA:
+            if tabela in FATOS_PARTICIONADOS:
+                fonte = f"read_parquet('{os.path.join(raiz, tabela)}/**/*.parquet', hive_partitioning = true)"
+            else:
+                fonte = f"read_parquet('{os.path.join(raiz, tabela)}.parquet')"
+            self.con.execute(f'CREATE VIEW {tabela} AS SELECT * FROM {fonte}')
+
+    def consultar(self, sql, parametros=()):
+        # Um cursor por consulta: callbacks do Dash rodam em threads diferentes
+        with self.con.cursor() as cursor:
+            return cursor.execute(sql, list(parametros)).df()
+
+
+class MotorSQLite:
+    nome = 'sqlite'
+
+    def __init__(self, raiz):
+        self.con = sqlite3.connect(':memory:', check_same_thread=False)
+        self._trava = threading.Lock()
+        for tabela, colunas in COLUNAS_SQL.items():
+            if tabela in FATOS_PARTICIONADOS:
+                origem = ds.dataset(os.path.join(raiz, tabela), format='parquet', partitioning='hive')
+            else:
+                origem = ds.dataset(os.path.join(raiz, f'{tabela}.parquet'), format='parquet')
+            origem.to_table(columns=colunas).to_pandas().to_sql(tabela, self.con, index=False)
+            if 'ano' in colunas:
+                self.con.execute(f'CREATE INDEX idx_{tabela}_ano ON {tabela} (ano)')
+
+    def consultar(self, sql, parametros=()):
+        with self._trava:
+            return pd.read_sql_query(sql, self.con, params=list(parametros))
+
+
+MOTORES = {'duckdb': MotorDuckDB, 'sqlite': MotorSQLite}
+
+
+# --- 4. AGREGAÇÕES DAS FIGURAS EM SQL ---
+# nome -> (SQL com {filtro}, coluna que liga o fato ao jogo). Mesmo resultado das funções
+# agregar_* de figuras.py sobre os quadros de detalhe (chave nula fora, ordem do groupby).
+CONSULTAS = {
+    'receita_categoria': ('''
+        SELECT p.categoria, SUM(f.receita_produto_rs) AS receita_produto_rs,
+               SUM(f.receita_produto_rs) / 1000 AS receita_produto_mil_rs
+        FROM fato_consumo f JOIN dim_produto p ON p.produto_id = f.produto_id
+        WHERE p.categoria IS NOT NULL {filtro}
+        GROUP BY p.categoria ORDER BY p.categoria''', 'jogo_id'),
+    'top_itens': ('''
+        SELECT p.item_vendido, SUM(f.receita_produto_rs) AS receita_produto_rs,
+               SUM(f.receita_produto_rs) / 1000 AS receita_produto_mil_rs
+        FROM fato_consumo f JOIN dim_produto p ON p.produto_id = f.produto_id
+        WHERE p.item_vendido IS NOT NULL {filtro}
+        GROUP BY p.item_vendido ORDER BY receita_produto_rs DESC, p.item_vendido LIMIT 5''', 'jogo_id'),
+    'vendas_tipo': ('''
+        SELECT c.tipo_operacao, CAST(SUM(f.vendas_canal) AS BIGINT) AS vendas_canal
+        FROM fato_mercado_ingressos f JOIN dim_canal c ON c.canal_id = f.canal_id
+        WHERE c.tipo_operacao IS NOT NULL {filtro}
+        GROUP BY c.tipo_operacao ORDER BY c.tipo_operacao''', 'data_id'),
+    'mobilidade_setor': ('''
+        SELECT s.nome_setor, AVG(f.tempo_entrada_medio_min) AS tempo_entrada_medio,
+               AVG(f.tempo_saida_medio_min) AS tempo_saida_medio
+        FROM fato_mobilidade_incidentes f JOIN dim_setor s ON s.setor_id = f.setor_id
+        WHERE s.nome_setor IS NOT NULL {filtro}
+        GROUP BY s.nome_setor ORDER BY s.nome_setor''', 'jogo_id'),
+    'incidentes_setor': ('''
+        SELECT s.nome_setor, CAST(SUM(f.incidente_contagem) AS BIGINT) AS incidentes_total,
+               AVG(f.tempo_resposta_min) AS tempo_resposta_medio,
+               CAST(SUM(f.publico_setor) AS BIGINT) AS publico_total
+        FROM fato_mobilidade_incidentes f JOIN dim_setor s ON s.setor_id = f.setor_id
+        WHERE s.nome_setor IS NOT NULL {filtro}
+        GROUP BY s.nome_setor ORDER BY s.nome_setor''', 'jogo_id'),
+}
+
+# Agregados por jogo/data da tabela mestre (tabela_mestre.agregar_fatos)
+CONSULTAS_MASTER = {
+    'consumo': '''
+        SELECT jogo_id, SUM(receita_produto_rs) AS receita_total_consumo_rs
+        FROM fato_consumo WHERE jogo_id IS NOT NULL GROUP BY jogo_id ORDER BY jogo_id''',
+    'ingressos': '''
+        SELECT data_id, MAX(socios_ativos) AS socios_ativos_dia, MAX(novas_adesoes) AS novas_adesoes_dia,
+               CAST(SUM(vendas_canal) AS BIGINT) AS vendas_total_ingressos
+        FROM fato_mercado_ingressos WHERE data_id IS NOT NULL GROUP BY data_id ORDER BY data_id''',
+    'mobilidade': '''
+        SELECT jogo_id, AVG(tempo_entrada_medio_min) AS tempo_entrada_medio_min,
+               AVG(tempo_saida_medio_min) AS tempo_saida_medio_min,
+               CAST(SUM(incidente_contagem) AS BIGINT) AS incidentes_total
+        FROM fato_mobilidade_incidentes WHERE jogo_id IS NOT NULL GROUP BY jogo_id ORDER BY jogo_id''',
+}
+
+
+def _marcadores(valores):
+    return ', '.join('?' * len(valores))
+
+
+def montar_filtro(coluna, anos=(), competicoes=(), niveis=(), setores=()):
+    # Filtros do app -> (trecho do WHERE, parâmetros). Mesma semântica do pandas: o fato é
+    # restrito aos jogos (ou datas de jogo) que passam nos filtros, por semijunção. O
+    # f.ano IN (...) poda partições; nos fatos por jogo_id, o ano da partição é o do
+    # próprio jogo, então só com filtro de temporada a semijunção nem é necessária.
+    trechos, parametros = [], []
+    if anos:
+        trechos.append(f'f.ano IN ({_marcadores(anos)})')
+        parametros += list(anos)
+    if competicoes or niveis or (anos and coluna != 'jogo_id'):
+        condicoes = []
+        for campo, valores in (('j.ano', anos), ('a.competicao', competicoes), ('a.nivel_confronto', niveis)):
+            if valores:
+                condicoes.append(f'{campo} IN ({_marcadores(valores)})')
+                parametros += list(valores)
+        juncao = ' JOIN dim_adversario a ON a.adversario_id = j.adversario_id' if competicoes or niveis else ''
+        trechos.append(f'f.{coluna} IN (SELECT j.{coluna} FROM fato_jogos j{juncao} WHERE {" AND ".join(condicoes)})')
+    if setores:
+        trechos.append(f's.nome_setor IN ({_marcadores(setores)})')
+        parametros += list(setores)
+    return ''.join(f' AND {trecho}' for trecho in trechos), parametros
+
+
+class BancoSQL:
+    def __init__(self, diretorio=None, motor=None):
+        self.raiz = particionar(diretorio)
+        self.motor = MOTORES[motor or MOTOR_PADRAO](self.raiz)
+
+    def agregar(self, nome, anos=(), competicoes=(), niveis=(), setores=()):
+        sql, coluna = CONSULTAS[nome]
+        filtro, parametros = montar_filtro(coluna, anos, competicoes, niveis, setores)
+        return self.motor.consultar(sql.format(filtro=filtro), parametros)
+
+    def agregados_master(self):
+        return {nome: self.motor.consultar(sql) for nome, sql in CONSULTAS_MASTER.items()}
+
+
+def abrir(diretorio=None, motor=None):
+    return BancoSQL(diretorio, motor)
+
+
+# --- 5. EQUIVALÊNCIA COM O BACKEND PANDAS ---
+def combinacoes_filtro(p):
+    # Sem filtro, cada filtro sozinho (primeiro valor) e todos juntos
+    dashboard = p.obter('df_dashboard')
+    ano = (int(dashboard['ano'].dropna().min()),)
+    competicao = (str(dashboard['competicao'].dropna().iloc[0]),)
+    nivel = (str(dashboard['nivel_confronto'].dropna().iloc[0]),)
+    setor = (str(p.obter('dim_setor')['nome_setor'].iloc[0]),)
+    return [((), (), (), ()), (ano, (), (), ()), ((), competicao, (), ()), ((), (), nivel, ()),
+            ((), (), (), setor), (ano, competicao, nivel, setor)]
+
+
+def _comparavel(df):
+    # Só valores: índice, dtype de texto e category não importam para as figuras
+    df = df.reset_index(drop=True)
+    return df.astype({col: object for col in df.columns if not pd.api.types.is_numeric_dtype(df[col])})
+
+
+def verificar(diretorio=None, motor=None):
+    import pipeline
+
+    p = pipeline.criar_pipeline(diretorio, compacto=False, backend='pandas')
+    banco = abrir(diretorio, motor)
+    print(f"Motor: {banco.motor.nome} | partições em {banco.raiz}")
+    for filtros in combinacoes_filtro(p):
+        for nome in pipeline.AGREGADOS:
+            anos, competicoes, niveis, setores = filtros
+            esperado = pipeline.agregar_filtrado(p, nome, anos, competicoes, niveis,
+                                                 setores if nome in pipeline.AGREGADOS_POR_SETOR else ())
+            obtido = banco.agregar(nome, anos, competicoes, niveis,
+                                   setores if nome in pipeline.AGREGADOS_POR_SETOR else ())
+            pd.testing.assert_frame_equal(_comparavel(obtido), _comparavel(esperado), check_dtype=False)
+
+    master_sql = pipeline.criar_pipeline(diretorio, compacto=False, backend='sql')
+    master_sql.definir('banco_sql', banco)
+    pd.testing.assert_frame_equal(_comparavel(master_sql.obter('df_master')), _comparavel(p.obter('df_master')),
+                                  check_dtype=False)
+    print(f"✅ {len(combinacoes_filtro(p))} combinações de filtro x {len(pipeline.AGREGADOS)} agregados "
+          f"e tabela mestre idênticos ao backend pandas")
+
+
+# --- 6. BENCHMARK: PANDAS vs. SQL ---
+_SCRIPT_RSS = (
+    "import sys, pipeline, metricas; p = pipeline.criar_pipeline(compacto=False, backend=sys.argv[1], "
+    "motor_sql=sys.argv[2] or None); [p.obter(n) for n in pipeline.NOS_FIGURAS]; "
+    "pipeline.devolver_memoria_livre(); print(metricas._rss_atual_bytes())"
+)
+
+
+def _rss_backend(diretorio, backend, motor=None):
+    # RSS de um processo novo com as 9 figuras prontas pelo backend
+    ambiente = {**os.environ, 'MINEIRAO_DADOS': diretorio or ingestao.DIRETORIO_PADRAO}
+    saida = subprocess.run([sys.executable, '-c', _SCRIPT_RSS, backend, motor or ''],
+                           cwd=os.path.dirname(os.path.abspath(__file__)), env=ambiente,
+                           capture_output=True, text=True, check=True).stdout
+    return int(saida.split()[-1])
+
+
+def _medir(funcao, repeticoes):
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def benchmark(diretorio=None, motores=None, repeticoes=3):
+    # Inicialização (tabela mestre + 6 agregados das figuras, pipeline novo a cada vez),
+    # os 5 agregados filtrados por uma temporada e o RSS de um processo com as 9 figuras.
+    # Os dois backends partem de arquivos já gravados: cache Parquet da ingestão (pandas)
+    # e Parquet particionado (SQL).
+    import pipeline
+
+    motores = motores or [m for m in MOTORES if m != 'duckdb' or duckdb is not None]
+    particionar(diretorio)
+    ingestao.carregar_tabelas(diretorio, compacto=False)
+    p = pipeline.criar_pipeline(diretorio, compacto=False, backend='pandas')
+    ano, = combinacoes_filtro(p)[1][0]
+    nos = ['df_master'] + list(pipeline.NOS_AGREGADOS.values())
+
+    def inicial(backend, motor=None):
+        q = pipeline.criar_pipeline(diretorio, compacto=False, backend=backend, motor_sql=motor)
+        for no in nos:
+            q.obter(no)
+        return q
+
+    linhas = []
+    q = inicial('pandas')
+    t_inicial = _medir(lambda: inicial('pandas'), repeticoes)
+    t_filtro = _medir(lambda: [pipeline.agregar_filtrado(q, nome, (ano,)) for nome in pipeline.AGREGADOS], repeticoes)
+    linhas.append(('pandas', t_inicial, t_filtro, _rss_backend(diretorio, 'pandas')))
+    for motor in motores:
+        banco = inicial('sql', motor).obter('banco_sql')
+        t_inicial = _medir(lambda: inicial('sql', motor), repeticoes)
+        t_filtro = _medir(lambda: [banco.agregar(nome, (ano,)) for nome in pipeline.AGREGADOS], repeticoes)
+        linhas.append((f'sql/{motor}', t_inicial, t_filtro, _rss_backend(diretorio, 'sql', motor)))
+
+    print(f"{'Backend':<16}{'Inicial (ms)':>16}{f'Filtro ano={ano} (ms)':>26}{'RSS (MB)':>12}")
+    for nome, t_inicial, t_filtro, rss in linhas:
+        print(f"{nome:<16}{t_inicial * 1000:>16.1f}{t_filtro * 1000:>26.1f}{rss / 2 ** 20:>12.0f}")
+    return linhas
+
+
+def limpar(diretorio=None):
+    shutil.rmtree(_caminho_raiz(diretorio), ignore_errors=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Backend SQL (DuckDB/SQLite) sobre Parquet particionado.')
+    parser.add_argument('diretorio', nargs='?', default=None, help='pasta dos CSVs (padrão: MINEIRAO_DADOS)')
+    parser.add_argument('--motor', choices=list(MOTORES), default=None, help='padrão: MINEIRAO_MOTOR_SQL')
+    parser.add_argument('--verificar', action='store_true', help='compara cada agregado com o backend pandas')
+    parser.add_argument('--benchmark', action='store_true', help='compara os tempos dos backends')
+    parser.add_argument('--limpar', action='store_true', help='apaga o Parquet particionado')
+    args = parser.parse_args()
+
+    if args.limpar:
+        limpar(args.diretorio)
+    elif args.verificar:
+        verificar(args.diretorio, args.motor)
+    elif args.benchmark:
+        benchmark(args.diretorio, [args.motor] if args.motor else None)
+    else:
+        raiz = particionar(args.diretorio, forcar=True)
+        arquivos = glob.glob(os.path.join(raiz, '**', '*.parquet'), recursive=True)
+        print(f"✅ {len(arquivos)} arquivos Parquet em {raiz}")
@@ -0,0 +1,200 @@
+import time
+import argparse
+from functools import reduce
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# --- 1. ESTATÍSTICAS SUFICIENTES COMBINÁVEIS ---
+# Para k colunas numéricas guardamos, por par de colunas (i, j), as estatísticas das
+# linhas em que as duas têm valor (como o corr() do pandas, que descarta NaN por par):
+#   n[i, j]      linhas válidas no par
+#   media[i, j]  média da coluna i nessas linhas
+#   m2[i, j]     soma dos quadrados dos desvios da coluna i nessas linhas
+#   comom[i, j]  co-momento: soma de (x_i - média_i)(x_j - média_j)
+# Um jogo novo atualiza tudo em O(k²) (Welford); dois estados se combinam em O(k²)
+# (Chan et al.), então partições podem ser calculadas em paralelo e somadas depois.
+# A diagonal dá contagem, média, soma e desvio padrão de cada coluna.
+
+
+class Momentos:
+    def __init__(self, colunas):
+        self.colunas = list(colunas)
+        k = len(self.colunas)
+        self.n = np.zeros((k, k))
+        self.media = np.zeros((k, k))
+        self.m2 = np.zeros((k, k))
+        self.comom = np.zeros((k, k))
+        self.minimo = np.full(k, np.nan)
+        self.maximo = np.full(k, np.nan)
+
+    @classmethod
+    def de_quadro(cls, df, colunas):
+        # Estado de um bloco de linhas, vetorizado: somas deslocadas pela média de cada
+        # coluna (estáveis numericamente) e produtos de matrizes k x linhas
+        estado = cls(colunas)
+        x = df[estado.colunas].to_numpy(dtype='float64', na_value=np.nan)
+        validas = ~np.isnan(x)
+        if not len(x):
+            return estado
+        v = validas.astype('float64')
+        contagem = v.sum(axis=0)
+        deslocamento = np.divide(np.where(validas, x, 0).sum(axis=0), contagem, out=np.zeros(len(contagem)),
+                                 where=contagem > 0)
+        z = np.where(validas, x - deslocamento, 0.0)
+        n = v.T @ v
+        s1 = z.T @ v
+        media_z = np.divide(s1, n, out=np.zeros_like(n), where=n > 0)
+        estado.n = n
+        estado.media = np.where(n > 0, media_z + deslocamento[:, None], 0.0)
+        estado.m2 = np.maximum((z * z).T @ v - s1 * media_z, 0.0)
+        estado.comom = z.T @ z - s1 * media_z.T
+        with np.errstate(invalid='ignore'):
+            estado.minimo = np.where(contagem > 0, np.nanmin(np.where(validas, x, np.inf), axis=0), np.nan)
+            estado.maximo = np.where(contagem > 0, np.nanmax(np.where(validas, x, -np.inf), axis=0), np.nan)
+        return estado
+
+    def atualizar(self, linha):
+        # Welford para uma linha (dict, Series ou sequência na ordem de colunas); O(k²)
+        if isinstance(linha, (dict, pd.Series)):
+            linha = [linha.get(coluna, np.nan) for coluna in self.colunas]
+        x = np.array([np.nan if pd.isna(v) else v for v in linha], dtype='float64')
+        valida = ~np.isnan(x)
+        par = valida[:, None] & valida[None, :]
+        x = np.where(valida, x, 0.0)
+        self.n = self.n + par
+        desvio = np.where(par, x[:, None] - self.media, 0.0)
+        self.media = self.media + np.divide(desvio, self.n, out=np.zeros_like(desvio), where=par)
+        self.m2 = self.m2 + desvio * np.where(par, x[:, None] - self.media, 0.0)
+        self.comom = self.comom + desvio * np.where(par, x[None, :] - self.media.T, 0.0)
+        self.minimo = np.where(valida, np.fmin(self.minimo, x), self.minimo)
+        self.maximo = np.where(valida, np.fmax(self.maximo, x), self.maximo)
+        return self
+
+    def combinar(self, outro):
+        # Novo estado com as linhas dos dois (Chan et al.)
+        if outro.colunas != self.colunas:
+            raise ValueError(f"Colunas diferentes: {self.colunas} x {outro.colunas}")
+        estado = Momentos(self.colunas)
+        n = self.n + outro.n
+        delta = outro.media - self.media
+        peso = np.divide(outro.n, n, out=np.zeros_like(n), where=n > 0)
+        produto = np.divide(self.n * outro.n, n, out=np.zeros_like(n), where=n > 0)
+        estado.n = n
+        estado.media = self.media + delta * peso
+        estado.m2 = self.m2 + outro.m2 + delta * delta * produto
+        estado.comom = self.comom + outro.comom + delta * delta.T * produto
+        estado.minimo = np.fmin(self.minimo, outro.minimo)
+        estado.maximo = np.fmax(self.maximo, outro.maximo)
+        return estado
+
+    # --- 2. LEITURA DAS ESTATÍSTICAS ---
+    def resumo(self):
+        # Uma linha por coluna: contagem, soma, média, desvio padrão (ddof=1), mínimo e máximo
+        n = np.diag(self.n)
+        media = np.where(n > 0, np.diag(self.media), np.nan)
+        desvio = np.sqrt(np.divide(np.diag(self.m2), n - 1, out=np.full(len(n), np.nan), where=n > 1))
+        return pd.DataFrame({'count': n.astype('int64'), 'sum': np.where(n > 0, media * n, 0.0), 'mean': media,
+                             'std': desvio, 'min': self.minimo, 'max': self.maximo}, index=self.colunas)
+
+    def correlacao(self):
+        # Mesma regra do DataFrame.corr(): por par de linhas válidas, NaN sem variância
+        divisor = np.sqrt(self.m2 * self.m2.T)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            r = np.where((divisor > 0) & (self.n > 0), self.comom / divisor, np.nan)
+        return pd.DataFrame(np.clip(r, -1, 1), index=self.colunas, columns=self.colunas)
+
+    # --- 3. SERIALIZAÇÃO (JSON) ---
+    def para_dict(self):
+        return {'colunas': self.colunas, **{campo: getattr(self, campo).tolist() for campo in CAMPOS}}
+
+    @classmethod
+    def de_dict(cls, dados):
+        estado = cls(dados['colunas'])
+        for campo in CAMPOS:
+            setattr(estado, campo, np.array(dados[campo], dtype='float64'))
+        return estado
+
+
+CAMPOS = ['n', 'media', 'm2', 'comom', 'minimo', 'maximo']
+
+
+def combinar_todos(estados, colunas=None):
+    # Combina uma sequência de estados (vazia: estado vazio com as colunas informadas)
+    estados = list(estados)
+    if not estados:
+        return Momentos(colunas or [])
+    return reduce(Momentos.combinar, estados)
+
+
+# --- 4. ESTADOS POR PARTIÇÃO, EM PARALELO ---
+def por_particao(df, colunas, chaves, trabalhadores=None):
+    # {valor da chave (tupla): Momentos}; os produtos de matrizes do numpy liberam o GIL
+    grupos = [(chave, grupo) for chave, grupo in df.groupby(chaves, sort=True)]
+    with ThreadPoolExecutor(trabalhadores) as executor:
+        estados = executor.map(lambda g: Momentos.de_quadro(g[1], colunas), grupos)
+        return {chave: estado for (chave, _), estado in zip(grupos, estados)}
+
+
+def metricas_por_grupo(estados, colunas, estatisticas=('sum', 'mean', 'std'), nome_chave='ano'):
+    # Tabela no formato de groupby(chave)[colunas].agg([...]): colunas <coluna>_<estatistica>
+    linhas = []
+    for chave, estado in sorted(estados.items()):
+        resumo = estado.resumo()
+        linha = {nome_chave: chave}
+        for coluna in colunas:
+            for estatistica in estatisticas:
+                linha[f'{coluna}_{estatistica}'] = resumo.at[coluna, estatistica]
+        linhas.append(linha)
+    return pd.DataFrame(linhas)
+
+
+# --- 5. VERIFICAÇÃO E TEMPOS ---
+def verificar(diretorio=None, jogos_iniciais=None):
+    # Compara com o pandas: correlação e métricas anuais do FATO_Jogos exportado, por
+    # partições combinadas e por atualização jogo a jogo
+    import export_powerbi
+    import ingestao
+
+    tabelas = ingestao.carregar_tabelas(diretorio, tabelas=export_powerbi.TABELAS_ORIGEM, compacto=False)
+    jogos = export_powerbi.base_jogos(tabelas)
+    colunas = export_powerbi.colunas_estatisticas(tabelas)
+    receitas = ['receita_ingresso', 'receita_produtos_internos', 'total_arrecadado']
+
+    inicio = time.perf_counter()
+    esperado = jogos[colunas].corr()
+    t_pandas = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    particoes = por_particao(jogos, colunas, ['ano', 'trimestre'])
+    combinado = combinar_todos(particoes[chave] for chave in sorted(particoes))
+    t_particoes = time.perf_counter() - inicio
+    pd.testing.assert_frame_equal(combinado.correlacao(), esperado, check_names=False, atol=1e-9, rtol=1e-9)
+
+    anuais = {ano: combinar_todos(e for (a, _), e in particoes.items() if a == ano) for ano, _ in particoes}
+    esperado_anual = jogos.groupby('ano')[receitas].agg(['sum', 'mean', 'std'])
+    esperado_anual.columns = [f'{c}_{e}' for c, e in esperado_anual.columns]
+    pd.testing.assert_frame_equal(metricas_por_grupo(anuais, receitas), esperado_anual.reset_index(),
+                                  check_dtype=False, atol=1e-6, rtol=1e-9)
+
+    # Jogo a jogo: parte inicial em bloco, os demais por atualização
+    jogos_iniciais = jogos_iniciais or len(jogos) // 2
+    estado = Momentos.de_quadro(jogos.iloc[:jogos_iniciais], colunas)
+    linhas = jogos[colunas].to_numpy(dtype='float64', na_value=np.nan)[jogos_iniciais:]
+    inicio = time.perf_counter()
+    for linha in linhas:
+        estado.atualizar(linha)
+    t_jogo = (time.perf_counter() - inicio) / max(len(linhas), 1)
+    pd.testing.assert_frame_equal(estado.correlacao(), esperado, check_names=False, atol=1e-9, rtol=1e-9)
+    print(f"✅ Correlação e métricas anuais idênticas ao pandas ({len(jogos)} jogos, {len(colunas)} colunas, "
+          f"{len(particoes)} partições)")
+    print(f"⏱️ corr() completo {t_pandas * 1000:.1f} ms | partições combinadas {t_particoes * 1000:.1f} ms | "
+          f"atualização por jogo {t_jogo * 1e6:.0f} µs")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Estatísticas online (Welford/Chan) do FATO_Jogos.')
+    parser.add_argument('diretorio', nargs='?', default=None, help='pasta dos CSVs (padrão: MINEIRAO_DADOS)')
+    parser.add_argument('--iniciais', type=int, default=None, help='jogos do estado inicial na verificação')
+    args = parser.parse_args()
+    verificar(args.diretorio, args.iniciais)
@@ -0,0 +1,346 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import ingestao
+import juncao_estrela
+import estatisticas_online
+
+# --- 1. CONFIGURAÇÃO ---
+# Tabelas do Power BI (as mesmas de exports_powerbi/, que eram CSVs estáticos) derivadas
+# do star schema. Cada tabela é gravada em CSV (UTF-8 com BOM, como as originais) e em
+# Parquet, particionada em pastas ano=/trimestre= quando tem granularidade de jogo/data.
+# A exportação é incremental: o manifesto guarda um hash do conteúdo das linhas de origem
+# de cada partição (jogos, consumo e mobilidade do trimestre) e só as partições cujas
+# linhas mudaram são recalculadas e regravadas. Mudança nas dimensões refaz tudo.
+# O manifesto também guarda as estatísticas suficientes (estatisticas_online.Momentos)
+# de cada partição: correlação, KPIs e métricas anuais saem da combinação desses
+# estados, sem reler as partições que não mudaram.
+NOME_DESTINO = 'exports_powerbi'
+ARQUIVO_MANIFESTO = 'manifesto_export.json'
+VERSAO_EXPORT = 2
+CLUBE = 'Cruzeiro'
+
+# Tabela -> colunas de partição (vazio: arquivo único)
+PARTICOES = {
+    'FATO_Jogos': ['ano', 'trimestre'],
+    'FATO_Temporal': ['ano', 'trimestre'],
+    'DIM_Produtos': ['ano', 'trimestre'],
+    'AGG_Metricas_Anuais': ['ano'],
+    'KPI_Dashboard': [],
+    'CORR_Matriz': [],
+    'DIM_Demografica': [],
+}
+
+TABELAS_ORIGEM = ['dim_data', 'dim_adversario', 'dim_setor', 'dim_produto', 'dim_perfil_torcedor',
+                  'fato_jogos', 'fato_consumo', 'fato_mobilidade_incidentes']
+DIMENSOES = ['dim_data', 'dim_adversario', 'dim_setor', 'dim_produto']
+# Fatos por jogo cujas linhas definem o conteúdo de cada partição ano/trimestre
+FATOS_POR_JOGO = ['fato_jogos', 'fato_consumo', 'fato_mobilidade_incidentes']
+
+
+# --- 2. HASH DAS LINHAS DE ORIGEM POR PARTIÇÃO ---
+def _periodo_jogos(tabelas):
+    # jogo_id -> ano, trimestre (pela data do jogo)
+    datas = tabelas['dim_data'][['data_id', 'ano', 'mes']]
+    jogos = juncao_estrela.juntar(tabelas['fato_jogos'][['jogo_id', 'data_id']], [(datas, 'data_id', ['ano', 'mes'])])
+    return pd.DataFrame({'jogo_id': jogos['jogo_id'], 'ano': jogos['ano'], 'trimestre': (jogos['mes'] - 1) // 3 + 1})
+
+
+def _hash_tabela(df):
+    return hashlib.sha256(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes()).hexdigest()
+
+
+def assinaturas_fontes(tabelas):
+    # Hash por partição: soma (mod 2^64) dos hashes das linhas de cada fato por jogo, que
+    # não depende da ordem das linhas, mais a contagem. Jogos sem data ficam de fora.
+    periodo = _periodo_jogos(tabelas).dropna()
+    codigos = pd.Series((periodo['ano'] * 10 + periodo['trimestre']).astype('int64').to_numpy(),
+                        index=periodo['jogo_id'].to_numpy())
+    partes = {}
+    for nome in FATOS_POR_JOGO:
+        fato = tabelas[nome]
+        codigo = codigos.reindex(fato['jogo_id'].to_numpy()).to_numpy()
+        validas = ~np.isnan(codigo)
+        hashes = pd.util.hash_pandas_object(fato, index=False).to_numpy()[validas]
+        unicos, inversos = np.unique(codigo[validas].astype('int64'), return_inverse=True)
+        soma = np.zeros(len(unicos), dtype=np.uint64)
+        np.add.at(soma, inversos, hashes)
+        contagem = np.bincount(inversos, minlength=len(unicos))
+        for c, s, n in zip(unicos, soma, contagem):
+            partes.setdefault(f'{c // 10}/{c % 10}', []).append(f'{nome}:{int(s):016x}:{n}')
+
+    return {
+        'dimensoes': hashlib.sha256(''.join(_hash_tabela(tabelas[d]) for d in DIMENSOES).encode()).hexdigest(),
+        'perfil': _hash_tabela(tabelas['dim_perfil_torcedor']),
+        'particoes': {chave: hashlib.sha256(';'.join(sorted(v)).encode()).hexdigest()[:32]
+                      for chave, v in sorted(partes.items())},
+    }
+
+
+# --- 3. TABELAS DERIVADAS ---
+def base_jogos(tabelas, anos=None):
+    # FATO_Jogos (um jogo por linha) dos anos pedidos (None: todos)
+    periodo = _periodo_jogos(tabelas)
+    fato = tabelas['fato_jogos']
+    if anos is not None:
+        fato = fato[periodo['ano'].isin(list(anos)).to_numpy()]
+    ids = fato['jogo_id']
+
+    consumo = tabelas['fato_consumo']
+    consumo = consumo[consumo['jogo_id'].isin(ids)].groupby('jogo_id').agg(
+        receita_produtos_internos=('receita_produto_rs', 'sum')).reset_index()
+    mobilidade = juncao_estrela.juntar(tabelas['fato_mobilidade_incidentes'][['jogo_id', 'setor_id', 'publico_setor']],
+                                       [(tabelas['dim_setor'], 'setor_id', ['nome_setor'])])
+    mobilidade = mobilidade[mobilidade['jogo_id'].isin(ids)]
+    setores = mobilidade.pivot_table(index='jogo_id', columns='nome_setor', values='publico_setor',
+                                     aggfunc='sum', observed=True)
+    setores = setores.reindex(columns=tabelas['dim_setor']['nome_setor'].tolist())
+    setores['setor_mais_visitado'] = setores.idxmax(axis=1) if len(setores) else pd.Series(dtype=str)
+    setores = setores.reset_index()
+
+    df = juncao_estrela.juntar(fato, [
+        (tabelas['dim_data'], 'data_id', ['data', 'ano', 'mes', 'dia_semana']),
+        (tabelas['dim_adversario'], 'adversario_id', ['nome_adversario', 'competicao', 'nivel_confronto', 'classico_local']),
+        (consumo, 'jogo_id', None),
+        (setores, 'jogo_id', None),
+    ])
+    data = pd.to_datetime(df['data'])
+    receita_ingresso = df['receita_ingresso_mil_rs'] * 1000
+    produtos = df['receita_produtos_internos'].fillna(0)
+    total = receita_ingresso + produtos
+    nomes_setor = tabelas['dim_setor']['nome_setor'].tolist()
+    saida = pd.DataFrame({
+        'jogo_id': df['jogo_id'],
+        'times_jogados': CLUBE + ' e ' + df['nome_adversario'],
+        'data': data.dt.strftime('%Y-%m-%d'),
+        'publico_total': df['publico_pago'],
+        'setor_mais_visitado': df['setor_mais_visitado'],
+        'horario': data.dt.strftime('%H:%Mh'),
+        'receita_ingresso': receita_ingresso.round(2),
+        'receita_produtos_internos': produtos.round(2),
+        'total_arrecadado': total.round(2),
+        'classificacao_para_competicao': df['competicao'],
+        'ticket_medio_ingresso': df['ticket_medio_ingresso_rs'],
+        **{nome: df[nome] for nome in nomes_setor},
+        'receita_per_capita': (total / df['publico_pago'].replace(0, np.nan)).round(2),
+        'percentual_receita_produtos': (produtos / total.replace(0, np.nan) * 100).round(2),
+        'mes': df['mes'],
+        'ano': df['ano'],
+        'dia_semana': df['dia_semana'],
+        'trimestre': (df['mes'] - 1) // 3 + 1,
+        'tipo_adversario': df['nivel_confronto'],
+        'eh_classico': df['classico_local'],
+    })
+    return saida.dropna(subset=['ano']).astype({'ano': 'int64', 'mes': 'int64', 'trimestre': 'int64'})
+
+
+def fato_temporal(jogos):
+    temporal = jogos.groupby(['data', 'ano', 'mes', 'trimestre'], as_index=False)[
+        ['receita_ingresso', 'receita_produtos_internos', 'total_arrecadado']].sum()
+    temporal['fonte'] = 'Star schema Mineirão'
+    return temporal[['data', 'receita_ingresso', 'receita_produtos_internos', 'total_arrecadado',
+                     'fonte', 'ano', 'mes', 'trimestre']]
+
+
+def dim_produtos(tabelas, jogos):
+    # Receita de consumo por jogo e categoria de produto (chave: jogo_id + categoria)
+    consumo = tabelas['fato_consumo']
+    consumo = juncao_estrela.juntar(consumo[consumo['jogo_id'].isin(jogos['jogo_id'])][['jogo_id', 'produto_id', 'receita_produto_rs']],
+                                    [(tabelas['dim_produto'], 'produto_id', ['categoria'])])
+    produtos = consumo.groupby(['jogo_id', 'categoria'], as_index=False, observed=True).agg(
+        Receita_Total_Produto=('receita_produto_rs', 'sum'))
+    produtos = juncao_estrela.juntar(produtos, [(jogos, 'jogo_id', ['publico_total', 'receita_produtos_internos',
+                                                                     'ano', 'trimestre'])])
+    return pd.DataFrame({
+        'jogo_id': produtos['jogo_id'],
+        'categoria': produtos['categoria'],
+        'Gasto_Medio_por_Torcedor': (produtos['Receita_Total_Produto'] / produtos['publico_total'].replace(0, np.nan)).round(4),
+        'Receita_Total_Produto': produtos['Receita_Total_Produto'].round(2),
+        'receita_total_jogo': produtos['receita_produtos_internos'],
+        'participacao_percentual': (produtos['Receita_Total_Produto'] / produtos['receita_produtos_internos'].replace(0, np.nan)
+                                    * 100).round(2),
+        'ano': produtos['ano'],
+        'trimestre': produtos['trimestre'],
+    })
+
+
+def colunas_estatisticas(tabelas):
+    # Colunas numéricas do FATO_Jogos com estatísticas online (correlação, KPIs e métricas anuais)
+    return ['publico_total', 'receita_ingresso', 'receita_produtos_internos', 'total_arrecadado',
+            'ticket_medio_ingresso', 'receita_per_capita', *tabelas['dim_setor']['nome_setor'].tolist()]
+
+
+def agg_metricas_anuais(estados_ano):
+    # estados_ano: {ano: Momentos}
+    return estatisticas_online.metricas_por_grupo(
+        estados_ano, ['receita_ingresso', 'receita_produtos_internos', 'total_arrecadado']).round(2)
+
+
+def kpi_dashboard(estado):
+    def reais(valor):
+        return f'R$ {valor:,.2f}'
+    resumo = estado.resumo()
+    return pd.DataFrame({
+        'Métrica': ['Público Médio', 'Receita Média Total', 'Ticket Médio Ingresso', 'Receita Per Capita',
+                    'Maior Público', 'Menor Público', 'Total de Jogos'],
+        'Valor': [f"{resumo.at['publico_total', 'mean']:.0f}", reais(resumo.at['total_arrecadado', 'mean']),
+                  reais(resumo.at['ticket_medio_ingresso', 'mean']), reais(resumo.at['receita_per_capita', 'mean']),
+                  f"{resumo.at['publico_total', 'max']:.0f}", f"{resumo.at['publico_total', 'min']:.0f}",
+                  f"{resumo.at['publico_total', 'count']}"],
+    })
+
+
+def corr_matriz(estado):
+    return estado.correlacao().round(3).rename_axis('').reset_index()
+
+
+def dim_demografica(perfil):
+    # Distribuição do perfil de torcedor (a dimensão não tem ligação com o jogo: uma linha)
+    linha = {'Jogo_ID': 'TODOS'}
+    for coluna in ['genero', 'faixa_etaria', 'regiao_origem']:
+        for valor, fracao in perfil[coluna].value_counts(normalize=True).sort_index().items():
+            linha[f"perc_{str(valor).upper().replace(' ', '_')}"] = round(fracao, 4)
+    return pd.DataFrame([linha])
+
+
+# --- 4. GRAVAÇÃO DAS PARTIÇÕES ---
+def _pasta(destino, tabela, chave):
+    colunas = PARTICOES[tabela]
+    return os.path.join(destino, tabela, *(f'{c}={v}' for c, v in zip(colunas, chave)))
+
+
+def gravar_particao(destino, tabela, chave, df):
+    # CSV e Parquet de uma partição, trocados de uma vez (os.replace) para que o Power BI
+    # nunca leia um arquivo pela metade
+    pasta = _pasta(destino, tabela, chave)
+    os.makedirs(pasta, exist_ok=True)
+    arquivos = []
+    for extensao, gravar in (('csv', lambda c: df.to_csv(c, index=False, encoding='utf-8-sig')),
+                             ('parquet', lambda c: df.to_parquet(c, index=False))):
+        caminho = os.path.join(pasta, f'{tabela}.{extensao}')
+        gravar(f'{caminho}.tmp')
+        os.replace(f'{caminho}.tmp', caminho)
+        arquivos.append(os.path.relpath(caminho, destino))
+    return tabela, chave, len(df), arquivos
+
+
+def _ler_manifesto(destino):
+    try:
+        with open(os.path.join(destino, ARQUIVO_MANIFESTO), encoding='utf-8') as f:
+            manifesto = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return manifesto if manifesto.get('versao') == VERSAO_EXPORT else {}
+
+
+def _chave_texto(chave):
+    return '/'.join(str(v) for v in chave)
+
+
+# --- 5. EXPORTAÇÃO INCREMENTAL ---
+def exportar(diretorio=None, destino=None, forcar=False, trabalhadores=None):
+    # Retorna um resumo: partições recalculadas/removidas, arquivos gravados e tempos
+    inicio = time.perf_counter()
+    destino = destino or os.path.join(diretorio or ingestao.DIRETORIO_PADRAO, NOME_DESTINO)
+    tabelas = ingestao.carregar_tabelas(diretorio, tabelas=TABELAS_ORIGEM, compacto=False)
+    fontes = assinaturas_fontes(tabelas)
+    anterior = _ler_manifesto(destino)
+    fontes_anteriores = anterior.get('fontes', {})
+    tempo_hash = time.perf_counter() - inicio
+
+    tudo = forcar or fontes_anteriores.get('dimensoes') != fontes['dimensoes']
+    particoes_antes = fontes_anteriores.get('particoes', {})
+    sujas = {chave for chave, h in fontes['particoes'].items() if tudo or particoes_antes.get(chave) != h}
+    removidas = set(particoes_antes) - set(fontes['particoes'])
+    anos_sujos = {int(chave.split('/')[0]) for chave in sujas}
+    anos_removidos = {int(chave.split('/')[0]) for chave in removidas} - {int(c.split('/')[0]) for c in fontes['particoes']}
+
+    tarefas = []  # (tabela, chave, df)
+    colunas = colunas_estatisticas(tabelas)
+    estados = {chave: estatisticas_online.Momentos.de_dict(dados)
+               for chave, dados in anterior.get('estatisticas', {}).items()
+               if chave in fontes['particoes'] and int(chave.split('/')[0]) not in anos_sujos}
+    jogos = base_jogos(tabelas, anos_sujos) if anos_sujos else None
+    if jogos is not None:
+        temporal = fato_temporal(jogos)
+        produtos = dim_produtos(tabelas, jogos)
+        for (ano, trimestre), estado in estatisticas_online.por_particao(jogos, colunas, ['ano', 'trimestre']).items():
+            estados[f'{ano}/{trimestre}'] = estado
+        for (ano, trimestre), grupo in jogos.groupby(['ano', 'trimestre']):
+            if f'{ano}/{trimestre}' not in sujas:
+                continue
+            tarefas.append(('FATO_Jogos', (ano, trimestre), grupo))
+            tarefas.append(('FATO_Temporal', (ano, trimestre),
+                            temporal[(temporal['ano'] == ano) & (temporal['trimestre'] == trimestre)]))
+            tarefas.append(('DIM_Produtos', (ano, trimestre),
+                            produtos[(produtos['ano'] == ano) & (produtos['trimestre'] == trimestre)]))
+        anuais = agg_metricas_anuais({ano: estatisticas_online.combinar_todos(
+            estados[chave] for chave in sorted(estados) if int(chave.split('/')[0]) == ano) for ano in anos_sujos})
+        for ano in anos_sujos:
+            tarefas.append(('AGG_Metricas_Anuais', (ano,), anuais[anuais['ano'] == ano]))
+
+    # Tabelas globais: combinação dos estados de todas as partições, em ordem fixa
+    if sujas or removidas or not os.path.exists(os.path.join(destino, 'KPI_Dashboard')):
+        total = estatisticas_online.combinar_todos((estados[chave] for chave in sorted(estados)), colunas)
+        tarefas.append(('KPI_Dashboard', (), kpi_dashboard(total)))
+        tarefas.append(('CORR_Matriz', (), corr_matriz(total)))
+    if forcar or fontes_anteriores.get('perfil') != fontes['perfil']:
+        tarefas.append(('DIM_Demografica', (), dim_demografica(tabelas['dim_perfil_torcedor'])))
+    tempo_calculo = time.perf_counter() - inicio - tempo_hash
+
+    # Partições que deixaram de existir na origem
+    for chave in removidas:
+        for tabela in ('FATO_Jogos', 'FATO_Temporal', 'DIM_Produtos'):
+            shutil.rmtree(_pasta(destino, tabela, chave.split('/')), ignore_errors=True)
+    for ano in anos_removidos:
+        for tabela in ('FATO_Jogos', 'FATO_Temporal', 'DIM_Produtos', 'AGG_Metricas_Anuais'):
+            shutil.rmtree(_pasta(destino, tabela, (ano,)), ignore_errors=True)
+
+    # Gravação em paralelo: to_parquet e a escrita em disco liberam o GIL
+    trabalhadores = trabalhadores or min(8, 2 * (os.cpu_count() or 1))
+    with ThreadPoolExecutor(trabalhadores) as executor:
+        gravados = list(executor.map(lambda t: gravar_particao(destino, *t), tarefas))
+
+    # Manifesto por último: se a exportação for interrompida, a próxima refaz as partições
+    manifesto = {'versao': VERSAO_EXPORT, 'data': time.strftime('%Y-%m-%dT%H:%M:%S'), 'fontes': fontes,
+                 'estatisticas': {chave: estados[chave].para_dict() for chave in sorted(estados)},
+                 'tabelas': {t: v for t, v in anterior.get('tabelas', {}).items()}}
+    for chave in removidas:
+        for tabela in ('FATO_Jogos', 'FATO_Temporal', 'DIM_Produtos'):
+            manifesto['tabelas'].get(tabela, {}).pop(chave, None)
+    for ano in anos_removidos:
+        manifesto['tabelas'].get('AGG_Metricas_Anuais', {}).pop(str(ano), None)
+    for tabela, chave, linhas, arquivos in gravados:
+        manifesto['tabelas'].setdefault(tabela, {})[_chave_texto(chave) or '*'] = {'linhas': linhas, 'arquivos': arquivos}
+    with open(os.path.join(destino, f'{ARQUIVO_MANIFESTO}.tmp'), 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f, indent=2, ensure_ascii=False)
+    os.replace(os.path.join(destino, f'{ARQUIVO_MANIFESTO}.tmp'), os.path.join(destino, ARQUIVO_MANIFESTO))
+
+    return {
+        'destino': destino, 'particoes': len(fontes['particoes']), 'sujas': sorted(sujas),
+        'removidas': sorted(removidas), 'arquivos': sum(len(g[3]) for g in gravados),
+        'tempo_hash_s': tempo_hash, 'tempo_calculo_s': tempo_calculo, 'tempo_total_s': time.perf_counter() - inicio,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Exportação incremental e particionada para o Power BI.')
+    parser.add_argument('diretorio', nargs='?', default=None, help='pasta dos CSVs (padrão: MINEIRAO_DADOS)')
+    parser.add_argument('--destino', default=None, help=f'pasta de saída (padrão: <dados>/{NOME_DESTINO})')
+    parser.add_argument('--forcar', action='store_true', help='regrava todas as partições')
+    parser.add_argument('--trabalhadores', type=int, default=None, help='threads de gravação')
+    args = parser.parse_args()
+
+    resumo = exportar(args.diretorio, args.destino, args.forcar, args.trabalhadores)
+    print(f"✅ {len(resumo['sujas'])} de {resumo['particoes']} partições ano/trimestre recalculadas, "
+          f"{len(resumo['removidas'])} removidas, {resumo['arquivos']} arquivos gravados em {resumo['destino']}")
+    print(f"⏱️ hash das fontes {resumo['tempo_hash_s'] * 1000:.0f} ms | cálculo {resumo['tempo_calculo_s'] * 1000:.0f} ms"
+          f" | total {resumo['tempo_total_s'] * 1000:.0f} ms")
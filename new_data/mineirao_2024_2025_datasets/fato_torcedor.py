@@ -0,0 +1,387 @@
+import os
+import json
+import time
+import glob
+import shutil
+import hashlib
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import ingestao
+import juncao_estrela
+
+
+# --- 1. CONFIGURAÇÃO ---
+# Fato por ingresso (um torcedor por linha) ligado a dim_perfil_torcedor, dim_setor,
+# dim_canal e ao jogo. Os CSVs não trazem ingressos individuais: cada jogo tem
+# publico_pago linhas sorteadas a partir dos próprios fatos (setor pelo publico_setor da
+# mobilidade, canal pelas vendas_canal do dia, preço pelo ticket médio do jogo) e um mix
+# de perfis próprio do jogo; SEED fixa o sorteio. Linhas em arrays numpy de códigos
+# pequenos (uint8/int32), gravados em .npy e abertos por mmap.
+# Os índices são bitmaps (um bit por ingresso, em palavras uint64) por valor de cada
+# atributo; um segmento é AND entre atributos de OR dos valores pedidos, a contagem é o
+# popcount e a soma da receita vem das fatias de bits do preço em centavos (bit-sliced
+# index): soma = sum(2**b * popcount(segmento & fatia_b)).
+NOME_CACHE = '.fato_torcedor'
+VERSAO_FATO = 1
+SEED = 2024
+TABELAS_FATO = ['fato_jogos', 'dim_data', 'dim_adversario', 'dim_perfil_torcedor', 'dim_setor', 'dim_canal',
+                'fato_mobilidade_incidentes', 'fato_mercado_ingressos']
+# Concentração do Dirichlet do mix de perfis de cada jogo (maior = mais perto do uniforme)
+CONCENTRACAO_PERFIS = 8.0
+# Preço relativo dos setores (sorteado uma vez pela SEED), normalizado por jogo para que
+# a receita dos ingressos feche com publico_pago x ticket_medio_ingresso_rs
+FAIXA_PRECO_SETOR = (0.7, 1.5)
+# Ingressos gerados por bloco de jogos (limita a memória do sorteio)
+LINHAS_POR_BLOCO = 4_000_000
+# Teto de ingressos (soma de publico_pago): o fato ocupa ~18 bytes por ingresso em disco
+# (arrays + bitmaps; 28,8 milhões de ingressos com 1.000 jogos = 537 MB). Acima do teto o
+# fato não é gerado e a figura 9 volta a contar os perfis de dim_perfil_torcedor;
+# MINEIRAO_MAX_INGRESSOS muda o teto (0 desliga o fato).
+MAXIMO_INGRESSOS = int(os.environ.get('MINEIRAO_MAX_INGRESSOS', 30_000_000))
+
+# Atributo indexado -> (coluna de código do ingresso, tabela e coluna que dão o valor).
+# Os atributos de jogo (temporada, competição, nível) passam pelo jogo do ingresso.
+ATRIBUTOS = {
+    'perfil_id': ('perfil_id', None, None),
+    'faixa_etaria': ('perfil_id', 'dim_perfil_torcedor', 'faixa_etaria'),
+    'genero': ('perfil_id', 'dim_perfil_torcedor', 'genero'),
+    'regiao_origem': ('perfil_id', 'dim_perfil_torcedor', 'regiao_origem'),
+    'setor_id': ('setor_id', None, None),
+    'nome_setor': ('setor_id', 'dim_setor', 'nome_setor'),
+    'canal_id': ('canal_id', None, None),
+    'tipo_operacao': ('canal_id', 'dim_canal', 'tipo_operacao'),
+    'ano': ('jogo_id', 'jogos', 'ano'),
+    'competicao': ('jogo_id', 'jogos', 'competicao'),
+    'nivel_confronto': ('jogo_id', 'jogos', 'nivel_confronto'),
+    'classico_local': ('jogo_id', 'jogos', 'classico_local'),
+}
+COLUNAS = ['jogo_id', 'perfil_id', 'setor_id', 'canal_id', 'valor_centavos']
+
+if hasattr(np, 'bitwise_count'):
+    def popcount(palavras):
+        return int(np.bitwise_count(palavras).sum(dtype=np.int64))
+else:
+    def popcount(palavras):
+        return int(np.unpackbits(np.ascontiguousarray(palavras).view(np.uint8)).sum(dtype=np.int64))
+
+
+# --- 2. SORTEIO DOS INGRESSOS ---
+def _proporcoes(fato, linha, coluna, valor, linhas, colunas, reserva):
+    # Matriz linhas x colunas de proporções (ex.: jogo x setor pelo publico_setor); linhas
+    # sem nada caem nos pesos de reserva
+    pesos = fato.pivot_table(index=linha, columns=coluna, values=valor, aggfunc='sum', fill_value=0)
+    pesos = pesos.reindex(index=linhas, columns=colunas, fill_value=0).to_numpy(float).clip(min=0)
+    vazias = pesos.sum(axis=1) == 0
+    pesos[vazias] = reserva
+    return pesos / pesos.sum(axis=1, keepdims=True)
+
+
+def _sortear_categoria(rng, posicao, acumuladas):
+    # Categoria de cada ingresso pela linha de probabilidades acumuladas do seu jogo:
+    # um único searchsorted sobre as linhas deslocadas de 1 em 1 (jogo + acumulada)
+    k = acumuladas.shape[1]
+    planas = (np.arange(len(acumuladas))[:, None] + acumuladas).ravel()
+    codigos = np.searchsorted(planas, posicao + rng.random(len(posicao)), side='right') - posicao * k
+    return np.minimum(codigos, k - 1)
+
+
+def sortear_bloco(rng, publico, p_setor, p_canal, p_perfil, preco):
+    # Ingressos de um bloco de jogos: (posição do jogo, setor, canal, perfil, centavos),
+    # em ordem de jogo e de setor
+    por_setor = rng.multinomial(publico, p_setor)
+    posicao = np.repeat(np.arange(len(publico)), publico)
+    setor = np.repeat(np.tile(np.arange(p_setor.shape[1]), len(publico)), por_setor.ravel())
+    canal = _sortear_categoria(rng, posicao, np.cumsum(p_canal, axis=1))
+    perfil = _sortear_categoria(rng, posicao, np.cumsum(p_perfil, axis=1))
+    return posicao, setor, canal, perfil, preco[posicao, setor]
+
+
+def gerar(tabelas, pasta, seed=SEED):
+    # Grava os arrays do fato por ingresso em pasta/<coluna>.npy e devolve {coluna: array}
+    jogos = tabelas['fato_jogos']
+    jogo_id = jogos['jogo_id'].to_numpy()
+    publico = jogos['publico_pago'].fillna(0).clip(lower=0).round().astype(np.int64).to_numpy()
+    setores = tabelas['dim_setor']['setor_id'].to_numpy()
+    canais = tabelas['dim_canal']['canal_id'].to_numpy()
+    perfis = tabelas['dim_perfil_torcedor']['perfil_id'].to_numpy()
+    rng = np.random.default_rng(seed)
+
+    p_setor = _proporcoes(tabelas['fato_mobilidade_incidentes'], 'jogo_id', 'setor_id', 'publico_setor', jogo_id,
+                          setores, tabelas['dim_setor']['capacidade_mil'].fillna(1).to_numpy(float))
+    p_canal = _proporcoes(tabelas['fato_mercado_ingressos'], 'data_id', 'canal_id', 'vendas_canal',
+                          jogos['data_id'].to_numpy(), canais, np.ones(len(canais)))
+    p_perfil = rng.dirichlet(np.full(len(perfis), CONCENTRACAO_PERFIS), size=len(jogos))
+    relativo = rng.uniform(*FAIXA_PRECO_SETOR, size=len(setores))
+    ticket = jogos['ticket_medio_ingresso_rs'].fillna(0).to_numpy(float)
+    preco = ticket[:, None] * relativo / (p_setor @ relativo)[:, None]
+    preco = np.round(preco * 100).astype(np.uint32)
+
+    os.makedirs(pasta, exist_ok=True)
+    total = int(publico.sum())
+    tipos = {'jogo_id': np.int32, 'valor_centavos': np.uint32}
+    arrays = {}
+    for coluna, ids in (('jogo_id', jogo_id), ('perfil_id', perfis), ('setor_id', setores), ('canal_id', canais),
+                        ('valor_centavos', None)):
+        tipo = tipos.get(coluna) or np.min_scalar_type(int(ids.max(initial=0)))
+        arrays[coluna] = np.lib.format.open_memmap(os.path.join(pasta, f'{coluna}.npy'), mode='w+',
+                                                   dtype=tipo, shape=(total,))
+
+    # Blocos de jogos com até LINHAS_POR_BLOCO ingressos
+    fim_jogo = np.cumsum(publico)
+    inicio, linha = 0, 0
+    while inicio < len(jogos):
+        limite = (fim_jogo[inicio - 1] if inicio else 0) + LINHAS_POR_BLOCO
+        fim = max(inicio + 1, int(np.searchsorted(fim_jogo, limite, side='right')))
+        fatia = slice(inicio, fim)
+        posicao, setor, canal, perfil, centavos = sortear_bloco(rng, publico[fatia], p_setor[fatia], p_canal[fatia],
+                                                                p_perfil[fatia], preco[fatia])
+        destino = slice(linha, linha + len(posicao))
+        arrays['jogo_id'][destino] = jogo_id[fatia][posicao]
+        arrays['setor_id'][destino] = setores[setor]
+        arrays['canal_id'][destino] = canais[canal]
+        arrays['perfil_id'][destino] = perfis[perfil]
+        arrays['valor_centavos'][destino] = centavos
+        linha, inicio = destino.stop, fim
+    for array in arrays.values():
+        array.flush()
+    return arrays
+
+
+# --- 3. ÍNDICES DE BITMAP ---
+def empacotar(mascara):
+    # Array booleano -> bitmap em palavras uint64 (bit i = linha i)
+    bytes_ = np.packbits(mascara, bitorder='little')
+    palavras = np.zeros(-(-len(bytes_) // 8) * 8, dtype=np.uint8)
+    palavras[:len(bytes_)] = bytes_
+    return palavras.view(np.uint64)
+
+
+def _valores_atributo(tabelas, atributo):
+    # Atributo -> (ids na coluna de código do ingresso, valor de cada id)
+    coluna, tabela, campo = ATRIBUTOS[atributo]
+    if tabela is None:
+        ids = tabelas[{'perfil_id': 'dim_perfil_torcedor', 'setor_id': 'dim_setor',
+                       'canal_id': 'dim_canal'}[coluna]][coluna].to_numpy()
+        return ids, ids
+    return tabelas[tabela][coluna].to_numpy(), tabelas[tabela][campo].to_numpy()
+
+
+def indexar(arrays, tabelas, pasta):
+    # Grava pasta/bitmaps.npy (um bitmap por linha) e pasta/indice.json
+    # ({atributo: {valor: linha}}, 'fatias': linhas das fatias do preço)
+    tabelas = dict(tabelas)
+    tabelas['jogos'] = juncao_estrela.juntar(tabelas['fato_jogos'][['jogo_id', 'data_id', 'adversario_id']], [
+        (tabelas['dim_data'], 'data_id', ['ano']),
+        (tabelas['dim_adversario'], 'adversario_id', ['competicao', 'nivel_confronto', 'classico_local']),
+    ])
+    # Cada atributo vira um código por id (tabela de consulta indexada pelo id), e o
+    # código por ingresso sai de um único gather sobre a coluna do ingresso
+    planos = []
+    for atributo, (coluna, _, _) in ATRIBUTOS.items():
+        ids, valores = _valores_atributo(tabelas, atributo)
+        codigos, unicos = pd.factorize(pd.Series(valores))
+        consulta = np.full(int(ids.max(initial=0)) + 1, -1, dtype=np.int16)
+        consulta[ids] = codigos
+        planos.append((atributo, coluna, consulta, unicos))
+    centavos = arrays['valor_centavos']
+    bits = int(centavos.max(initial=0)).bit_length()
+
+    matriz = np.lib.format.open_memmap(os.path.join(pasta, 'bitmaps.npy'), mode='w+', dtype=np.uint64,
+                                       shape=(sum(len(p[3]) for p in planos) + bits, -(-len(centavos) // 64)))
+    indice, linha = {}, 0
+    for atributo, coluna, consulta, unicos in planos:
+        por_ingresso = consulta[arrays[coluna]]
+        indice[atributo] = {}
+        for codigo, valor in enumerate(unicos):
+            indice[atributo][_chave(valor)] = linha
+            matriz[linha] = empacotar(por_ingresso == codigo)
+            linha += 1
+    indice['fatias'] = []
+    for b in range(bits):
+        indice['fatias'].append(linha)
+        matriz[linha] = empacotar((centavos >> b) & 1 == 1)
+        linha += 1
+    matriz.flush()
+    with open(os.path.join(pasta, 'indice.json'), 'w', encoding='utf-8') as f:
+        json.dump(indice, f, ensure_ascii=False)
+
+
+def _chave(valor):
+    # Valores do índice como texto (JSON); inteiros e booleanos do numpy viram 2024 / True
+    return str(valor.item() if isinstance(valor, np.generic) else valor)
+
+
+# --- 4. CONSULTAS DE SEGMENTO ---
+class FatoTorcedor:
+    def __init__(self, pasta):
+        self.pasta = pasta
+        self.colunas = {c: np.load(os.path.join(pasta, f'{c}.npy'), mmap_mode='r') for c in COLUNAS}
+        self.bitmaps = np.load(os.path.join(pasta, 'bitmaps.npy'), mmap_mode='r')
+        with open(os.path.join(pasta, 'indice.json'), encoding='utf-8') as f:
+            self.indice = json.load(f)
+        self.fatias = self.indice.pop('fatias')
+
+    def __len__(self):
+        return len(self.colunas['jogo_id'])
+
+    def valores(self, atributo):
+        return list(self.indice[atributo])
+
+    def segmento(self, **filtros):
+        # Bitmap do segmento: AND entre atributos do OR dos valores de cada um (vazio =
+        # sem filtro). Valores fora do índice não selecionam nada.
+        resultado = None
+        for atributo, valores in filtros.items():
+            if not valores:
+                continue
+            if atributo not in self.indice:
+                raise KeyError(f"Atributo '{atributo}' sem índice (disponíveis: {', '.join(self.indice)})")
+            linhas = [self.indice[atributo][v] for v in map(_chave, valores) if v in self.indice[atributo]]
+            uniao = np.bitwise_or.reduce(self.bitmaps[linhas], axis=0) if linhas else \
+                np.zeros(self.bitmaps.shape[1], dtype=np.uint64)
+            resultado = uniao if resultado is None else resultado & uniao
+        return resultado
+
+    def contar(self, segmento=None):
+        return len(self) if segmento is None else popcount(segmento)
+
+    def somar_centavos(self, segmento=None):
+        soma = 0
+        for b, linha in enumerate(self.fatias):
+            fatia = self.bitmaps[linha]
+            soma += popcount(fatia if segmento is None else segmento & fatia) << b
+        return soma
+
+    def consultar(self, **filtros):
+        # {'ingressos', 'receita_rs'} do segmento
+        segmento = self.segmento(**filtros)
+        return {'ingressos': self.contar(segmento), 'receita_rs': self.somar_centavos(segmento) / 100}
+
+    def contar_por(self, atributo, receita=False, **filtros):
+        # Ingressos (e receita) por valor do atributo dentro do segmento dos filtros
+        segmento = self.segmento(**filtros)
+        linhas = []
+        for valor, linha in self.indice[atributo].items():
+            parte = self.bitmaps[linha] if segmento is None else segmento & self.bitmaps[linha]
+            linhas.append({atributo: valor, 'contagem': popcount(parte),
+                           **({'receita_rs': self.somar_centavos(parte) / 100} if receita else {})})
+        return pd.DataFrame(linhas, columns=[atributo, 'contagem'] + (['receita_rs'] if receita else []))
+
+    def quadro(self):
+        # As linhas como DataFrame (colunas sobre os próprios arrays)
+        return pd.DataFrame({c: np.asarray(a) for c, a in self.colunas.items()}, copy=False)
+
+    def bytes(self):
+        return sum(a.nbytes for a in self.colunas.values()), self.bitmaps.nbytes
+
+
+# --- 5. CACHE EM DISCO ---
+_ABERTOS = {}
+
+
+def chave_fato(diretorio=None, seed=SEED):
+    h = hashlib.sha256(f'v{VERSAO_FATO};seed={seed}'.encode())
+    h.update(ingestao.assinatura_dados(diretorio, TABELAS_FATO).encode())
+    with open(os.path.abspath(__file__), 'rb') as f:
+        h.update(f.read())
+    return h.hexdigest()[:16]
+
+
+def cabe(fato_jogos, teto=None):
+    # O fato destes jogos fica dentro do teto de ingressos?
+    teto = MAXIMO_INGRESSOS if teto is None else teto
+    return int(fato_jogos['publico_pago'].sum()) <= teto
+
+
+def abrir(diretorio=None, forcar=False, seed=SEED, teto=None):
+    # Fato em memória, senão do disco, senão sorteado e indexado agora (e gravado).
+    # teto: máximo de ingressos a sortear (padrão: MAXIMO_INGRESSOS)
+    chave = chave_fato(diretorio, seed)
+    if chave in _ABERTOS and not forcar:
+        return _ABERTOS[chave]
+    raiz = os.path.join(diretorio or ingestao.DIRETORIO_PADRAO, NOME_CACHE)
+    pasta = os.path.join(raiz, chave)
+    if forcar or not os.path.exists(os.path.join(pasta, 'indice.json')):
+        # Grava numa pasta temporária e troca de uma vez: leitores nunca veem meio índice
+        temporaria = f'{pasta}.{os.getpid()}.tmp'
+        shutil.rmtree(temporaria, ignore_errors=True)
+        tabelas = ingestao.carregar_tabelas(diretorio, tabelas=TABELAS_FATO, compacto=False)
+        if not cabe(tabelas['fato_jogos'], teto):
+            raise ValueError(f"{int(tabelas['fato_jogos']['publico_pago'].sum()):,} ingressos acima do teto de "
+                             f"{MAXIMO_INGRESSOS if teto is None else teto:,} (MINEIRAO_MAX_INGRESSOS)")
+        indexar(gerar(tabelas, temporaria, seed), tabelas, temporaria)
+        shutil.rmtree(pasta, ignore_errors=True)
+        os.replace(temporaria, pasta)
+        for antiga in glob.glob(os.path.join(raiz, '*')):
+            if antiga != pasta and not antiga.endswith('.tmp'):
+                shutil.rmtree(antiga, ignore_errors=True)
+    _ABERTOS[chave] = FatoTorcedor(pasta)
+    return _ABERTOS[chave]
+
+
+# --- 6. RELATÓRIO: BITMAPS vs. PANDAS ---
+def relatorio(diretorio=None, forcar=False, repeticoes=5, teto=None):
+    def milhar(valor):
+        return f'{valor:,}'.replace(',', '.')
+
+    def melhor(funcao):
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            resultado = funcao()
+            tempos.append(time.perf_counter() - inicio)
+        return min(tempos) * 1000, resultado
+
+    inicio = time.perf_counter()
+    fato = abrir(diretorio, forcar, teto=teto)
+    preparo = time.perf_counter() - inicio
+    arrays, indices = fato.bytes()
+    print(f"🎟️ {milhar(len(fato))} ingressos; arrays {arrays / 1e6:.1f} MB + bitmaps {indices / 1e6:.1f} MB "
+          f"({fato.bitmaps.shape[0]} bitmaps); pronto em {preparo:.2f} s")
+
+    # Mesmo segmento pelo pandas: ingressos com os atributos já juntados (tipos compactos)
+    tabelas = ingestao.carregar_tabelas(diretorio, tabelas=TABELAS_FATO, compacto=True)
+    jogos = juncao_estrela.juntar(tabelas['fato_jogos'][['jogo_id', 'adversario_id']], [
+        (tabelas['dim_adversario'], 'adversario_id', ['nivel_confronto'])])
+    detalhe = juncao_estrela.juntar(fato.quadro(), [
+        (tabelas['dim_perfil_torcedor'], 'perfil_id', ['faixa_etaria', 'regiao_origem']),
+        (jogos, 'jogo_id', ['nivel_confronto'])])
+    print(f"   mesmo fato no pandas com atributos: {detalhe.memory_usage(deep=True).sum() / 1e6:.1f} MB")
+
+    perfil = tabelas['dim_perfil_torcedor'].iloc[min(1, len(tabelas['dim_perfil_torcedor']) - 1)]
+    niveis = tabelas['dim_adversario']['nivel_confronto'].dropna()
+    nivel = 'Classico' if (niveis == 'Classico').any() else str(niveis.iloc[0])
+    filtros = {'faixa_etaria': [perfil['faixa_etaria']], 'regiao_origem': [perfil['regiao_origem']],
+               'nivel_confronto': [nivel]}
+
+    def pandas_segmento():
+        mascara = np.ones(len(detalhe), dtype=bool)
+        for coluna, valores in filtros.items():
+            mascara &= detalhe[coluna].isin(valores).to_numpy()
+        return {'ingressos': int(mascara.sum()), 'receita_rs': int(detalhe['valor_centavos'][mascara].sum()) / 100}
+
+    tempo_bitmap, obtido = melhor(lambda: fato.consultar(**filtros))
+    tempo_pandas, esperado = melhor(pandas_segmento)
+    tempo_faixas, _ = melhor(lambda: fato.contar_por('faixa_etaria', receita=True, **filtros))
+    reais = f"{obtido['receita_rs']:,.2f}".replace(',', ' ').replace('.', ',').replace(' ', '.')
+    print(f"🔎 Segmento ({', '.join(v[0] for v in filtros.values())}): {milhar(obtido['ingressos'])} ingressos, "
+          f"R$ {reais}")
+    print(f"{'Consulta':<44}{'Tempo (ms)':>12}")
+    print(f"{'pandas (máscara booleana + soma)':<44}{tempo_pandas:>12.2f}")
+    print(f"{'bitmaps (AND/OR + popcount)':<44}{tempo_bitmap:>12.2f}")
+    print(f"{'bitmaps, por faixa etária com receita':<44}{tempo_faixas:>12.2f}")
+    print("✅ Bitmaps e pandas concordam" if obtido == esperado else f"❌ Divergência: {obtido} != {esperado}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fato por ingresso com índices de bitmap por segmento.')
+    parser.add_argument('diretorio', nargs='?', default=None, help='diretório dos CSVs (padrão: MINEIRAO_DADOS)')
+    parser.add_argument('--forcar', action='store_true', help='sorteia e indexa de novo, ignorando o cache')
+    parser.add_argument('--repeticoes', type=int, default=5, help='repetições por consulta (vale a melhor)')
+    parser.add_argument('--teto', type=int, default=None,
+                        help=f'máximo de ingressos a sortear (padrão: {MAXIMO_INGRESSOS:,})')
+    args = parser.parse_args()
+    relatorio(args.diretorio, args.forcar, args.repeticoes, args.teto)
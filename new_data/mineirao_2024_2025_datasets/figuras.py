@@ -0,0 +1,317 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+import amostragem
+import ingestao
+
+# Funções de agregação e de construção das 9 figuras do dashboard, compartilhadas
+# pelo app Dash, pela exportação offline e pelo pipeline (pipeline.py).
+
+# --- MODO PARA SÉRIES GRANDES ---
+# Acima de LIMITE_PONTOS jogos, as séries temporais (figuras 1 e 2) viram traces
+# scattergl (WebGL) reduzidas no servidor para cerca de PONTOS_TELA pontos por série.
+# intervalo=(inicio, fim) em datetime64 corta a série ao zoom atual, que então é
+# reamostrado com resolução maior (ver callbacks de relayout no app.py).
+LIMITE_PONTOS = 5000
+PONTOS_TELA = 2000
+
+
+def modo_series_grandes(df_dashboard):
+    return len(df_dashboard) > LIMITE_PONTOS
+
+
+def _figura_serie_reduzida(df_dashboard, series, titulo, rotulo_y, metodo, intervalo):
+    x = df_dashboard['data'].to_numpy('datetime64[ns]')
+    ordem = None if (np.diff(x.view(np.int64)) >= 0).all() else np.argsort(x, kind='stable')
+    x = x if ordem is None else x[ordem]
+    intervalo_ns = None if intervalo is None else tuple(pd.Timestamp(v).value for v in intervalo)
+
+    fig = go.Figure()
+    mostrados, total = 0, 0
+    for coluna, nome, cor in series:
+        y = df_dashboard[coluna].to_numpy(np.float64)
+        y = y if ordem is None else y[ordem]
+        xs, ys, n = amostragem.reduzir_serie(x.view(np.int64), y, PONTOS_TELA, metodo, intervalo_ns)
+        fig.add_trace(go.Scattergl(x=xs.view('datetime64[ns]'), y=ys, name=nome, mode='lines',
+                                   line={'color': cor, 'width': 1}))
+        mostrados, total = mostrados + len(xs), total + n
+    fig.update_layout(
+        title=f'{titulo} ({mostrados:,} de {total:,} pontos)'.replace(',', '.'),
+        xaxis_title='Data do Jogo', yaxis_title=rotulo_y,
+        hovermode="x unified", uirevision='serie-grande', template='plotly',
+    )
+    if intervalo is not None:
+        fig.update_xaxes(range=[str(intervalo[0]), str(intervalo[1])])
+    return fig
+
+
+# --- PAINEL 1 ---
+# faixas: percentis por jogo da simulação Monte Carlo (simulacao.py), desenhados como
+# faixa P10-P90 e linha P50 sobre as séries realizadas
+def _adicionar_faixa(fig, df_dashboard, faixas, medida, nome, cor):
+    # arrays numpy (datetime64/float) serializam bem mais rápido que as datas em objeto
+    faixas = faixas[faixas['jogo_id'].isin(df_dashboard['jogo_id'])].sort_values('data_jogo')
+    x = pd.to_datetime(faixas['data_jogo']).to_numpy('datetime64[ns]')
+    fig.add_trace(go.Scatter(x=x, y=faixas[f'{medida}_p90'].to_numpy(), mode='lines', line={'width': 0},
+                             showlegend=False, hoverinfo='skip', name=f'{nome} P90'))
+    fig.add_trace(go.Scatter(x=x, y=faixas[f'{medida}_p10'].to_numpy(), mode='lines', line={'width': 0},
+                             fill='tonexty', fillcolor=cor, name=f'{nome} P10-P90'))
+    fig.add_trace(go.Scatter(x=x, y=faixas[f'{medida}_p50'].to_numpy(), mode='lines',
+                             line={'dash': 'dot', 'color': '#555'}, name=f'{nome} P50'))
+
+
+def figura_publico(df_dashboard, faixas=None, intervalo=None):
+    if modo_series_grandes(df_dashboard):
+        # min/máx por faixa preserva os picos de público
+        return _figura_serie_reduzida(
+            df_dashboard,
+            [('publico_pago_real', 'publico_pago_real', '#636efa'),
+             ('publico_pago_projetado', 'publico_pago_projetado', '#EF553B')],
+            '1. Comparativo de Público Pago: Realizado vs. Projetado', 'Público Pago (Pessoas)', 'minmax', intervalo)
+    fig1 = px.bar(
+        df_dashboard.sort_values('data_jogo'),
+        x='data_jogo',
+        y=['publico_pago_real', 'publico_pago_projetado'],
+        barmode='group',
+        labels={'value': 'Público Pago (Pessoas)', 'variable': 'Métrica'},
+        title='1. Comparativo de Público Pago: Realizado vs. Projetado'
+    )
+    if faixas is not None:
+        _adicionar_faixa(fig1, df_dashboard, faixas, 'publico', 'Simulação', 'rgba(99, 110, 250, 0.2)')
+    fig1.update_layout(hovermode="x unified")
+    return fig1
+
+
+def figura_ticket_medio(df_dashboard, faixas=None, intervalo=None):
+    if modo_series_grandes(df_dashboard):
+        return _figura_serie_reduzida(
+            df_dashboard, [('ticket_medio_total_rs', 'ticket_medio_total_rs', '#F6511D')],
+            '2. Evolução do Ticket Médio Total (Ingresso + Consumo)', 'Ticket Médio Total (R$)', 'lttb', intervalo)
+    fig2 = px.line(
+        df_dashboard.sort_values('data_jogo'),
+        x='data_jogo',
+        y='ticket_medio_total_rs',
+        title='2. Evolução do Ticket Médio Total (Ingresso + Consumo)',
+        labels={'data_jogo': 'Data do Jogo', 'ticket_medio_total_rs': 'Ticket Médio Total (R$)'},
+        markers=True,
+        color_discrete_sequence=['#F6511D']
+    )
+    if faixas is not None:
+        _adicionar_faixa(fig2, df_dashboard, faixas, 'ticket_medio_total_rs', 'Simulação', 'rgba(246, 81, 29, 0.15)')
+    fig2.update_layout(hovermode="x unified")
+    return fig2
+
+
+order = ['Grande', 'Medio', 'Pequeno', 'Classico']
+
+
+def figura_receita_confronto(df_dashboard):
+    # Só as duas colunas usadas, em vez de uma cópia da tabela mestre inteira
+    df_box = df_dashboard[['nivel_confronto', 'receita_total_mil_rs_real']].dropna(subset=['receita_total_mil_rs_real'])
+    df_box = df_box.assign(nivel_confronto=pd.Categorical(df_box['nivel_confronto'], categories=order, ordered=True))
+    df_box = df_box.sort_values('nivel_confronto')
+
+    fig3 = px.box(
+        df_box,
+        x='nivel_confronto',
+        y='receita_total_mil_rs_real',
+        color='nivel_confronto',
+        title='3. Distribuição da Receita Total (Milhões de R$) por Nível de Confronto',
+        labels={'nivel_confronto': 'Nível do Confronto', 'receita_total_mil_rs_real': 'Receita Total (Milhões de R$)'},
+    )
+    return fig3
+
+
+# --- PAINEL 2 ---
+# Os agregados dos painéis 2 e 3 voltam os decimais do modo compacto (inteiros escalados) a
+# float64 antes de somar, e saem iguais aos do modo padrão
+def agregar_receita_categoria(df_consumo_detalhe):
+    df_consumo_detalhe = ingestao.decimais(df_consumo_detalhe[['categoria', 'receita_produto_rs']])
+    df_receita_categoria = df_consumo_detalhe.groupby('categoria', observed=True)['receita_produto_rs'].sum().reset_index()
+    df_receita_categoria['receita_produto_mil_rs'] = df_receita_categoria['receita_produto_rs'] / 1000
+    return df_receita_categoria
+
+
+def figura_receita_categoria(df_receita_categoria):
+    fig4 = px.pie(
+        df_receita_categoria,
+        values='receita_produto_mil_rs',
+        names='categoria',
+        title='4. Distribuição da Receita de Consumo por Categoria',
+        hole=.3, 
+        color_discrete_sequence=px.colors.qualitative.Pastel
+    )
+    fig4.update_traces(textposition='inside', textinfo='percent+label')
+    return fig4
+
+
+def agregar_top_itens(df_consumo_detalhe):
+    df_consumo_detalhe = ingestao.decimais(df_consumo_detalhe[['item_vendido', 'receita_produto_rs']])
+    df_top_itens = df_consumo_detalhe.groupby('item_vendido', observed=True)['receita_produto_rs'].sum().reset_index()
+    # Estável: empates ficam em ordem alfabética (a mesma do ORDER BY do backend SQL)
+    df_top_itens = df_top_itens.sort_values(by='receita_produto_rs', ascending=False, kind='stable').head(5)
+    df_top_itens['receita_produto_mil_rs'] = df_top_itens['receita_produto_rs'] / 1000
+    return df_top_itens
+
+
+def figura_top_itens(df_top_itens):
+    return px.bar(
+        df_top_itens,
+        x='item_vendido',
+        y='receita_produto_mil_rs',
+        title='5. Top 5 Itens Vendidos por Receita Total',
+        labels={'item_vendido': 'Item', 'receita_produto_mil_rs': 'Receita Total (Milhares de R$)'},
+        color='item_vendido',
+        color_discrete_sequence=px.colors.qualitative.Dark2
+    )
+
+
+def agregar_vendas_tipo(df_ingressos_canal):
+    return df_ingressos_canal.groupby('tipo_operacao', observed=True)['vendas_canal'].sum().reset_index()
+
+
+def figura_vendas_canal(df_vendas_tipo):
+    return px.bar(
+        df_vendas_tipo,
+        x='tipo_operacao',
+        y='vendas_canal',
+        title='6. Volume Total de Vendas de Ingressos por Tipo de Canal',
+        labels={'tipo_operacao': 'Tipo de Operação', 'vendas_canal': 'Total de Ingressos Vendidos'},
+        color='tipo_operacao',
+        color_discrete_sequence=['#4B0082', '#00BFFF']
+    )
+
+
+# --- PAINEL 3 ---
+def agregar_mobilidade_setor(df_mobilidade_detalhe):
+    df_mobilidade_detalhe = ingestao.decimais(
+        df_mobilidade_detalhe[['nome_setor', 'tempo_entrada_medio_min', 'tempo_saida_medio_min']])
+    return df_mobilidade_detalhe.groupby('nome_setor', observed=True).agg(
+        tempo_entrada_medio=('tempo_entrada_medio_min', 'mean'),
+        tempo_saida_medio=('tempo_saida_medio_min', 'mean'),
+    ).reset_index()
+
+
+def figura_mobilidade(df_mobilidade_agg_setor, filas=None):
+    fig7 = px.bar(
+        df_mobilidade_agg_setor,
+        x='nome_setor',
+        y=['tempo_entrada_medio', 'tempo_saida_medio'],
+        barmode='group',
+        title='7. Tempo Médio de Entrada e Saída por Setor (Minutos)',
+        labels={'value': 'Tempo Médio (Minutos)', 'variable': 'Métrica de Tempo', 'nome_setor': 'Setor'},
+        color_discrete_map={'tempo_entrada_medio': '#3CB371', 'tempo_saida_medio': '#FFA07A'}
+    )
+    if filas is not None:
+        # Simulado (filas_portoes.py): P50 das replicações com barra de erro P10-P90,
+        # sobre as barras observadas de cada métrica
+        filas = df_mobilidade_agg_setor[['nome_setor']].astype(str).merge(filas, on='nome_setor')
+        for medida, nome, cor in (('entrada', 'tempo_entrada_simulado', '#1E6B3C'),
+                                  ('saida', 'tempo_saida_simulado', '#C0502A')):
+            p50 = filas[f'tempo_{medida}_p50']
+            fig7.add_trace(go.Scatter(
+                x=filas['nome_setor'], y=p50, mode='markers', name=nome,
+                marker={'symbol': 'diamond', 'size': 9, 'color': cor},
+                error_y={'type': 'data', 'symmetric': False, 'array': filas[f'tempo_{medida}_p90'] - p50,
+                         'arrayminus': p50 - filas[f'tempo_{medida}_p10']}))
+        fig7.update_layout(title='7. Tempo Médio de Entrada e Saída por Setor: Observado vs. Simulado (Minutos)',
+                           scattermode='group')
+    return fig7
+
+
+def agregar_incidentes_setor(df_mobilidade_detalhe):
+    df_mobilidade_detalhe = ingestao.decimais(df_mobilidade_detalhe[['nome_setor', 'incidente_contagem',
+                                                                     'tempo_resposta_min', 'publico_setor']])
+    return df_mobilidade_detalhe.groupby('nome_setor', observed=True).agg(
+        incidentes_total=('incidente_contagem', 'sum'),
+        tempo_resposta_medio=('tempo_resposta_min', 'mean'),
+        publico_total=('publico_setor', 'sum') 
+    ).reset_index()
+
+
+def figura_incidentes(df_incidentes_agg_setor):
+    return px.scatter(
+        df_incidentes_agg_setor,
+        x='tempo_resposta_medio',
+        y='incidentes_total',
+        size='publico_total', 
+        color='nome_setor',
+        hover_name='nome_setor',
+        title='8. Análise de Incidentes: Total vs. Tempo Médio de Resposta por Setor',
+        labels={'tempo_resposta_medio': 'Tempo Médio de Resposta (Minutos)', 'incidentes_total': 'Total de Incidentes', 'publico_total': 'Público Total Acumulado'},
+        size_max=50
+    )
+
+
+age_order = ['18-24 anos', '25-34 anos', '35-44 anos', '45-59 anos', '60+ anos']
+
+
+def agregar_faixa_etaria(fato_torcedor, df_perfil, **filtros):
+    # Ingressos por faixa etária no fato por ingresso simulado (fato_torcedor.py): popcount
+    # dos bitmaps, com os filtros como atributos indexados (ano, competicao, nome_setor...).
+    # Sem o fato (acima de fato_torcedor.MAXIMO_INGRESSOS), conta os perfis da dimensão.
+    if fato_torcedor is None:
+        return ordenar_faixa_etaria(df_perfil.groupby('faixa_etaria', observed=True).size().reset_index(name='contagem'))
+    return ordenar_faixa_etaria(fato_torcedor.contar_por('faixa_etaria', **filtros))
+
+
+def ordenar_faixa_etaria(df_faixa_etaria):
+    df_faixa_etaria['faixa_etaria'] = pd.Categorical(df_faixa_etaria['faixa_etaria'], categories=age_order, ordered=True)
+    return df_faixa_etaria.sort_values('faixa_etaria')
+
+
+def figura_faixa_etaria(df_faixa_etaria, simulado=True):
+    # simulado: contagem de ingressos sorteados (fato_torcedor.py), não de torcedores reais
+    if simulado:
+        titulo = ('9. Distribuição do Público por Faixa Etária (simulado)<br>'
+                  '<sup>Ingressos sorteados a partir dos fatos por jogo, não dados reais de bilheteria</sup>')
+    else:
+        titulo = ('9. Perfis de Torcedor por Faixa Etária<br>'
+                  '<sup>Contagem de perfis em dim_perfil_torcedor (fato por ingresso acima do teto)</sup>')
+    fig9 = px.pie(
+        df_faixa_etaria,
+        values='contagem',
+        names='faixa_etaria',
+        title=titulo,
+        hole=.4,
+        color_discrete_sequence=px.colors.qualitative.Vivid
+    )
+    fig9.update_traces(textposition='inside', textinfo='percent+label')
+    return fig9
+
+
+# --- PAINEL 4 (SIMULADOR DE CENÁRIOS) ---
+def agregar_cenarios(df_cenarios):
+    # Média sobre dias e feriado de cada adversário x ticket simulado
+    return df_cenarios.groupby(['nome_adversario', 'ticket_medio_ingresso_rs'], as_index=False, observed=True)[
+        ['publico_projetado', 'receita_projetada_mil_rs']].mean()
+
+
+def figura_cenarios_receita(df_cenarios_agg):
+    return px.line(
+        df_cenarios_agg,
+        x='ticket_medio_ingresso_rs',
+        y='receita_projetada_mil_rs',
+        color='nome_adversario',
+        title='10. Receita de Ingressos Projetada por Ticket Médio',
+        labels={'ticket_medio_ingresso_rs': 'Ticket Médio (R$)', 'receita_projetada_mil_rs': 'Receita Projetada (R$ Mil)',
+                'nome_adversario': 'Adversário'},
+        template='plotly'
+    )
+
+
+def figura_cenarios_publico(df_cenarios_agg, capacidade):
+    fig = px.line(
+        df_cenarios_agg,
+        x='ticket_medio_ingresso_rs',
+        y='publico_projetado',
+        color='nome_adversario',
+        title='11. Público Pago Projetado por Ticket Médio',
+        labels={'ticket_medio_ingresso_rs': 'Ticket Médio (R$)', 'publico_projetado': 'Público Projetado (Pessoas)',
+                'nome_adversario': 'Adversário'},
+        template='plotly'
+    )
+    fig.add_hline(y=capacidade, line_dash='dash', line_color='#777', annotation_text='Capacidade')
+    return fig
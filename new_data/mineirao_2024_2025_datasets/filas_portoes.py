@@ -0,0 +1,229 @@
+import os
+import re
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import gerador
+
+# --- 1. CONFIGURAÇÃO ---
+# Simulador de filas nos portões de cada setor. O público de um setor chega por uma curva
+# (minutos antes do início) e passa pelas catracas dos seus portões (dim_setor.tipo_acesso:
+# 'Portão 1-3' = 3 portões). Cada setor é uma fila FIFO com capacidade constante por passo,
+# c = portões x catracas x taxa, e a recursão de Lindley Q[t] = max(0, Q[t-1] + A[t] - c)
+# tem solução fechada como passeio refletido: com X[t] = soma(A[..t]) - c*t,
+# Q[t] = X[t] - min(0, min(X[..t])). Um cumsum e um minimum.accumulate resolvem todos os
+# passos de todos os setores, configurações e replicações de uma vez, sem laço no tempo.
+# O torcedor que chega no passo t espera ~Q[t]/c passos; o tempo de entrada é espera +
+# atendimento na catraca + deslocamento do portão ao assento (na saída, o inverso).
+PASSO_S = 5
+CONFIG_PADRAO = {
+    'catracas_por_portao': 3,
+    'taxa_catraca_min': 8.0,        # torcedores por catraca por minuto na entrada (leitura + revista)
+    'taxa_saida_portao_min': 60.0,  # torcedores por portão por minuto na saída
+    'janela_entrada_min': 120,      # chegadas a partir de 2 h antes do início
+    'pico_entrada_min': 35,         # moda da curva de chegada (minutos antes do início)
+    'media_saida_min': 8,           # média da saída após o apito final (exponencial)
+    'deslocamento_entrada_min': 8,  # do portão ao assento
+    'deslocamento_saida_min': 12,   # do assento ao portão
+    'limite_espera_min': 15,        # nível de serviço: parcela do público esperando mais que isso
+}
+# Minutos simulados depois do início (entrada) ou do apito (saída) para a fila escoar
+ESCOAMENTO_MIN = 90
+REPLICACOES_DASHBOARD = 100
+SEED_PADRAO = 42
+# Elementos (linhas x passos) por bloco processado; limita a memória de cada processo
+ELEMENTOS_POR_BLOCO = 8_000_000
+
+
+def portoes_por_setor(dim_setor):
+    # 'Portão 1-3' -> 3 portões; 'Portão 13' -> 1
+    def contar(tipo_acesso):
+        numeros = [int(n) for n in re.findall(r'\d+', tipo_acesso)]
+        return numeros[-1] - numeros[0] + 1 if numeros else 1
+    return dim_setor['tipo_acesso'].map(contar).to_numpy(np.int64)
+
+
+# --- 2. CURVAS DE CHEGADA ---
+def perfil_entrada(pico_min=CONFIG_PADRAO['pico_entrada_min'], janela_min=CONFIG_PADRAO['janela_entrada_min'],
+                   forma=3.0):
+    # Fração do público chegando em cada passo, do início da janela até o apito inicial e
+    # sem chegadas depois (passos extras para o escoamento). Gama nos minutos antes do
+    # início, com moda em pico_min; pico_min pode ser um array (uma curva por linha).
+    pico = np.asarray(pico_min, dtype=float)[..., None]
+    antes = (janela_min - (np.arange(janela_min * 60 // PASSO_S) + 0.5) * PASSO_S / 60)
+    theta = pico / (forma - 1)
+    densidade = antes ** (forma - 1) * np.exp(-antes / theta)
+    densidade /= densidade.sum(axis=-1, keepdims=True)
+    return np.concatenate([densidade, np.zeros(densidade.shape[:-1] + (ESCOAMENTO_MIN * 60 // PASSO_S,))], axis=-1)
+
+
+def perfil_saida(media_min=CONFIG_PADRAO['media_saida_min']):
+    # Exponencial depois do apito final, truncada no fim da janela de escoamento
+    media = np.asarray(media_min, dtype=float)[..., None]
+    depois = (np.arange(ESCOAMENTO_MIN * 60 // PASSO_S) + 0.5) * PASSO_S / 60
+    densidade = np.exp(-depois / media)
+    return densidade / densidade.sum(axis=-1, keepdims=True)
+
+
+# --- 3. FILA VETORIZADA ---
+def filas(chegadas, capacidade):
+    # chegadas (..., passos), capacidade (...) por passo -> fila ao fim de cada passo
+    passos = np.arange(1, chegadas.shape[-1] + 1)
+    x = np.cumsum(chegadas, axis=-1) - capacidade[..., None] * passos
+    return x - np.minimum(np.minimum.accumulate(x, axis=-1), 0)
+
+
+def medir(chegadas, capacidade, limite_min):
+    # Por linha: espera média e máxima (min), parcela do público acima do limite e quantos
+    # ainda estão na fila no fim do período de chegadas
+    fila = filas(chegadas, capacidade)
+    espera = fila / capacidade[..., None] * PASSO_S / 60
+    total = chegadas.sum(axis=-1)
+    return {
+        'espera_media_min': (chegadas * espera).sum(axis=-1) / total,
+        'espera_max_min': espera.max(axis=-1),
+        'acima_limite': (chegadas * (espera > limite_min)).sum(axis=-1) / total,
+        'fila_final': fila[..., -1],
+    }
+
+
+# --- 4. CENÁRIOS ---
+def simular(publico_setor, portoes, config=None, replicacoes=0, seed=SEED_PADRAO):
+    # publico_setor (..., setores) e parâmetros de config escalares ou arrays que fazem
+    # broadcast com ele. replicacoes=0: curva esperada (fluida); senão chegadas de Poisson
+    # por passo e pico sorteado em ±10 min, um eixo a mais à esquerda por replicação.
+    config = {**CONFIG_PADRAO, **(config or {})}
+    pico = np.asarray(config['pico_entrada_min'], dtype=float)
+    media_saida = np.asarray(config['media_saida_min'], dtype=float)
+    taxa_entrada = portoes * np.asarray(config['catracas_por_portao']) * np.asarray(config['taxa_catraca_min'])
+    taxa_saida = portoes * np.asarray(config['taxa_saida_portao_min'], dtype=float)
+    forma = np.broadcast_shapes(np.shape(publico_setor), pico.shape, media_saida.shape, taxa_entrada.shape,
+                                taxa_saida.shape)
+    if replicacoes:
+        forma = (replicacoes,) + forma
+    publico = np.broadcast_to(np.asarray(publico_setor, dtype=float), forma)
+    rng = np.random.default_rng(seed)
+    if replicacoes:
+        pico = pico + rng.uniform(-10, 10, forma)
+        media_saida = media_saida * rng.uniform(0.8, 1.2, forma)
+
+    chegadas = perfil_entrada(np.broadcast_to(pico, forma), config['janela_entrada_min']) * publico[..., None]
+    saidas = perfil_saida(np.broadcast_to(media_saida, forma)) * publico[..., None]
+    if replicacoes:
+        chegadas, saidas = rng.poisson(chegadas).astype(float), rng.poisson(saidas).astype(float)
+
+    passo_min = PASSO_S / 60
+    capacidade_entrada = np.broadcast_to(taxa_entrada * passo_min, forma)
+    capacidade_saida = np.broadcast_to(taxa_saida * passo_min, forma)
+    entrada = medir(chegadas, capacidade_entrada, config['limite_espera_min'])
+    saida = medir(saidas, capacidade_saida, config['limite_espera_min'])
+    # Tempo total por torcedor: espera + atendimento + deslocamento
+    entrada['tempo_medio_min'] = (entrada['espera_media_min'] + 1 / np.asarray(config['taxa_catraca_min'])
+                                  + config['deslocamento_entrada_min'])
+    saida['tempo_medio_min'] = saida['espera_media_min'] + config['deslocamento_saida_min']
+    return entrada, saida
+
+
+def estadio_cheio(dim_setor, publico_total=gerador.CAPACIDADE_MINEIRAO):
+    # Público por setor proporcional à capacidade, somando publico_total
+    capacidade = dim_setor['capacidade_mil'].to_numpy(float) * 1000
+    return capacidade / capacidade.sum() * publico_total
+
+
+# --- 5. VARREDURA DE CONFIGURAÇÕES DE EQUIPE (EM PARALELO) ---
+def grade_configuracoes(**eixos):
+    # Produto cartesiano dos eixos, ex.: catracas_por_portao=range(2, 16), taxa_catraca_min=[...]
+    return pd.MultiIndex.from_product(list(eixos.values()), names=list(eixos)).to_frame(index=False)
+
+
+def _simular_bloco(publico_setor, portoes, configuracoes):
+    # Um bloco de configurações (DataFrame) x setores, com a curva esperada
+    config = {coluna: configuracoes[coluna].to_numpy()[:, None] for coluna in configuracoes.columns}
+    entrada, saida = simular(publico_setor[None, :], portoes[None, :], config)
+    return {**{f'entrada_{k}': v for k, v in entrada.items()}, **{f'saida_{k}': v for k, v in saida.items()}}
+
+
+def varrer(dim_setor, configuracoes, publico_setor=None, trabalhadores=None):
+    # Uma linha por configuração x setor com as métricas de entrada e saída
+    publico_setor = estadio_cheio(dim_setor) if publico_setor is None else np.asarray(publico_setor, dtype=float)
+    portoes = portoes_por_setor(dim_setor)
+    trabalhadores = trabalhadores or os.cpu_count() or 1
+    passos = (CONFIG_PADRAO['janela_entrada_min'] + ESCOAMENTO_MIN) * 60 // PASSO_S
+    tamanho = max(1, min(-(-len(configuracoes) // (2 * trabalhadores)),
+                         ELEMENTOS_POR_BLOCO // (passos * len(portoes))))
+    blocos = [configuracoes.iloc[i:i + tamanho] for i in range(0, len(configuracoes), tamanho)]
+    if trabalhadores < 2 or len(blocos) < 2:
+        resultados = [_simular_bloco(publico_setor, portoes, b) for b in blocos]
+    else:
+        with ProcessPoolExecutor(min(trabalhadores, len(blocos))) as executor:
+            resultados = list(executor.map(_simular_bloco, [publico_setor] * len(blocos), [portoes] * len(blocos),
+                                           blocos))
+
+    setores = len(portoes)
+    df = configuracoes.loc[configuracoes.index.repeat(setores)].reset_index(drop=True)
+    df.insert(0, 'nome_setor', np.tile(dim_setor['nome_setor'].to_numpy(), len(configuracoes)))
+    df['publico_setor'] = np.tile(publico_setor, len(configuracoes)).round().astype(np.int64)
+    df['portoes'] = np.tile(portoes, len(configuracoes))
+    for nome in resultados[0] if resultados else []:
+        df[nome] = np.concatenate([r[nome].ravel() for r in resultados])
+    return df
+
+
+# --- 6. SIMULADO vs. OBSERVADO (FIGURA 7) ---
+def simular_setores_dashboard(dim_setor, df_dashboard):
+    # Distribuição (P10/P50/P90 das replicações) do tempo médio de entrada e saída por
+    # setor, com o público do setor na ocupação média dos jogos, como no gerador
+    ocupacao = df_dashboard['publico_pago_real'].mean() / gerador.CAPACIDADE_MINEIRAO if len(df_dashboard) else 1.0
+    publico = dim_setor['capacidade_mil'].to_numpy(float) * 1000 * ocupacao
+    entrada, saida = simular(publico, portoes_por_setor(dim_setor), replicacoes=REPLICACOES_DASHBOARD)
+    df = pd.DataFrame({'nome_setor': dim_setor['nome_setor'].to_numpy()})
+    for prefixo, resultado in (('entrada', entrada), ('saida', saida)):
+        p10, p50, p90 = np.percentile(resultado['tempo_medio_min'], [10, 50, 90], axis=0)
+        df[f'tempo_{prefixo}_p10'], df[f'tempo_{prefixo}_p50'], df[f'tempo_{prefixo}_p90'] = p10, p50, p90
+    return df
+
+
+# --- 7. RELATÓRIO E TEMPOS ---
+def relatorio(diretorio=None, trabalhadores=None):
+    import ingestao
+    dim_setor = ingestao.carregar_tabelas(diretorio, tabelas=['dim_setor'])['dim_setor']
+    portoes = portoes_por_setor(dim_setor)
+    publico = estadio_cheio(dim_setor)
+
+    inicio = time.perf_counter()
+    entrada, saida = simular(publico, portoes, replicacoes=100)
+    t_cenario = (time.perf_counter() - inicio) / 100
+    print(f"✅ Estádio cheio ({gerador.CAPACIDADE_MINEIRAO:,} torcedores, {portoes.sum()} portões): ".replace(',', '.')
+          + f"{t_cenario * 1000:.1f} ms por cenário estocástico")
+    print(f"{'Setor':<20}{'Público':>9}{'Portões':>9}{'Entrada P50 (min)':>19}{'Acima do limite':>17}"
+          f"{'Saída P50 (min)':>17}")
+    for i, setor in enumerate(dim_setor['nome_setor']):
+        print(f"{setor:<20}{publico[i]:>9,.0f}{portoes[i]:>9}{np.median(entrada['tempo_medio_min'][:, i]):>19.1f}"
+              f"{np.median(entrada['acima_limite'][:, i]) * 100:>16.1f}%{np.median(saida['tempo_medio_min'][:, i]):>17.1f}")
+
+    configuracoes = grade_configuracoes(catracas_por_portao=range(2, 16), taxa_catraca_min=[8, 10, 12, 14, 16],
+                                        pico_entrada_min=[20, 35, 50])
+    inicio = time.perf_counter()
+    varredura = varrer(dim_setor, configuracoes, publico, trabalhadores)
+    duracao = time.perf_counter() - inicio
+    print(f"⏱️ {len(configuracoes)} configurações x {len(portoes)} setores em {duracao:.2f} s "
+          f"com {trabalhadores or os.cpu_count()} processo(s)")
+
+    # Menor número de catracas por portão que deixa no máximo 5% do público acima do limite
+    atende = varredura[varredura['entrada_acima_limite'] <= 0.05]
+    minimo = atende.groupby(['taxa_catraca_min', 'pico_entrada_min', 'nome_setor'])['catracas_por_portao'].min()
+    print("Catracas por portão necessárias (≤ 5% do público esperando mais que "
+          f"{CONFIG_PADRAO['limite_espera_min']} min), pico de chegada de 35 min antes do início:")
+    print(minimo.xs(35, level='pico_entrada_min').unstack('nome_setor').to_string())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Simulação das filas nos portões por setor.')
+    parser.add_argument('diretorio', nargs='?', default=None, help='pasta dos CSVs (padrão: MINEIRAO_DADOS)')
+    parser.add_argument('--processos', type=int, default=None, help='processos (padrão: núcleos disponíveis)')
+    args = parser.parse_args()
+    relatorio(args.diretorio, args.processos)
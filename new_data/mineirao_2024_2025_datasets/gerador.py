@@ -0,0 +1,440 @@
+import os
+import time
+import argparse
+import resource
+
+import numpy as np
+import pandas as pd
+
+# Versão vetorizada do gerador de create_data-not.ipynb.
+# Cada tabela fato é produzida por operações NumPy em lote a partir de um
+# np.random.Generator com seed, sem apply/iterrows nem buscas .iloc[0] por linha:
+# as dimensões têm chaves substitutas densas (1..N), então os atributos são
+# obtidos com indexação direta em arrays.
+#
+# Os sorteios são feitos em blocos fixos de BLOCO_RNG jogos, cada um com seu
+# próprio fluxo aleatório (SeedSequence(seed, spawn_key=(bloco,))). Assim um lote
+# de jogos gera exatamente as mesmas linhas que uma execução completa geraria
+# para esses jogos, e tabelas de vários GB podem ser gravadas em lotes
+# (gerar_lotes / exportar_em_lotes) com pico de memória limitado.
+
+# --- 1. DIMENSÕES (CONTEXTO ESTÁTICO) ---
+DIM_ADVERSARIO = pd.DataFrame({
+    'adversario_id': range(1, 10),
+    'nome_adversario': ['Atlético-MG', 'Palmeiras', 'Flamengo', 'São Paulo', 'Athletico-PR', 'Grêmio', 'Ceará', 'Tombense', 'CRB'],
+    'competicao': ['Brasileiro', 'Brasileiro', 'Copa do Brasil', 'Libertadores', 'Brasileiro', 'Brasileiro', 'Copa do Brasil', 'Mineiro', 'Copa do Brasil'],
+    'nivel_confronto': ['Classico', 'Grande', 'Grande', 'Grande', 'Medio', 'Medio', 'Medio', 'Pequeno', 'Pequeno'],
+    'classico_local': [True, False, False, False, False, False, False, False, False]
+})
+
+DIM_SETOR = pd.DataFrame({
+    'setor_id': [1, 2, 3, 4, 5, 6, 7],
+    'nome_setor': ['Amarelo Inferior', 'Vermelho Inferior', 'Roxo Superior', 'Laranja Superior', 'Roxo Inferior', 'Camarotes', 'Visitante'],
+    'capacidade_mil': [12, 18, 15, 10, 5, 1.5, 2.5],
+    'tipo_acesso': ['Portão 1-3', 'Portão 4-6', 'Portão 7-9', 'Portão 10-12', 'Portão 13', 'Portão 14', 'Portão 15']
+})
+
+DIM_PRODUTO = pd.DataFrame({
+    'produto_id': [1, 2, 3, 4, 5, 6],
+    'item_vendido': ['Cerveja (350ml)', 'Refrigerante', 'Pipoca/Salgado', 'Hot Dog', 'Água Mineral', 'Camisa Oficial (Loja)'],
+    'categoria': ['Bebida Alcoolica', 'Bebida Nao-Alcoolica', 'Comida', 'Comida', 'Bebida Nao-Alcoolica', 'Merchandising'],
+    'preco_medio_rs': [15.00, 10.00, 25.00, 30.00, 8.00, 350.00]
+})
+
+DIM_PERFIL_TORCEDOR = pd.DataFrame({
+    'perfil_id': [1, 2, 3, 4, 5],
+    'faixa_etaria': ['18-24 anos', '25-34 anos', '35-44 anos', '45-59 anos', '60+ anos'],
+    'genero': ['Masculino', 'Feminino', 'Masculino', 'Feminino', 'Masculino'],
+    'regiao_origem': ['Capital - BH', 'Interior - MG', 'Outros Estados', 'Capital - BH', 'Interior - MG']
+})
+
+DIM_CANAL = pd.DataFrame({
+    'canal_id': [1, 2, 3],
+    'nome_canal': ['Site Oficial', 'Bilheteria Física', 'Aplicativo Móvel'],
+    'tipo_operacao': ['Digital', 'Físico', 'Digital']
+})
+
+# --- 2. PARÂMETROS DO MODELO (os mesmos do notebook) ---
+CAPACIDADE_MINEIRAO = 61846
+NIVEIS = np.array(['Classico', 'Grande', 'Medio', 'Pequeno'])
+FATOR_NIVEL_PROJECAO = np.array([1.0, 0.8, 0.6, 0.4])  # na ordem de NIVEIS
+DIAS_SEMANA = np.array(['Segunda-feira', 'Terça-feira', 'Quarta-feira', 'Quinta-feira', 'Sexta-feira', 'Sábado', 'Domingo'])
+PESO_VENDA_PRODUTO = np.array([0.4, 0.15, 0.15, 0.05, 0.2, 0.05])
+FATOR_PUBLICO_CONSUMIDOR = 0.6
+PROPORCAO_CANAL_CLASSICO = np.array([0.55, 0.10, 0.35])  # Site, Bilheteria, App
+PROPORCAO_CANAL_NORMAL = np.array([0.40, 0.25, 0.35])
+SOCIO_BASE = 45000
+
+# Jogos por fluxo aleatório independente. Mudar este valor muda os dados gerados.
+BLOCO_RNG = 8192
+
+# Atributos das dimensões em arrays indexados pela chave (posição 0 sem uso)
+_ADV_IDS = DIM_ADVERSARIO['adversario_id'].to_numpy()
+_ADV_CLASSICO = np.concatenate([[False], DIM_ADVERSARIO['classico_local'].to_numpy(bool)])
+_ADV_GRANDE = np.concatenate([[False], DIM_ADVERSARIO['nivel_confronto'].isin(['Classico', 'Grande']).to_numpy()])
+_ADV_LIBERTADORES = np.concatenate([[False], (DIM_ADVERSARIO['competicao'] == 'Libertadores').to_numpy()])
+_ADV_NIVEL = np.concatenate([[0], pd.Categorical(DIM_ADVERSARIO['nivel_confronto'], categories=NIVEIS).codes])
+_ADV_NOME = np.concatenate([[''], DIM_ADVERSARIO['nome_adversario'].to_numpy(object)])
+
+_SETOR_IDS = DIM_SETOR['setor_id'].to_numpy()
+_SETOR_CAPACIDADE = DIM_SETOR['capacidade_mil'].to_numpy(float) * 1000
+_SETOR_MOVIMENTADO = DIM_SETOR['nome_setor'].isin(['Amarelo Inferior', 'Laranja Superior']).to_numpy()
+_SETOR_DENSO = DIM_SETOR['nome_setor'].isin(['Amarelo Inferior', 'Vermelho Inferior']).to_numpy()
+
+_PRODUTO_IDS = DIM_PRODUTO['produto_id'].to_numpy()
+_PRODUTO_PRECO = DIM_PRODUTO['preco_medio_rs'].to_numpy(float)
+_PRODUTO_INTERNO = (DIM_PRODUTO['categoria'] != 'Merchandising').to_numpy()
+
+# As 28 combinações possíveis de base_analise, indexadas por dia_semana * 4 + nivel
+_BASE_ANALISE = np.array([f"Dia: {dia}, Adversário: {nivel}" for dia in DIAS_SEMANA for nivel in NIVEIS], dtype=object)
+
+
+# --- 3. MODELO DO JOGO ---
+# Partes determinísticas do sorteio de cada jogo, compartilhadas com o simulador de
+# temporadas (simulacao.py); aceitam arrays de qualquer forma terminando nos jogos.
+def media_publico(adversario_id, fim_de_semana):
+    publico_medio = np.where(_ADV_CLASSICO[adversario_id], 45000.0, np.where(_ADV_GRANDE[adversario_id], 35000.0, 20000.0))
+    return np.where(fim_de_semana, publico_medio * 1.1, publico_medio)
+
+
+def limitar_publico(publico_sorteado):
+    return np.clip(publico_sorteado.astype(np.int64), 10000, CAPACIDADE_MINEIRAO)
+
+
+def multiplicar_ticket(ticket_medio_base, adversario_id):
+    # Clássicos pagam 50% a mais e jogos de Libertadores 20% a mais
+    ticket_medio_base = np.where(_ADV_CLASSICO[adversario_id], ticket_medio_base * 1.5, ticket_medio_base)
+    return np.where(_ADV_LIBERTADORES[adversario_id], ticket_medio_base * 1.2, ticket_medio_base)
+
+
+def quantidades_consumo(publico):
+    # Quantidade vendida de cada produto (último eixo): 60% do público consome, no mix de PESO_VENDA_PRODUTO
+    volume = PESO_VENDA_PRODUTO / PESO_VENDA_PRODUTO.sum()
+    return (np.asarray(publico)[..., None] * FATOR_PUBLICO_CONSUMIDOR * volume).astype(np.int64)
+
+
+# --- 4. FATO_JOGOS E DIM_DATA ---
+def gerar_jogos(rng, jogo_id, num_jogos, inicio, fim):
+    # Gera os jogos jogo_id (subconjunto de 1..num_jogos) de um bloco
+    inicio, fim = pd.Timestamp(inicio), pd.Timestamp(fim)
+    tamanho = len(jogo_id)
+
+    # Datas estratificadas: o jogo i cai em [i, i+1) * passo a partir do início.
+    # Ficam ordenadas por construção (sem ordenar o conjunto inteiro) e uma por jogo,
+    # de modo que data_id == jogo_id.
+    passo = (fim.value - inicio.value) / num_jogos
+    deslocamento = ((jogo_id - 1 + rng.uniform(0, 1, tamanho)) * passo).astype(np.int64)
+    datas = (inicio.value + deslocamento).astype('datetime64[ns]')
+    adversario_id = rng.choice(_ADV_IDS, tamanho)
+
+    indice_datas = pd.DatetimeIndex(datas)
+    dia_semana = indice_datas.dayofweek.to_numpy()
+    fim_de_semana = dia_semana >= 5
+
+    # Público: clássicos/grandes e fins de semana têm público maior
+    publico_medio = media_publico(adversario_id, fim_de_semana)
+    publico_pago = limitar_publico(rng.normal(publico_medio, publico_medio * 0.1))
+
+    ticket_medio_base = multiplicar_ticket(rng.uniform(70, 150, tamanho), adversario_id)
+    receita_ingresso = publico_pago * ticket_medio_base / 1000.0
+
+    ticket_medio_consumo = rng.normal(55, 10, tamanho)
+
+    dim_data = pd.DataFrame({
+        'data_id': jogo_id,
+        'data': datas,
+        'ano': indice_datas.year,
+        'mes': indice_datas.month,
+        'dia_semana': DIAS_SEMANA[dia_semana],
+        'feriado': fim_de_semana,  # Sábado/Domingo como "dias especiais"
+    })
+
+    fato_jogos = pd.DataFrame({
+        'jogo_id': jogo_id,
+        'data_id': jogo_id,
+        'adversario_id': adversario_id,
+        'publico_pago': publico_pago,
+        'receita_ingresso_mil_rs': np.round(receita_ingresso, 3),
+        'ticket_medio_ingresso_rs': np.round(receita_ingresso * 1000 / publico_pago, 2),
+        'ticket_medio_consumo_base_rs': np.round(ticket_medio_consumo, 2),
+        'taxa_ocupacao': np.round(publico_pago / CAPACIDADE_MINEIRAO * 100, 2),
+    })
+    return fato_jogos, dim_data, dia_semana
+
+
+# --- 5. FATOS FILHOS ---
+def gerar_consumo(fato_jogos):
+    # jogos x produtos; determinístico a partir do público
+    num_jogos, num_produtos = len(fato_jogos), len(_PRODUTO_IDS)
+    publico = fato_jogos['publico_pago'].to_numpy()
+    qtd_vendida = quantidades_consumo(publico)
+    receita = qtd_vendida * _PRODUTO_PRECO[None, :]
+    consumo_por_pessoa = np.where(_PRODUTO_INTERNO[None, :], receita / publico[:, None], 0.0)
+
+    return pd.DataFrame({
+        'jogo_id': np.repeat(fato_jogos['jogo_id'].to_numpy(), num_produtos),
+        'produto_id': np.tile(_PRODUTO_IDS, num_jogos),
+        'qtd_vendida': qtd_vendida.ravel(),
+        'receita_produto_rs': np.round(receita, 2).ravel(),
+        'consumo_por_pessoa_rs': np.round(consumo_por_pessoa, 2).ravel(),
+    })
+
+
+def gerar_mobilidade(rng, fato_jogos):
+    # jogos x setores; setores com até 1000 pessoas são descartados
+    num_jogos, num_setores = len(fato_jogos), len(_SETOR_IDS)
+    forma = (num_jogos, num_setores)
+
+    fator_ocupacao = fato_jogos['taxa_ocupacao'].to_numpy()[:, None] / 100 * rng.uniform(0.9, 1.1, forma)
+    publico_setor = (_SETOR_CAPACIDADE[None, :] * fator_ocupacao).astype(np.int64)
+
+    tempo_entrada = rng.normal(np.where(_SETOR_MOVIMENTADO, 15.0, 10.0), 3, forma)
+    tempo_saida = rng.normal(np.where(_SETOR_MOVIMENTADO, 25.0, 20.0), 5, forma)
+    fator_incidente = np.where(_SETOR_DENSO, 0.00015, 0.00005)
+    incidente_contagem = (publico_setor * fator_incidente * rng.uniform(0.8, 1.5, forma)).astype(np.int64)
+    tempo_resposta = rng.normal(7, 2, forma)
+
+    mantidos = (publico_setor > 1000).ravel()
+    return pd.DataFrame({
+        'jogo_id': np.repeat(fato_jogos['jogo_id'].to_numpy(), num_setores)[mantidos],
+        'setor_id': np.tile(_SETOR_IDS, num_jogos)[mantidos],
+        'publico_setor': publico_setor.ravel()[mantidos],
+        'tempo_entrada_medio_min': np.round(np.maximum(5, tempo_entrada), 1).ravel()[mantidos],
+        'tempo_saida_medio_min': np.round(np.maximum(10, tempo_saida), 1).ravel()[mantidos],
+        'incidente_contagem': np.maximum(0, incidente_contagem).ravel()[mantidos],
+        'tempo_resposta_min': np.round(np.maximum(3, tempo_resposta), 1).ravel()[mantidos],
+    }).reset_index(drop=True)
+
+
+def gerar_mercado_ingressos(rng, fato_jogos):
+    # Uma linha por data x canal (há um jogo por data). socios_ativos depende do
+    # acumulado de adesões das datas anteriores e é preenchido por gerar_lotes.
+    num_datas, num_canais = len(fato_jogos), len(PROPORCAO_CANAL_CLASSICO)
+    novas_adesoes = rng.integers(50, 300, num_datas)
+
+    classico = _ADV_CLASSICO[fato_jogos['adversario_id'].to_numpy()]
+    proporcoes = np.where(classico[:, None], PROPORCAO_CANAL_CLASSICO[None, :], PROPORCAO_CANAL_NORMAL[None, :])
+    publico = fato_jogos['publico_pago'].to_numpy()
+    vendas = (publico[:, None] * proporcoes * rng.uniform(0.9, 1.1, (num_datas, num_canais))).astype(np.int64)
+
+    return pd.DataFrame({
+        'data_id': np.repeat(fato_jogos['data_id'].to_numpy(), num_canais),
+        'novas_adesoes': np.repeat(novas_adesoes, num_canais),
+        'vendas_canal': vendas.ravel(),
+        'canal_id': np.tile(DIM_CANAL['canal_id'].to_numpy(), num_datas),
+    })
+
+
+def gerar_projecao(rng, fato_jogos, dia_semana):
+    num_jogos = len(fato_jogos)
+    adversario_id = fato_jogos['adversario_id'].to_numpy()
+    nivel = _ADV_NIVEL[adversario_id]
+
+    fator_dia = np.where(dia_semana >= 5, 1.1, 0.9)
+    publico_projetado = (40000 * FATOR_NIVEL_PROJECAO[nivel] * fator_dia * rng.uniform(0.95, 1.05, num_jogos)).astype(np.int64)
+    publico_projetado = np.clip(publico_projetado, 15000, CAPACIDADE_MINEIRAO)
+    receita_projetada = fato_jogos['receita_ingresso_mil_rs'].to_numpy() * rng.uniform(0.95, 1.05, num_jogos)
+
+    return pd.DataFrame({
+        'jogo_id': fato_jogos['jogo_id'].to_numpy(),
+        'adversario': _ADV_NOME[adversario_id],
+        'publico_projetado': publico_projetado,
+        'receita_projetada_mil_rs': np.round(receita_projetada, 3),
+        'base_analise': _BASE_ANALISE[dia_semana * len(NIVEIS) + nivel],
+    })
+
+
+def gerar_receita_agregada(receita_ingresso, receita_produto):
+    # Recebe os totais em mil R$, acumulados na execução completa ou lote a lote
+    total = receita_ingresso + receita_produto
+    return pd.DataFrame({
+        'categoria_receita': ['Ingressos', 'Produtos Internos'],
+        'receita_total_mil_rs': [round(receita_ingresso, 3), round(receita_produto, 3)],
+        'percentual_total': [round(receita_ingresso / total * 100, 2), round(receita_produto / total * 100, 2)],
+    })
+
+
+# --- 6. GERAÇÃO EM BLOCOS E LOTES ---
+DIMENSOES_ESTATICAS = {
+    'dim_canal': DIM_CANAL,
+    'dim_perfil_torcedor': DIM_PERFIL_TORCEDOR,
+    'dim_produto': DIM_PRODUTO,
+    'dim_setor': DIM_SETOR,
+    'dim_adversario': DIM_ADVERSARIO,
+}
+# Tabelas geradas jogo a jogo e a coluna que identifica o jogo (data_id == jogo_id)
+TABELAS_POR_JOGO = {
+    'dim_data': 'data_id',
+    'fato_jogos': 'jogo_id',
+    'fato_consumo': 'jogo_id',
+    'fato_mobilidade_incidentes': 'jogo_id',
+    'fato_mercado_ingressos': 'data_id',
+    'fato_projecao': 'jogo_id',
+}
+
+
+def _validar_periodo(num_jogos, inicio, fim):
+    if (pd.Timestamp(fim) - pd.Timestamp(inicio)).value < num_jogos:
+        raise ValueError("Período curto demais para uma data distinta por jogo")
+
+
+def _gerar_bloco(seed, bloco, num_jogos, inicio, fim):
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(bloco,)))
+    primeiro = bloco * BLOCO_RNG + 1
+    jogo_id = np.arange(primeiro, min(primeiro + BLOCO_RNG, num_jogos + 1))
+    fato_jogos, dim_data, dia_semana = gerar_jogos(rng, jogo_id, num_jogos, inicio, fim)
+    return {
+        'dim_data': dim_data,
+        'fato_jogos': fato_jogos,
+        'fato_consumo': gerar_consumo(fato_jogos),
+        'fato_mobilidade_incidentes': gerar_mobilidade(rng, fato_jogos),
+        'fato_mercado_ingressos': gerar_mercado_ingressos(rng, fato_jogos),
+        'fato_projecao': gerar_projecao(rng, fato_jogos, dia_semana),
+    }
+
+
+def gerar_lotes(num_jogos, jogos_por_lote, seed=42, inicio='2024-03-01', fim='2025-11-30'):
+    # Gera as tabelas por jogo em lotes de jogos_por_lote jogos, em ordem.
+    # Cada lote traz exatamente as linhas da execução completa para os seus jogos.
+    _validar_periodo(num_jogos, inicio, fim)
+    num_canais = len(DIM_CANAL)
+    socios = SOCIO_BASE
+    ultimo_bloco = (None, None)  # reaproveita o bloco dividido entre dois lotes
+
+    for primeiro in range(1, num_jogos + 1, jogos_por_lote):
+        fim_lote = min(primeiro + jogos_por_lote, num_jogos + 1)  # exclusivo
+        partes = []
+        for bloco in range((primeiro - 1) // BLOCO_RNG, (fim_lote - 2) // BLOCO_RNG + 1):
+            if ultimo_bloco[0] != bloco:
+                ultimo_bloco = (bloco, _gerar_bloco(seed, bloco, num_jogos, inicio, fim))
+            partes.append(ultimo_bloco[1])
+
+        lote = {}
+        for nome, chave in TABELAS_POR_JOGO.items():
+            df = pd.concat([p[nome] for p in partes], ignore_index=True) if len(partes) > 1 else partes[0][nome]
+            ids = df[chave].to_numpy()
+            manter = (ids >= primeiro) & (ids < fim_lote)
+            lote[nome] = df if manter.all() else df[manter].reset_index(drop=True)
+
+        # Base de sócios cresce com as adesões de cada data, carregada entre lotes
+        mercado = lote['fato_mercado_ingressos']
+        socios_ativos = socios + np.cumsum(mercado['novas_adesoes'].to_numpy()[::num_canais])
+        mercado = mercado.copy()
+        mercado.insert(1, 'socios_ativos', np.repeat(socios_ativos, num_canais))
+        lote['fato_mercado_ingressos'] = mercado
+        if len(socios_ativos):
+            socios = socios_ativos[-1]
+        yield lote
+
+
+# --- 7. STAR SCHEMA COMPLETO ---
+def gerar_star_schema(num_jogos=25, seed=42, inicio='2024-03-01', fim='2025-11-30'):
+    # Retorna {nome_da_tabela: DataFrame}, com os mesmos nomes dos CSVs
+    tabelas = dict(DIMENSOES_ESTATICAS)
+    tabelas.update(next(gerar_lotes(num_jogos, num_jogos, seed, inicio, fim)))
+    tabelas['fato_receita_agregada'] = gerar_receita_agregada(
+        tabelas['fato_jogos']['receita_ingresso_mil_rs'].sum(),
+        tabelas['fato_consumo']['receita_produto_rs'].sum() / 1000,
+    )
+    return tabelas
+
+
+def verificar_lotes(num_jogos=5000, jogos_por_lote=1234, seed=42):
+    # Confere que a concatenação dos lotes é idêntica à execução completa
+    completo = gerar_star_schema(num_jogos, seed)
+    lotes = list(gerar_lotes(num_jogos, jogos_por_lote, seed))
+    for nome in TABELAS_POR_JOGO:
+        pd.testing.assert_frame_equal(completo[nome], pd.concat([l[nome] for l in lotes], ignore_index=True))
+    print(f"✅ {len(lotes)} lotes de {jogos_por_lote} jogos idênticos à execução completa ({num_jogos} jogos)")
+
+
+# --- 8. EXPORTAÇÃO ---
+def _gravar_csv(df, caminho, anexar=False):
+    # Mesmo formato do notebook: separador ';' e decimal ','
+    df.to_csv(caminho, sep=';', decimal=',', index=False, encoding='utf-8',
+              mode='a' if anexar else 'w', header=not anexar)
+
+
+def _gravar_parquet_particionado(df, dim_data, diretorio, nome, lote):
+    # Partições ano=/mes= no estilo Hive; um arquivo por lote em cada partição
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    chave = TABELAS_POR_JOGO[nome]
+    posicao = df[chave].to_numpy() - dim_data['data_id'].to_numpy()[0]
+    df = df.assign(ano=dim_data['ano'].to_numpy()[posicao], mes=dim_data['mes'].to_numpy()[posicao])
+    pq.write_to_dataset(
+        pa.Table.from_pandas(df, preserve_index=False),
+        root_path=os.path.join(diretorio, 'parquet', nome),
+        partition_cols=['ano', 'mes'],
+        basename_template=f'lote-{lote:05d}-{{i}}.parquet',
+    )
+
+
+def exportar_csv(tabelas, diretorio):
+    os.makedirs(diretorio, exist_ok=True)
+    for nome, df in tabelas.items():
+        _gravar_csv(df, os.path.join(diretorio, f'{nome}.csv'))
+        print(f"✅ Gerado: {nome}.csv (Tamanho: {df.shape[0]} linhas)")
+
+
+def exportar_em_lotes(diretorio, num_jogos, jogos_por_lote=100_000, seed=42,
+                      inicio='2024-03-01', fim='2025-11-30', parquet=False):
+    # Modo streaming: cada lote é anexado aos CSVs (e opcionalmente ao Parquet
+    # particionado) e descartado, então o pico de memória depende só do lote.
+    os.makedirs(diretorio, exist_ok=True)
+    for nome, df in DIMENSOES_ESTATICAS.items():
+        _gravar_csv(df, os.path.join(diretorio, f'{nome}.csv'))
+        if parquet:
+            os.makedirs(os.path.join(diretorio, 'parquet'), exist_ok=True)
+            df.to_parquet(os.path.join(diretorio, 'parquet', f'{nome}.parquet'), index=False)
+
+    linhas = dict.fromkeys(TABELAS_POR_JOGO, 0)
+    receita_ingresso = receita_produto = 0.0
+    for i, lote in enumerate(gerar_lotes(num_jogos, jogos_por_lote, seed, inicio, fim)):
+        for nome, df in lote.items():
+            _gravar_csv(df, os.path.join(diretorio, f'{nome}.csv'), anexar=i > 0)
+            if parquet:
+                _gravar_parquet_particionado(df, lote['dim_data'], diretorio, nome, i)
+            linhas[nome] += len(df)
+        receita_ingresso += lote['fato_jogos']['receita_ingresso_mil_rs'].sum()
+        receita_produto += lote['fato_consumo']['receita_produto_rs'].sum() / 1000
+        print(f"  lote {i + 1}: jogos {lote['fato_jogos']['jogo_id'].iloc[0]}-{lote['fato_jogos']['jogo_id'].iloc[-1]}")
+
+    agregada = gerar_receita_agregada(receita_ingresso, receita_produto)
+    _gravar_csv(agregada, os.path.join(diretorio, 'fato_receita_agregada.csv'))
+    for nome, total in linhas.items():
+        print(f"✅ Gerado: {nome}.csv (Tamanho: {total} linhas)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Gera o star schema sintético do Mineirão.')
+    parser.add_argument('--jogos', type=int, default=25, help='número de jogos (padrão: 25)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--inicio', default='2024-03-01')
+    parser.add_argument('--fim', default='2025-11-30')
+    parser.add_argument('--saida', default='mineirao_2024_2025_star_schema', help='diretório dos CSVs')
+    parser.add_argument('--lote', type=int, default=None,
+                        help='modo streaming: grava em lotes deste número de jogos')
+    parser.add_argument('--parquet', action='store_true',
+                        help='no modo streaming, grava também Parquet particionado por ano/mes')
+    parser.add_argument('--verificar', action='store_true',
+                        help='confere que lotes e execução completa geram as mesmas linhas')
+    args = parser.parse_args()
+
+    if args.verificar:
+        verificar_lotes(seed=args.seed)
+    elif args.lote:
+        inicio = time.perf_counter()
+        exportar_em_lotes(args.saida, args.jogos, args.lote, args.seed, args.inicio, args.fim, args.parquet)
+        pico_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(f"Star schema com {args.jogos} jogos gravado em lotes de {args.lote} em "
+              f"{time.perf_counter() - inicio:.2f} s (pico de memória: {pico_mb:.0f} MB)")
+    else:
+        inicio = time.perf_counter()
+        tabelas = gerar_star_schema(args.jogos, args.seed, args.inicio, args.fim)
+        print(f"Star schema com {args.jogos} jogos gerado em {time.perf_counter() - inicio:.2f} s")
+
+        inicio = time.perf_counter()
+        exportar_csv(tabelas, args.saida)
+        print(f"CSVs gravados em '{args.saida}' em {time.perf_counter() - inicio:.2f} s")
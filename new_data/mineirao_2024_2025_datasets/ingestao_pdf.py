@@ -0,0 +1,421 @@
+import os
+import re
+import glob
+import json
+import time
+import hashlib
+import argparse
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import ingestao
+import gerador
+
+try:
+    import pdfplumber
+    PDF_DISPONIVEL = True
+except ImportError:
+    PDF_DISPONIVEL = False
+
+# --- 1. CONFIGURAÇÃO ---
+# Ingestão offline dos PDFs de análise (pasta data/ do repositório). Cada página é lida
+# (texto e tabelas) num processo do pool; os extratores por documento mapeiam o resultado
+# para as colunas do star schema e gravam CSVs (sep=';', decimal=',') em <dados>/extraido_pdf.
+# O resultado de cada PDF fica em cache (JSON) pelo sha256 do conteúdo, então uma nova execução
+# só lê as páginas dos PDFs que mudaram.
+DIRETORIO_PDFS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data')
+NOME_SAIDA = 'extraido_pdf'
+NOME_CACHE = '.cache'
+
+# Incrementar quando o formato do cache mudar (o hash deste arquivo já cobre os extratores)
+VERSAO_EXTRACAO = 2
+
+# Tabelas geradas: nome do CSV -> tipo de cada coluna (na ordem de gravação), com os
+# mesmos nomes e tipos lógicos do ingestao.ESQUEMA quando a coluna existe no star schema
+TABELAS = {
+    'fato_jogos': {'documento': 'str', 'pagina': 'int', 'data': 'datetime', 'adversario_id': 'int',
+                   'nome_adversario': 'str', 'competicao': 'str', 'publico_pago': 'int', 'taxa_ocupacao': 'float',
+                   'capacidade': 'int', 'publico_mandante': 'int', 'publico_visitante': 'int',
+                   'gols_cruzeiro': 'int', 'gols_adversario': 'int'},
+    'dim_data': {'documento': 'str', 'data': 'datetime', 'ano': 'int', 'mes': 'int', 'dia_semana': 'str',
+                 'feriado': 'bool'},
+    'dim_setor': {'documento': 'str', 'pagina': 'int', 'setor_id': 'int', 'nome_setor': 'str',
+                  'preco_inteira_rs': 'float', 'preco_meia_rs': 'float', 'vendas_inteira': 'int',
+                  'vendas_meia': 'int', 'renda_setor_rs': 'float'},
+    'vendas_canal_ano': {'documento': 'str', 'ano': 'int', 'estimativa_parcial': 'bool', 'canal_id': 'int',
+                         'nome_canal': 'str', 'vendas_min': 'int', 'vendas_max': 'int', 'percentual': 'float'},
+    'vendas_competicao': {'documento': 'str', 'competicao': 'str', 'jogos_ano_min': 'int', 'jogos_ano_max': 'int',
+                          'publico_medio_min': 'int', 'publico_medio_max': 'int', 'vendas_min': 'int',
+                          'vendas_max': 'int', 'participacao_min': 'float', 'participacao_max': 'float'},
+    'tabelas_brutas': {'documento': 'str', 'pagina': 'int', 'tabela': 'int', 'linha': 'int', 'coluna': 'int',
+                       'valor': 'str'},
+}
+# Tipos nulos do pandas: campos ausentes no PDF ficam vazios no CSV
+_TIPOS = {'int': 'Int64', 'float': 'float64', 'bool': 'boolean', 'str': 'string', 'datetime': 'datetime64[ns]'}
+
+# Nomes dos PDFs que não batem com dim_adversario / dim_canal por substring
+APELIDOS_ADVERSARIO = {'clube de regatas brasil': 'CRB'}
+CANAIS = {'site': 1, 'bilheteria': 2, 'aplicativo': 3}
+
+_NUMERO = re.compile(r'\d{1,3}(?:\.\d{3})+(?:,\d+)?|\d+(?:,\d+)?')
+_FAIXA = re.compile(r'\s*[–-]\s*')
+_SETOR = re.compile(r'^(Amarelo|Laranja|Vermelho|Roxo|Camarotes?|Visitante)\b')
+
+
+# --- 2. NORMALIZAÇÃO ---
+def sem_acento(texto):
+    # Minúsculas sem acentos (nomes de arquivo dos PDFs podem vir em NFD)
+    return ''.join(c for c in unicodedata.normalize('NFD', str(texto)) if not unicodedata.combining(c)).lower()
+
+
+def numero(texto):
+    # '4.125.000,00' -> 4125000.0; '61.927 pessoas' -> 61927.0; NaN se não houver número
+    achado = _NUMERO.search(str(texto or ''))
+    return float(achado.group().replace('.', '').replace(',', '.')) if achado else np.nan
+
+
+def faixa(texto):
+    # '630.000 – 770.000' -> (630000, 770000); '19' -> (19, 19); '70% – 75%' -> (70, 75)
+    partes = [numero(p) for p in _FAIXA.split(re.sub(r'\(.*?\)', '', str(texto or ''))) if p.strip()]
+    return (partes[0], partes[-1]) if partes else (np.nan, np.nan)
+
+
+def versao_codigo():
+    # Muda quando este arquivo ou o pdfplumber mudam: invalida todo o cache
+    h = hashlib.sha256(f'v{VERSAO_EXTRACAO};pdfplumber={pdfplumber.__version__ if PDF_DISPONIVEL else "-"}'.encode())
+    with open(os.path.abspath(__file__), 'rb') as f:
+        h.update(hashlib.sha256(f.read()).digest())
+    return h.hexdigest()[:16]
+
+
+# --- 3. LEITURA DE PÁGINAS (PROCESSO DO POOL) ---
+def contar_paginas(caminho):
+    with pdfplumber.open(caminho) as pdf:
+        return len(pdf.pages)
+
+
+def ler_pagina(caminho, indice):
+    # (texto, tabelas, segundos) de uma página; tabelas são listas de linhas de células
+    inicio = time.perf_counter()
+    with pdfplumber.open(caminho, pages=[indice + 1]) as pdf:
+        pagina = pdf.pages[0]
+        texto = pagina.extract_text() or ''
+        tabelas = pagina.extract_tables()
+    return texto, tabelas, time.perf_counter() - inicio
+
+
+def ler_paginas(tarefas, processos=None):
+    # tarefas: [(caminho, indice)]; a ordem do resultado é a das tarefas
+    processos = processos or os.cpu_count() or 1
+    if processos < 2 or len(tarefas) < 2:
+        return [ler_pagina(*t) for t in tarefas]
+    with ProcessPoolExecutor(min(processos, len(tarefas))) as executor:
+        return list(executor.map(ler_pagina, *zip(*tarefas), chunksize=max(1, len(tarefas) // (4 * processos))))
+
+
+# --- 4. EXTRATORES POR DOCUMENTO ---
+# Cada extrator recebe [(texto, tabelas)] por página e as dimensões de referência e
+# devolve {tabela: lista de dicts}; a coluna 'documento' é preenchida depois.
+def _adversario(nome, dim_adversario):
+    # (adversario_id, nome_adversario) pelo nome de dim_adversario contido no texto do PDF
+    alvo = sem_acento(nome)
+    for apelido, oficial in APELIDOS_ADVERSARIO.items():
+        alvo = alvo.replace(apelido, sem_acento(oficial))
+    for linha in dim_adversario.itertuples():
+        if re.search(rf'\b{re.escape(sem_acento(linha.nome_adversario))}\b', alvo):
+            return linha.adversario_id, linha.nome_adversario
+    return pd.NA, nome.strip().title()
+
+
+def _placar(texto):
+    # 'Cruzeiro 2 x 1 Flamengo' / 'CRUZEIRO ... 1 X 0 TOMBENSE ...' -> (2, 1, 'Flamengo')
+    achado = re.search(r'(\d+)\s*[xX]\s*(\d+)\s*(.*)', texto or '')
+    return (int(achado.group(1)), int(achado.group(2)), achado.group(3)) if achado else (pd.NA, pd.NA, '')
+
+
+def extrair_lotacao(paginas, dim_adversario, dim_setor):
+    # Uma ficha rótulo/valor por página: Competição, Data/Hora, Equipe Visitante, Placar,
+    # Capacidade, Público Presente/Mandante/Visitante
+    jogos = []
+    for indice, (_, tabelas) in enumerate(paginas):
+        for tabela in tabelas:
+            campos = {}
+            for linha in tabela:
+                celulas = [c.replace('\n', ' ').strip() for c in linha if c and c.strip()]
+                if len(celulas) == 2:
+                    campos[sem_acento(celulas[0])] = celulas[1]
+            if 'publico presente' not in campos:
+                continue
+            data = pd.to_datetime(re.sub(r'\s*[–-]\s*', ' ', campos.get('data/hora', '')).rstrip('h'),
+                                  format='%d/%m/%Y %H:%M', errors='coerce')
+            adversario_id, nome = _adversario(campos.get('equipe visitante', ''), dim_adversario)
+            gols_cruzeiro, gols_adversario, _ = _placar(campos.get('placar final'))
+            publico, capacidade = numero(campos['publico presente']), numero(campos.get('capacidade do mineirao'))
+            jogos.append({
+                'pagina': indice + 1, 'data': data, 'adversario_id': adversario_id, 'nome_adversario': nome,
+                'competicao': campos.get('competicao'), 'publico_pago': publico,
+                'taxa_ocupacao': round(publico / capacidade * 100, 2), 'capacidade': capacidade,
+                'publico_mandante': numero(campos.get('publico mandante')),
+                'publico_visitante': numero(campos.get('publico visitante')),
+                'gols_cruzeiro': gols_cruzeiro, 'gols_adversario': gols_adversario,
+            })
+    return {'fato_jogos': jogos}
+
+
+def extrair_mapa_calor(paginas, dim_adversario, dim_setor):
+    # Só texto: cabeçalho 'CRUZEIRO ESPORTE CLUBE 1 X 0 <ADVERSÁRIO>' seguido de 'Público Presente: N'
+    jogos = []
+    for indice, (texto, _) in enumerate(paginas):
+        for achado in re.finditer(r'CRUZEIRO ESPORTE CLUBE\s+(\d+\s*X\s*\d+.*)\n\s*P[úu]blico Presente:\s*([\d.]+)', texto):
+            gols_cruzeiro, gols_adversario, visitante = _placar(achado.group(1))
+            adversario_id, nome = _adversario(visitante, dim_adversario)
+            jogos.append({'pagina': indice + 1, 'adversario_id': adversario_id, 'nome_adversario': nome,
+                          'publico_pago': numero(achado.group(2)),
+                          'gols_cruzeiro': gols_cruzeiro, 'gols_adversario': gols_adversario})
+    return {'fato_jogos': jogos}
+
+
+def extrair_renda(paginas, dim_adversario, dim_setor):
+    # Tabela sem bordas (extract_tables não acha): blocos de texto que começam pela cor do
+    # setor e terminam no próximo setor ou em 'Total'. Em cada bloco os inteiros são as
+    # vendas (inteira, meia) e os decimais os preços e a renda (a maior delas).
+    ids = dict(zip(dim_setor['nome_setor'], dim_setor['setor_id']))
+    setores = []
+    for indice, (texto, _) in enumerate(paginas):
+        blocos = []
+        for linha in texto.splitlines():
+            if _SETOR.match(linha):
+                blocos.append([linha])
+            elif linha.startswith('Total'):
+                break
+            elif blocos:
+                blocos[-1].append(linha)
+        for bloco in blocos:
+            corpo = ' '.join(bloco)
+            niveis = re.search(r'\((.*?)\)', corpo)
+            niveis = niveis.group(1) if niveis else ''
+            corpo = corpo.replace(f'({niveis})', '')
+            inteiros = [numero(t) for t in _NUMERO.findall(corpo) if ',' not in t]
+            decimais = sorted((numero(t) for t in _NUMERO.findall(corpo) if ',' in t), reverse=True)
+            if len(inteiros) < 2 or len(decimais) < 3:
+                continue
+            nome = _SETOR.match(corpo).group(1)
+            if niveis.startswith('Sup') and 'Inf' in niveis:
+                nome = f'{nome} Superior e Inferior'
+            elif niveis:
+                nome = f'{nome} {"Superior" if niveis.startswith("Sup") else "Inferior"}'
+            setores.append({
+                'pagina': indice + 1, 'setor_id': ids.get(nome, pd.NA), 'nome_setor': nome,
+                'preco_inteira_rs': decimais[1], 'preco_meia_rs': decimais[2],
+                'vendas_inteira': inteiros[0], 'vendas_meia': inteiros[1], 'renda_setor_rs': decimais[0],
+            })
+        if setores:
+            break
+    return {'dim_setor': setores}
+
+
+def extrair_resumo_ingressos(paginas, dim_adversario, dim_setor):
+    # Tabela por ano (total e canais com 'Qtd min – max (pct%)') e tabela por competição
+    canais, competicoes = [], []
+    for _, tabelas in paginas:
+        for tabela in tabelas:
+            cabecalho = [sem_acento(c or '') for c in tabela[0]]
+            for linha in tabela[1:]:
+                if cabecalho[0] == 'ano':
+                    for coluna, celula in zip(cabecalho[2:], linha[2:]):
+                        chave = coluna.split()[0]
+                        percentual = re.search(r'\((\d+(?:,\d+)?)%\)', celula or '')
+                        minimo, maximo = faixa(celula)
+                        canais.append({
+                            'ano': int(numero(linha[0])), 'estimativa_parcial': '*' in linha[0],
+                            'canal_id': CANAIS.get(chave, pd.NA), 'nome_canal': chave.capitalize(),
+                            'vendas_min': minimo, 'vendas_max': maximo,
+                            'percentual': numero(percentual.group(1)) if percentual else np.nan,
+                        })
+                elif cabecalho[0] == 'competicao':
+                    valores = [faixa(c) for c in linha[1:5]]
+                    competicoes.append({'competicao': linha[0], **{
+                        f'{nome}_{limite}': valor[k]
+                        for nome, valor in zip(['jogos_ano', 'publico_medio', 'vendas', 'participacao'], valores)
+                        for k, limite in enumerate(['min', 'max'])}})
+    return {'vendas_canal_ano': canais, 'vendas_competicao': competicoes}
+
+
+def extrair_tabelas_brutas(paginas, dim_adversario, dim_setor):
+    # Documentos sem extrator próprio: todas as células em formato longo
+    celulas = []
+    for indice, (_, tabelas) in enumerate(paginas):
+        for t, tabela in enumerate(tabelas, 1):
+            for i, linha in enumerate(tabela, 1):
+                celulas.extend({'pagina': indice + 1, 'tabela': t, 'linha': i, 'coluna': j, 'valor': c.strip()}
+                               for j, c in enumerate(linha, 1) if c and c.strip())
+    return {'tabelas_brutas': celulas}
+
+
+# Extrator pelo nome do arquivo (sem acentos, minúsculo); o primeiro que bater vale
+EXTRATORES = [
+    ('resumo_ingressos', extrair_resumo_ingressos),
+    ('lotacao por jogo', extrair_lotacao),
+    ('calculo da renda', extrair_renda),
+    ('mapa de calor', extrair_mapa_calor),
+]
+
+
+def extrator(nome_arquivo):
+    nome = sem_acento(nome_arquivo)
+    return next((func for chave, func in EXTRATORES if chave in nome), extrair_tabelas_brutas)
+
+
+# --- 5. MAPEAMENTO PARA O STAR SCHEMA ---
+def linhas_dim_data(fato_jogos):
+    # dim_data das datas dos jogos extraídos (feriado não consta nos PDFs)
+    datas = pd.to_datetime(fato_jogos['data']).dropna()
+    return pd.DataFrame({
+        'documento': fato_jogos.loc[datas.index, 'documento'].to_numpy(), 'data': datas.to_numpy(),
+        'ano': datas.dt.year.to_numpy(), 'mes': datas.dt.month.to_numpy(),
+        'dia_semana': gerador.DIAS_SEMANA[datas.dt.dayofweek.to_numpy()], 'feriado': pd.NA,
+    })
+
+
+def montar_tabelas(documentos):
+    # Junta os resultados por documento nas tabelas de TABELAS (uma linha por registro extraído)
+    tabelas = {}
+    for nome in TABELAS:
+        partes = [pd.DataFrame(d['tabelas'][nome]).assign(documento=d['documento'])
+                  for d in documentos if d['tabelas'].get(nome)]
+        tabelas[nome] = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()
+    tabelas['dim_data'] = linhas_dim_data(tabelas['fato_jogos'].reindex(columns=TABELAS['fato_jogos']))
+    return {nome: tabelas[nome].reindex(columns=list(colunas)).astype({c: _TIPOS[t] for c, t in colunas.items()})
+            for nome, colunas in TABELAS.items()}
+
+
+# --- 6. CACHE POR CONTEÚDO E EXECUÇÃO ---
+# Um JSON por PDF, pelo sha256 do conteúdo: registros extraídos, páginas e tempo de leitura
+def _caminho_cache(saida, sha):
+    return os.path.join(saida, NOME_CACHE, f'{sha}.json')
+
+
+def _para_json(valor):
+    # Datas dos registros (Timestamp/NaT), valores ausentes do pandas e escalares do numpy
+    if valor is pd.NaT or valor is pd.NA:
+        return None
+    if isinstance(valor, pd.Timestamp):
+        return valor.isoformat()
+    if isinstance(valor, np.generic):
+        return valor.item()
+    raise TypeError(f'{type(valor).__name__} não serializável no cache')
+
+
+def _ler_cache(caminho, versao):
+    try:
+        with open(caminho, encoding='utf-8') as f:
+            documento = json.load(f)
+        if documento.get('versao') != versao:
+            return None
+        # Colunas datetime voltam a Timestamp, como saem dos extratores
+        for nome, registros in documento['tabelas'].items():
+            datas = [coluna for coluna, tipo in TABELAS[nome].items() if tipo == 'datetime']
+            for registro in registros:
+                for coluna in datas:
+                    if coluna in registro:
+                        registro[coluna] = pd.Timestamp(registro[coluna]) if registro[coluna] else pd.NaT
+        return documento
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return None
+
+
+def _gravar_cache(documento, caminho):
+    temporario = f'{caminho}.{os.getpid()}.tmp'
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump({k: v for k, v in documento.items() if k not in ('documento', 'do_cache')}, f, default=_para_json)
+    os.replace(temporario, caminho)
+
+
+def _gravar_csv(df, caminho):
+    temporario = f'{caminho}.{os.getpid()}.tmp'
+    df.to_csv(temporario, sep=';', decimal=',', index=False, date_format='%Y-%m-%d %H:%M:%S')
+    os.replace(temporario, caminho)
+
+
+def ingerir(origem=None, saida=None, processos=None, forcar=False):
+    # Retorna (tabelas, documentos); documentos traz por PDF: páginas, linhas por tabela,
+    # segundos de leitura e se veio do cache
+    if not PDF_DISPONIVEL:
+        raise ImportError('pdfplumber não instalado: pip install pdfplumber')
+    origem = origem or DIRETORIO_PDFS
+    saida = saida or os.path.join(ingestao.DIRETORIO_PADRAO, NOME_SAIDA)
+    os.makedirs(os.path.join(saida, NOME_CACHE), exist_ok=True)
+    versao = versao_codigo()
+    dimensoes = ingestao.carregar_tabelas(tabelas=['dim_adversario', 'dim_setor'])
+    dim_adversario, dim_setor = dimensoes['dim_adversario'], dimensoes['dim_setor']
+
+    arquivos = sorted(glob.glob(os.path.join(origem, '*.pdf')))
+    documentos, pendentes = [], []
+    for caminho in arquivos:
+        sha = ingestao._hash_arquivo(caminho)
+        documento = None if forcar else _ler_cache(_caminho_cache(saida, sha), versao)
+        if documento is None:
+            documento = {'versao': versao, 'sha256': sha, 'paginas': contar_paginas(caminho)}
+            pendentes.append((caminho, documento))
+        documento.update(documento=unicodedata.normalize('NFC', os.path.basename(caminho)),
+                         do_cache=documento.get('tabelas') is not None)
+        documentos.append(documento)
+
+    # Páginas de todos os PDFs alterados num único pool
+    tarefas = [(caminho, i) for caminho, documento in pendentes for i in range(documento['paginas'])]
+    paginas = iter(ler_paginas(tarefas, processos))
+    for caminho, documento in pendentes:
+        lidas = [next(paginas) for _ in range(documento['paginas'])]
+        inicio = time.perf_counter()
+        registros = extrator(documento['documento'])([(t, tb) for t, tb, _ in lidas], dim_adversario, dim_setor)
+        documento.update(tabelas=registros, segundos=sum(s for _, _, s in lidas) + time.perf_counter() - inicio)
+        _gravar_cache(documento, _caminho_cache(saida, documento['sha256']))
+
+    # Remove do cache os PDFs que não existem mais (e o formato antigo, em pickle)
+    atuais = {_caminho_cache(saida, d['sha256']) for d in documentos}
+    pasta_cache = os.path.join(saida, NOME_CACHE)
+    for antigo in glob.glob(os.path.join(pasta_cache, '*.json')) + glob.glob(os.path.join(pasta_cache, '*.pkl')):
+        if antigo not in atuais:
+            os.remove(antigo)
+
+    tabelas = montar_tabelas(documentos)
+    for nome, df in tabelas.items():
+        _gravar_csv(df, os.path.join(saida, f'{nome}.csv'))
+    return tabelas, documentos
+
+
+# --- 7. RELATÓRIO ---
+def milhar(valor):
+    return f'{valor:,}'.replace(',', '.')
+
+
+def relatorio(origem=None, saida=None, processos=None, forcar=False):
+    inicio = time.perf_counter()
+    tabelas, documentos = ingerir(origem, saida, processos, forcar)
+    duracao = time.perf_counter() - inicio
+    print(f"{'Documento':<62}{'Páginas':>8}{'Linhas':>8}{'Extração (s)':>14}  Origem")
+    for d in documentos:
+        linhas = sum(len(v) for v in d['tabelas'].values())
+        detalhe = ', '.join(f'{nome} {len(v)}' for nome, v in d['tabelas'].items() if v)
+        print(f"{d['documento'][:60]:<62}{d['paginas']:>8}{linhas:>8}{d['segundos']:>14.2f}  "
+              f"{'cache' if d['do_cache'] else 'extraído'} ({detalhe or 'nenhuma tabela'})")
+    extraidos = sum(not d['do_cache'] for d in documentos)
+    print(f"✅ {len(documentos)} PDFs ({extraidos} extraídos, {len(documentos) - extraidos} do cache) em {duracao:.2f} s")
+    for nome, df in tabelas.items():
+        print(f"   {nome}.csv: {milhar(len(df))} linhas")
+    sem_id = tabelas['fato_jogos']['adversario_id'].isna().sum()
+    if sem_id:
+        print(f"⚠️ {sem_id} jogos com adversário fora de dim_adversario")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Extrai as tabelas dos PDFs de análise para CSVs do star schema.')
+    parser.add_argument('origem', nargs='?', default=None, help='pasta dos PDFs (padrão: ../../data)')
+    parser.add_argument('--saida', default=None, help='pasta dos CSVs extraídos (padrão: <dados>/extraido_pdf)')
+    parser.add_argument('--processos', type=int, default=None, help='processos (padrão: núcleos disponíveis)')
+    parser.add_argument('--forcar', action='store_true', help='ignora o cache e relê todos os PDFs')
+    args = parser.parse_args()
+    relatorio(args.origem, args.saida, args.processos, args.forcar)
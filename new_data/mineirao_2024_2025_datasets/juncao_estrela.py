@@ -0,0 +1,182 @@
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# --- 1. CONFIGURAÇÃO ---
+# Junção em estrela por índice de chave: toda dimensão (e todo agregado por jogo_id ou
+# data_id) tem chave inteira única, quase sempre densa a partir de 1. Em vez de um
+# merge por hash, guardamos posicao[chave] -> linha da tabela e resolvemos as chaves
+# estrangeiras do fato com take vetorizado. Cada coluna anexada é alocada uma única
+# vez; as colunas do fato não são copiadas.
+
+# Acima desta razão (maior chave / linhas), o vetor de posições ficaria esparso
+# demais e a busca usa pd.Index.get_indexer
+LIMITE_ESPARSO = 4
+
+
+class ChaveAusente(KeyError):
+    pass
+
+
+# --- 2. ÍNDICE DE CHAVE ---
+class IndiceChave:
+    def __init__(self, tabela, chave):
+        self.tabela = tabela
+        self.chave = chave
+        self.ids = tabela[chave].to_numpy()
+        if not np.issubdtype(self.ids.dtype, np.integer):
+            raise TypeError(f"Chave '{chave}' precisa ser inteira (dtype {self.ids.dtype})")
+        self._indice = None
+        self._posicao = None
+
+    def alinhada(self, chaves):
+        # Mesma sequência de chaves do fato, estritamente crescente (logo única): a linha i
+        # do fato casa com a linha i da tabela, sem busca nenhuma
+        chaves = pd.Series(chaves).to_numpy()
+        return (chaves.dtype == self.ids.dtype and np.array_equal(chaves, self.ids)
+                and bool(np.all(self.ids[1:] > self.ids[:-1])))
+
+    def _construir(self):
+        ids = self.ids
+        maior = int(ids.max()) if len(ids) else -1
+        if len(ids) and ids.min() >= 0 and maior <= LIMITE_ESPARSO * len(ids) + 1024:
+            self._posicao = np.full(maior + 1, -1, dtype=np.intp)
+            self._posicao[ids] = np.arange(len(ids))
+            # Chave repetida: duas linhas escreveram na mesma posição
+            repetida = np.count_nonzero(self._posicao >= 0) != len(ids)
+        else:
+            self._indice = pd.Index(ids)
+            repetida = self._indice.has_duplicates
+        if repetida:
+            self._posicao = self._indice = None
+            raise ValueError(f"Chave '{self.chave}' com valores repetidos")
+
+    def posicoes(self, chaves):
+        # Linha da tabela para cada chave; -1 onde a chave não existe (ou é nula)
+        if self._posicao is None and self._indice is None:
+            self._construir()
+        chaves = pd.Series(chaves).to_numpy()
+        if self._indice is not None:
+            return self._indice.get_indexer(chaves)
+        if np.issubdtype(chaves.dtype, np.floating):
+            validas = np.isfinite(chaves) & (chaves == np.round(chaves))
+            chaves = np.where(validas, chaves, -1).astype(np.int64)
+        if len(chaves) == 0:
+            return np.empty(0, dtype=np.intp)
+        # Caso comum: todas as chaves no intervalo do vetor, um único take
+        if chaves.min() >= 0 and chaves.max() < len(self._posicao):
+            return self._posicao.take(chaves)
+        posicoes = np.full(len(chaves), -1, dtype=np.intp)
+        dentro = (chaves >= 0) & (chaves < len(self._posicao))
+        posicoes[dentro] = self._posicao[chaves[dentro]]
+        return posicoes
+
+
+# --- 3. JUNÇÃO ---
+def _tomar(serie, posicoes, com_ausentes):
+    # Uma alocação por coluna: take direto; com ausentes, preenche com o nulo do tipo
+    # (inteiros viram float com NaN, como no merge(how='left'))
+    valores = serie.array if isinstance(serie.dtype, pd.api.extensions.ExtensionDtype) else serie.to_numpy()
+    if isinstance(valores, np.ndarray):
+        return pd.api.extensions.take(valores, posicoes, allow_fill=com_ausentes)
+    return valores.take(posicoes, allow_fill=com_ausentes)
+
+
+def juntar(fato, ligacoes, renomear_fato=None, ausentes='nulo', estatisticas=None):
+    # fato: tabela de fatos (as colunas entram sem cópia, renomeadas por renomear_fato)
+    # ligacoes: [(tabela, chave, colunas), ...] em ordem; colunas = None (todas menos a
+    #   chave), lista ou dict {origem: destino}. tabela pode ser um IndiceChave já pronto.
+    # ausentes: 'nulo' (como merge how='left') ou 'erro' (levanta ChaveAusente).
+    # estatisticas (lista opcional) recebe (chave, linhas do fato sem par) de cada ligação.
+    # O resultado tem RangeIndex e as mesmas colunas, na mesma ordem, dos merges encadeados.
+    base = fato.rename(columns=renomear_fato or {}).reset_index(drop=True)
+    partes = [base]
+    nomes = set(base.columns)
+
+    for tabela, chave, selecao in ligacoes:
+        indice = tabela if isinstance(tabela, IndiceChave) else IndiceChave(tabela, chave)
+        if selecao is None:
+            selecao = [col for col in indice.tabela.columns if col != chave]
+        if not isinstance(selecao, dict):
+            selecao = {col: col for col in selecao}
+        repetidas = nomes.intersection(selecao.values())
+        if repetidas:
+            raise ValueError(f"Colunas {sorted(repetidas)} já existem no resultado da junção")
+        nomes.update(selecao.values())
+
+        if indice.alinhada(fato[chave]):
+            # Tabela já alinhada ao fato (ex.: agregados por jogo_id): colunas por referência
+            sem_par = 0
+            parte = indice.tabela[list(selecao)].rename(columns=selecao).reset_index(drop=True)
+        else:
+            posicoes = indice.posicoes(fato[chave])
+            sem_par = int((posicoes < 0).sum())
+            if sem_par and ausentes == 'erro':
+                exemplos = pd.unique(fato[chave].to_numpy()[posicoes < 0])[:5].tolist()
+                raise ChaveAusente(f"{sem_par} linhas com '{chave}' sem correspondência (ex.: {exemplos})")
+            parte = pd.DataFrame({destino: _tomar(indice.tabela[origem], posicoes, sem_par > 0)
+                                  for origem, destino in selecao.items()}, index=base.index, copy=False)
+        if estatisticas is not None:
+            estatisticas.append((chave, sem_par))
+        partes.append(parte)
+
+    # Colunas do fato e de tabelas alinhadas entram por referência (protegidas pelo
+    # copy-on-write do pandas); as demais já são arrays próprios: o concat não copia nada
+    return pd.concat(partes, axis=1)
+
+
+# --- 4. VERIFICAÇÃO CONTRA MERGES ENCADEADOS ---
+def juntar_com_merge(fato, ligacoes, renomear_fato=None):
+    # Referência: o mesmo resultado com merge(how='left') encadeado
+    df = fato.reset_index(drop=True)
+    for tabela, chave, selecao in ligacoes:
+        tabela = tabela.tabela if isinstance(tabela, IndiceChave) else tabela
+        if selecao is None:
+            selecao = [col for col in tabela.columns if col != chave]
+        if not isinstance(selecao, dict):
+            selecao = {col: col for col in selecao}
+        df = df.merge(tabela[[chave, *selecao]].rename(columns=selecao), on=chave, how='left')
+    return df.rename(columns=renomear_fato or {})
+
+
+def verificar(diretorio=None):
+    # Tabela mestre e quadros de detalhe: igualdade com os merges e tempo de cada um
+    import ingestao
+    import tabela_mestre
+
+    dfs = ingestao.carregar_tabelas(diretorio)
+    agregados = {
+        'consumo': dfs['fato_consumo'].groupby('jogo_id').agg(
+            receita_total_consumo_rs=('receita_produto_rs', 'sum')).reset_index(),
+        'ingressos': dfs['fato_mercado_ingressos'].groupby('data_id').agg(
+            vendas_total_ingressos=('vendas_canal', 'sum')).reset_index(),
+    }
+    casos = {
+        'tabela_mestre': (dfs['fato_jogos'], [
+            (dfs['dim_data'], 'data_id', ['data']),
+            (dfs['dim_adversario'], 'adversario_id', tabela_mestre.COLUNAS_ADVERSARIO[1:]),
+            (dfs['fato_projecao'], 'jogo_id', tabela_mestre.RENOMEAR_PROJECAO),
+            (agregados['consumo'], 'jogo_id', None),
+            (agregados['ingressos'], 'data_id', None),
+        ], tabela_mestre.RENOMEAR_JOGOS),
+        'consumo_detalhe': (dfs['fato_consumo'], [(dfs['dim_produto'], 'produto_id', None)], None),
+        'ingressos_canal': (dfs['fato_mercado_ingressos'], [(dfs['dim_canal'], 'canal_id', None)], None),
+        'mobilidade_detalhe': (dfs['fato_mobilidade_incidentes'], [(dfs['dim_setor'], 'setor_id', None)], None),
+    }
+    print(f"{'Junção':<22}{'Linhas':>12}{'merge (ms)':>14}{'estrela (ms)':>14}")
+    for nome, (fato, ligacoes, renomear) in casos.items():
+        inicio = time.perf_counter()
+        esperado = juntar_com_merge(fato, ligacoes, renomear)
+        t_merge = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        obtido = juntar(fato, ligacoes, renomear)
+        t_estrela = time.perf_counter() - inicio
+        pd.testing.assert_frame_equal(obtido, esperado)
+        print(f"{nome:<22}{len(obtido):>12}{t_merge * 1000:>14.1f}{t_estrela * 1000:>14.1f}")
+    print("✅ Junção em estrela idêntica aos merges")
+
+
+if __name__ == '__main__':
+    verificar(sys.argv[1] if len(sys.argv) > 1 else None)
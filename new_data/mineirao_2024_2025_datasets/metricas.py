@@ -0,0 +1,232 @@
+import os
+import sys
+import time
+import bisect
+import cProfile
+import pstats
+import argparse
+import resource
+import threading
+from contextlib import contextmanager
+
+try:
+    import pyinstrument
+except ImportError:
+    pyinstrument = None
+
+
+# --- 1. MEDIÇÃO DE ETAPAS ---
+# Cada etapa (nó do pipeline, construção de figura em callback, serialização da
+# resposta) acumula: execuções, tempo de parede, tempo de CPU do thread, aumento do
+# pico de RSS do processo e o número de linhas do último resultado.
+# Latência dos callbacks do Dash vai para histogramas no formato do Prometheus.
+LIMITES_LATENCIA_S = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0]
+PREFIXO = 'mineirao'
+
+
+def _pico_rss_bytes():
+    # ru_maxrss: pico de RSS do processo (KB no Linux, bytes no macOS)
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico if sys.platform == 'darwin' else pico * 1024
+
+
+def _rss_atual_bytes():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return _pico_rss_bytes()
+
+
+def contar_linhas(valor):
+    # DataFrames e Series: número de linhas; figuras e demais valores: None
+    return len(valor) if hasattr(valor, 'shape') and hasattr(valor, '__len__') else None
+
+
+class Metricas:
+    def __init__(self):
+        self._trava = threading.Lock()
+        self.etapas = {}      # (tipo, etapa) -> acumulados
+        self.latencias = {}   # callback -> [contagem por limite..., +Inf], soma, total
+
+    def registrar_etapa(self, tipo, etapa, parede_s, cpu_s=0.0, rss_delta=0, linhas=None):
+        with self._trava:
+            atual = self.etapas.setdefault((tipo, etapa), {
+                'execucoes': 0, 'parede_s': 0.0, 'cpu_s': 0.0, 'ultima_parede_s': 0.0,
+                'rss_pico_delta_bytes': 0, 'linhas': None,
+            })
+            atual['execucoes'] += 1
+            atual['parede_s'] += parede_s
+            atual['cpu_s'] += cpu_s
+            atual['ultima_parede_s'] = parede_s
+            atual['rss_pico_delta_bytes'] = max(atual['rss_pico_delta_bytes'], rss_delta)
+            if linhas is not None:
+                atual['linhas'] = linhas
+
+    @contextmanager
+    def medir(self, tipo, etapa):
+        # Uso: with metricas.medir('figura', 'grafico-publico') as m: ...; m['linhas'] = n
+        info = {'linhas': None}
+        pico, parede, cpu = _pico_rss_bytes(), time.perf_counter(), time.thread_time()
+        try:
+            yield info
+        finally:
+            self.registrar_etapa(tipo, etapa, time.perf_counter() - parede, time.thread_time() - cpu,
+                                 _pico_rss_bytes() - pico, info['linhas'])
+
+    def instrumentar_pipeline(self, categoria):
+        # Função para Pipeline.instrumentacao: mede cada nó calculado
+        def instrumentacao(nome, calcular):
+            with self.medir(categoria(nome), nome) as info:
+                valor = calcular()
+                info['linhas'] = contar_linhas(valor)
+            return valor
+        return instrumentacao
+
+    def registrar_latencia(self, callback, segundos):
+        with self._trava:
+            contagens, soma, total = self.latencias.get(callback, ([0] * (len(LIMITES_LATENCIA_S) + 1), 0.0, 0))
+            contagens[bisect.bisect_left(LIMITES_LATENCIA_S, segundos)] += 1
+            self.latencias[callback] = (contagens, soma + segundos, total + 1)
+
+    # --- 2. FORMATO DE TEXTO DO PROMETHEUS ---
+    def texto_prometheus(self, caches=None):
+        # caches: {nome: CacheLRU} para expor acertos/faltas de cada cache
+        with self._trava:
+            etapas = {chave: dict(valor) for chave, valor in self.etapas.items()}
+            latencias = {chave: (list(c), s, t) for chave, (c, s, t) in self.latencias.items()}
+
+        linhas = []
+
+        def metrica(nome, tipo_metrica, ajuda, amostras):
+            linhas.append(f'# HELP {PREFIXO}_{nome} {ajuda}')
+            linhas.append(f'# TYPE {PREFIXO}_{nome} {tipo_metrica}')
+            for rotulos, valor in amostras:
+                texto = ','.join(f'{k}="{_escapar(v)}"' for k, v in rotulos.items())
+                linhas.append(f'{PREFIXO}_{nome}{{{texto}}} {valor:.6g}' if texto else f'{PREFIXO}_{nome} {valor:.6g}')
+
+        def por_etapa(campo):
+            return [({'tipo': tipo, 'etapa': etapa}, valor[campo]) for (tipo, etapa), valor in sorted(etapas.items())
+                    if valor[campo] is not None]
+
+        metrica('etapa_execucoes_total', 'counter', 'Execuções de cada etapa.', por_etapa('execucoes'))
+        metrica('etapa_segundos_total', 'counter', 'Tempo de parede acumulado por etapa.', por_etapa('parede_s'))
+        metrica('etapa_cpu_segundos_total', 'counter', 'Tempo de CPU (thread) acumulado por etapa.', por_etapa('cpu_s'))
+        metrica('etapa_ultima_duracao_segundos', 'gauge', 'Tempo de parede da última execução.',
+                por_etapa('ultima_parede_s'))
+        metrica('etapa_rss_pico_delta_bytes', 'gauge', 'Maior aumento do pico de RSS durante a etapa.',
+                por_etapa('rss_pico_delta_bytes'))
+        metrica('etapa_linhas', 'gauge', 'Linhas do último resultado da etapa.', por_etapa('linhas'))
+
+        nome = f'{PREFIXO}_callback_latencia_segundos'
+        linhas.append(f'# HELP {nome} Latência das requisições de callback do Dash (inclui serialização).')
+        linhas.append(f'# TYPE {nome} histogram')
+        for callback, (contagens, soma, total) in sorted(latencias.items()):
+            acumulado = 0
+            for limite, contagem in zip(LIMITES_LATENCIA_S + ['+Inf'], contagens):
+                acumulado += contagem
+                linhas.append(f'{nome}_bucket{{callback="{_escapar(callback)}",le="{limite}"}} {acumulado}')
+            linhas.append(f'{nome}_sum{{callback="{_escapar(callback)}"}} {soma:.6g}')
+            linhas.append(f'{nome}_count{{callback="{_escapar(callback)}"}} {total}')
+
+        if caches:
+            estatisticas = {nome: cache.estatisticas() for nome, cache in caches.items()}
+            for campo in ('acertos', 'faltas', 'descartes'):
+                metrica(f'cache_{campo}_total', 'counter', f'Contador de {campo} do cache LRU.',
+                        [({'cache': nome}, e[campo]) for nome, e in estatisticas.items()])
+            metrica('cache_itens', 'gauge', 'Itens no cache LRU.',
+                    [({'cache': nome}, e['tamanho']) for nome, e in estatisticas.items()])
+
+        metrica('processo_rss_bytes', 'gauge', 'RSS atual do processo.', [({}, _rss_atual_bytes())])
+        metrica('processo_rss_pico_bytes', 'gauge', 'Pico de RSS do processo.', [({}, _pico_rss_bytes())])
+        return '\n'.join(linhas) + '\n'
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# --- 3. INTEGRAÇÃO COM O SERVIDOR FLASK DO DASH ---
+def marcar_fim_callback():
+    # Chamado pelo callback logo antes de retornar, para separar a serialização
+    import flask
+    if flask.has_request_context():
+        flask.g.fim_callback = time.perf_counter()
+
+
+def instalar_no_servidor(servidor, metricas, caches=None, rota='/metrics'):
+    # Rota /metrics e medição de cada requisição de callback (_dash-update-component).
+    # A etapa 'serializacao' é o tempo entre o fim do callback (marcado pelo app em
+    # flask.g.fim_callback) e a resposta pronta: conversão da figura em JSON.
+    import flask
+
+    @servidor.before_request
+    def _inicio_requisicao():
+        flask.g.inicio_requisicao = time.perf_counter()
+
+    @servidor.after_request
+    def _fim_requisicao(resposta):
+        if flask.request.path.endswith('/_dash-update-component'):
+            fim = time.perf_counter()
+            corpo = flask.request.get_json(silent=True) or {}
+            callback = corpo.get('output', '?')
+            metricas.registrar_latencia(callback, fim - flask.g.get('inicio_requisicao', fim))
+            fim_callback = flask.g.get('fim_callback')
+            if fim_callback is not None:
+                metricas.registrar_etapa('serializacao', callback, fim - fim_callback)
+        return resposta
+
+    @servidor.route(rota)
+    def _metricas():
+        return flask.Response(metricas.texto_prometheus(caches), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# --- 4. PERFIL DE UMA RECONSTRUÇÃO COMPLETA (OPCIONAL) ---
+def capturar_perfil(funcao, caminho):
+    # Perfil de funcao(): com pyinstrument (se instalado e caminho .html) grava o relatório
+    # HTML; senão usa cProfile e grava o .prof (abrir com snakeviz ou pstats).
+    # Retorna (resultado de funcao, arquivo gravado).
+    if caminho.endswith('.html') and pyinstrument is not None:
+        perfilador = pyinstrument.Profiler()
+        perfilador.start()
+        try:
+            resultado = funcao()
+        finally:
+            perfilador.stop()
+            with open(caminho, 'w', encoding='utf-8') as f:
+                f.write(perfilador.output_html())
+        return resultado, caminho
+
+    if caminho.endswith('.html'):
+        caminho = caminho[:-len('.html')] + '.prof'
+    perfilador = cProfile.Profile()
+    try:
+        resultado = perfilador.runcall(funcao)
+    finally:
+        perfilador.dump_stats(caminho)
+    return resultado, caminho
+
+
+def reconstruir_tudo(diretorio=None):
+    # Reconstrução completa sem caches: CSVs, merges, agregados e as 9 figuras
+    import ingestao
+    import pipeline
+    p = pipeline.criar_pipeline(diretorio, usar_estado=False)
+    for nome, df in ingestao.carregar_tabelas(diretorio, usar_cache=False).items():
+        p.definir(nome, df)
+    for nome in pipeline.NOS_FIGURAS:
+        p.obter(nome)
+    return p
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Perfil de uma reconstrução completa do dashboard.')
+    parser.add_argument('--saida', default='perfil_reconstrucao.prof',
+                        help='.prof (cProfile) ou .html (pyinstrument, se instalado)')
+    parser.add_argument('--top', type=int, default=20, help='funções listadas (cProfile)')
+    args = parser.parse_args()
+
+    _, caminho = capturar_perfil(reconstruir_tudo, args.saida)
+    if caminho.endswith('.prof'):
+        pstats.Stats(caminho).sort_stats('cumulative').print_stats(args.top)
+    print(f"✅ Perfil gravado em {caminho}")
@@ -0,0 +1,318 @@
+import os
+import sys
+import ctypes
+import time
+import threading
+
+import numpy as np
+
+import ingestao
+import juncao_estrela
+import consulta_sql
+import tabela_mestre
+import figuras
+import simulacao
+import filas_portoes
+import fato_torcedor
+
+
+# --- 1. DAG PREGUIÇOSO DE QUADROS DERIVADOS ---
+# Cada tabela, agregado e figura é um nó com uma função e a lista dos nós de que
+# depende. obter(nome) calcula só o que está a montante do nó pedido e guarda o
+# resultado; invalidar(nome) descarta o nó e tudo que depende dele.
+class Pipeline:
+    def __init__(self):
+        self._nos = {}          # nome -> (funcao, dependencias)
+        self._dependentes = {}  # nome -> nós que dependem diretamente dele
+        self._valores = {}
+        self._trava = threading.RLock()
+        self.tempos = {}        # nome -> segundos gastos no último cálculo do nó
+        # Opcional: função (nome, calcular) -> valor que envolve o cálculo de cada nó
+        # (ex.: metricas.Metricas.instrumentar_pipeline)
+        self.instrumentacao = None
+
+    def no(self, nome, *dependencias):
+        # Decorador: registra a função como o nó `nome`
+        def registrar(funcao):
+            self.registrar(nome, funcao, dependencias)
+            return funcao
+        return registrar
+
+    def registrar(self, nome, funcao, dependencias=()):
+        for dep in dependencias:
+            if dep not in self._nos:
+                raise KeyError(f"Nó '{nome}' depende de '{dep}', que não foi registrado")
+        with self._trava:
+            self._nos[nome] = (funcao, tuple(dependencias))
+            self._dependentes.setdefault(nome, set())
+            for dep in dependencias:
+                self._dependentes[dep].add(nome)
+            self.invalidar(nome)
+
+    def obter(self, nome):
+        with self._trava:
+            if nome in self._valores:
+                return self._valores[nome]
+            funcao, dependencias = self._nos[nome]
+            argumentos = [self.obter(dep) for dep in dependencias]
+            inicio = time.perf_counter()
+            if self.instrumentacao is None:
+                valor = funcao(*argumentos)
+            else:
+                valor = self.instrumentacao(nome, lambda: funcao(*argumentos))
+            self.tempos[nome] = time.perf_counter() - inicio
+            self._valores[nome] = valor
+            return valor
+
+    def definir(self, nome, valor):
+        # Substitui o valor de um nó (ex.: uma tabela recarregada) e invalida os dependentes
+        with self._trava:
+            self.invalidar(nome)
+            self._valores[nome] = valor
+
+    def invalidar(self, nome):
+        with self._trava:
+            pendentes = [nome]
+            while pendentes:
+                atual = pendentes.pop()
+                self._valores.pop(atual, None)
+                pendentes.extend(self._dependentes.get(atual, ()))
+
+    def obter_em_paralelo(self, nomes, executor=None):
+        # Calcula vários nós independentes (ex.: as figuras) ao mesmo tempo: as dependências
+        # são resolvidas aqui e só a função de cada nó vai para o executor (threads ou
+        # processos; neste caso a função precisa ser serializável, como as de figuras.py).
+        if executor is None:
+            return {nome: self.obter(nome) for nome in nomes}
+        pendentes = {}
+        for nome in nomes:
+            if nome in self._valores:
+                continue
+            funcao, dependencias = self._nos[nome]
+            argumentos = [self.obter(dep) for dep in dependencias]
+            pendentes[nome] = (executor.submit(funcao, *argumentos), time.perf_counter())
+        for nome, (futuro, inicio) in pendentes.items():
+            valor = futuro.result()
+            with self._trava:
+                self.tempos[nome] = time.perf_counter() - inicio
+                self._valores[nome] = valor
+        return {nome: self.obter(nome) for nome in nomes}
+
+    def a_montante(self, nomes):
+        # Nós necessários para calcular `nomes` (incluídos), em ordem de registro,
+        # que já é uma ordem topológica
+        necessarios = set()
+        pendentes = list(nomes)
+        while pendentes:
+            atual = pendentes.pop()
+            if atual not in necessarios:
+                necessarios.add(atual)
+                pendentes.extend(self._nos[atual][1])
+        return [nome for nome in self._nos if nome in necessarios]
+
+    def calculados(self):
+        with self._trava:
+            return [nome for nome in self._nos if nome in self._valores]
+
+    def dependencias(self, nome):
+        return self._nos[nome][1]
+
+    def nomes(self):
+        return list(self._nos)
+
+
+# --- 2. NÓS DO DASHBOARD ---
+NOS_FIGURAS = ['fig1', 'fig2', 'fig3', 'fig4', 'fig5', 'fig6', 'fig7', 'fig8', 'fig9']
+
+# Agregado (nome usado nos filtros do app e em consulta_sql.CONSULTAS) -> nó do pipeline
+NOS_AGREGADOS = {
+    'receita_categoria': 'df_receita_categoria',
+    'top_itens': 'df_top_itens',
+    'vendas_tipo': 'df_vendas_tipo',
+    'mobilidade_setor': 'df_mobilidade_agg_setor',
+    'incidentes_setor': 'df_incidentes_agg_setor',
+    'faixa_etaria': 'df_faixa_etaria',
+}
+
+# Agregados filtráveis -> (nó do detalhe no pipeline, coluna que liga ao jogo, função de agregação)
+AGREGADOS = {
+    'receita_categoria': ('df_consumo_detalhe', 'jogo_id', figuras.agregar_receita_categoria),
+    'top_itens': ('df_consumo_detalhe', 'jogo_id', figuras.agregar_top_itens),
+    'vendas_tipo': ('df_ingressos_canal', 'data_id', figuras.agregar_vendas_tipo),
+    'mobilidade_setor': ('df_mobilidade_detalhe', 'jogo_id', figuras.agregar_mobilidade_setor),
+    'incidentes_setor': ('df_mobilidade_detalhe', 'jogo_id', figuras.agregar_incidentes_setor),
+}
+# O filtro de setor só vale para os agregados do Painel 3
+AGREGADOS_POR_SETOR = ('mobilidade_setor', 'incidentes_setor')
+
+
+def categoria(nome):
+    # Etapa a que o nó pertence, usada em benchmarks e métricas
+    if nome in ingestao.ESQUEMA:
+        return 'carga'
+    if nome in NOS_FIGURAS:
+        return 'figura'
+    if nome in ('banco_sql', 'fato_torcedor'):
+        return 'carga'
+    if nome == 'df_master':
+        return 'tabela_mestre'
+    return 'agregacao'
+
+
+def devolver_memoria_livre():
+    # Merges e leituras deixam muita memória livre presa no heap do glibc; malloc_trim
+    # devolve ao sistema o que os quadros intermediários já liberaram (só no Linux/glibc)
+    try:
+        ctypes.CDLL('libc.so.6').malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+def criar_pipeline(diretorio=None, compacto=None, backend=None, motor_sql=None, usar_estado=True):
+    # compacto: tipos compactos em tabelas e quadros derivados (padrão: MINEIRAO_COMPACTO)
+    # backend: 'pandas' ou 'sql' (padrão: MINEIRAO_BACKEND). No 'sql', a tabela mestre e os
+    # agregados das figuras vêm de consultas em consulta_sql.py e os fatos grandes
+    # (consumo, ingressos, mobilidade) não são carregados no pandas.
+    # usar_estado: no backend pandas, a tabela mestre vem do estado incremental salvo
+    # (tabela_mestre.py, .estado_master) quando ele foi derivado dos CSVs atuais, sem carregar
+    # os fatos grandes; senão (ou com usar_estado=False), é reconstruída por inteiro.
+    compacto = ingestao.COMPACTO_PADRAO if compacto is None else compacto
+    backend = backend or consulta_sql.BACKEND_PADRAO
+    p = Pipeline()
+    p.backend = backend
+
+    # Tabelas: cada CSV é um nó próprio, carregado (tipado e com cache) só quando pedido
+    for tabela in ingestao.ESQUEMA:
+        p.registrar(tabela, lambda tabela=tabela: ingestao.carregar_tabelas(diretorio, tabelas=[tabela],
+                                                                            compacto=compacto)[tabela])
+
+    def _finalizar_master(df_master):
+        # No modo compacto, também as colunas calculadas (ex.: data_jogo vira datetime64)
+        return ingestao.compactar(df_master) if compacto else df_master
+
+    if backend == 'sql':
+        p.registrar('banco_sql', lambda: consulta_sql.abrir(diretorio, motor_sql))
+
+        @p.no('df_master', 'fato_jogos', 'dim_data', 'dim_adversario', 'fato_projecao', 'banco_sql')
+        def _master_sql(fato_jogos, dim_data, dim_adversario, fato_projecao, banco):
+            return _finalizar_master(tabela_mestre.juntar_master({
+                'fato_jogos': fato_jogos, 'dim_data': dim_data, 'dim_adversario': dim_adversario,
+                'fato_projecao': fato_projecao,
+            }, banco.agregados_master()))
+    elif usar_estado and tabela_mestre.estado_em_dia(diretorio):
+        dir_estado = os.path.join(diretorio or ingestao.DIRETORIO_PADRAO, tabela_mestre.NOME_ESTADO)
+        p.registrar('df_master', lambda: _finalizar_master(
+            tabela_mestre.carregar_estado(dir_estado, ['master'])['master']))
+    else:
+        @p.no('df_master', 'fato_jogos', 'dim_data', 'dim_adversario', 'fato_projecao',
+              'fato_consumo', 'fato_mercado_ingressos', 'fato_mobilidade_incidentes')
+        def _master(fato_jogos, dim_data, dim_adversario, fato_projecao, fato_consumo, fato_mercado_ingressos,
+                    fato_mobilidade_incidentes):
+            return _finalizar_master(tabela_mestre.construir_master({
+                'fato_jogos': fato_jogos, 'dim_data': dim_data, 'dim_adversario': dim_adversario,
+                'fato_projecao': fato_projecao, 'fato_consumo': fato_consumo,
+                'fato_mercado_ingressos': fato_mercado_ingressos,
+                'fato_mobilidade_incidentes': fato_mobilidade_incidentes,
+            }))
+
+    @p.no('df_dashboard', 'df_master', 'dim_data')
+    def _dashboard(df_master, dim_data):
+        # Cópia rasa: compartilha as colunas da tabela mestre e só acrescenta 'ano'
+        df_dashboard = df_master.copy(deep=False)
+        # Temporada (dim_data.ano), usada nos filtros do app
+        df_dashboard['ano'] = df_dashboard['data_id'].map(dim_data.set_index('data_id')['ano'])
+        return df_dashboard
+
+    # Dataframes Detalhe para Painéis 2 e 3: fato + colunas da dimensão por índice de chave
+    p.registrar('df_consumo_detalhe', lambda fato, dim: juncao_estrela.juntar(fato, [(dim, 'produto_id', None)]),
+                ['fato_consumo', 'dim_produto'])
+    p.registrar('df_ingressos_canal', lambda fato, dim: juncao_estrela.juntar(fato, [(dim, 'canal_id', None)]),
+                ['fato_mercado_ingressos', 'dim_canal'])
+    p.registrar('df_mobilidade_detalhe', lambda fato, dim: juncao_estrela.juntar(fato, [(dim, 'setor_id', None)]),
+                ['fato_mobilidade_incidentes', 'dim_setor'])
+    # Fato por ingresso com índices de bitmap (fato_torcedor.py): painel demográfico. Acima
+    # de fato_torcedor.MAXIMO_INGRESSOS não é gerado (None) e a figura 9 conta os perfis.
+    p.registrar('fato_torcedor', lambda fato_jogos: fato_torcedor.abrir(diretorio) if fato_torcedor.cabe(fato_jogos)
+                else None, ['fato_jogos'])
+
+    # Agregados
+    if backend == 'sql':
+        for nome in consulta_sql.CONSULTAS:
+            p.registrar(NOS_AGREGADOS[nome], lambda banco, nome=nome: banco.agregar(nome), ['banco_sql'])
+    else:
+        p.registrar('df_receita_categoria', figuras.agregar_receita_categoria, ['df_consumo_detalhe'])
+        p.registrar('df_top_itens', figuras.agregar_top_itens, ['df_consumo_detalhe'])
+        p.registrar('df_vendas_tipo', figuras.agregar_vendas_tipo, ['df_ingressos_canal'])
+        p.registrar('df_mobilidade_agg_setor', figuras.agregar_mobilidade_setor, ['df_mobilidade_detalhe'])
+        p.registrar('df_incidentes_agg_setor', figuras.agregar_incidentes_setor, ['df_mobilidade_detalhe'])
+    p.registrar('df_faixa_etaria', figuras.agregar_faixa_etaria, ['fato_torcedor', 'dim_perfil_torcedor'])
+
+    # Faixas P10-P90 por jogo (simulação Monte Carlo das temporadas) das figuras 1 e 2
+    p.registrar('df_simulacao', simulacao.faixas_dashboard, ['df_dashboard'])
+
+    # Tempos de entrada e saída simulados por setor (filas nos portões) da figura 7
+    p.registrar('df_filas_setor', filas_portoes.simular_setores_dashboard, ['dim_setor', 'df_dashboard'])
+
+    # Figuras
+    p.registrar('fig1', figuras.figura_publico, ['df_dashboard', 'df_simulacao'])
+    p.registrar('fig2', figuras.figura_ticket_medio, ['df_dashboard', 'df_simulacao'])
+    p.registrar('fig3', figuras.figura_receita_confronto, ['df_dashboard'])
+    p.registrar('fig4', figuras.figura_receita_categoria, ['df_receita_categoria'])
+    p.registrar('fig5', figuras.figura_top_itens, ['df_top_itens'])
+    p.registrar('fig6', figuras.figura_vendas_canal, ['df_vendas_tipo'])
+    p.registrar('fig7', figuras.figura_mobilidade, ['df_mobilidade_agg_setor', 'df_filas_setor'])
+    p.registrar('fig8', figuras.figura_incidentes, ['df_incidentes_agg_setor'])
+    p.registrar('fig9', lambda df, fato: figuras.figura_faixa_etaria(df, fato is not None),
+                ['df_faixa_etaria', 'fato_torcedor'])
+    return p
+
+
+# --- 3. FILTROS (BACKEND PANDAS) ---
+# Temporada (dim_data.ano), competição e nível de confronto filtram os jogos; o detalhe
+# fica com as linhas dos jogos (ou datas de jogo) filtrados. O backend SQL reproduz a
+# mesma semântica em consulta_sql.montar_filtro.
+def filtrar_jogos(df_dashboard, anos=(), competicoes=(), niveis=()):
+    mascara = np.ones(len(df_dashboard), dtype=bool)
+    if anos:
+        mascara &= df_dashboard['ano'].isin(anos).to_numpy()
+    if competicoes:
+        mascara &= df_dashboard['competicao'].isin(competicoes).to_numpy()
+    if niveis:
+        mascara &= df_dashboard['nivel_confronto'].isin(niveis).to_numpy()
+    return df_dashboard[mascara]
+
+
+def filtrar_detalhe(p, nome, jogos=None, setores=()):
+    # jogos: resultado de filtrar_jogos, ou None para não filtrar por jogo
+    no_detalhe, coluna, _ = AGREGADOS[nome]
+    detalhe = p.obter(no_detalhe)
+    if jogos is not None:
+        detalhe = detalhe[detalhe[coluna].isin(jogos[coluna])]
+    if setores:
+        detalhe = detalhe[detalhe['nome_setor'].isin(setores)]
+    return detalhe
+
+
+# Filtros do app -> atributos indexados do fato por ingresso (o mesmo em qualquer backend)
+ATRIBUTOS_FILTRO_TORCEDOR = ('ano', 'competicao', 'nivel_confronto', 'nome_setor')
+
+
+def agregar_torcedores(p, anos=(), competicoes=(), niveis=(), setores=()):
+    filtros = dict(zip(ATRIBUTOS_FILTRO_TORCEDOR, (anos, competicoes, niveis, setores)))
+    return figuras.agregar_faixa_etaria(p.obter('fato_torcedor'), p.obter('dim_perfil_torcedor'), **filtros)
+
+
+def agregar_filtrado(p, nome, anos=(), competicoes=(), niveis=(), setores=()):
+    if nome == 'faixa_etaria':
+        return agregar_torcedores(p, anos, competicoes, niveis, setores)
+    jogos = filtrar_jogos(p.obter('df_dashboard'), anos, competicoes, niveis) if anos or competicoes or niveis else None
+    return AGREGADOS[nome][2](filtrar_detalhe(p, nome, jogos, setores))
+
+
+if __name__ == '__main__':
+    # Uso: python pipeline.py fig4 [fig7 ...] -> mostra quais nós foram calculados e o tempo de cada um
+    p = criar_pipeline()
+    for alvo in sys.argv[1:] or NOS_FIGURAS:
+        p.obter(alvo)
+    for nome in p.calculados():
+        print(f"{nome:<28}{p.tempos[nome] * 1000:>10.1f} ms")
@@ -0,0 +1,254 @@
+import os
+import glob
+import json
+import time
+import hashlib
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import gerador
+import ingestao
+import juncao_estrela
+
+# --- 1. CONFIGURAÇÃO ---
+# Modelo de projeção de público pago e receita de ingressos, no lugar do ruído em torno
+# de 40.000 do fato_projecao original. Regressão ridge em escala log sobre nível do
+# confronto, competição, dia da semana, feriado e log do ticket médio, para que cenários
+# de preço também possam ser simulados. O horário do jogo não entra: os CSVs não o têm
+# (a hora de dim_data.data é sorteada ao acaso pelo gerador) e ele não afeta o público.
+# O ajuste é guardado em <dados>/.modelo_projecao (npz, sem pickle), com chave no hash dos
+# CSVs e deste código; a previsão monta a matriz do modelo de uma vez para todos os cenários.
+NOME_MODELO = '.modelo_projecao'
+VERSAO_MODELO = 2
+TABELAS_MODELO = ['fato_jogos', 'dim_data', 'dim_adversario']
+FATORES = ['nivel_confronto', 'competicao', 'dia_semana']
+RIDGE = 1.0
+DOBRAS = 5
+DIAS_SEMANA = gerador.DIAS_SEMANA.tolist()
+CAPACIDADE = gerador.CAPACIDADE_MINEIRAO
+
+_MODELOS = {}  # chave -> ModeloProjecao já carregado neste processo
+
+
+# --- 2. MATRIZ DO MODELO E AJUSTE ---
+def _um_quente(valores, categorias):
+    # Uma coluna por categoria; valor desconhecido fica com todas em zero
+    codigos = pd.Categorical(valores, categories=categorias).codes
+    return np.vstack([np.eye(len(categorias)), np.zeros(len(categorias))])[codigos]
+
+
+class ModeloProjecao:
+    def __init__(self, categorias, ticket_referencia):
+        self.categorias = categorias                # fator -> lista de categorias vistas no ajuste
+        self.ticket_referencia = ticket_referencia  # nivel_confronto -> ticket mediano (e '*': geral)
+        self.coeficientes = None                    # (colunas da matriz, 2): log público, log receita
+        self.suavizacao = None                      # fator de Duan para voltar da escala log
+        self.qualidade = {}
+        self.previsto_fora_dobra = None             # por jogo_id: previsão com o jogo fora do ajuste
+        self.jogos = 0
+
+    def _ticket(self, cenarios):
+        padrao = cenarios['nivel_confronto'].map(self.ticket_referencia).astype('float64').fillna(self.ticket_referencia['*'])
+        if 'ticket_medio_ingresso_rs' not in cenarios:
+            return padrao.to_numpy()
+        return cenarios['ticket_medio_ingresso_rs'].astype('float64').fillna(padrao).to_numpy()
+
+    def matriz(self, cenarios):
+        # cenarios: nivel_confronto, competicao, dia_semana, feriado e, opcionalmente,
+        # ticket_medio_ingresso_rs
+        return np.hstack([
+            np.ones((len(cenarios), 1)),
+            *(_um_quente(cenarios[fator], self.categorias[fator]) for fator in FATORES),
+            cenarios['feriado'].to_numpy(dtype='float64')[:, None],
+            np.log(self._ticket(cenarios))[:, None],
+        ])
+
+    def prever(self, cenarios):
+        # Retorna os cenários com publico_projetado, receita_projetada_mil_rs e
+        # ocupacao_projetada; público limitado à capacidade do estádio, com a receita
+        # reduzida na mesma proporção
+        escala = np.exp(self.matriz(cenarios) @ self.coeficientes) * self.suavizacao
+        publico = np.minimum(escala[:, 0], CAPACIDADE)
+        resultado = cenarios.copy()
+        resultado['ticket_medio_ingresso_rs'] = self._ticket(cenarios)
+        resultado['publico_projetado'] = np.round(publico).astype(np.int64)
+        resultado['receita_projetada_mil_rs'] = np.round(escala[:, 1] * publico / escala[:, 0], 3)
+        resultado['ocupacao_projetada'] = publico / CAPACIDADE
+        return resultado
+
+
+def historico(tabelas):
+    # Um jogo por linha com os fatores do modelo e os valores realizados (em float64 também no modo compacto)
+    jogos = ingestao.decimais(tabelas['fato_jogos'][['jogo_id', 'data_id', 'adversario_id', 'publico_pago',
+                                                     'receita_ingresso_mil_rs', 'ticket_medio_ingresso_rs']])
+    df = juncao_estrela.juntar(jogos, [
+        (tabelas['dim_data'], 'data_id', ['dia_semana', 'feriado']),
+        (tabelas['dim_adversario'], 'adversario_id', ['nome_adversario', 'nivel_confronto', 'competicao']),
+    ])
+    df['feriado'] = df['feriado'].fillna(False).astype(bool)
+    return df
+
+
+def _resolver(xtx, xty, colunas):
+    # Ridge sem penalizar o intercepto
+    penalidade = RIDGE * np.eye(colunas)
+    penalidade[0, 0] = 0
+    return np.linalg.solve(xtx + penalidade, xty)
+
+
+def ajustar(tabelas):
+    df = historico(tabelas)
+    df = df[(df['publico_pago'] > 0) & (df['receita_ingresso_mil_rs'] > 0) & (df['ticket_medio_ingresso_rs'] > 0)]
+    ticket = df.groupby('nivel_confronto')['ticket_medio_ingresso_rs'].median()
+    modelo = ModeloProjecao({fator: sorted(df[fator].dropna().unique().tolist()) for fator in FATORES},
+                            {**ticket.to_dict(), '*': float(df['ticket_medio_ingresso_rs'].median())})
+    x = modelo.matriz(df)
+    y = np.log(df[['publico_pago', 'receita_ingresso_mil_rs']].to_numpy(dtype='float64'))
+    xtx, xty = x.T @ x, x.T @ y
+    modelo.coeficientes = _resolver(xtx, xty, x.shape[1])
+    residuos = y - x @ modelo.coeficientes
+    modelo.suavizacao = np.exp(residuos).mean(axis=0)
+
+    # Validação cruzada por jogo_id % DOBRAS: cada dobra desconta a sua parte de X'X e X'y
+    dobra = df['jogo_id'].to_numpy() % DOBRAS
+    fora = np.empty_like(y)
+    for k in range(DOBRAS):
+        linhas = dobra == k
+        if linhas.any() and not linhas.all():
+            xk = x[linhas]
+            fora[linhas] = xk @ _resolver(xtx - xk.T @ xk, xty - xk.T @ y[linhas], x.shape[1])
+        else:
+            fora[linhas] = x[linhas] @ modelo.coeficientes
+    modelo.previsto_fora_dobra = pd.DataFrame(np.exp(fora) * modelo.suavizacao, index=df['jogo_id'].to_numpy(),
+                                              columns=['publico_pago', 'receita_ingresso_mil_rs'])
+    realizado = np.exp(y)
+    for j, alvo in enumerate(['publico_pago', 'receita_ingresso_mil_rs']):
+        modelo.qualidade[alvo] = {
+            'r2_log': float(1 - residuos[:, j].var() / y[:, j].var()),
+            'r2_log_fora_dobra': float(1 - (y[:, j] - fora[:, j]).var() / y[:, j].var()),
+            'mape_fora_dobra': float(np.mean(np.abs(np.exp(fora[:, j]) * modelo.suavizacao[j] / realizado[:, j] - 1))),
+        }
+    modelo.jogos = len(df)
+    return modelo
+
+
+# --- 3. CACHE DO MODELO AJUSTADO ---
+def chave_modelo(diretorio=None):
+    h = hashlib.sha256(f'v{VERSAO_MODELO};ridge={RIDGE}'.encode())
+    h.update(ingestao.assinatura_dados(diretorio, TABELAS_MODELO).encode())
+    with open(os.path.abspath(__file__), 'rb') as f:
+        h.update(f.read())
+    return h.hexdigest()[:16]
+
+
+def _gravar_modelo(modelo, caminho):
+    # Arrays do ajuste e, em JSON, categorias, tickets de referência e qualidade (sem pickle)
+    descricao = {'categorias': modelo.categorias, 'ticket_referencia': modelo.ticket_referencia,
+                 'qualidade': modelo.qualidade, 'jogos': modelo.jogos}
+    temporario = f'{caminho}.{os.getpid()}.tmp'
+    with open(temporario, 'wb') as f:
+        np.savez(f, descricao=np.array(json.dumps(descricao)), coeficientes=modelo.coeficientes,
+                 suavizacao=modelo.suavizacao, fora_jogo_id=modelo.previsto_fora_dobra.index.to_numpy(),
+                 fora_previsto=modelo.previsto_fora_dobra.to_numpy())
+    os.replace(temporario, caminho)
+
+
+def _ler_modelo(caminho):
+    with np.load(caminho, allow_pickle=False) as arquivo:
+        descricao = json.loads(str(arquivo['descricao']))
+        modelo = ModeloProjecao(descricao['categorias'], descricao['ticket_referencia'])
+        modelo.qualidade = descricao['qualidade']
+        modelo.jogos = descricao['jogos']
+        modelo.coeficientes = arquivo['coeficientes']
+        modelo.suavizacao = arquivo['suavizacao']
+        modelo.previsto_fora_dobra = pd.DataFrame(arquivo['fora_previsto'], index=arquivo['fora_jogo_id'],
+                                                  columns=['publico_pago', 'receita_ingresso_mil_rs'])
+    return modelo
+
+
+def obter_modelo(diretorio=None):
+    # Modelo em memória, senão do disco, senão ajustado agora (e gravado)
+    chave = chave_modelo(diretorio)
+    if chave in _MODELOS:
+        return _MODELOS[chave]
+    pasta = os.path.join(diretorio or ingestao.DIRETORIO_PADRAO, NOME_MODELO)
+    caminho = os.path.join(pasta, f'modelo_{chave}.npz')
+    try:
+        modelo = _ler_modelo(caminho)
+    except Exception:
+        # Qualquer falha de leitura (ausente, truncado, formato antigo) é só um cache perdido
+        modelo = ajustar(ingestao.carregar_tabelas(diretorio, tabelas=TABELAS_MODELO))
+        os.makedirs(pasta, exist_ok=True)
+        _gravar_modelo(modelo, caminho)
+        for antigo in glob.glob(os.path.join(pasta, 'modelo_*.npz')) + glob.glob(os.path.join(pasta, 'modelo_*.pkl')):
+            if antigo != caminho:
+                os.remove(antigo)
+    _MODELOS[chave] = modelo
+    return modelo
+
+
+# --- 4. CENÁRIOS ---
+def grade_cenarios(adversarios, **eixos):
+    # Produto cartesiano: cada adversário (linhas de dim_adversario) x cada combinação
+    # dos eixos (ex.: dia_semana=[...], feriado=[...], ticket_medio_ingresso_rs=[...])
+    grade = pd.MultiIndex.from_product(list(eixos.values()), names=list(eixos)).to_frame(index=False)
+    return adversarios[['nome_adversario', 'nivel_confronto', 'competicao']].merge(grade, how='cross')
+
+
+def projetar_jogos(tabelas, modelo):
+    # fato_projecao dos jogos realizados com a previsão fora da dobra de cada jogo
+    # (o jogo não entra no ajuste que o projeta)
+    df = historico(tabelas)
+    previsto = modelo.previsto_fora_dobra.reindex(df['jogo_id'].to_numpy())
+    completo = modelo.prever(df.drop(columns=['ticket_medio_ingresso_rs']))
+    publico = previsto['publico_pago'].fillna(completo['publico_projetado']).clip(upper=CAPACIDADE)
+    return pd.DataFrame({
+        'jogo_id': df['jogo_id'],
+        'adversario': df['nome_adversario'],
+        'publico_projetado': publico.round().astype(np.int64).to_numpy(),
+        'receita_projetada_mil_rs': previsto['receita_ingresso_mil_rs'].fillna(
+            completo['receita_projetada_mil_rs']).round(3).to_numpy(),
+        'base_analise': 'Modelo: ' + df['dia_semana'] + ', ' + df['nivel_confronto'] + ', ' + df['competicao'],
+    })
+
+
+# --- 5. AVALIAÇÃO ---
+def avaliar(diretorio=None, cenarios=(1_000, 10_000, 100_000)):
+    tabelas = ingestao.carregar_tabelas(diretorio, tabelas=TABELAS_MODELO + ['fato_projecao'])
+    inicio = time.perf_counter()
+    modelo = ajustar(tabelas)
+    print(f"✅ Modelo ajustado em {(time.perf_counter() - inicio) * 1000:.0f} ms com {modelo.jogos} jogos")
+    for alvo, q in modelo.qualidade.items():
+        print(f"   {alvo:<26} R² log {q['r2_log']:.3f} | fora da dobra {q['r2_log_fora_dobra']:.3f}"
+              f" | erro médio fora da dobra {q['mape_fora_dobra'] * 100:.1f}%")
+    real = tabelas['fato_jogos'].set_index('jogo_id')['publico_pago']
+    atual = tabelas['fato_projecao'].set_index('jogo_id')['publico_projetado'].reindex(real.index)
+    print(f"   fato_projecao atual: erro médio de público {np.mean(np.abs(atual / real - 1)) * 100:.1f}%")
+
+    adversarios = tabelas['dim_adversario']
+    for n in cenarios:
+        tickets = np.linspace(40, 300, max(1, n // (len(adversarios) * 7 * 2)))
+        grade = grade_cenarios(adversarios, dia_semana=DIAS_SEMANA, feriado=[False, True],
+                               ticket_medio_ingresso_rs=tickets)
+        inicio = time.perf_counter()
+        modelo.prever(grade)
+        print(f"⏱️ {len(grade):>8,} cenários projetados em {(time.perf_counter() - inicio) * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Modelo de projeção de público e receita de ingressos.')
+    parser.add_argument('comando', nargs='?', default='avaliar', choices=['avaliar', 'gravar'],
+                        help='avaliar: qualidade e tempo de previsão; gravar: regrava fato_projecao.csv com o modelo')
+    parser.add_argument('diretorio', nargs='?', default=None, help='pasta dos CSVs (padrão: MINEIRAO_DADOS)')
+    args = parser.parse_args()
+
+    if args.comando == 'gravar':
+        projecao = projetar_jogos(ingestao.carregar_tabelas(args.diretorio, tabelas=TABELAS_MODELO),
+                                  obter_modelo(args.diretorio))
+        caminho = os.path.join(args.diretorio or ingestao.DIRETORIO_PADRAO, 'fato_projecao.csv')
+        projecao.to_csv(caminho, sep=';', decimal=',', index=False, encoding='utf-8')
+        print(f"✅ {len(projecao)} projeções gravadas em {caminho}")
+    else:
+        avaliar(args.diretorio)
@@ -0,0 +1,348 @@
+import os
+import re
+import sys
+import gzip
+import json
+import time
+import hashlib
+import argparse
+import subprocess
+
+import plotly.io as pio
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# --- 1. CONFIGURAÇÃO ---
+# Modo de servir do app em app.server (Flask):
+#   - respostas comprimidas com brotli (se o pacote estiver instalado) ou gzip, conforme o
+#     Accept-Encoding; os bundles JS do Dash usam as cópias pré-comprimidas em
+#     <dados>/.estaticos_comprimidos (python servidor_http.py --pre-comprimir)
+#   - ETags fortes: figuras pela chave do snapshot (snapshot.chave_snapshot), o resto pelo
+#     conteúdo; If-None-Match igual devolve 304 sem corpo
+#   - as 9 figuras saem do layout e cada painel busca as suas em GET /_figuras/<id> quando
+#     entra na tela, com cache HTTP no navegador
+# MINEIRAO_HTTP=0 volta ao modo original (figuras embutidas no layout, sem compressão).
+HTTP_OTIMIZADO = os.environ.get('MINEIRAO_HTTP', '1') != '0'
+NOME_ESTATICOS = '.estaticos_comprimidos'
+ROTA_FIGURAS = '/_figuras/'
+
+# Respostas menores que um pacote TCP não compensam a compressão
+MIN_BYTES_COMPRESSAO = 1400
+TIPOS_COMPRIMIVEIS = ('text/', 'application/json', 'application/javascript', 'image/svg+xml')
+# Qualidade: dinâmica (a cada resposta) e estática (pré-compressão, feita uma vez)
+QUALIDADE_DINAMICA = {'br': 5, 'gzip': 6}
+QUALIDADE_ESTATICA = {'br': 11, 'gzip': 9}
+ROTA_ESTATICOS = '/_dash-component-suites/'
+# Recursos carregados pelo navegador depois do índice (gráficos, dropdowns, sliders e plotly.js)
+RECURSOS_ASSINCRONOS = [('dash', 'dcc/async-graph.js'), ('dash', 'dcc/async-dropdown.js'),
+                        ('dash', 'dcc/async-slider.js'), ('plotly', 'package_data/plotly.min.js')]
+
+
+# --- 2. COMPRESSÃO E ETAG ---
+def escolher_codificacao(aceitas):
+    # aceitas: request.accept_encodings do Werkzeug (qualidade 0 = não aceita)
+    if brotli is not None and aceitas['br']:
+        return 'br'
+    if aceitas['gzip']:
+        return 'gzip'
+    return None
+
+
+def comprimir(dados, codificacao, qualidade):
+    if codificacao == 'br':
+        return brotli.compress(dados, quality=qualidade)
+    return gzip.compress(dados, compresslevel=qualidade, mtime=0)
+
+
+def comprimivel(resposta):
+    return (resposta.status_code == 200 and not resposta.direct_passthrough and not resposta.is_streamed
+            and 'Content-Encoding' not in resposta.headers and resposta.mimetype.startswith(TIPOS_COMPRIMIVEIS))
+
+
+def etag(base, codificacao):
+    # Uma ETag forte por representação: o mesmo conteúdo em br e gzip tem tags diferentes
+    return f'{base}-{codificacao}' if codificacao else base
+
+
+class EstaticosComprimidos:
+    # Cópias comprimidas dos bundles JS pelo sha256 do conteúdo: em disco (pré-comprimidas
+    # na qualidade máxima) ou, na falta delas, comprimidas uma vez por processo na
+    # qualidade dinâmica (brotli 11 no plotly.js leva ~17 s)
+    def __init__(self, diretorio):
+        self.diretorio = diretorio
+        self.memoria = {}
+
+    def caminho(self, chave, codificacao):
+        return os.path.join(self.diretorio, f'{chave}.{codificacao}')
+
+    def obter(self, dados, codificacao):
+        chave = hashlib.sha256(dados).hexdigest()[:20]
+        if (chave, codificacao) not in self.memoria:
+            try:
+                with open(self.caminho(chave, codificacao), 'rb') as f:
+                    self.memoria[chave, codificacao] = f.read()
+            except OSError:
+                self.memoria[chave, codificacao] = comprimir(dados, codificacao, QUALIDADE_DINAMICA[codificacao])
+        return self.memoria[chave, codificacao]
+
+    def gravar(self, dados):
+        # Pré-compressão na qualidade máxima; retorna {codificação: bytes}
+        os.makedirs(self.diretorio, exist_ok=True)
+        chave = hashlib.sha256(dados).hexdigest()[:20]
+        tamanhos = {}
+        for codificacao in (['br'] if brotli is not None else []) + ['gzip']:
+            caminho = self.caminho(chave, codificacao)
+            if not os.path.exists(caminho):
+                temporario = f'{caminho}.{os.getpid()}.tmp'
+                with open(temporario, 'wb') as f:
+                    f.write(comprimir(dados, codificacao, QUALIDADE_ESTATICA[codificacao]))
+                os.replace(temporario, caminho)
+            tamanhos[codificacao] = os.path.getsize(caminho)
+        return tamanhos
+
+
+# --- 3. INSTALAÇÃO NO SERVIDOR ---
+def instalar_no_servidor(servidor, figuras, chave, diretorio):
+    # figuras: id do gráfico -> função sem argumentos que devolve a figura Plotly (chamada
+    # só na primeira requisição de cada figura); chave: hash dos dados e do código.
+    import flask
+
+    estaticos = EstaticosComprimidos(os.path.join(diretorio, NOME_ESTATICOS))
+    corpos_figuras = {}
+
+    @servidor.route(ROTA_FIGURAS + '<id_grafico>')
+    def _figura(id_grafico):
+        if id_grafico not in figuras:
+            flask.abort(404)
+        base = f'{chave}-{id_grafico}'
+        codificacao = escolher_codificacao(flask.request.accept_encodings)
+        tag = etag(base, codificacao)
+        if flask.request.if_none_match.contains(tag):
+            resposta = flask.Response(status=304)
+        else:
+            # JSON e versões comprimidas guardados por processo: a figura não muda sem mudar a chave
+            if (id_grafico, codificacao) not in corpos_figuras:
+                if (id_grafico, None) not in corpos_figuras:
+                    corpos_figuras[id_grafico, None] = pio.to_json(figuras[id_grafico](), validate=False).encode()
+                if codificacao:
+                    corpos_figuras[id_grafico, codificacao] = comprimir(
+                        corpos_figuras[id_grafico, None], codificacao, QUALIDADE_DINAMICA[codificacao])
+            resposta = flask.Response(corpos_figuras[id_grafico, codificacao], mimetype='application/json')
+            if codificacao:
+                resposta.headers['Content-Encoding'] = codificacao
+        resposta.set_etag(tag)
+        resposta.headers['Cache-Control'] = 'no-cache'
+        resposta.vary.add('Accept-Encoding')
+        return resposta
+
+    @servidor.after_request
+    def _comprimir(resposta):
+        if not comprimivel(resposta):
+            return resposta
+        dados = resposta.get_data()
+        codificacao = escolher_codificacao(flask.request.accept_encodings)
+        estatico = flask.request.path.startswith(ROTA_ESTATICOS)
+        if flask.request.method == 'GET' and not estatico and 'ETag' not in resposta.headers:
+            # Layout e dependências: ETag pelo conteúdo (o índice traz um end_id aleatório
+            # por requisição e nunca repete a tag)
+            tag = etag(hashlib.sha256(dados).hexdigest()[:20], codificacao)
+            resposta.set_etag(tag)
+            resposta.headers['Cache-Control'] = 'no-cache'
+            if flask.request.if_none_match.contains(tag):
+                resposta.status_code = 304
+                resposta.set_data(b'')
+                return resposta
+        if codificacao is None or len(dados) < MIN_BYTES_COMPRESSAO:
+            return resposta
+        resposta.set_data(estaticos.obter(dados, codificacao) if estatico
+                          else comprimir(dados, codificacao, QUALIDADE_DINAMICA[codificacao]))
+        resposta.headers['Content-Encoding'] = codificacao
+        resposta.vary.add('Accept-Encoding')
+        return resposta
+
+    return estaticos
+
+
+# --- 4. PAINÉIS SOB DEMANDA (NAVEGADOR) ---
+# Por painel, um callback no navegador observa o painel (IntersectionObserver) e, quando
+# ele entra na tela, marca o Store visivel-<painel>; um segundo callback busca então as
+# figuras do painel em paralelo. Gráficos com filtro ativo já foram montados pelos
+# callbacks de filtro e não são sobrescritos pela figura sem filtro.
+_JS_OBSERVAR = """
+function(id) {
+    var marcar = function() { window.dash_clientside.set_props('visivel-' + id, {data: true}); };
+    var armar = function(tentativas) {
+        var alvo = document.getElementById(id);
+        if (!alvo && tentativas > 0) { setTimeout(function() { armar(tentativas - 1); }, 50); return; }
+        if (!alvo || !('IntersectionObserver' in window)) { marcar(); return; }
+        var observador = new IntersectionObserver(function(entradas) {
+            if (entradas.some(function(e) { return e.isIntersecting; })) { observador.disconnect(); marcar(); }
+        }, {rootMargin: '200px'});
+        observador.observe(alvo);
+    };
+    armar(20);
+    return window.dash_clientside.no_update;
+}
+"""
+
+_JS_CARREGAR = """
+function(visivel, ...filtros) {
+    var graficos = %s;
+    var ids = Object.keys(graficos);
+    var pular = function(id) { return graficos[id].some(function(i) { return filtros[i] && filtros[i].length; }); };
+    if (!visivel) { return ids.map(function() { return window.dash_clientside.no_update; }); }
+    return Promise.all(ids.map(function(id) {
+        if (pular(id)) { return window.dash_clientside.no_update; }
+        return fetch('%s' + id).then(function(r) { return r.ok ? r.json() : window.dash_clientside.no_update; });
+    }));
+}
+"""
+
+
+def registrar_paineis(app, paineis, filtros):
+    # paineis: id do painel -> {id do gráfico: índices em filtros dos filtros que ele usa};
+    # filtros: ids dos Dropdowns de filtro (lidos como State)
+    from dash import Input, Output, State
+
+    for painel, graficos in paineis.items():
+        app.clientside_callback(_JS_OBSERVAR, Output(f'visivel-{painel}', 'data'), Input(painel, 'id'))
+        app.clientside_callback(_JS_CARREGAR % (json.dumps(graficos), ROTA_FIGURAS),
+                                [Output(g, 'figure', allow_duplicate=True) for g in graficos],
+                                Input(f'visivel-{painel}', 'data'), *(State(f, 'value') for f in filtros),
+                                prevent_initial_call=True)
+
+
+# --- 5. MEDIÇÃO: BYTES TRANSFERIDOS E TEMPO ATÉ INTERATIVO ---
+# Latência de ida e volta por conexão, junto com a banda de export_offline.CONEXOES_MBPS
+LATENCIA_S = {'3G': 0.3, '4G congestionado': 0.15, 'Wi-Fi': 0.02}
+
+
+def _recursos(app, cliente):
+    # URLs que o navegador baixa para montar a página, na ordem das rodadas de requisições:
+    # índice, scripts do índice, layout e dependências, recursos assíncronos
+    indice = cliente.get('/', headers={'Accept-Encoding': 'identity'}).get_data(as_text=True)
+    scripts = [s for s in re.findall(r'<script src="([^"]+)"', indice)]
+    with app.server.test_request_context():
+        assincronos = app._collect_and_register_resources(
+            [{'relative_package_path': caminho, 'namespace': pacote} for pacote, caminho in RECURSOS_ASSINCRONOS])
+    return [['/'], scripts, ['/_dash-layout', '/_dash-dependencies'], assincronos]
+
+
+def medir_carga():
+    # Roda no processo do app (python servidor_http.py --medir): uma primeira visita e uma
+    # visita repetida com o cache do navegador (ETag e max-age), pelo cliente de teste do Flask
+    import app as modulo_app
+
+    cliente = modulo_app.app.server.test_client()
+    cabecalhos = {'Accept-Encoding': 'br, gzip'}
+    rodadas = _recursos(modulo_app.app, cliente)
+    if HTTP_OTIMIZADO:
+        # Painel 1 (primeira tela) numa rodada; os demais quando o usuário rolar a página
+        paineis = list(modulo_app.PAINEIS.values())
+        rodadas.append([ROTA_FIGURAS + g for g in paineis[0]])
+        depois = [ROTA_FIGURAS + g for painel in paineis[1:] for g in painel]
+    else:
+        depois = []
+
+    cache = {}
+
+    def baixar(urls, repetida):
+        # (bytes, segundos de servidor, requisições feitas)
+        total, servidor, requisicoes = 0, 0.0, 0
+        for url in urls:
+            extra = {}
+            if repetida and url in cache:
+                if 'max-age' in (cache[url].headers.get('Cache-Control') or ''):
+                    continue  # bundle com impressão digital: nem vai ao servidor
+                if cache[url].headers.get('ETag'):
+                    extra['If-None-Match'] = cache[url].headers['ETag']
+            inicio = time.perf_counter()
+            resposta = cliente.get(url, headers={**cabecalhos, **extra})
+            servidor += time.perf_counter() - inicio
+            total += len(resposta.get_data())
+            requisicoes += 1
+            if resposta.status_code == 200:
+                cache[url] = resposta
+        return total, servidor, requisicoes
+
+    resultado = {}
+    for visita, repetida in (('primeira', False), ('repetida', True)):
+        por_rodada = [baixar(urls, repetida) for urls in rodadas]
+        resto = baixar(depois, repetida)
+        resultado[visita] = {
+            'bytes_interativo': sum(r[0] for r in por_rodada), 'servidor_s': sum(r[1] for r in por_rodada),
+            'rodadas': sum(r[2] > 0 for r in por_rodada), 'bytes_total': sum(r[0] for r in por_rodada) + resto[0],
+        }
+    return resultado
+
+
+def relatorio(diretorio=None):
+    # Cada modo sobe o app num processo novo, como um worker do gunicorn
+    from export_offline import CONEXOES_MBPS
+
+    aqui = os.path.dirname(os.path.abspath(__file__))
+    ambiente = dict(os.environ)
+    if diretorio:
+        ambiente['MINEIRAO_DADOS'] = diretorio
+    modos = [('original', '0'), ('otimizado', '1')]
+    resultados = {}
+    for nome, valor in modos:
+        saida = subprocess.run([sys.executable, os.path.join(aqui, 'servidor_http.py'), '--medir'], cwd=aqui,
+                               env={**ambiente, 'MINEIRAO_HTTP': valor}, capture_output=True, text=True, check=True)
+        resultados[nome] = json.loads(saida.stdout.strip().splitlines()[-1])
+
+    def kb(n):
+        return f"{n / 1024:,.1f} KB"
+
+    print(f"{'Modo / visita':<24}{'Até interativo':>16}{'Página inteira':>16}{'Servidor':>11}"
+          + ''.join(f"{'TTI ' + c:>22}" for c in CONEXOES_MBPS))
+    for nome, _ in modos:
+        for visita, r in resultados[nome].items():
+            # Estimativa: rodadas x latência + bytes / banda + tempo de servidor (sem parse/execução do JS)
+            tti = [r['rodadas'] * LATENCIA_S[c] + r['bytes_interativo'] * 8 / (mbps * 1e6) + r['servidor_s']
+                   for c, mbps in CONEXOES_MBPS.items()]
+            print(f"{nome + ', ' + visita:<24}{kb(r['bytes_interativo']):>16}{kb(r['bytes_total']):>16}"
+                  f"{r['servidor_s'] * 1000:>9.0f}ms" + ''.join(f"{t:>21.2f}s" for t in tti))
+    return resultados
+
+
+def pre_comprimir(diretorio=None):
+    # Grava as cópias br/gzip na qualidade máxima de todos os bundles que a página usa.
+    # O app lê a pasta de MINEIRAO_DADOS ao ser importado: o diretório pedido vai para o
+    # ambiente antes, e as cópias ficam na mesma pasta de onde o app as serve
+    os.environ['MINEIRAO_HTTP'] = '1'
+    if diretorio:
+        os.environ['MINEIRAO_DADOS'] = diretorio
+    import ingestao
+    import app as modulo_app
+
+    if diretorio and os.path.abspath(diretorio) != os.path.abspath(ingestao.DIRETORIO_PADRAO):
+        raise RuntimeError(f"app já carregado com os dados de {ingestao.DIRETORIO_PADRAO}, não de {diretorio}")
+    cliente = modulo_app.app.server.test_client()
+    estaticos = EstaticosComprimidos(os.path.join(ingestao.DIRETORIO_PADRAO, NOME_ESTATICOS))
+    inicio = time.perf_counter()
+    for url in [u for rodada in _recursos(modulo_app.app, cliente) for u in rodada if u.startswith(ROTA_ESTATICOS)]:
+        dados = cliente.get(url, headers={'Accept-Encoding': 'identity'}).get_data()
+        tamanhos = estaticos.gravar(dados)
+        print(f"{url.rsplit('/', 1)[-1][:60]:<62}{len(dados) / 1024:>10,.1f} KB"
+              + ''.join(f"{c:>8} {t / 1024:>9,.1f} KB" for c, t in tamanhos.items()))
+    print(f"✅ Bundles pré-comprimidos em {estaticos.diretorio} ({time.perf_counter() - inicio:.1f} s)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compressão, ETags e figuras sob demanda no servidor do app.')
+    parser.add_argument('diretorio', nargs='?', default=None, help='pasta dos CSVs (padrão: MINEIRAO_DADOS)')
+    parser.add_argument('--pre-comprimir', action='store_true', help='grava as cópias br/gzip dos bundles JS')
+    parser.add_argument('--relatorio', action='store_true', help='compara bytes e tempo até interativo por modo')
+    parser.add_argument('--medir', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.pre_comprimir:
+        pre_comprimir(args.diretorio)
+    elif args.medir:
+        print(json.dumps(medir_carga()))
+    else:
+        relatorio(args.diretorio)
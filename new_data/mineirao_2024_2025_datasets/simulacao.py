@@ -0,0 +1,151 @@
+import os
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import gerador
+
+# --- 1. CONFIGURAÇÃO ---
+# Simulação Monte Carlo de temporadas com o modelo de jogo do gerador (gerar_fato_jogo
+# do notebook): público pela força do adversário e fim de semana, multiplicadores de
+# ticket, 60% do público consumindo no mix de produtos. Cada jogo do calendário tem o
+# seu fluxo aleatório (SeedSequence(seed, spawn_key=(jogo_id,))), então o resultado
+# não depende de quantos processos nem de como os jogos foram divididos entre eles.
+# Cada processo sorteia as N temporadas de um bloco de jogos como arrays jogos x N e
+# devolve os percentis por jogo e as somas por temporada (ano) do bloco.
+PERCENTIS = (10, 50, 90)
+MEDIDAS = ['publico', 'receita_total_mil_rs', 'ticket_medio_total_rs']
+# Elementos (temporadas x jogos) por bloco: limita a memória de cada processo
+ELEMENTOS_POR_BLOCO = 4_000_000
+# Temporadas simuladas para as faixas das figuras 1 e 2 do dashboard
+SIMULACOES_DASHBOARD = 2000
+SEED_PADRAO = 42
+
+
+# --- 2. CALENDÁRIO ---
+def calendario(df_dashboard):
+    # Jogos a simular: jogo_id, data, temporada (ano), adversário e fim de semana
+    data = pd.to_datetime(df_dashboard['data'])
+    return pd.DataFrame({
+        'jogo_id': df_dashboard['jogo_id'].to_numpy(),
+        'data_jogo': df_dashboard['data_jogo'].to_numpy(),
+        'ano': data.dt.year.to_numpy(),
+        'adversario_id': df_dashboard['adversario_id'].to_numpy(),
+        'fim_de_semana': (data.dt.dayofweek >= 5).to_numpy(),
+    })
+
+
+# --- 3. SORTEIO DE UM BLOCO DE JOGOS ---
+def simular_bloco(jogo_id, adversario_id, fim_de_semana, codigo_ano, anos, n, seed):
+    # Percentis por jogo (medida -> array len(PERCENTIS) x jogos) e somas de público e
+    # receita por temporada (anos x n). Os sorteios são os mesmos de gerador.gerar_jogos.
+    # Arrays jogos x temporadas: cada jogo é uma linha contígua (sorteio e percentil rápidos).
+    normais = np.empty((len(jogo_id), n))
+    uniformes = np.empty((len(jogo_id), n))
+    for j, jogo in enumerate(jogo_id):
+        rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(int(jogo),)))
+        rng.standard_normal(out=normais[j])
+        rng.random(out=uniformes[j])
+
+    adversario_id = adversario_id[:, None]
+    media = gerador.media_publico(adversario_id, fim_de_semana[:, None])
+    publico = gerador.limitar_publico(media + media * 0.1 * normais)
+    ticket = gerador.multiplicar_ticket(70 + 80 * uniformes, adversario_id)
+    consumo = gerador.quantidades_consumo(publico) @ gerador.DIM_PRODUTO['preco_medio_rs'].to_numpy(float)
+    medidas = {
+        'publico': publico,
+        'receita_total_mil_rs': publico * ticket / 1000.0 + consumo / 1000,
+        'ticket_medio_total_rs': ticket + consumo / publico,
+    }
+    percentis = {nome: np.percentile(valores, PERCENTIS, axis=1) for nome, valores in medidas.items()}
+
+    # Soma por temporada: produto pela matriz ano x jogo (um 1 por jogo)
+    por_ano = np.zeros((anos, len(jogo_id)))
+    por_ano[codigo_ano, np.arange(len(jogo_id))] = 1
+    somas = {nome: por_ano @ medidas[nome] for nome in ('publico', 'receita_total_mil_rs')}
+    return percentis, somas
+
+
+def _blocos(jogos, n, trabalhadores):
+    # Ao menos 2 blocos por processo, cada um com até ELEMENTOS_POR_BLOCO sorteios
+    tamanho = max(1, min(-(-jogos // (2 * trabalhadores)), ELEMENTOS_POR_BLOCO // max(n, 1)))
+    return [slice(i, min(i + tamanho, jogos)) for i in range(0, jogos, tamanho)]
+
+
+# --- 4. SIMULAÇÃO DA TEMPORADA ---
+def simular(calendario_jogos, n=10_000, seed=SEED_PADRAO, trabalhadores=None):
+    # Retorna (por_jogo, por_temporada) com colunas <medida>_p10/_p50/_p90
+    trabalhadores = trabalhadores or os.cpu_count() or 1
+    anos, codigo_ano = np.unique(calendario_jogos['ano'].to_numpy(), return_inverse=True)
+    colunas = [calendario_jogos[c].to_numpy() for c in ('jogo_id', 'adversario_id', 'fim_de_semana')]
+    tarefas = [(*(c[fatia] for c in colunas), codigo_ano[fatia], len(anos), n, seed)
+               for fatia in _blocos(len(calendario_jogos), n, trabalhadores)]
+
+    if trabalhadores < 2 or len(tarefas) < 2:
+        resultados = [simular_bloco(*t) for t in tarefas]
+    else:
+        with ProcessPoolExecutor(min(trabalhadores, len(tarefas))) as executor:
+            resultados = list(executor.map(simular_bloco, *zip(*tarefas)))
+
+    por_jogo = calendario_jogos[['jogo_id', 'data_jogo', 'ano']].reset_index(drop=True)
+    for nome in MEDIDAS:
+        valores = np.concatenate([r[0][nome] for r in resultados], axis=1) if resultados else np.empty((len(PERCENTIS), 0))
+        for k, p in enumerate(PERCENTIS):
+            por_jogo[f'{nome}_p{p}'] = valores[k]
+
+    por_temporada = pd.DataFrame({'ano': anos, 'jogos': np.bincount(codigo_ano, minlength=len(anos))})
+    for nome in ('publico', 'receita_total_mil_rs'):
+        total = sum(r[1][nome] for r in resultados)
+        for k, p in enumerate(PERCENTIS):
+            por_temporada[f'{nome}_p{p}'] = np.percentile(total, p, axis=1)
+    return por_jogo, por_temporada
+
+
+def faixas_dashboard(df_dashboard):
+    # Faixas P10-P90 por jogo para as figuras 1 e 2; no modo de séries grandes as figuras
+    # são reduzidas no servidor e não mostram faixas
+    import figuras
+    if figuras.modo_series_grandes(df_dashboard):
+        return None
+    return simular(calendario(df_dashboard), SIMULACOES_DASHBOARD, trabalhadores=1)[0]
+
+
+# --- 5. RELATÓRIO E TEMPOS ---
+def relatorio(diretorio=None, n=100_000, trabalhadores=None, ano=None):
+    import pipeline
+    df_dashboard = pipeline.criar_pipeline(diretorio).obter('df_dashboard')
+    jogos = calendario(df_dashboard)
+    if ano is not None:
+        jogos = jogos[jogos['ano'] == ano]
+    inicio = time.perf_counter()
+    por_jogo, por_temporada = simular(jogos, n, trabalhadores=trabalhadores)
+    duracao = time.perf_counter() - inicio
+
+    def milhar(valor):
+        return f'{valor:,}'.replace(',', '.')
+    print(f"✅ {milhar(n)} temporadas simuladas ({len(jogos)} jogos, {milhar(len(jogos) * n)} jogos sorteados)"
+          f" em {duracao:.2f} s com {trabalhadores or os.cpu_count()} processo(s)")
+    real = df_dashboard.assign(ano=pd.to_datetime(df_dashboard['data']).dt.year).groupby('ano').agg(
+        receita_real=('receita_total_mil_rs_real', 'sum'))
+    print(f"{'Temporada':<11}{'Jogos':>6}{'Público P10':>14}{'P50':>12}{'P90':>12}{'Receita P10 (mil)':>20}"
+          f"{'P50':>12}{'P90':>12}{'Receita real':>14}")
+    for linha in por_temporada.itertuples():
+        print(f"{linha.ano:<11}{linha.jogos:>6}{linha.publico_p10:>14,.0f}{linha.publico_p50:>12,.0f}"
+              f"{linha.publico_p90:>12,.0f}{linha.receita_total_mil_rs_p10:>20,.0f}{linha.receita_total_mil_rs_p50:>12,.0f}"
+              f"{linha.receita_total_mil_rs_p90:>12,.0f}{real.loc[linha.ano, 'receita_real']:>14,.0f}")
+    real_jogo = por_jogo['jogo_id'].map(df_dashboard.set_index('jogo_id')['publico_pago_real'])
+    dentro = real_jogo.between(por_jogo['publico_p10'], por_jogo['publico_p90']).mean()
+    print(f"Jogos com público real dentro da faixa P10-P90: {dentro * 100:.0f}%")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Simulação Monte Carlo de temporadas (público e receita).')
+    parser.add_argument('diretorio', nargs='?', default=None, help='pasta dos CSVs (padrão: MINEIRAO_DADOS)')
+    parser.add_argument('--temporadas', type=int, default=100_000, help='temporadas simuladas')
+    parser.add_argument('--processos', type=int, default=None, help='processos (padrão: núcleos disponíveis)')
+    parser.add_argument('--ano', type=int, default=None, help='simula só o calendário dessa temporada')
+    args = parser.parse_args()
+    relatorio(args.diretorio, args.temporadas, args.processos, args.ano)
@@ -0,0 +1,255 @@
+import os
+import sys
+import json
+import time
+import glob
+import shutil
+import hashlib
+import argparse
+import subprocess
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pandas as pd
+import plotly
+
+import ingestao
+import consulta_sql
+import pipeline
+import validacao
+
+
+# --- 1. CONFIGURAÇÃO ---
+# Snapshot de inicialização do app: os quadros que o app usa (um Parquet por quadro) e o
+# JSON das 9 figuras, numa pasta por chave. Só formatos de dados, nada de pickle: um
+# arquivo trocado na pasta de dados não executa código ao ser lido. A chave é o hash dos
+# CSVs somado ao do código que produz os quadros e as figuras, então qualquer mudança nos
+# dados ou nas regras gera um snapshot novo. Workers do gunicorn carregam a pasta em
+# milissegundos em vez de refazer leitura, merges e figuras. Sem pyarrow, não há snapshot.
+NOME_SNAPSHOT = '.snapshot_app'
+VERSAO_SNAPSHOT = 2
+ARQUIVO_FIGURAS = 'figuras.json'
+
+# Módulos cujo código altera o conteúdo do snapshot
+FONTES = ['ingestao.py', 'juncao_estrela.py', 'tabela_mestre.py', 'consulta_sql.py', 'pipeline.py', 'figuras.py',
+          'amostragem.py', 'gerador.py', 'simulacao.py', 'filas_portoes.py', 'fato_torcedor.py']
+
+# Nós do pipeline guardados além das figuras (layout, filtros e agregados do app);
+# os quadros de detalhe só no backend pandas (no SQL os filtros consultam o Parquet)
+QUADROS = ['dim_data', 'dim_adversario', 'dim_setor', 'df_dashboard', 'df_simulacao', 'df_filas_setor']
+QUADROS_DETALHE = ['df_consumo_detalhe', 'df_ingressos_canal', 'df_mobilidade_detalhe']
+
+# Variáveis de ambiente: MINEIRAO_SNAPSHOT=0 desliga o snapshot;
+# MINEIRAO_PARALELO escolhe 'processos', 'threads' ou 'serial' para montar as figuras.
+USAR_SNAPSHOT = os.environ.get('MINEIRAO_SNAPSHOT', '1') != '0'
+MODO_PARALELO = os.environ.get('MINEIRAO_PARALELO', 'processos')
+
+
+# --- 2. CHAVE E ARQUIVO ---
+def chave_snapshot(diretorio=None):
+    aqui = os.path.dirname(os.path.abspath(__file__))
+    h = hashlib.sha256(f'v{VERSAO_SNAPSHOT};pandas={pd.__version__};plotly={plotly.__version__};'
+                       f'compacto={ingestao.COMPACTO_PADRAO};backend={consulta_sql.BACKEND_PADRAO}'.encode())
+    h.update(ingestao.assinatura_dados(diretorio).encode())
+    for fonte in FONTES:
+        with open(os.path.join(aqui, fonte), 'rb') as f:
+            h.update(hashlib.sha256(f.read()).digest())
+    return h.hexdigest()[:16]
+
+
+def quadros(p):
+    return QUADROS + (QUADROS_DETALHE if p.backend == 'pandas' else [])
+
+
+def _caminho(diretorio, chave):
+    return os.path.join(diretorio or ingestao.DIRETORIO_PADRAO, NOME_SNAPSHOT, f'app_{chave}')
+
+
+def _remover(caminho):
+    # Snapshot antigo: pasta, ou arquivo .pkl de versões anteriores
+    if os.path.isdir(caminho):
+        shutil.rmtree(caminho, ignore_errors=True)
+    elif os.path.exists(caminho):
+        os.remove(caminho)
+
+
+def salvar(p, diretorio, chave):
+    if not ingestao.PARQUET_DISPONIVEL:
+        return None
+    caminho = _caminho(diretorio, chave)
+    # Grava numa pasta temporária e troca de uma vez: vários workers podem gerar o mesmo
+    # snapshot ao mesmo tempo sem que um leia a pasta pela metade
+    temporario = f'{caminho}.{os.getpid()}.tmp'
+    shutil.rmtree(temporario, ignore_errors=True)
+    os.makedirs(temporario)
+    tipos = {}
+    for nome in quadros(p):
+        df = p.obter(nome)
+        df.to_parquet(os.path.join(temporario, f'{nome}.parquet'))
+        # O Parquet não tem datetime64[s] (modo compacto): o tipo original volta na leitura
+        tipos[nome] = {str(col): str(tipo) for col, tipo in df.dtypes.items()}
+    conteudo = {
+        'chave': chave,
+        'tipos': tipos,
+        'figuras': {nome: json.loads(p.obter(nome).to_json()) for nome in pipeline.NOS_FIGURAS},
+    }
+    with open(os.path.join(temporario, ARQUIVO_FIGURAS), 'w', encoding='utf-8') as f:
+        json.dump(conteudo, f)
+    _remover(caminho)
+    try:
+        os.replace(temporario, caminho)
+    except OSError:
+        # Outro worker trocou primeiro: o snapshot dele tem o mesmo conteúdo
+        shutil.rmtree(temporario, ignore_errors=True)
+    for antigo in glob.glob(os.path.join(os.path.dirname(caminho), 'app_*')):
+        if antigo != caminho and not antigo.endswith('.tmp'):
+            _remover(antigo)
+    return caminho
+
+
+def carregar(p, diretorio, chave):
+    # Preenche o pipeline com o snapshot da chave; retorna False se ele não existir.
+    # As figuras voltam como dicionários (o JSON do Plotly), que o dcc.Graph aceita direto.
+    if not ingestao.PARQUET_DISPONIVEL:
+        return False
+    caminho = _caminho(diretorio, chave)
+    try:
+        with open(os.path.join(caminho, ARQUIVO_FIGURAS), encoding='utf-8') as f:
+            conteudo = json.load(f)
+        if conteudo.get('chave') != chave:
+            return False
+        lidos = {}
+        for nome in quadros(p):
+            df = pd.read_parquet(os.path.join(caminho, f'{nome}.parquet'))
+            tipos = conteudo['tipos'][nome]
+            diferentes = {col: tipos[str(col)] for col, tipo in df.dtypes.items() if str(tipo) != tipos[str(col)]}
+            lidos[nome] = df.astype(diferentes) if diferentes else df
+    except (OSError, ValueError, KeyError):
+        return False
+    # Em ordem de registro, para que definir() de um nó não descarte os já definidos
+    for nome in quadros(p):
+        p.definir(nome, lidos[nome])
+    for nome in pipeline.NOS_FIGURAS:
+        p.definir(nome, conteudo['figuras'][nome])
+    return True
+
+
+# --- 3. MONTAGEM PARALELA DAS FIGURAS ---
+def criar_executor(modo=None, nos=len(pipeline.NOS_FIGURAS)):
+    # Figuras do Plotly Express são Python puro e seguram o GIL: processos escalam
+    # com os núcleos, threads só ajudam nos trechos em pandas/numpy
+    modo = modo or MODO_PARALELO
+    trabalhadores = min(nos, os.cpu_count() or 1)
+    if modo == 'serial' or trabalhadores < 2:
+        return None
+    if modo == 'threads':
+        return ThreadPoolExecutor(trabalhadores)
+    return ProcessPoolExecutor(trabalhadores)
+
+
+def construir_figuras(p, modo=None):
+    executor = criar_executor(modo)
+    if executor is None:
+        return p.obter_em_paralelo(pipeline.NOS_FIGURAS)
+    with executor:
+        return p.obter_em_paralelo(pipeline.NOS_FIGURAS, executor)
+
+
+# --- 4. INICIALIZAÇÃO DO APP ---
+def preparar_pipeline(diretorio=None, tempos=None, usar_snapshot=None, modo=None, instrumentacao=None, validar=None):
+    # Pipeline com tudo que o app usa na inicialização já calculado.
+    # tempos (dict opcional) recebe a duração de cada fase: validacao, carga, transformacao,
+    # figuras e snapshot (cálculo da chave + leitura ou gravação).
+    # Dados reprovados na validação (validacao.py) levantam validacao.DadosInvalidos.
+    tempos = tempos if tempos is not None else {}
+    usar_snapshot = USAR_SNAPSHOT if usar_snapshot is None else usar_snapshot
+    if validacao.VALIDAR_PADRAO if validar is None else validar:
+        inicio = time.perf_counter()
+        validacao.exigir(diretorio)
+        tempos['validacao'] = time.perf_counter() - inicio
+    p = pipeline.criar_pipeline(diretorio)
+    p.instrumentacao = instrumentacao
+
+    chave = None
+    if usar_snapshot:
+        inicio = time.perf_counter()
+        chave = chave_snapshot(diretorio)
+        carregado = carregar(p, diretorio, chave)
+        tempos['snapshot'] = time.perf_counter() - inicio
+        if carregado:
+            tempos['origem'] = 'snapshot'
+            return p
+
+    # Fases forçadas em ordem: tabelas, quadros derivados e, por fim, as figuras
+    necessarios = p.a_montante(quadros(p) + pipeline.NOS_FIGURAS)
+    inicio = time.perf_counter()
+    for nome in necessarios:
+        if pipeline.categoria(nome) == 'carga':
+            p.obter(nome)
+    tempos['carga'] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for nome in necessarios:
+        if nome not in pipeline.NOS_FIGURAS:
+            p.obter(nome)
+    tempos['transformacao'] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    construir_figuras(p, modo)
+    tempos['figuras'] = time.perf_counter() - inicio
+
+    if usar_snapshot:
+        inicio = time.perf_counter()
+        salvar(p, diretorio, chave)
+        tempos['snapshot'] += time.perf_counter() - inicio
+    tempos['origem'] = 'calculado'
+    pipeline.devolver_memoria_livre()
+    return p
+
+
+def formatar_tempos(tempos):
+    fases = ['importacao', 'validacao', 'carga', 'transformacao', 'figuras', 'snapshot', 'total']
+    partes = [f"{fase} {tempos[fase] * 1000:.0f} ms" for fase in fases if fase in tempos]
+    return f"Inicialização ({tempos.get('origem', '?')}): " + ' | '.join(partes)
+
+
+def limpar(diretorio=None):
+    for caminho in glob.glob(os.path.join(diretorio or ingestao.DIRETORIO_PADRAO, NOME_SNAPSHOT, 'app_*')):
+        _remover(caminho)
+
+
+# --- 5. RELATÓRIO: INICIALIZAÇÃO DO APP COM E SEM SNAPSHOT ---
+def relatorio(diretorio=None):
+    # Cada cenário importa o app em um processo novo, como um worker do gunicorn
+    aqui = os.path.dirname(os.path.abspath(__file__))
+    ambiente = dict(os.environ)
+    if diretorio:
+        ambiente['MINEIRAO_DADOS'] = diretorio
+    cenarios = [
+        ('sem snapshot, serial', {'MINEIRAO_SNAPSHOT': '0', 'MINEIRAO_PARALELO': 'serial'}),
+        ('sem snapshot, processos', {'MINEIRAO_SNAPSHOT': '0', 'MINEIRAO_PARALELO': 'processos'}),
+        ('gerando snapshot', {'MINEIRAO_SNAPSHOT': '1'}),
+        ('lendo snapshot', {'MINEIRAO_SNAPSHOT': '1'}),
+    ]
+    limpar(diretorio)
+    print(f"Núcleos disponíveis: {os.cpu_count()}")
+    for nome, extra in cenarios:
+        saida = subprocess.run([sys.executable, '-c', 'import app'], cwd=aqui, env={**ambiente, **extra},
+                               capture_output=True, text=True, check=True).stdout
+        linha = next((l for l in saida.splitlines() if l.startswith('Inicialização')), saida.strip())
+        print(f"{nome:<26}{linha}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Snapshot de inicialização do app Dash.')
+    parser.add_argument('--limpar', action='store_true', help='Apaga o snapshot existente')
+    parser.add_argument('--relatorio', action='store_true', help='Compara a inicialização com e sem snapshot')
+    args = parser.parse_args()
+
+    if args.limpar:
+        limpar()
+    elif args.relatorio:
+        relatorio()
+    else:
+        tempos = {}
+        preparar_pipeline(tempos=tempos)
+        print(formatar_tempos(tempos))
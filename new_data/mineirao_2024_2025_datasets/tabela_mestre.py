@@ -0,0 +1,377 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import ingestao
+import juncao_estrela
+
+# --- 1. CONFIGURAÇÃO ---
+RENOMEAR_JOGOS = {
+    'receita_ingresso_mil_rs': 'receita_ingresso_mil_rs_real',
+    'publico_pago': 'publico_pago_real'
+}
+RENOMEAR_PROJECAO = {
+    'publico_projetado': 'publico_pago_projetado',
+    'receita_projetada_mil_rs': 'receita_ingresso_mil_rs_projetada'
+}
+COLUNAS_ADVERSARIO = ['adversario_id', 'nome_adversario', 'competicao', 'nivel_confronto', 'classico_local']
+COLUNAS_PROJECAO = ['jogo_id', 'publico_pago_projetado', 'receita_ingresso_mil_rs_projetada']
+
+# Estado incremental persistido (um Parquet por tabela), junto com a assinatura dos CSVs
+# de que ele foi derivado: estado e CSVs só andam juntos (seção 6)
+NOME_ESTADO = '.estado_master'
+DIRETORIO_ESTADO = os.path.join(ingestao.DIRETORIO_PADRAO, NOME_ESTADO)
+ARQUIVO_ASSINATURA = 'assinatura.txt'
+TABELAS_ESTADO = ['jogos', 'projecao', 'dim_data', 'dim_adversario',
+                  'parcial_consumo', 'parcial_ingressos', 'parcial_mobilidade', 'master']
+# Tabelas aceitas por anexar(): as com chave são atualizadas (upsert), os fatos ganham linhas
+CHAVES_UPSERT = {'dim_data': 'data_id', 'dim_adversario': 'adversario_id',
+                 'fato_jogos': 'jogo_id', 'fato_projecao': 'jogo_id'}
+# Tabela do estado que guarda as chaves de cada tabela com chave (seção 6)
+ESTADO_DA_FONTE = {'dim_data': 'dim_data', 'dim_adversario': 'dim_adversario',
+                   'fato_jogos': 'jogos', 'fato_projecao': 'projecao'}
+TABELAS_ANEXAVEIS = list(CHAVES_UPSERT) + ['fato_consumo', 'fato_mercado_ingressos', 'fato_mobilidade_incidentes']
+
+
+# --- 2. CONSTRUÇÃO COMPLETA DA TABELA MESTRE ---
+def calcular_kpis(df_master):
+    # Cálculo de Métricas Derivadas (KPIs)
+    df_master['receita_total_consumo_mil_rs'] = df_master['receita_total_consumo_rs'] / 1000
+    df_master['receita_total_mil_rs_real'] = df_master['receita_ingresso_mil_rs_real'] + df_master['receita_total_consumo_mil_rs'].fillna(0)
+    df_master['gap_publico_pago_perc'] = ((df_master['publico_pago_real'] - df_master['publico_pago_projetado']) / df_master['publico_pago_projetado']) * 100
+    df_master['gap_publico_pago_perc'] = df_master['gap_publico_pago_perc'].replace([np.inf, -np.inf], np.nan).round(2)
+    df_master['ticket_medio_consumo_rs_real'] = df_master['receita_total_consumo_rs'] / df_master['publico_pago_real']
+    df_master['ticket_medio_total_rs'] = df_master['ticket_medio_ingresso_rs'] + df_master['ticket_medio_consumo_rs_real'].fillna(0)
+    df_master['data_jogo'] = pd.to_datetime(df_master['data']).dt.date
+    return df_master
+
+
+def agregar_fatos(dataframes):
+    # Agregados dos fatos grandes por jogo/data (o backend SQL calcula os mesmos em
+    # consulta_sql.BancoSQL.agregados_master). Decimais do modo compacto voltam antes a float64.
+    # Agregação de Fato_Consumo
+    df_consumo = ingestao.decimais(dataframes['fato_consumo'][['jogo_id', 'receita_produto_rs']])
+    df_consumo_agg = df_consumo.groupby('jogo_id').agg(
+        receita_total_consumo_rs=('receita_produto_rs', 'sum')
+    ).reset_index()
+
+    # Ingressos e Mobilidade (Agregados)
+    df_ingressos_agg = dataframes['fato_mercado_ingressos'].groupby('data_id').agg(
+        socios_ativos_dia=('socios_ativos', 'max'),
+        novas_adesoes_dia=('novas_adesoes', 'max'),
+        vendas_total_ingressos=('vendas_canal', 'sum')
+    ).reset_index()
+    df_mobilidade_agg = ingestao.decimais(dataframes['fato_mobilidade_incidentes']).groupby('jogo_id').agg(
+        tempo_entrada_medio_min=('tempo_entrada_medio_min', 'mean'),
+        tempo_saida_medio_min=('tempo_saida_medio_min', 'mean'),
+        incidentes_total=('incidente_contagem', 'sum')
+    ).reset_index()
+    return {'consumo': df_consumo_agg, 'ingressos': df_ingressos_agg, 'mobilidade': df_mobilidade_agg}
+
+
+def juntar_master(dataframes, agregados):
+    # Fato_Jogos com Dimensões, Projeção e Agregados em uma junção em estrela por índice
+    # de chave (juncao_estrela.py), com a mesma ordem de colunas dos antigos merges
+    df_master = juncao_estrela.juntar(ingestao.decimais(dataframes['fato_jogos']), [
+        (dataframes['dim_data'], 'data_id', ['data']),
+        (dataframes['dim_adversario'], 'adversario_id', COLUNAS_ADVERSARIO[1:]),
+        (ingestao.decimais(dataframes['fato_projecao']), 'jogo_id', RENOMEAR_PROJECAO),
+        (agregados['consumo'], 'jogo_id', None),
+        (agregados['ingressos'], 'data_id', None),
+        (agregados['mobilidade'], 'jogo_id', None),
+    ], renomear_fato=RENOMEAR_JOGOS)
+
+    return calcular_kpis(df_master)
+
+
+def construir_master(dataframes):
+    # Reconstrução completa: agregações sobre os fatos inteiros + junção em estrela
+    return juntar_master(dataframes, agregar_fatos(dataframes))
+
+
+# --- 3. AGREGADOS PARCIAIS (combináveis: somas, contagens e máximos) ---
+# As médias são guardadas como soma + contagem para continuarem exatas após cada anexação.
+REGRAS_PARCIAIS = {
+    'parcial_consumo': ('jogo_id', {'receita_soma': 'sum'}),
+    'parcial_ingressos': ('data_id', {'socios_max': 'max', 'adesoes_max': 'max', 'vendas_soma': 'sum'}),
+    'parcial_mobilidade': ('jogo_id', {'entrada_soma': 'sum', 'entrada_contagem': 'sum',
+                                       'saida_soma': 'sum', 'saida_contagem': 'sum', 'incidentes_soma': 'sum'}),
+}
+
+
+def _parcial_consumo(fato_consumo):
+    return fato_consumo.groupby('jogo_id').agg(receita_soma=('receita_produto_rs', 'sum')).reset_index()
+
+
+def _parcial_ingressos(fato_mercado_ingressos):
+    return fato_mercado_ingressos.groupby('data_id').agg(
+        socios_max=('socios_ativos', 'max'),
+        adesoes_max=('novas_adesoes', 'max'),
+        vendas_soma=('vendas_canal', 'sum'),
+    ).reset_index()
+
+
+def _parcial_mobilidade(fato_mobilidade_incidentes):
+    return fato_mobilidade_incidentes.groupby('jogo_id').agg(
+        entrada_soma=('tempo_entrada_medio_min', 'sum'),
+        entrada_contagem=('tempo_entrada_medio_min', 'count'),
+        saida_soma=('tempo_saida_medio_min', 'sum'),
+        saida_contagem=('tempo_saida_medio_min', 'count'),
+        incidentes_soma=('incidente_contagem', 'sum'),
+    ).reset_index()
+
+
+# Agregado parcial -> (tabela fato de origem, função de cálculo)
+PARCIAIS = {
+    'parcial_consumo': ('fato_consumo', _parcial_consumo),
+    'parcial_ingressos': ('fato_mercado_ingressos', _parcial_ingressos),
+    'parcial_mobilidade': ('fato_mobilidade_incidentes', _parcial_mobilidade),
+}
+
+
+def _combinar_parciais(nome, atual, novo):
+    chave, regras = REGRAS_PARCIAIS[nome]
+    afetadas = novo[chave].unique()
+    mantidas = atual[~atual[chave].isin(afetadas)]
+    atualizadas = pd.concat([atual[atual[chave].isin(afetadas)], novo]).groupby(chave).agg(regras).reset_index()
+    return pd.concat([mantidas, atualizadas], ignore_index=True).sort_values(chave, ignore_index=True)
+
+
+def _upsert(atual, novo, chave):
+    # Linhas novas substituem as existentes com a mesma chave
+    return pd.concat([atual[~atual[chave].isin(novo[chave])], novo], ignore_index=True)
+
+
+# --- 4. MONTAGEM DAS LINHAS DA TABELA MESTRE A PARTIR DO ESTADO ---
+def _montar_linhas(jogos, estado):
+    # Junção em estrela por índice de chave: cada jogo busca direto a sua linha em cada
+    # dimensão/parcial, sem filtrar nem copiar o estado
+    mob = estado['parcial_mobilidade']
+    mob = pd.DataFrame({
+        'jogo_id': mob['jogo_id'],
+        'tempo_entrada_medio_min': mob['entrada_soma'] / mob['entrada_contagem'].replace(0, np.nan),
+        'tempo_saida_medio_min': mob['saida_soma'] / mob['saida_contagem'].replace(0, np.nan),
+        'incidentes_total': mob['incidentes_soma'],
+    })
+    df = juncao_estrela.juntar(jogos, [
+        (estado['dim_data'], 'data_id', None),
+        (estado['dim_adversario'], 'adversario_id', None),
+        (estado['projecao'], 'jogo_id', None),
+        (estado['parcial_consumo'], 'jogo_id', {'receita_soma': 'receita_total_consumo_rs'}),
+        (estado['parcial_ingressos'], 'data_id', {'socios_max': 'socios_ativos_dia', 'adesoes_max': 'novas_adesoes_dia',
+                                                  'vendas_soma': 'vendas_total_ingressos'}),
+        (mob, 'jogo_id', None),
+    ])
+    return calcular_kpis(df)
+
+
+def _ordenar_como_jogos(master, jogos):
+    posicao = pd.Index(jogos['jogo_id']).get_indexer(master['jogo_id'])
+    return master.iloc[np.argsort(posicao, kind='stable')].reset_index(drop=True)
+
+
+# --- 5. ESTADO INCREMENTAL ---
+def criar_estado(dataframes):
+    estado = {
+        'jogos': dataframes['fato_jogos'].rename(columns=RENOMEAR_JOGOS),
+        'projecao': dataframes['fato_projecao'].rename(columns=RENOMEAR_PROJECAO)[COLUNAS_PROJECAO],
+        'dim_data': dataframes['dim_data'][['data_id', 'data']],
+        'dim_adversario': dataframes['dim_adversario'][COLUNAS_ADVERSARIO],
+    }
+    for nome, (fato, calcular) in PARCIAIS.items():
+        estado[nome] = calcular(dataframes[fato])
+    estado['master'] = _montar_linhas(estado['jogos'], estado)
+    return estado
+
+
+def anexar(estado, novos):
+    # Aplica novas linhas de fatos/dimensões (mesmos nomes de ingestao.ESQUEMA) e
+    # recalcula só as linhas da tabela mestre dos jogo_id/data_id afetados.
+    # Retorna (novo_estado, jogo_ids_afetados).
+    estado = dict(estado)
+    jogos_afetados = set()
+    datas_afetadas = set()
+    adversarios_afetados = set()
+
+    if 'dim_data' in novos:
+        estado['dim_data'] = _upsert(estado['dim_data'], novos['dim_data'][['data_id', 'data']], 'data_id')
+        datas_afetadas.update(novos['dim_data']['data_id'])
+    if 'dim_adversario' in novos:
+        estado['dim_adversario'] = _upsert(estado['dim_adversario'], novos['dim_adversario'][COLUNAS_ADVERSARIO], 'adversario_id')
+        adversarios_afetados.update(novos['dim_adversario']['adversario_id'])
+    if 'fato_jogos' in novos:
+        estado['jogos'] = _upsert(estado['jogos'], novos['fato_jogos'].rename(columns=RENOMEAR_JOGOS), 'jogo_id')
+        jogos_afetados.update(novos['fato_jogos']['jogo_id'])
+    if 'fato_projecao' in novos:
+        projecao = novos['fato_projecao'].rename(columns=RENOMEAR_PROJECAO)[COLUNAS_PROJECAO]
+        estado['projecao'] = _upsert(estado['projecao'], projecao, 'jogo_id')
+        jogos_afetados.update(projecao['jogo_id'])
+
+    for nome, (fato, calcular) in PARCIAIS.items():
+        if fato not in novos or novos[fato].empty:
+            continue
+        parcial = calcular(novos[fato])
+        estado[nome] = _combinar_parciais(nome, estado[nome], parcial)
+        chave = REGRAS_PARCIAIS[nome][0]
+        (datas_afetadas if chave == 'data_id' else jogos_afetados).update(parcial[chave])
+
+    jogos = estado['jogos']
+    afetados = jogos['jogo_id'].isin(jogos_afetados) | jogos['data_id'].isin(datas_afetadas) \
+        | jogos['adversario_id'].isin(adversarios_afetados)
+    linhas = _montar_linhas(jogos[afetados], estado)
+
+    master = estado['master']
+    master = pd.concat([master[~master['jogo_id'].isin(linhas['jogo_id'])], linhas], ignore_index=True)
+    estado['master'] = _ordenar_como_jogos(master, jogos)
+    return estado, set(linhas['jogo_id'])
+
+
+def salvar_estado(estado, diretorio=DIRETORIO_ESTADO, assinatura=None):
+    os.makedirs(diretorio, exist_ok=True)
+    for nome in TABELAS_ESTADO:
+        df = estado[nome]
+        if nome == 'master':
+            df = df.drop(columns=['data_jogo'])  # recalculada na leitura (objetos date)
+        df.to_parquet(os.path.join(diretorio, f'{nome}.parquet'), index=False)
+    with open(os.path.join(diretorio, ARQUIVO_ASSINATURA), 'w') as f:
+        f.write(assinatura or '')
+
+
+def assinatura_estado(diretorio=DIRETORIO_ESTADO):
+    # Assinatura dos CSVs de que o estado salvo foi derivado (None se não há estado)
+    try:
+        with open(os.path.join(diretorio, ARQUIVO_ASSINATURA)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def carregar_estado(diretorio=DIRETORIO_ESTADO, tabelas=TABELAS_ESTADO):
+    estado = {nome: pd.read_parquet(os.path.join(diretorio, f'{nome}.parquet')) for nome in tabelas}
+    if 'master' in estado:
+        estado['master']['data_jogo'] = pd.to_datetime(estado['master']['data']).dt.date
+    return estado
+
+
+def estado_em_dia(diretorio=None):
+    # O estado salvo foi derivado dos CSVs atuais? Sem estado, nem calcula a assinatura dos CSVs
+    diretorio = diretorio or ingestao.DIRETORIO_PADRAO
+    assinatura = assinatura_estado(os.path.join(diretorio, NOME_ESTADO))
+    return assinatura is not None and assinatura == ingestao.assinatura_dados(diretorio)
+
+
+# --- 6. ANEXAÇÃO AOS CSVs DE ORIGEM ---
+# O app, o pipeline e o snapshot leem os CSVs; por isso a anexação grava as linhas novas
+# também neles. A assinatura dos CSVs muda, o que invalida os caches derivados (ingestão,
+# partições SQL, snapshot), e o estado salvo passa a ter a nova assinatura. O custo acompanha
+# as linhas novas: as chaves existentes vêm do estado, e o manifesto da ingestão encadeia o
+# hash só dos bytes anexados (ingestao._registrar_anexo).
+def gravar_fontes(novos, diretorio, estado):
+    # Fatos ganham linhas no fim do arquivo; tabelas com chave só são relidas e regravadas
+    # quando alguma chave já existia no estado (upsert, como em anexar)
+    for tabela, df in novos.items():
+        chave = CHAVES_UPSERT.get(tabela)
+        if chave and estado[ESTADO_DA_FONTE[tabela]][chave].isin(df[chave]).any():
+            atual = ingestao.ler_csv_tipado(os.path.join(diretorio, f'{tabela}.csv'), tabela)
+            ingestao.gravar_csv(_upsert(atual, df, chave), diretorio, tabela)
+        else:
+            ingestao.gravar_csv(df, diretorio, tabela, anexar=True)
+
+
+def anexar_fontes(novos, diretorio=None):
+    # Anexa ao estado e aos CSVs. Um estado ausente ou derivado de outros CSVs é
+    # reconstruído antes, para que o resultado corresponda sempre aos CSVs gravados.
+    diretorio = diretorio or ingestao.DIRETORIO_PADRAO
+    dir_estado = os.path.join(diretorio, NOME_ESTADO)
+    ignoradas = set(novos) - set(TABELAS_ANEXAVEIS)
+    if ignoradas:
+        raise ValueError(f"Tabelas não anexáveis: {', '.join(sorted(ignoradas))}")
+
+    if estado_em_dia(diretorio):
+        anterior = carregar_estado(dir_estado)
+    else:
+        anterior = criar_estado(ingestao.carregar_tabelas(diretorio, compacto=False))
+    estado, afetados = anexar(anterior, novos)
+    gravar_fontes(novos, diretorio, anterior)
+    salvar_estado(estado, dir_estado, ingestao.assinatura_dados(diretorio))
+    return estado, afetados
+
+
+# --- 7. VERIFICAÇÃO: INCREMENTAL == RECONSTRUÇÃO COMPLETA ---
+def _comparar(incremental, completo):
+    # Mesmos valores e mesmos dtypes da reconstrução completa
+    pd.testing.assert_frame_equal(
+        incremental.sort_values('jogo_id', ignore_index=True)[list(completo.columns)],
+        completo.sort_values('jogo_id', ignore_index=True),
+    )
+
+
+def _fatos_ate(dataframes, jogo_ids):
+    # Subconjunto dos fatos que pertencem aos jogos informados
+    datas = dataframes['fato_jogos'].loc[dataframes['fato_jogos']['jogo_id'].isin(jogo_ids), 'data_id']
+    parcial = dict(dataframes)
+    for nome in ['fato_jogos', 'fato_consumo', 'fato_mobilidade_incidentes', 'fato_projecao']:
+        parcial[nome] = dataframes[nome][dataframes[nome]['jogo_id'].isin(jogo_ids)]
+    parcial['fato_mercado_ingressos'] = dataframes['fato_mercado_ingressos'][
+        dataframes['fato_mercado_ingressos']['data_id'].isin(datas)]
+    return parcial
+
+
+def verificar_incremental(dataframes, jogos_iniciais=None):
+    # Simula rodadas: parte dos jogos forma o estado inicial e os demais são anexados
+    # um a um. Após cada anexação, o resultado é comparado à reconstrução completa.
+    ids = dataframes['fato_jogos']['jogo_id'].to_numpy()
+    jogos_iniciais = jogos_iniciais or max(1, len(ids) // 2)
+    estado = criar_estado(_fatos_ate(dataframes, ids[:jogos_iniciais]))
+    _comparar(estado['master'], construir_master(_fatos_ate(dataframes, ids[:jogos_iniciais])))
+
+    tempos = []
+    for i in range(jogos_iniciais, len(ids)):
+        rodada = _fatos_ate(dataframes, ids[i:i + 1])
+        # Na rodada anterior os ingressos dessa data podem já ter entrado
+        rodada['fato_mercado_ingressos'] = rodada['fato_mercado_ingressos'][
+            ~rodada['fato_mercado_ingressos']['data_id'].isin(estado['jogos']['data_id'])]
+        novos = {nome: rodada[nome] for nome in
+                 ['fato_jogos', 'fato_consumo', 'fato_mobilidade_incidentes', 'fato_projecao', 'fato_mercado_ingressos']}
+        inicio = time.perf_counter()
+        estado, _ = anexar(estado, novos)
+        tempos.append(time.perf_counter() - inicio)
+        _comparar(estado['master'], construir_master(_fatos_ate(dataframes, ids[:i + 1])))
+
+    inicio = time.perf_counter()
+    construir_master(dataframes)
+    tempo_completo = time.perf_counter() - inicio
+    print(f"✅ {len(tempos)} rodadas anexadas; tabela mestre idêntica à reconstrução completa após cada uma")
+    if tempos:
+        print(f"Anexação média: {np.mean(tempos) * 1000:.1f} ms | reconstrução completa: {tempo_completo * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Tabela mestre incremental (estado em .estado_master).')
+    parser.add_argument('comando', nargs='?', default='verificar', choices=['construir', 'anexar', 'verificar'],
+                        help='construir: estado a partir dos CSVs | anexar: aplica os CSVs de PASTA ao estado '
+                             'e aos CSVs de origem | verificar: incremental vs. reconstrução completa')
+    parser.add_argument('pasta', nargs='?', help='pasta com os CSVs a anexar (comando anexar)')
+    parser.add_argument('--dados', default=None, help='pasta dos CSVs de origem (padrão: MINEIRAO_DADOS)')
+    args = parser.parse_args()
+    dados = args.dados or ingestao.DIRETORIO_PADRAO
+
+    if args.comando == 'construir':
+        dir_estado = os.path.join(dados, NOME_ESTADO)
+        salvar_estado(criar_estado(ingestao.carregar_tabelas(dados, compacto=False)), dir_estado,
+                      ingestao.assinatura_dados(dados))
+        print(f"✅ Estado da tabela mestre salvo em: {dir_estado}")
+    elif args.comando == 'anexar':
+        if not args.pasta:
+            parser.error('anexar exige a pasta com os CSVs novos')
+        novos = {nome: ingestao.ler_csv_tipado(os.path.join(args.pasta, f'{nome}.csv'), nome)
+                 for nome in TABELAS_ANEXAVEIS if os.path.exists(os.path.join(args.pasta, f'{nome}.csv'))}
+        inicio = time.perf_counter()
+        estado, afetados = anexar_fontes(novos, dados)
+        print(f"✅ {len(afetados)} linha(s) da tabela mestre atualizada(s) em {(time.perf_counter() - inicio) * 1000:.1f} ms"
+              f" ({', '.join(novos)} anexados aos CSVs de {dados})")
+    else:
+        verificar_incremental(ingestao.carregar_tabelas(dados, compacto=False))
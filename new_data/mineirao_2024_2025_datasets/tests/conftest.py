@@ -0,0 +1,20 @@
+import glob
+import os
+import shutil
+import sys
+
+import pytest
+
+# Os módulos do projeto ficam na pasta pai, lado a lado, e são importados pelo nome
+PASTA_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PASTA_PROJETO)
+
+
+@pytest.fixture(scope='session')
+def dados(tmp_path_factory):
+    # Cópia dos 12 CSVs de amostra: os caches (.cache_ingestao, .particoes_sql...) vão
+    # para a pasta temporária e não tocam nos dados versionados
+    pasta = tmp_path_factory.mktemp('dados')
+    for caminho in glob.glob(os.path.join(PASTA_PROJETO, '*.csv')):
+        shutil.copy(caminho, pasta)
+    return str(pasta)
@@ -0,0 +1,21 @@
+import pytest
+
+import agregacao_particionada
+import ingestao
+
+pytest.importorskip('pyarrow')
+
+
+@pytest.mark.parametrize('trabalhadores', [1, 2, 3])
+def test_motor_igual_ao_caminho_pandas(dados, trabalhadores):
+    motor = agregacao_particionada.MotorParticionado({agregacao_particionada.ESTADIO_PADRAO: dados}, trabalhadores)
+    esperado = agregacao_particionada.caminho_pandas(ingestao.carregar_tabelas(dados, compacto=False))
+    assert agregacao_particionada.diferencas(esperado, motor.agregar_todos()) == []
+
+
+def test_um_lote_contiguo_por_processo(dados):
+    motor = agregacao_particionada.MotorParticionado({agregacao_particionada.ESTADIO_PADRAO: dados}, 2)
+    pastas = [p['fato_consumo'] for *_, p in motor.particoes() if 'fato_consumo' in p]
+    lotes = motor.lotes()
+    assert len(lotes) == 2
+    assert [pasta for _, lote in lotes for pasta in lote['fato_consumo']] == pastas
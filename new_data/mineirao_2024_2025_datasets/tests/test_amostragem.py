@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+import amostragem
+
+
+def _serie(n=50_000, seed=7):
+    rng = np.random.default_rng(seed)
+    x = np.arange(n, dtype=np.int64) * 86_400
+    y = np.cumsum(rng.normal(size=n))
+    return x, y
+
+
+@pytest.mark.parametrize('metodo', sorted(amostragem.METODOS))
+@pytest.mark.parametrize('n_saida', [4, 5, 101, 2000])
+def test_reducao_mantem_bordas_e_respeita_limite(metodo, n_saida):
+    x, y = _serie()
+    # Pico e vale bem acima da variação da série, longe das bordas
+    y[12_345], y[37_000] = y.max() + 100, y.min() - 100
+    indices = amostragem.METODOS[metodo](x, y, n_saida)
+
+    assert len(indices) <= n_saida
+    assert (np.diff(indices) > 0).all()
+    assert indices[0] == 0 and indices[-1] == len(x) - 1
+    assert {12_345, 37_000} <= set(indices.tolist())
+
+
+@pytest.mark.parametrize('n_saida', [6, 101, 2000])
+def test_minmax_mantem_extremos_de_cada_faixa(n_saida):
+    x, y = _serie(seed=11)
+    indices = set(amostragem.reduzir_minmax(x, y, n_saida).tolist())
+    faixas = (n_saida - 2) // 2
+    for faixa in np.split(np.arange(len(x)), np.arange(1, faixas) * len(x) // faixas):
+        assert faixa[np.argmin(y[faixa])] in indices
+        assert faixa[np.argmax(y[faixa])] in indices
+
+
+def test_serie_curta_e_intervalo():
+    x, y = _serie(n=100)
+    assert (amostragem.reduzir_lttb(x, y, 200) == np.arange(100)).all()
+    assert (amostragem.reduzir_minmax(x, y, 100) == np.arange(100)).all()
+
+    y[3] = np.nan
+    rx, ry, total = amostragem.reduzir_serie(x, y, 20, intervalo=(x[10], x[60]))
+    # Um ponto de cada lado do intervalo, sem o NaN
+    assert total == 53 and rx[0] == x[9] and rx[-1] == x[61]
+    assert len(rx) <= 20 and not np.isnan(ry).any()
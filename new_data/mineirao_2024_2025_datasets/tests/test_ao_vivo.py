@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import ao_vivo
+
+SETORES = {1: 'Norte', 2: 'Sul', 3: 'Leste'}
+
+
+def _eventos(n=20_000, duracao_s=2 * 3600, seed=3):
+    # Duas horas de eventos (o anel cobre uma), fora de ordem
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'ts': np.round(rng.uniform(0, duracao_s, n), 3),
+        'tipo': rng.choice(list(ao_vivo.TIPOS), n),
+        'setor_id': rng.choice(list(SETORES) + [99], n, p=[0.3, 0.3, 0.3, 0.1]),
+        'valor': np.round(rng.gamma(4.0, 3.0, n), 2),
+    })
+
+
+def _janela_forca_bruta(eventos, janela_s, largura_s):
+    # Média simples dos eventos cujas faixas caem na janela que termina na faixa do último evento
+    faixa = eventos['ts'] // largura_s
+    k = int(janela_s // largura_s)
+    na_janela = eventos[(faixa > faixa.max() - k) & eventos['setor_id'].isin(list(SETORES))]
+    linhas = []
+    for setor_id, nome in SETORES.items():
+        do_setor = na_janela[na_janela['setor_id'] == setor_id]
+        por_tipo = {t: do_setor.loc[do_setor['tipo'] == t, 'valor'] for t in ao_vivo.TIPOS}
+        linhas.append({
+            'setor_id': setor_id, 'nome_setor': nome,
+            'tempo_entrada_medio': por_tipo['E'].mean(), 'tempo_saida_medio': por_tipo['S'].mean(),
+            'incidentes_total': len(por_tipo['I']), 'tempo_resposta_medio': por_tipo['I'].mean(),
+            'publico_total': len(por_tipo['E']),
+        })
+    return pd.DataFrame(linhas)
+
+
+@pytest.mark.parametrize('janela_min', ao_vivo.JANELAS_MIN)
+def test_janelas_do_anel_iguais_a_forca_bruta(janela_min):
+    eventos = _eventos()
+    agregados = ao_vivo.AgregadosAoVivo(SETORES)
+    linhas = ao_vivo.formatar_linhas(*(eventos[c].to_numpy() for c in eventos.columns))
+    agregados.processar_linhas([linha.encode() for linha in linhas[:100]] + ['lixo', ''] + linhas[100:])
+
+    esperado = _janela_forca_bruta(eventos, janela_min * 60, agregados.largura_s)
+    obtido = agregados.resumo(janela_min * 60)
+    pd.testing.assert_frame_equal(obtido, esperado, check_dtype=False, rtol=1e-9)
+    assert agregados.ultimo_ts == eventos['ts'].max()
+    # Setor desconhecido e a linha inválida são descartados; a vazia é ignorada
+    assert agregados.descartados >= (eventos['setor_id'] == 99).sum() + 1
+
+
+def test_resumo_sem_eventos_e_janela_que_avanca():
+    agregados = ao_vivo.AgregadosAoVivo(SETORES, janela_max_s=600)
+    vazio = agregados.resumo(300)
+    assert (vazio['incidentes_total'] == 0).all() and vazio['tempo_entrada_medio'].isna().all()
+
+    agregados.registrar(5.0, 'E', 1, 10.0)
+    agregados.registrar(400.0, 'E', 1, 20.0)
+    assert agregados.resumo(600).loc[0, 'tempo_entrada_medio'] == 15.0
+    assert agregados.resumo(300).loc[0, 'tempo_entrada_medio'] == 20.0
+    # Uma volta depois (faixa 100 na posição da faixa 40), os dois primeiros saem da janela
+    # e um evento atrasado para a faixa 40 é descartado
+    agregados.registrar(1000.0, 'E', 1, 30.0)
+    agregados.registrar(405.0, 'E', 1, 99.0)
+    assert agregados.resumo(600).loc[0, 'tempo_entrada_medio'] == 30.0
+    assert agregados.descartados == 1 and agregados.eventos == 3
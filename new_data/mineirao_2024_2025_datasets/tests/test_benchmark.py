@@ -0,0 +1,20 @@
+import benchmark
+
+
+def _resultado(**etapas):
+    return {'etapas': {nome: {'segundos': segundos, 'pico_mb': None} for nome, segundos in etapas.items()}}
+
+
+def test_regressao_acima_do_limite_e_do_piso():
+    baseline = {'tamanhos': {'25': _resultado(carga_csv=0.100, fig1=0.010)}}
+    atual = {'tamanhos': {'25': _resultado(carga_csv=0.200, fig1=0.020)}}
+    assert benchmark.comparar(atual, baseline) == ([('25', 'carga_csv', 0.100, 0.200)], [])
+
+
+def test_erro_e_etapa_sem_baseline_reprovam():
+    baseline = {'tamanhos': {'25': _resultado(carga_csv=0.1), '1000': _resultado(carga_csv=0.1)}}
+    atual = {'tamanhos': {'25': _resultado(carga_csv=0.1, nova=0.1), '1000': {'erro': 'MemoryError'},
+                          '5000': _resultado(carga_csv=0.1)}}
+    regressoes, falhas = benchmark.comparar(atual, baseline)
+    assert regressoes == []
+    assert falhas == ['25 jogos, nova: etapa ausente da baseline', '1000 jogos: MemoryError', '5000 jogos: sem baseline']
@@ -0,0 +1,34 @@
+import pandas as pd
+import pytest
+
+import consulta_sql
+import pipeline
+
+pytest.importorskip('pyarrow')
+
+MOTORES = [pytest.param('duckdb', marks=pytest.mark.skipif(consulta_sql.duckdb is None, reason='DuckDB não instalado')),
+           'sqlite']
+
+
+@pytest.fixture(scope='module')
+def pandas_p(dados):
+    return pipeline.criar_pipeline(dados, compacto=False, backend='pandas')
+
+
+@pytest.mark.parametrize('motor', MOTORES)
+def test_agregados_sql_iguais_ao_pandas(dados, pandas_p, motor):
+    banco = consulta_sql.abrir(dados, motor)
+    for anos, competicoes, niveis, setores in consulta_sql.combinacoes_filtro(pandas_p):
+        for nome in consulta_sql.CONSULTAS:
+            setores_nome = setores if nome in pipeline.AGREGADOS_POR_SETOR else ()
+            esperado = pipeline.agregar_filtrado(pandas_p, nome, anos, competicoes, niveis, setores_nome)
+            obtido = banco.agregar(nome, anos, competicoes, niveis, setores_nome)
+            pd.testing.assert_frame_equal(consulta_sql._comparavel(obtido), consulta_sql._comparavel(esperado),
+                                          check_dtype=False, obj=f'{nome} {anos} {competicoes} {niveis} {setores_nome}')
+
+
+@pytest.mark.parametrize('motor', MOTORES)
+def test_tabela_mestre_sql_igual_ao_pandas(dados, pandas_p, motor):
+    p = pipeline.criar_pipeline(dados, compacto=False, backend='sql', motor_sql=motor)
+    pd.testing.assert_frame_equal(consulta_sql._comparavel(p.obter('df_master')),
+                                  consulta_sql._comparavel(pandas_p.obter('df_master')), check_dtype=False)
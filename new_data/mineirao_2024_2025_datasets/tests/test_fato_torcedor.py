@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+import fato_torcedor
+import figuras
+import ingestao
+import juncao_estrela
+import pipeline
+
+
+@pytest.fixture(scope='module')
+def fato(dados):
+    return fato_torcedor.abrir(dados)
+
+
+@pytest.fixture(scope='module')
+def detalhe(dados, fato):
+    # Os mesmos ingressos no pandas, com os atributos indexados juntados
+    tabelas = ingestao.carregar_tabelas(dados, compacto=False)
+    jogos = juncao_estrela.juntar(tabelas['fato_jogos'][['jogo_id', 'data_id', 'adversario_id']], [
+        (tabelas['dim_data'], 'data_id', ['ano']),
+        (tabelas['dim_adversario'], 'adversario_id', ['competicao', 'nivel_confronto'])])
+    return juncao_estrela.juntar(fato.quadro(), [
+        (tabelas['dim_perfil_torcedor'], 'perfil_id', ['faixa_etaria', 'regiao_origem']),
+        (tabelas['dim_setor'], 'setor_id', ['nome_setor']),
+        (jogos, 'jogo_id', ['ano', 'competicao', 'nivel_confronto'])])
+
+
+def _segmentos(detalhe):
+    linha = detalhe.iloc[0]
+    return [{}, {'ano': [int(linha['ano'])]}, {'competicao': [linha['competicao']]},
+            {'nome_setor': [linha['nome_setor']], 'nivel_confronto': [linha['nivel_confronto']]},
+            {'faixa_etaria': [linha['faixa_etaria']], 'regiao_origem': [linha['regiao_origem'], 'Outro Estado']}]
+
+
+def _mascara(detalhe, filtros):
+    mascara = np.ones(len(detalhe), dtype=bool)
+    for coluna, valores in filtros.items():
+        mascara &= detalhe[coluna].isin(valores).to_numpy()
+    return mascara
+
+
+def test_um_ingresso_por_pagante(dados, fato):
+    assert len(fato) == ingestao.carregar_tabelas(dados, tabelas=['fato_jogos'])['fato_jogos']['publico_pago'].sum()
+
+
+def test_segmentos_iguais_ao_pandas(fato, detalhe):
+    for filtros in _segmentos(detalhe):
+        mascara = _mascara(detalhe, filtros)
+        assert fato.consultar(**filtros) == {'ingressos': int(mascara.sum()),
+                                             'receita_rs': int(detalhe['valor_centavos'][mascara].sum()) / 100}
+
+
+def test_contagem_por_faixa_igual_ao_pandas(fato, detalhe):
+    for filtros in _segmentos(detalhe):
+        esperado = detalhe[_mascara(detalhe, filtros)].groupby('faixa_etaria').size()
+        obtido = fato.contar_por('faixa_etaria', **filtros).set_index('faixa_etaria')['contagem']
+        assert obtido[obtido > 0].sort_index().to_dict() == esperado[esperado > 0].sort_index().to_dict()
+
+
+def test_acima_do_teto_figura_9_conta_perfis(dados, monkeypatch):
+    monkeypatch.setattr(fato_torcedor, 'MAXIMO_INGRESSOS', 0)
+    p = pipeline.criar_pipeline(dados, compacto=False)
+    assert p.obter('fato_torcedor') is None
+    perfis = p.obter('dim_perfil_torcedor')
+    assert p.obter('df_faixa_etaria')['contagem'].sum() == len(perfis)
+    assert 'simulado' not in p.obter('fig9').layout.title.text
+    with pytest.raises(ValueError):
+        fato_torcedor.abrir(dados, forcar=True)
+
+
+def test_figura_9_marcada_como_simulada(dados):
+    p = pipeline.criar_pipeline(dados, compacto=False)
+    assert p.obter('fato_torcedor') is not None
+    assert 'simulado' in p.obter('fig9').layout.title.text
+    assert 'simulado' in figuras.figura_faixa_etaria(pipeline.agregar_torcedores(p, anos=(2024,))).layout.title.text
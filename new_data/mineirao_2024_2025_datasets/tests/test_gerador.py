@@ -0,0 +1,45 @@
+import contextlib
+import io
+
+import pandas as pd
+import pytest
+
+import gerador
+import ingestao
+
+
+def test_mesma_seed_gera_tabelas_identicas():
+    a = gerador.gerar_star_schema(200, seed=7)
+    b = gerador.gerar_star_schema(200, seed=7)
+    assert a.keys() == b.keys()
+    for nome in a:
+        pd.testing.assert_frame_equal(a[nome], b[nome])
+
+
+def test_seeds_diferentes_geram_jogos_diferentes():
+    a = gerador.gerar_star_schema(200, seed=7)['fato_jogos']
+    b = gerador.gerar_star_schema(200, seed=8)['fato_jogos']
+    assert not a['publico_pago'].equals(b['publico_pago'])
+
+
+@pytest.mark.parametrize('jogos_por_lote', [1, 37, 200])
+def test_lotes_identicos_a_execucao_completa(jogos_por_lote):
+    completo = gerador.gerar_star_schema(200, seed=7)
+    lotes = list(gerador.gerar_lotes(200, jogos_por_lote, seed=7))
+    for nome in gerador.TABELAS_POR_JOGO:
+        pd.testing.assert_frame_equal(completo[nome], pd.concat([l[nome] for l in lotes], ignore_index=True))
+
+
+def test_periodo_curto_demais():
+    with pytest.raises(ValueError):
+        gerador.gerar_star_schema(10, inicio='2024-03-01', fim='2024-03-01')
+
+
+def test_exportacao_em_lotes_igual_a_completa(tmp_path):
+    completo, lotes = tmp_path / 'completo', tmp_path / 'lotes'
+    with contextlib.redirect_stdout(io.StringIO()):
+        gerador.exportar_csv(gerador.gerar_star_schema(300, seed=7), str(completo))
+        gerador.exportar_em_lotes(str(lotes), 300, jogos_por_lote=64, seed=7)
+    for tabela in ingestao.ESQUEMA:
+        pd.testing.assert_frame_equal(ingestao.ler_csv_tipado(str(lotes / f'{tabela}.csv'), tabela),
+                                      ingestao.ler_csv_tipado(str(completo / f'{tabela}.csv'), tabela), obj=tabela)
@@ -0,0 +1,72 @@
+import os
+import shutil
+import time
+
+import pandas as pd
+
+import ingestao
+import pipeline
+
+
+def test_modo_compacto_preserva_valores_em_reais(dados):
+    padrao = ingestao.carregar_tabelas(dados, compacto=False)
+    compacto = ingestao.carregar_tabelas(dados, compacto=True)
+    for tabela, df in padrao.items():
+        decimais = ingestao.decimais(compacto[tabela])
+        for coluna in df.columns:
+            if ingestao._escala(coluna):
+                assert decimais[coluna].dtype == 'float64', f'{tabela}.{coluna}'
+                pd.testing.assert_series_equal(decimais[coluna], df[coluna])
+    assert pd.api.types.is_integer_dtype(compacto['fato_consumo']['receita_produto_rs'])
+
+    # Agregados das figuras e colunas em reais da tabela mestre: iguais nos dois modos
+    quadros = ['df_receita_categoria', 'df_top_itens', 'df_mobilidade_agg_setor', 'df_incidentes_agg_setor']
+    p_padrao, p_compacto = (pipeline.criar_pipeline(dados, compacto=modo, backend='pandas', usar_estado=False)
+                            for modo in (False, True))
+    for nome in quadros:
+        esperado, obtido = p_padrao.obter(nome), p_compacto.obter(nome)
+        for coluna in esperado.columns:
+            pd.testing.assert_series_equal(obtido[coluna].astype(esperado[coluna].dtype), esperado[coluna],
+                                           check_exact=True, obj=f'{nome}.{coluna}')
+    master_padrao, master_compacto = p_padrao.obter('df_master'), p_compacto.obter('df_master')
+    for coluna in master_padrao.columns:
+        if ingestao._monetaria(coluna):
+            pd.testing.assert_series_equal(master_compacto[coluna], master_padrao[coluna], obj=coluna)
+
+
+def _origens(diretorio, tabela):
+    estatisticas = {}
+    df = ingestao.carregar_tabelas(diretorio, tabelas=[tabela], estatisticas=estatisticas, compacto=False)[tabela]
+    return estatisticas[tabela]['origem'], df
+
+
+def test_cache_parquet_reaproveitado_e_invalidado(dados, tmp_path):
+    shutil.copy(os.path.join(dados, 'fato_jogos.csv'), tmp_path)
+    caminho = str(tmp_path / 'fato_jogos.csv')
+    origem, original = _origens(str(tmp_path), 'fato_jogos')
+    assert origem == 'csv'
+    origem, df = _origens(str(tmp_path), 'fato_jogos')
+    assert origem == 'cache'
+    pd.testing.assert_frame_equal(df, original)
+
+    # Só o mtime mudou (cópia, checkout): o hash confirma e o cache vale
+    os.utime(caminho, ns=(time.time_ns(), time.time_ns() + 10 ** 9))
+    assert _origens(str(tmp_path), 'fato_jogos')[0] == 'cache'
+
+    # Mesmo tamanho, conteúdo diferente: lido de novo do CSV
+    with open(caminho, encoding='utf-8') as f:
+        cabecalho, primeira, *resto = f.read().splitlines(keepends=True)
+    campos = primeira.split(';')
+    campos[3] = str(int(campos[3]) + 1)  # publico_pago, mesmo número de dígitos
+    with open(caminho, 'w', encoding='utf-8') as f:
+        f.write(cabecalho + ';'.join(campos) + ''.join(resto))
+    assert os.path.getsize(caminho) == os.path.getsize(os.path.join(dados, 'fato_jogos.csv'))
+    origem, df = _origens(str(tmp_path), 'fato_jogos')
+    assert origem == 'csv'
+    assert df['publico_pago'].iloc[0] == int(campos[3])
+
+    # Tamanho diferente (linha anexada): lido de novo do CSV
+    ingestao.gravar_csv(original.iloc[[0]], str(tmp_path), 'fato_jogos', anexar=True)
+    origem, df = _origens(str(tmp_path), 'fato_jogos')
+    assert (origem, len(df)) == ('csv', len(original) + 1)
+    assert _origens(str(tmp_path), 'fato_jogos')[0] == 'cache'
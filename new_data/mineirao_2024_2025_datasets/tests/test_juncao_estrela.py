@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import juncao_estrela
+
+
+def _dimensao(ids):
+    ids = np.asarray(ids, dtype=np.int64)
+    return pd.DataFrame({
+        'chave_id': ids,
+        'nome': pd.Series([f'item {i}' for i in ids], dtype='category'),
+        'valor': ids * 1.5,
+        'contagem': (ids % 7).astype(np.int32),
+    })
+
+
+# Densa (vetor de posições) e esparsa (pd.Index), ambas fora de ordem
+DIMENSOES = {'densa': [5, 1, 3, 2, 8, 13], 'esparsa': [10_000_000, 7, 42, 1]}
+
+
+# O merge de referência avisa sobre a chave 3.5 (float sem inteiro equivalente), de propósito
+@pytest.mark.filterwarnings('ignore:You are merging on int and float')
+@pytest.mark.parametrize('tipo', sorted(DIMENSOES))
+def test_juntar_igual_ao_merge_com_chaves_problematicas(tipo):
+    dim = _dimensao(DIMENSOES[tipo])
+    # Chaves repetidas no fato, ausentes na dimensão, negativas e muito acima da maior
+    chaves = [1, 3, 3, 4, 8, -1, 10_000_000, 2 ** 40, 13, 1, 7, 0]
+    fato = pd.DataFrame({'chave_id': np.array(chaves, dtype=np.int64), 'medida': np.arange(len(chaves))})
+    obtido = juncao_estrela.juntar(fato, [(dim, 'chave_id', None)])
+    pd.testing.assert_frame_equal(obtido, juncao_estrela.juntar_com_merge(fato, [(dim, 'chave_id', None)]))
+
+    # Chave float com NaN e valor não inteiro: sem par, como no merge
+    fato_nulo = fato.assign(chave_id=fato['chave_id'].astype(float))
+    fato_nulo.loc[[2, 4], 'chave_id'] = [np.nan, 3.5]
+    ligacao = [(dim, 'chave_id', {'nome': 'nome_item', 'valor': 'valor_item'})]
+    pd.testing.assert_frame_equal(juncao_estrela.juntar(fato_nulo, ligacao),
+                                  juncao_estrela.juntar_com_merge(fato_nulo, ligacao))
+
+
+def test_posicoes_e_erros():
+    indice = juncao_estrela.IndiceChave(_dimensao([5, 1, 3]), 'chave_id')
+    np.testing.assert_array_equal(indice.posicoes([3, 3, 5, 2, -4, 10 ** 9, 1]), [2, 2, 0, -1, -1, -1, 1])
+    np.testing.assert_array_equal(indice.posicoes(np.array([1.0, np.nan, 2.5, np.inf])), [1, -1, -1, -1])
+    assert len(indice.posicoes(np.array([], dtype=np.int64))) == 0
+
+    # Chave repetida na dimensão, no índice denso e no esparso
+    for ids in ([1, 2, 2], [1, 10_000_000, 10_000_000]):
+        with pytest.raises(ValueError, match='repetidos'):
+            juncao_estrela.IndiceChave(_dimensao(ids), 'chave_id').posicoes([1])
+    with pytest.raises(TypeError):
+        juncao_estrela.IndiceChave(pd.DataFrame({'chave_id': ['a']}), 'chave_id')
+
+    fato = pd.DataFrame({'chave_id': np.array([1, 4], dtype=np.int64)})
+    with pytest.raises(juncao_estrela.ChaveAusente):
+        juncao_estrela.juntar(fato, [(_dimensao([1, 2]), 'chave_id', None)], ausentes='erro')
+    with pytest.raises(ValueError, match='já existem'):
+        juncao_estrela.juntar(fato.assign(nome='x'), [(_dimensao([1, 2]), 'chave_id', None)])
+
+
+def test_tabela_alinhada_e_estatisticas():
+    dim = _dimensao([1, 2, 3, 4])
+    fato = pd.DataFrame({'chave_id': np.array([1, 2, 3, 4], dtype=np.int64), 'medida': [9, 8, 7, 6]},
+                        index=[10, 11, 12, 13])
+    estatisticas = []
+    obtido = juncao_estrela.juntar(fato, [(juncao_estrela.IndiceChave(dim, 'chave_id'), 'chave_id', ['valor']),
+                                          (_dimensao([2, 3]), 'chave_id', ['nome'])],
+                                   renomear_fato={'medida': 'medida_jogo'}, estatisticas=estatisticas)
+    esperado = juncao_estrela.juntar_com_merge(fato, [(dim, 'chave_id', ['valor']),
+                                                      (_dimensao([2, 3]), 'chave_id', ['nome'])],
+                                               renomear_fato={'medida': 'medida_jogo'})
+    pd.testing.assert_frame_equal(obtido, esperado)
+    assert estatisticas == [('chave_id', 0), ('chave_id', 2)]
@@ -0,0 +1,32 @@
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+
+import ingestao
+import projecao
+
+
+def test_modelo_gravado_sem_pickle_e_cache_invalido_reajusta(dados):
+    ajustado = projecao.ajustar(ingestao.carregar_tabelas(dados, tabelas=projecao.TABELAS_MODELO))
+    projecao._MODELOS.clear()
+    projecao.obter_modelo(dados)
+    (caminho,) = glob.glob(os.path.join(dados, projecao.NOME_MODELO, 'modelo_*.npz'))
+
+    # Lido do disco: mesmos coeficientes, previsões fora da dobra e qualidade do ajuste
+    projecao._MODELOS.clear()
+    lido = projecao.obter_modelo(dados)
+    np.testing.assert_allclose(lido.coeficientes, ajustado.coeficientes)
+    pd.testing.assert_frame_equal(lido.previsto_fora_dobra, ajustado.previsto_fora_dobra)
+    assert lido.qualidade == ajustado.qualidade
+    grade = projecao.grade_cenarios(ingestao.carregar_tabelas(dados, tabelas=['dim_adversario'])['dim_adversario'],
+                                    dia_semana=projecao.DIAS_SEMANA, feriado=[False, True])
+    pd.testing.assert_frame_equal(lido.prever(grade), ajustado.prever(grade))
+
+    # Arquivo corrompido: vira um cache perdido, o modelo é reajustado e regravado
+    with open(caminho, 'wb') as f:
+        f.write(b'corrompido')
+    projecao._MODELOS.clear()
+    np.testing.assert_allclose(projecao.obter_modelo(dados).coeficientes, ajustado.coeficientes)
+    assert projecao._ler_modelo(caminho).jogos == ajustado.jogos
@@ -0,0 +1,45 @@
+import glob
+import json
+import os
+
+import pandas as pd
+import pytest
+
+import ingestao
+import pipeline
+import snapshot
+
+pytest.importorskip('pyarrow')
+
+
+@pytest.mark.parametrize('compacto', [False, True])
+def test_snapshot_devolve_os_mesmos_quadros_e_figuras(dados, monkeypatch, compacto):
+    monkeypatch.setattr(ingestao, 'COMPACTO_PADRAO', compacto)
+    snapshot.limpar(dados)
+    tempos_calculo, tempos_leitura = {}, {}
+    calculado = snapshot.preparar_pipeline(dados, tempos_calculo, usar_snapshot=True, modo='serial', validar=False)
+    lido = snapshot.preparar_pipeline(dados, tempos_leitura, usar_snapshot=True, modo='serial', validar=False)
+
+    assert (tempos_calculo['origem'], tempos_leitura['origem']) == ('calculado', 'snapshot')
+    for nome in snapshot.quadros(calculado):
+        pd.testing.assert_frame_equal(lido.obter(nome), calculado.obter(nome), obj=nome)
+    for nome in pipeline.NOS_FIGURAS:
+        assert lido.obter(nome) == json.loads(calculado.obter(nome).to_json())
+
+
+def test_snapshot_sem_pickle_e_chave_conferida(dados):
+    snapshot.limpar(dados)
+    snapshot.preparar_pipeline(dados, usar_snapshot=True, modo='serial', validar=False)
+    chave = snapshot.chave_snapshot(dados)
+    pasta = snapshot._caminho(dados, chave)
+    assert sorted(os.path.splitext(f)[1] for f in os.listdir(pasta)) == \
+        ['.json'] + ['.parquet'] * len(snapshot.quadros(pipeline.criar_pipeline(dados)))
+    assert not glob.glob(os.path.join(dados, snapshot.NOME_SNAPSHOT, '*.pkl'))
+    assert snapshot.carregar(pipeline.criar_pipeline(dados), dados, chave)
+    # Outra chave gravada no arquivo: o snapshot é ignorado
+    arquivo = os.path.join(pasta, snapshot.ARQUIVO_FIGURAS)
+    with open(arquivo, encoding='utf-8') as f:
+        conteudo = json.load(f)
+    with open(arquivo, 'w', encoding='utf-8') as f:
+        json.dump({**conteudo, 'chave': 'outra'}, f)
+    assert not snapshot.carregar(pipeline.criar_pipeline(dados), dados, chave)
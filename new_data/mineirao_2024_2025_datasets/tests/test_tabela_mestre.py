@@ -0,0 +1,69 @@
+import ingestao
+import pipeline
+import tabela_mestre
+
+
+def test_anexacao_rodada_a_rodada_igual_a_reconstrucao(dados):
+    # verificar_incremental compara, com dtypes, após cada jogo anexado
+    tabela_mestre.verificar_incremental(ingestao.carregar_tabelas(dados, compacto=False))
+
+
+def test_anexar_fontes_mantem_csvs_e_estado_juntos(dados, tmp_path):
+    completo = ingestao.carregar_tabelas(dados, compacto=False)
+    ids = completo['fato_jogos']['jogo_id'].to_numpy()
+    iniciais = tabela_mestre._fatos_ate(completo, ids[:10])
+    for tabela in ingestao.ESQUEMA:
+        ingestao.gravar_csv(iniciais[tabela], str(tmp_path), tabela)
+
+    resto = tabela_mestre._fatos_ate(completo, ids[10:])
+    mercado = resto['fato_mercado_ingressos']
+    resto['fato_mercado_ingressos'] = mercado[~mercado['data_id'].isin(iniciais['fato_jogos']['data_id'])]
+    novos = {nome: resto[nome] for nome in tabela_mestre.TABELAS_ANEXAVEIS if nome.startswith('fato_')}
+    estado, afetados = tabela_mestre.anexar_fontes(novos, str(tmp_path))
+
+    assert afetados == set(ids[10:])
+    esperado = tabela_mestre.construir_master(completo)
+    tabela_mestre._comparar(estado['master'], esperado)
+    # Os CSVs regravados reconstroem a mesma tabela que o estado salvo
+    tabela_mestre._comparar(tabela_mestre.construir_master(ingestao.carregar_tabelas(str(tmp_path))), esperado)
+    assert tabela_mestre.assinatura_estado(str(tmp_path / tabela_mestre.NOME_ESTADO)) == \
+        ingestao.assinatura_dados(str(tmp_path))
+
+
+def test_anexar_fontes_com_chave_existente_faz_upsert(dados, tmp_path):
+    completo = ingestao.carregar_tabelas(dados, compacto=False)
+    for tabela in ingestao.ESQUEMA:
+        ingestao.gravar_csv(completo[tabela], str(tmp_path), tabela)
+    jogo = completo['fato_jogos'].iloc[[0]].assign(publico_pago=12345)
+    estado, afetados = tabela_mestre.anexar_fontes({'fato_jogos': jogo}, str(tmp_path))
+
+    assert afetados == {jogo['jogo_id'].iloc[0]}
+    relido = ingestao.carregar_tabelas(str(tmp_path))['fato_jogos']
+    assert len(relido) == len(completo['fato_jogos'])
+    assert (relido.loc[relido['jogo_id'] == jogo['jogo_id'].iloc[0], 'publico_pago'] == 12345).all()
+    tabela_mestre._comparar(estado['master'], tabela_mestre.construir_master(ingestao.carregar_tabelas(str(tmp_path))))
+
+
+def test_pipeline_le_o_estado_e_anexacao_nao_refaz_o_hash(dados, tmp_path, monkeypatch):
+    completo = ingestao.carregar_tabelas(dados, compacto=False)
+    ids = completo['fato_jogos']['jogo_id'].to_numpy()
+    iniciais = tabela_mestre._fatos_ate(completo, ids[:-1])
+    for tabela in ingestao.ESQUEMA:
+        ingestao.gravar_csv(iniciais[tabela], str(tmp_path), tabela)
+    tabela_mestre.anexar_fontes({}, str(tmp_path))
+
+    # Com o estado em dia, a anexação só lê os bytes anexados (nenhum CSV inteiro)
+    def sem_hash_completo(caminho, bloco=None):
+        raise AssertionError(f'hash completo de {caminho}')
+    monkeypatch.setattr(ingestao, '_hash_arquivo', sem_hash_completo)
+    ultimo = tabela_mestre._fatos_ate(completo, ids[-1:])
+    tabela_mestre.anexar_fontes({nome: ultimo[nome] for nome in tabela_mestre.TABELAS_ANEXAVEIS
+                                 if nome.startswith('fato_') and nome != 'fato_mercado_ingressos'}, str(tmp_path))
+    assert tabela_mestre.estado_em_dia(str(tmp_path))
+    monkeypatch.undo()
+
+    # O df_master do pipeline vem do estado, sem carregar os fatos grandes
+    p = pipeline.criar_pipeline(str(tmp_path), compacto=False, backend='pandas')
+    master = p.obter('df_master')
+    assert 'fato_consumo' not in p.calculados()
+    tabela_mestre._comparar(master, tabela_mestre.construir_master(ingestao.carregar_tabelas(str(tmp_path))))
@@ -0,0 +1,397 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import gerador
+import ingestao
+import juncao_estrela
+
+# --- 1. CONFIGURAÇÃO ---
+# Validação do star schema antes dos dashboards, uma passada vetorizada por tabela:
+#   formato   : bytes do CSV (numpy): linhas com número errado de campos e inteiros
+#               gravados como decimal ('1,0')
+#   tipos     : tipagem do ingestao.ESQUEMA (inteiro, booleano, data) e nulos
+#   chaves    : unicidade da chave de cada tabela (ESQUEMA[...]['chaves'])
+#   relações  : órfãos e cobertura de cada chave estrangeira de ingestao.RELACIONAMENTOS
+#   domínios  : faixas e valores permitidos (DOMINIOS) e datas com ruído abaixo do segundo
+#   coerência : colunas copiadas de outra tabela (COPIAS) e calendário do dim_data
+# 'erro' quebra junções ou agregados e bloqueia os dashboards; 'aviso' só é listado.
+# O relatório fica em <dados>/.validacao.json com a chave dos CSVs e deste código, então
+# a inicialização do app só refaz a validação quando os dados mudam.
+NOME_RELATORIO = '.validacao.json'
+VERSAO_VALIDACAO = 1
+# Bytes lidos por vez na varredura do CSV (limita a memória em tabelas de vários GB)
+BLOCO_BYTES = 16 << 20
+# MINEIRAO_VALIDAR=0 desliga a validação na inicialização do app
+VALIDAR_PADRAO = os.environ.get('MINEIRAO_VALIDAR', '1') != '0'
+
+# (mínimo, máximo), com None para sem limite, ou a lista de valores permitidos
+DOMINIOS = {
+    'dim_data': {'mes': (1, 12), 'dia_semana': gerador.DIAS_SEMANA.tolist()},
+    'dim_produto': {'preco_medio_rs': (0, None)},
+    'dim_setor': {'capacidade_mil': (0, None)},
+    'fato_jogos': {'publico_pago': (0, gerador.CAPACIDADE_MINEIRAO), 'receita_ingresso_mil_rs': (0, None),
+                   'ticket_medio_ingresso_rs': (0, None), 'ticket_medio_consumo_base_rs': (0, None),
+                   'taxa_ocupacao': (0, 100)},
+    'fato_consumo': {'qtd_vendida': (0, None), 'receita_produto_rs': (0, None), 'consumo_por_pessoa_rs': (0, None)},
+    'fato_mercado_ingressos': {'socios_ativos': (0, None), 'novas_adesoes': (0, None), 'vendas_canal': (0, None)},
+    'fato_mobilidade_incidentes': {'publico_setor': (0, None), 'tempo_entrada_medio_min': (0, None),
+                                   'tempo_saida_medio_min': (0, None), 'incidente_contagem': (0, None),
+                                   'tempo_resposta_min': (0, None)},
+    'fato_projecao': {'publico_projetado': (0, None), 'receita_projetada_mil_rs': (0, None)},
+    'fato_receita_agregada': {'receita_total_mil_rs': (0, None), 'percentual_total': (0, 100)},
+}
+
+# Colunas desnormalizadas: (tabela, coluna, chaves estrangeiras a seguir, coluna de destino).
+# Seguindo os RELACIONAMENTOS por essas chaves, o valor tem que ser o mesmo.
+COPIAS = [
+    ('fato_projecao', 'adversario', ['jogo_id', 'adversario_id'], 'nome_adversario'),
+]
+
+
+class DadosInvalidos(ValueError):
+    pass
+
+
+def _ocorrencia(tabela, coluna, verificacao, severidade, linhas, total, detalhe):
+    return {'tabela': tabela, 'coluna': coluna, 'verificacao': verificacao, 'severidade': severidade,
+            'linhas': int(linhas), 'total': int(total), 'detalhe': detalhe}
+
+
+# --- 2. FORMATO: VARREDURA DOS BYTES DO CSV ---
+def _contar_bloco(buf, campos_esperados):
+    # Bloco de linhas inteiras -> (linhas, linhas com número errado de campos, vírgulas por
+    # campo). Cada delimitador (';' ou '\n') fecha um campo, e as vírgulas do campo são a
+    # diferença da contagem acumulada de vírgulas entre ele e o delimitador anterior.
+    # Os CSVs não têm ';' dentro de campos entre aspas.
+    delimitadores = np.flatnonzero((buf == ord(';')) | (buf == ord('\n')))
+    virgulas = np.diff(np.cumsum(buf == ord(','), dtype=np.int32)[delimitadores], prepend=0)
+    e_quebra = buf[delimitadores] == ord('\n')
+    linhas = int(np.count_nonzero(e_quebra))
+    if (len(delimitadores) == linhas * campos_esperados
+            and e_quebra[campos_esperados - 1::campos_esperados].all()):
+        # Caso comum: toda linha com campos_esperados campos, delimitadores em matriz linhas x campos
+        return linhas, 0, virgulas.reshape(-1, campos_esperados).sum(axis=0)
+
+    # Linhas irregulares ou vazias: posição de cada delimitador dentro da sua linha
+    fim_linha = np.flatnonzero(e_quebra)
+    inicio_linha = np.r_[0, fim_linha[:-1] + 1]
+    campo = np.arange(len(delimitadores)) - np.repeat(inicio_linha, fim_linha - inicio_linha + 1)
+    quebras = delimitadores[fim_linha]
+    tamanho = quebras - np.r_[0, quebras[:-1] + 1]
+    vazias = (tamanho == 0) | ((tamanho == 1) & (buf[np.maximum(quebras - 1, 0)] == ord('\r')))
+    errados = (fim_linha - inicio_linha + 1 != campos_esperados) & ~vazias
+    dentro = campo < campos_esperados
+    por_campo = np.bincount(campo[dentro], weights=virgulas[dentro], minlength=campos_esperados).astype(np.int64)
+    return linhas - int(vazias.sum()), int(errados.sum()), por_campo
+
+
+def varrer_csv(caminho):
+    # Cabeçalho, linhas, linhas com número errado de campos e vírgulas por coluna, em
+    # blocos de BLOCO_BYTES cortados na última quebra de linha
+    with open(caminho, 'rb') as f:
+        cabecalho = f.readline().decode('utf-8-sig').rstrip('\r\n').split(';')
+        linhas = campos_errados = 0
+        virgulas = np.zeros(len(cabecalho), dtype=np.int64)
+        resto = b''
+        while True:
+            pedaco = f.read(BLOCO_BYTES)
+            bloco = resto + pedaco
+            if pedaco:
+                corte = bloco.rfind(b'\n') + 1
+                bloco, resto = bloco[:corte], bloco[corte:]
+            elif bloco.strip():
+                bloco += b'\n'
+            if bloco:
+                n, errados, por_campo = _contar_bloco(np.frombuffer(bloco, dtype=np.uint8), len(cabecalho))
+                linhas, campos_errados, virgulas = linhas + n, campos_errados + errados, virgulas + por_campo
+            if not pedaco:
+                break
+    return {'cabecalho': cabecalho, 'linhas': linhas, 'campos_errados': campos_errados,
+            'virgulas': dict(zip(cabecalho, virgulas.tolist()))}
+
+
+def verificar_formato(tabela, varredura):
+    colunas = ingestao.ESQUEMA[tabela]['colunas']
+    ocorrencias = []
+    if varredura['campos_errados']:
+        ocorrencias.append(_ocorrencia(tabela, '', 'formato', 'erro', varredura['campos_errados'], varredura['linhas'],
+                                       f"número de campos diferente dos {len(varredura['cabecalho'])} do cabeçalho"))
+    faltando = [coluna for coluna in colunas if coluna not in varredura['cabecalho']]
+    if faltando:
+        ocorrencias.append(_ocorrencia(tabela, ', '.join(faltando), 'formato', 'erro', varredura['linhas'],
+                                       varredura['linhas'], 'coluna ausente no cabeçalho'))
+    for coluna, tipo in colunas.items():
+        decimais = varredura['virgulas'].get(coluna, 0)
+        if tipo == 'int' and decimais:
+            ocorrencias.append(_ocorrencia(tabela, coluna, 'formato', 'aviso', decimais, varredura['linhas'],
+                                           "inteiro gravado como decimal (ex.: '1,0')"))
+    return ocorrencias
+
+
+# --- 3. TIPOS, CHAVES E DOMÍNIOS DE UMA TABELA ---
+def _repetidas(df, chaves):
+    # Chaves inteiras em ordem estritamente crescente (caso comum: fatos gravados jogo a jogo)
+    # não repetem; uma comparação entre linhas vizinhas evita o hash do duplicated()
+    colunas = [df[chave].to_numpy() for chave in chaves]
+    if all(np.issubdtype(c.dtype, np.integer) for c in colunas):
+        crescente = colunas[-1][1:] > colunas[-1][:-1]
+        for c in reversed(colunas[:-1]):
+            crescente = (c[1:] > c[:-1]) | ((c[1:] == c[:-1]) & crescente)
+        if crescente.all():
+            return 0
+    return int(df.duplicated(chaves).sum())
+
+
+def verificar_tabela(tabela, df, chaves_estrangeiras):
+    chaves = ingestao.ESQUEMA[tabela]['chaves']
+    ocorrencias = []
+    for coluna, nulos in df.isna().sum().items():
+        if nulos:
+            severidade = 'erro' if coluna in chaves or coluna in chaves_estrangeiras else 'aviso'
+            ocorrencias.append(_ocorrencia(tabela, coluna, 'tipos', severidade, nulos, len(df), 'valores nulos'))
+
+    repetidas = _repetidas(df, chaves)
+    if repetidas:
+        ocorrencias.append(_ocorrencia(tabela, ', '.join(chaves), 'chaves', 'erro', repetidas, len(df),
+                                       'chave repetida'))
+
+    for coluna, regra in DOMINIOS.get(tabela, {}).items():
+        serie = df[coluna]
+        if isinstance(regra, tuple):
+            minimo, maximo = regra
+            fora = np.zeros(len(serie), dtype=bool)
+            if minimo is not None:
+                fora |= (serie < minimo).to_numpy()
+            if maximo is not None:
+                fora |= (serie > maximo).to_numpy()
+            descricao = f"fora de [{minimo if minimo is not None else '-∞'}, {maximo if maximo is not None else '∞'}]"
+        else:
+            fora = ~serie.isin(regra).to_numpy()
+            descricao = 'fora dos valores permitidos'
+        if fora.any():
+            ocorrencias.append(_ocorrencia(tabela, coluna, 'dominios', 'erro', fora.sum(), len(df),
+                                           f"{descricao} (ex.: {serie[fora].iloc[0]})"))
+
+    for coluna, tipo in ingestao.ESQUEMA[tabela]['colunas'].items():
+        if tipo == 'datetime':
+            ns = df[coluna].to_numpy('datetime64[ns]').view(np.int64)
+            ruido = ns % 1_000_000_000 != 0
+            if ruido.any():
+                ocorrencias.append(_ocorrencia(tabela, coluna, 'dominios', 'aviso', ruido.sum(), len(df),
+                                               f"fração de segundo (ex.: {df[coluna][ruido].iloc[0]})"))
+
+    if tabela == 'dim_data':
+        ocorrencias += verificar_calendario(df)
+    return ocorrencias
+
+
+def verificar_calendario(dim_data):
+    # ano, mes e dia_semana têm que sair da própria data
+    data = dim_data['data'].dt
+    esperado = {'ano': data.year.to_numpy(), 'mes': data.month.to_numpy(),
+                'dia_semana': gerador.DIAS_SEMANA[data.dayofweek.to_numpy()]}
+    ocorrencias = []
+    for coluna, valores in esperado.items():
+        divergentes = dim_data[coluna].to_numpy() != valores
+        if divergentes.any():
+            ocorrencias.append(_ocorrencia('dim_data', coluna, 'coerencia', 'erro', divergentes.sum(), len(dim_data),
+                                           f"não confere com a coluna data (ex.: data_id "
+                                           f"{dim_data['data_id'][divergentes].iloc[0]})"))
+    return ocorrencias
+
+
+# --- 4. RELACIONAMENTOS E CÓPIAS ENTRE TABELAS ---
+def _posicoes(indices, tabelas, destino, coluna, chaves):
+    # Linha de destino para cada chave (-1 se órfã), com um IndiceChave por (destino, coluna)
+    if (destino, coluna) not in indices:
+        indices[(destino, coluna)] = juncao_estrela.IndiceChave(tabelas[destino], coluna)
+    try:
+        return indices[(destino, coluna)].posicoes(chaves)
+    except ValueError:
+        # Chave repetida no destino (já apontada em 'chaves'): vale a primeira ocorrência
+        primeiras = np.flatnonzero(~tabelas[destino][coluna].duplicated().to_numpy())
+        posicoes = pd.Index(tabelas[destino][coluna].to_numpy()[primeiras]).get_indexer(chaves)
+        return np.where(posicoes >= 0, primeiras[posicoes], -1)
+
+
+def verificar_relacionamentos(tabelas):
+    # Órfãos por chave estrangeira e cobertura (parcela das chaves do destino usadas)
+    indices, ocorrencias, relacionamentos = {}, [], []
+    for origem, destino, coluna in ingestao.RELACIONAMENTOS:
+        if origem not in tabelas or destino not in tabelas:
+            continue
+        chaves = tabelas[origem][coluna].to_numpy()
+        posicoes = _posicoes(indices, tabelas, destino, coluna, chaves)
+        orfas = posicoes < 0
+        usadas = np.zeros(len(tabelas[destino]), dtype=bool)
+        usadas[posicoes[~orfas]] = True
+        cobertura = usadas.mean() if len(usadas) else 1.0
+        relacionamentos.append({'origem': origem, 'destino': destino, 'coluna': coluna, 'linhas': len(chaves),
+                                'orfas': int(orfas.sum()), 'cobertura': float(cobertura)})
+        if orfas.any():
+            ocorrencias.append(_ocorrencia(origem, coluna, 'relacoes', 'erro', orfas.sum(), len(chaves),
+                                           f"sem linha em {destino} (ex.: {coluna} = {chaves[orfas][0]})"))
+    return ocorrencias, relacionamentos, indices
+
+
+def verificar_copias(tabelas, indices):
+    ocorrencias = []
+    destinos = {(origem, coluna): destino for origem, destino, coluna in ingestao.RELACIONAMENTOS}
+    for tabela, coluna, caminho, coluna_destino in COPIAS:
+        atual, linhas = tabela, np.arange(len(tabelas.get(tabela, ())))
+        for chave in caminho:
+            destino = destinos.get((atual, chave))
+            if destino is None or destino not in tabelas or atual not in tabelas:
+                linhas = None
+                break
+            posicoes = np.full(len(linhas), -1)
+            validas = linhas >= 0
+            posicoes[validas] = _posicoes(indices, tabelas, destino, chave,
+                                          tabelas[atual][chave].to_numpy()[linhas[validas]])
+            atual, linhas = destino, posicoes
+        if linhas is None:
+            continue
+        # Linhas órfãs no caminho já aparecem em 'relacoes'
+        validas = linhas >= 0
+        copia = tabelas[tabela][coluna].to_numpy()[validas]
+        original = tabelas[atual][coluna_destino].to_numpy()[linhas[validas]]
+        divergentes = copia != original
+        if divergentes.any():
+            exemplo = np.flatnonzero(validas)[np.flatnonzero(divergentes)[0]]
+            ocorrencias.append(_ocorrencia(
+                tabela, coluna, 'coerencia', 'aviso', divergentes.sum(), len(copia),
+                f"difere de {atual}.{coluna_destino} via {' -> '.join(caminho)} "
+                f"(ex.: linha {exemplo}: '{copia[divergentes][0]}' x '{original[divergentes][0]}')"))
+    return ocorrencias
+
+
+# --- 5. VALIDAÇÃO COMPLETA ---
+def validar(diretorio=None, trabalhadores=None):
+    diretorio = diretorio or ingestao.DIRETORIO_PADRAO
+    inicio = time.perf_counter()
+    nomes = list(ingestao.ESQUEMA)
+    estrangeiras = {}
+    for origem, _, coluna in ingestao.RELACIONAMENTOS:
+        estrangeiras.setdefault(origem, set()).add(coluna)
+
+    def varrer(tabela):
+        try:
+            return varrer_csv(os.path.join(diretorio, f'{tabela}.csv'))
+        except OSError:
+            return None
+
+    # Varreduras em threads (leitura de arquivo e numpy liberam o GIL); a tipagem usa o
+    # cache Parquet da ingestão e roda em sequência (um manifesto por pasta)
+    with ThreadPoolExecutor(trabalhadores) as executor:
+        varreduras = dict(zip(nomes, executor.map(varrer, nomes)))
+
+    ocorrencias, tabelas, linhas = [], {}, 0
+    for tabela in nomes:
+        varredura = varreduras[tabela]
+        if varredura is None:
+            ocorrencias.append(_ocorrencia(tabela, '', 'formato', 'erro', 0, 0, 'arquivo CSV ausente'))
+            continue
+        linhas += varredura['linhas']
+        ocorrencias += verificar_formato(tabela, varredura)
+        try:
+            tabelas[tabela] = ingestao.carregar_tabelas(diretorio, tabelas=[tabela], compacto=False)[tabela]
+        except ValueError as erro:
+            ocorrencias.append(_ocorrencia(tabela, '', 'tipos', 'erro', varredura['linhas'], varredura['linhas'],
+                                           str(erro)))
+            continue
+        ocorrencias += verificar_tabela(tabela, tabelas[tabela], estrangeiras.get(tabela, set()))
+
+    ocorrencias_relacoes, relacionamentos, indices = verificar_relacionamentos(tabelas)
+    ocorrencias += ocorrencias_relacoes + verificar_copias(tabelas, indices)
+    return {'linhas': linhas, 'segundos': time.perf_counter() - inicio,
+            'ocorrencias': ocorrencias, 'relacionamentos': relacionamentos}
+
+
+def erros(relatorio):
+    return [o for o in relatorio['ocorrencias'] if o['severidade'] == 'erro']
+
+
+# --- 6. RELATÓRIO EM CACHE E PORTA DE ENTRADA DOS DASHBOARDS ---
+def chave_validacao(diretorio=None):
+    h = hashlib.sha256(f'v{VERSAO_VALIDACAO}'.encode())
+    h.update(ingestao.assinatura_dados(diretorio).encode())
+    aqui = os.path.dirname(os.path.abspath(__file__))
+    for fonte in ('validacao.py', 'ingestao.py'):
+        with open(os.path.join(aqui, fonte), 'rb') as f:
+            h.update(hashlib.sha256(f.read()).digest())
+    return h.hexdigest()[:16]
+
+
+def obter_relatorio(diretorio=None, forcar=False, trabalhadores=None):
+    # Relatório gravado se a chave bate; senão valida agora e grava
+    caminho = os.path.join(diretorio or ingestao.DIRETORIO_PADRAO, NOME_RELATORIO)
+    chave = chave_validacao(diretorio)
+    if not forcar:
+        try:
+            with open(caminho, encoding='utf-8') as f:
+                relatorio = json.load(f)
+            if relatorio.get('chave') == chave:
+                return relatorio
+        except (OSError, ValueError):
+            pass
+    relatorio = {'chave': chave, **validar(diretorio, trabalhadores)}
+    temporario = f'{caminho}.{os.getpid()}.tmp'
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, indent=2, ensure_ascii=False)
+    os.replace(temporario, caminho)
+    return relatorio
+
+
+def milhar(valor):
+    return f'{valor:,}'.replace(',', '.')
+
+
+def formatar_ocorrencia(ocorrencia):
+    simbolo = '❌' if ocorrencia['severidade'] == 'erro' else '⚠️'
+    coluna = f".{ocorrencia['coluna']}" if ocorrencia['coluna'] else ''
+    return (f"{simbolo} {ocorrencia['tabela']}{coluna} [{ocorrencia['verificacao']}] "
+            f"{milhar(ocorrencia['linhas'])}/{milhar(ocorrencia['total'])} linhas: {ocorrencia['detalhe']}")
+
+
+def exigir(diretorio=None):
+    # Chamado antes de carregar os dashboards: DadosInvalidos se houver erro
+    relatorio = obter_relatorio(diretorio)
+    avisos = len(relatorio['ocorrencias']) - len(erros(relatorio))
+    if avisos:
+        print(f"⚠️ Validação dos dados: {avisos} aviso(s); detalhes em python validacao.py", flush=True)
+    if erros(relatorio):
+        raise DadosInvalidos('Dados reprovados na validação:\n' +
+                             '\n'.join(formatar_ocorrencia(o) for o in erros(relatorio)))
+    return relatorio
+
+
+def imprimir(relatorio):
+    print(f"{'Origem':<28}{'Destino':<16}{'Coluna':<15}{'Linhas':>12}{'Órfãs':>10}{'Cobertura':>11}")
+    for r in relatorio['relacionamentos']:
+        print(f"{r['origem']:<28}{r['destino']:<16}{r['coluna']:<15}{milhar(r['linhas']):>12}{milhar(r['orfas']):>10}"
+              f"{r['cobertura'] * 100:>10.1f}%")
+    print("---")
+    for ocorrencia in relatorio['ocorrencias']:
+        print(formatar_ocorrencia(ocorrencia))
+    simbolo = '❌' if erros(relatorio) else '✅'
+    print(f"{simbolo} {len(erros(relatorio))} erro(s), {len(relatorio['ocorrencias']) - len(erros(relatorio))} "
+          f"aviso(s) em {milhar(relatorio['linhas'])} linhas ({relatorio['segundos']:.2f} s)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Validação de integridade e qualidade do star schema.')
+    parser.add_argument('diretorio', nargs='?', default=None, help='pasta dos CSVs (padrão: MINEIRAO_DADOS)')
+    parser.add_argument('--forcar', action='store_true', help='ignora o relatório gravado e valida de novo')
+    parser.add_argument('--trabalhadores', type=int, default=None, help='threads da varredura dos CSVs')
+    args = parser.parse_args()
+    relatorio = obter_relatorio(args.diretorio, args.forcar, args.trabalhadores)
+    imprimir(relatorio)
+    sys.exit(1 if erros(relatorio) else 0)